@@ -0,0 +1,29 @@
+#!/bin/bash --login
+
+# Usage: ./experiment-monitor-overhead.sh <workload> [workload and monitor overhead arguments...]
+# Runs a workload without and with the GradeML resource monitor at several periods and sets of monitoring modules.
+
+WORKLOAD="$1"
+shift
+
+# Activate the Conda environment
+ROOT_DIR="$(readlink -f "$(dirname "${BASH_SOURCE[0]}")")"
+. "$ROOT_DIR/conda/activate_conda_env.sh"
+
+# Build the resource monitor if needed
+MONITOR_DIR="$ROOT_DIR/../../src/resource-monitor"
+if [ ! -x "$MONITOR_DIR/bin/resource-monitor" ]; then
+	if command -v nvcc > /dev/null; then
+		make -C "$MONITOR_DIR"
+	else
+		NO_CUDA=1 make -C "$MONITOR_DIR"
+	fi
+fi
+
+# Create a directory for experiment logs
+EXP_LOG_DIR="$ROOT_DIR/logs/$(date +%Y%m%d-%H%M)_monitor-overhead_$WORKLOAD"
+mkdir -p "$EXP_LOG_DIR"
+
+PYTHONPATH="$ROOT_DIR/src" python -m benchmark.monitor_overhead "$WORKLOAD" \
+	--monitor-binary "$MONITOR_DIR/bin/resource-monitor" \
+	--log-dir "$EXP_LOG_DIR" "$@"
@@ -26,7 +26,7 @@ for run in $(seq 1 $REPEATS); do
 
 		RUN_LOG_DIR="$EXP_LOG_DIR/profile_$profile_type/$run"
 		mkdir -p "$RUN_LOG_DIR"
-		python src/pytorch_inference_resnet50.py \
+		PYTHONPATH="$ROOT_DIR/src" python -m benchmark pytorch_inference_resnet50 \
 			--batch-size "$BATCH_SIZE" \
 			--num-batches "$BATCHES" \
 			--profile-type "$profile_type" \
@@ -3,6 +3,10 @@
 # Experiment configuration
 EPOCHS=5
 REPEATS=5
+SAMPLE_PERIOD=0.01
+DATA_DIR="${DATA_DIR:-/local/$USER/sonet/datasets}"
+DATASET_MODE=torchvision
+NUM_WORKERS=0
 
 # Activate the Conda environment
 ROOT_DIR="$(readlink -f "$(dirname "${BASH_SOURCE[0]}")")"
@@ -14,9 +18,12 @@ mkdir -p "$EXP_LOG_DIR"
 
 # Record the experiment configuration
 echo "epochs: $EPOCHS" > "$EXP_LOG_DIR/configuration"
+echo "sample_period: $SAMPLE_PERIOD" >> "$EXP_LOG_DIR/configuration"
+echo "dataset_mode: $DATASET_MODE" >> "$EXP_LOG_DIR/configuration"
+echo "num_workers: $NUM_WORKERS" >> "$EXP_LOG_DIR/configuration"
 
 for run in $(seq 1 $REPEATS); do
-	for profile_type in none trace trace_per_epoch profile profile_per_epoch; do
+	for profile_type in none trace trace_per_epoch trace_streaming profile profile_per_epoch; do
 		echo "============================================================"
 		echo "STARTING PYTORCH MNIST EXPERIMENT WITH PROFILE $profile_type ($run/$REPEATS)"
 		echo "============================================================"
@@ -24,17 +31,22 @@ for run in $(seq 1 $REPEATS); do
 
 		RUN_LOG_DIR="$EXP_LOG_DIR/profile_$profile_type/$run"
 		mkdir -p "$RUN_LOG_DIR"
-		python src/pytorch_training_mnist.py \
+		PYTHONPATH="$ROOT_DIR/src" python -m benchmark pytorch_training_mnist \
 			--no-cuda \
 			--epochs "$EPOCHS" \
+			--data-dir "$DATA_DIR" \
+			--dataset-mode "$DATASET_MODE" \
+			--num-workers "$NUM_WORKERS" \
 			--profile-type "$profile_type" \
 			--log-dir "$RUN_LOG_DIR" &
 
-		# Record output from top for memory usage monitoring
+		# Sample memory, CPU, page fault, and I/O usage until the benchmark exits
 		PYT_PID=$!
-		while kill -0 $PYT_PID &>/dev/null; do
-			top -b -d 0.5 -n 10 -p $PYT_PID >> "$RUN_LOG_DIR/top.txt"
-		done
+		PYTHONPATH="$ROOT_DIR/src" python -m benchmark.sampler \
+			--pid $PYT_PID \
+			--period "$SAMPLE_PERIOD" \
+			--output "$RUN_LOG_DIR/process_samples.bin"
+		wait $PYT_PID
 
 		echo
 	done
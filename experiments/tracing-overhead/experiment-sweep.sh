@@ -0,0 +1,18 @@
+#!/bin/bash --login
+
+# Usage: ./experiment-sweep.sh <workload> [workload and sweep arguments...]
+# Runs all profile types of a workload in a single process, repeating each until its batch time is stable.
+
+WORKLOAD="$1"
+shift
+
+# Activate the Conda environment
+ROOT_DIR="$(readlink -f "$(dirname "${BASH_SOURCE[0]}")")"
+. "$ROOT_DIR/conda/activate_conda_env.sh"
+
+# Create a directory for experiment logs
+EXP_LOG_DIR="$ROOT_DIR/logs/$(date +%Y%m%d-%H%M)_sweep_$WORKLOAD"
+mkdir -p "$EXP_LOG_DIR"
+
+PYTHONPATH="$ROOT_DIR/src" python -m benchmark.sweep "$WORKLOAD" \
+	--log-dir "$EXP_LOG_DIR" "$@"
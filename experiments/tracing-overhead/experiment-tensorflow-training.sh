@@ -3,6 +3,7 @@
 # Experiment configuration
 EPOCHS=5
 REPEATS=5
+SAMPLE_PERIOD=0.01
 
 # Activate the Conda environment
 ROOT_DIR="$(readlink -f "$(dirname "${BASH_SOURCE[0]}")")"
@@ -14,6 +15,7 @@ mkdir -p "$EXP_LOG_DIR"
 
 # Record the experiment configuration
 echo "epochs: $EPOCHS" > "$EXP_LOG_DIR/configuration"
+echo "sample_period: $SAMPLE_PERIOD" >> "$EXP_LOG_DIR/configuration"
 
 for run in $(seq 1 $REPEATS); do
 	for profile_type in none trace trace_per_epoch; do
@@ -24,17 +26,19 @@ for run in $(seq 1 $REPEATS); do
 
 		RUN_LOG_DIR="$EXP_LOG_DIR/profile_$profile_type/$run"
 		mkdir -p "$RUN_LOG_DIR"
-		python src/tensorflow_training_mnist.py \
+		PYTHONPATH="$ROOT_DIR/src" python -m benchmark tensorflow_training_mnist \
 			--no-cuda \
 			--epochs "$EPOCHS" \
 			--profile-type "$profile_type" \
 			--log-dir "$RUN_LOG_DIR" &
 
-		# Record output from top for memory usage monitoring
+		# Sample memory, CPU, page fault, and I/O usage until the benchmark exits
 		TF2_PID=$!
-		while kill -0 $TF2_PID &>/dev/null; do
-			top -b -d 0.5 -n 10 -p $TF2_PID >> "$RUN_LOG_DIR/top.txt"
-		done
+		PYTHONPATH="$ROOT_DIR/src" python -m benchmark.sampler \
+			--pid $TF2_PID \
+			--period "$SAMPLE_PERIOD" \
+			--output "$RUN_LOG_DIR/process_samples.bin"
+		wait $TF2_PID
 
 		echo
 	done
@@ -0,0 +1,10 @@
+"""Shared harness for the tracing overhead benchmarks.
+
+A benchmark run combines a workload (framework x training/inference, see workload.py) with a profiler mode
+(see profiling.py), and produces per-step timings and a single result record (see results.py) in a log directory.
+"""
+
+from .profiling import PROFILER_MODES, ProfilerBackend, ProfilerMode, register_profiler_mode
+from .results import RESULT_FIELDS, RESULT_SCHEMA_VERSION, ResultRecord, read_result, write_result
+from .run import BenchmarkRun, run_benchmark
+from .workload import WORKLOADS, Workload, get_workload_class, register_workload
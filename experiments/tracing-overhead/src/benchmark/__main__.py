@@ -0,0 +1,31 @@
+import sys
+import time
+
+if __name__ == '__main__':
+    print('Importing benchmark harness...')
+
+from .cli import parse_workload_args
+from .run import run_benchmark
+
+
+def add_run_arguments(parser, profiler_modes):
+    parser.add_argument('--profile-type', default='none', choices=profiler_modes,
+                        help='type of profiling to perform (default: none)')
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    workload_class, args = parse_workload_args(argv, 'Tracing overhead benchmark', add_run_arguments)
+
+    workload = workload_class(args)
+    setup_start_time = time.time()
+    workload.setup()
+    setup_time = time.time() - setup_start_time
+
+    record = run_benchmark(workload, args.profile_type, args.log_dir, setup_time=setup_time,
+                           sample_period=args.sample_period, phase_markers=args.phase_markers)
+    print('Makespan: {:.3f} s'.format(record.makespan))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+"""Overhead analysis of benchmark results, with bootstrap confidence intervals and regression checks.
+
+Loads all runs below one or more log directories (result.json files, e.g., from a sweep) and/or makespan tables
+({task}_makespan.ssv, as in data/), and reports per framework, task, and profiler mode:
+
+- the makespan overhead relative to the 'none' mode of the same framework and task,
+- the steady-state batch time overhead (batch_time_mean, which excludes warm-up batches and profiler stop/export),
+- the one-off time spent stopping the profiler and exporting its output (profile_parsing_time and
+  profile_serialization_time), per run and as a fraction of the makespan.
+
+Overheads are ratios minus one, e.g., 0.25 for a 25% slowdown. Confidence intervals are percentile intervals from a
+bootstrap that resamples the runs of a mode and of its baseline independently. Given a baseline file written with
+--save-baseline, an overhead is flagged as a regression if its confidence interval lies entirely above the baseline's.
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+
+import numpy as np
+
+from .results import RESULT_FILE_NAME, read_result
+
+BASELINE_PROFILE = 'none'
+
+ANALYSIS_FIELDS = (
+    'framework',
+    'task',
+    'profile',
+    'runs',
+    'makespan.mean',
+    'makespan.overhead',
+    'makespan.overhead.ci.low',
+    'makespan.overhead.ci.high',
+    'batch.time.mean',
+    'batch.overhead',
+    'batch.overhead.ci.low',
+    'batch.overhead.ci.high',
+    'profile.parsing.time',
+    'profile.serialization.time',
+    'profile.time.fraction',
+    'regression',
+)
+
+# Overheads compared against a stored baseline
+_OVERHEAD_METRICS = ('makespan', 'batch')
+
+
+class RunTable(object):
+    """Columnar table of runs, with one NumPy array per column"""
+
+    def __init__(self, rows):
+        self.framework = np.array([r[0] for r in rows], dtype=object)
+        self.task = np.array([r[1] for r in rows], dtype=object)
+        self.profile = np.array([r[2] for r in rows], dtype=object)
+        self.makespan = np.array([r[3] for r in rows], dtype=float)
+        self.batch_time = np.array([r[4] for r in rows], dtype=float)
+        self.parsing_time = np.array([r[5] for r in rows], dtype=float)
+        self.serialization_time = np.array([r[6] for r in rows], dtype=float)
+
+    def __len__(self):
+        return len(self.makespan)
+
+
+def _optional(value):
+    return float('nan') if value is None else value
+
+
+def _read_makespan_table(path, rows):
+    # Makespan tables are named after the task of their runs, e.g., training_makespan.ssv
+    task = os.path.basename(path).split('_makespan')[0]
+    with open(path) as f:
+        header = f.readline().split()
+        for line in f:
+            values = dict(zip(header, line.split()))
+            if not values:
+                continue
+            nan = float('nan')
+            rows.append((values['framework'], task, values['profile'], float(values['makespan']), nan, nan, nan))
+
+
+def load_runs(paths):
+    """Loads all measured runs below the given log directories and makespan tables into a RunTable
+
+    Directories are searched for result.json files; warm-up runs (with a negative repeat) are skipped.
+    """
+    rows = []
+    for path in paths:
+        if os.path.isfile(path):
+            _read_makespan_table(path, rows)
+            continue
+        for directory, _, file_names in os.walk(path):
+            if RESULT_FILE_NAME not in file_names:
+                continue
+            record = read_result(directory)
+            if record.repeat < 0:
+                continue
+            rows.append((record.framework, record.task, record.profile, record.makespan,
+                         _optional(record.batch_time_mean), record.profile_parsing_time,
+                         record.profile_serialization_time))
+    return RunTable(rows)
+
+
+def bootstrap_means(samples, bootstrap_samples, rng):
+    """Returns the means of bootstrap_samples resamples (with replacement) of the given samples"""
+    samples = samples[~np.isnan(samples)]
+    if len(samples) == 0:
+        return np.full(bootstrap_samples, np.nan)
+    indices = rng.integers(0, len(samples), size=(bootstrap_samples, len(samples)))
+    return samples[indices].mean(axis=1)
+
+
+def overhead_interval(samples, baseline_samples, confidence=0.95, bootstrap_samples=10000, rng=None):
+    """Returns the overhead of the mean of samples relative to the mean of baseline_samples, with a bootstrap CI
+
+    The result is a tuple (overhead, ci_low, ci_high); values are NaN if either sample set is empty.
+    """
+    rng = np.random.default_rng(0) if rng is None else rng
+    samples = np.asarray(samples, dtype=float)
+    baseline_samples = np.asarray(baseline_samples, dtype=float)
+    if np.all(np.isnan(samples)) or np.all(np.isnan(baseline_samples)):
+        return math.nan, math.nan, math.nan
+    overhead = np.nanmean(samples) / np.nanmean(baseline_samples) - 1
+    ratios = (bootstrap_means(samples, bootstrap_samples, rng) /
+              bootstrap_means(baseline_samples, bootstrap_samples, rng) - 1)
+    alpha = (1 - confidence) / 2
+    ci_low, ci_high = np.quantile(ratios, [alpha, 1 - alpha])
+    return float(overhead), float(ci_low), float(ci_high)
+
+
+def _nanmean(values):
+    return float(np.nanmean(values)) if len(values) > 0 and not np.all(np.isnan(values)) else math.nan
+
+
+def analyze(runs, confidence=0.95, bootstrap_samples=10000, seed=0):
+    """Computes the overhead of every profiler mode in a RunTable, returning one dict per mode with ANALYSIS_FIELDS"""
+    rng = np.random.default_rng(seed)
+    results = []
+    groups = sorted(set(zip(runs.framework, runs.task, runs.profile)),
+                    key=lambda g: (g[0], g[1], g[2] != BASELINE_PROFILE, g[2]))
+    for framework, task, profile in groups:
+        selected = (runs.framework == framework) & (runs.task == task) & (runs.profile == profile)
+        baseline = (runs.framework == framework) & (runs.task == task) & (runs.profile == BASELINE_PROFILE)
+
+        makespan = runs.makespan[selected]
+        batch_time = runs.batch_time[selected]
+        profile_time = runs.parsing_time[selected] + runs.serialization_time[selected]
+        result = {
+            'framework': framework,
+            'task': task,
+            'profile': profile,
+            'runs': int(selected.sum()),
+            'makespan.mean': _nanmean(makespan),
+            'batch.time.mean': _nanmean(batch_time),
+            'profile.parsing.time': _nanmean(runs.parsing_time[selected]),
+            'profile.serialization.time': _nanmean(runs.serialization_time[selected]),
+            'profile.time.fraction': _nanmean(profile_time / makespan),
+            'regression': '',
+        }
+        for metric, values in (('makespan', runs.makespan), ('batch', runs.batch_time)):
+            overhead = overhead_interval(values[selected], values[baseline], confidence, bootstrap_samples, rng)
+            for suffix, value in zip(('', '.ci.low', '.ci.high'), overhead):
+                result['{}.overhead{}'.format(metric, suffix)] = value
+        results.append(result)
+    return results
+
+
+def _baseline_key(result):
+    return '{}/{}/{}'.format(result['framework'], result['task'], result['profile'])
+
+
+def flag_regressions(results, baseline, tolerance=0.0):
+    """Marks results whose overhead CI lies entirely above the baseline's CI (plus tolerance) as regressions
+
+    baseline maps '<framework>/<task>/<profile>' to a previously computed result. Returns the flagged results.
+    """
+    regressions = []
+    for result in results:
+        reference = baseline.get(_baseline_key(result))
+        if reference is None:
+            continue
+        regressed_metrics = []
+        for metric in _OVERHEAD_METRICS:
+            ci_low = result['{}.overhead.ci.low'.format(metric)]
+            reference_ci_high = reference.get('{}.overhead.ci.high'.format(metric), math.nan)
+            # Comparisons with NaN are false, so missing metrics are never flagged
+            if ci_low > reference_ci_high + tolerance:
+                regressed_metrics.append(metric)
+        result['regression'] = ','.join(regressed_metrics)
+        if regressed_metrics:
+            regressions.append(result)
+    return regressions
+
+
+def read_baseline(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_baseline(results, path):
+    with open(path, 'w+') as f:
+        json.dump({_baseline_key(result): result for result in results}, f, indent=2, sort_keys=True)
+        print(file=f)
+
+
+def write_analysis(results, path):
+    with open(path, 'w+') as f:
+        print(' '.join(ANALYSIS_FIELDS), file=f)
+        for result in results:
+            print(' '.join(str(result[field]) if result[field] != '' else '-' for field in ANALYSIS_FIELDS), file=f)
+
+
+def _format_overhead(result, metric):
+    overhead = result['{}.overhead'.format(metric)]
+    if math.isnan(overhead):
+        return 'n/a'
+    return '{:+.1%} [{:+.1%}, {:+.1%}]'.format(
+        overhead, result['{}.overhead.ci.low'.format(metric)], result['{}.overhead.ci.high'.format(metric)])
+
+
+def print_analysis(results, file=sys.stdout):
+    print('{:<12} {:<10} {:<24} {:>4} {:>28} {:>28} {:>10}'.format(
+        'framework', 'task', 'profile', 'runs', 'makespan overhead', 'batch overhead', 'profiling'), file=file)
+    for result in results:
+        profiling_time = result['profile.parsing.time'] + result['profile.serialization.time']
+        print('{:<12} {:<10} {:<24} {:>4} {:>28} {:>28} {:>10}{}'.format(
+            result['framework'], result['task'], result['profile'], result['runs'],
+            _format_overhead(result, 'makespan'), _format_overhead(result, 'batch'),
+            'n/a' if math.isnan(profiling_time) else '{:.3f}'.format(profiling_time),
+            '  REGRESSION ({})'.format(result['regression']) if result['regression'] else ''), file=file)
+
+
+def add_analysis_arguments(parser):
+    parser.add_argument('--baseline', default=None, metavar='FILE',
+                        help='flag overheads that regressed compared to this baseline file (default: disabled)')
+    parser.add_argument('--regression-tolerance', type=float, default=0.0, metavar='F',
+                        help='overhead increase beyond the baseline confidence interval that is tolerated, '
+                             'e.g., 0.01 for one percentage point (default: 0.0)')
+    parser.add_argument('--bootstrap-samples', type=int, default=10000, metavar='N',
+                        help='number of bootstrap resamples for confidence intervals (default: 10000)')
+
+
+def run_analysis(paths, output_path, confidence=0.95, bootstrap_samples=10000, baseline_path=None,
+                 regression_tolerance=0.0):
+    """Analyzes the runs in the given paths, writes the results to output_path, and returns (results, regressions)"""
+    results = analyze(load_runs(paths), confidence, bootstrap_samples)
+    regressions = []
+    if baseline_path is not None:
+        regressions = flag_regressions(results, read_baseline(baseline_path), regression_tolerance)
+    write_analysis(results, output_path)
+    print_analysis(results)
+    return results, regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Analyze the overhead of profiler modes in benchmark results')
+    parser.add_argument('paths', nargs='+',
+                        help='log directories to search for result.json files, or makespan tables (*.ssv)')
+    parser.add_argument('--output', default='overhead_analysis.ssv',
+                        help='file to write the analysis to (default: overhead_analysis.ssv)')
+    parser.add_argument('--save-baseline', default=None, metavar='FILE',
+                        help='store the analysis as a baseline for later comparisons')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='confidence level of the confidence intervals (default: 0.95)')
+    add_analysis_arguments(parser)
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    results, regressions = run_analysis(args.paths, args.output, args.confidence, args.bootstrap_samples,
+                                        args.baseline, args.regression_tolerance)
+    if args.save_baseline is not None:
+        write_baseline(results, args.save_baseline)
+    if regressions:
+        print('{} profiler mode(s) regressed compared to {}'.format(len(regressions), args.baseline))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
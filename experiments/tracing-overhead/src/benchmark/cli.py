@@ -0,0 +1,36 @@
+import argparse
+
+from .profiling import add_profiler_mode_arguments, available_profiler_modes
+from .workload import WORKLOADS, get_workload_class
+
+
+def _create_parser(description, workload_class, add_arguments):
+    parser = argparse.ArgumentParser(description=description, add_help=workload_class is not None)
+    parser.add_argument('workload', choices=sorted(WORKLOADS.keys()),
+                        help='workload to run')
+    if workload_class is not None:
+        parser.add_argument('--no-cuda', action='store_true', default=False,
+                            help='disables CUDA')
+        parser.add_argument('--log-dir', required=True,
+                            help='directory to store log files in')
+        parser.add_argument('--sample-period', type=float, default=None, metavar='SECONDS',
+                            help='sample the resource usage of the benchmark process at this period (default: disabled)')
+        parser.add_argument('--phase-markers', action='store_true', default=False,
+                            help='record the start and end of epochs, batches, and workload-specific phases '
+                                 'in phase_markers.bin')
+        add_arguments(parser, available_profiler_modes(workload_class))
+        add_profiler_mode_arguments(parser, workload_class)
+        workload_class.add_arguments(parser)
+    return parser
+
+
+def parse_workload_args(argv, description, add_arguments):
+    """Parses command line arguments for a workload, returning the workload class and the parsed arguments
+
+    The workload is determined first, so only its framework is imported and only its arguments are accepted.
+    add_arguments(parser, profiler_modes) adds arguments specific to the calling command.
+    """
+    workload_args, _ = _create_parser(description, None, add_arguments).parse_known_args(argv)
+    workload_class = get_workload_class(workload_args.workload)
+    args = _create_parser(description, workload_class, add_arguments).parse_args(argv)
+    return workload_class, args
@@ -0,0 +1,2 @@
+# Framework-specific profiler backends and helpers.
+# Modules in this package import their framework at import time, so only import the one a workload needs.
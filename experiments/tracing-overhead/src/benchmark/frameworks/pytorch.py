@@ -0,0 +1,225 @@
+import collections
+import json
+import os
+import queue
+import threading
+import time
+
+import torch
+
+from ..profiling import (ProfilerBackend, ProfilerMode, register_profiler_mode, write_trace_start_time,
+                         TRACE_START_TIME_SUFFIX)
+from ..tracefile import TraceFileWriter
+
+# A stopped profiler session, with the CLOCK_REALTIME timestamp at which it was started
+PyTorchSession = collections.namedtuple('PyTorchSession', ['profile', 'start_time_ns'])
+
+
+def _write_binary_events(writer, session):
+    # Event times are in microseconds since the start of the session
+    offset_ns = session.start_time_ns - writer.base_time_ns
+    for event in session.profile.function_events:
+        interval = event.time_range if hasattr(event, 'time_range') else event.cpu_interval
+        writer.add_event(event.name, event.thread, offset_ns + int(interval.start * 1000),
+                         int((interval.end - interval.start) * 1000))
+
+
+class PyTorchProfilerBackend(ProfilerBackend):
+    """Profiler backend based on torch.autograd.profiler"""
+
+    export_kinds = ('trace', 'trace_binary', 'profile')
+
+    def __init__(self, log_dir, use_cuda):
+        super(PyTorchProfilerBackend, self).__init__(log_dir)
+        self.use_cuda = use_cuda
+        self.active_profile = None
+        self.active_start_time_ns = None
+
+    def start(self, name):
+        self.active_profile = torch.autograd.profiler.profile(use_cuda=self.use_cuda)
+        self.active_start_time_ns = time.time_ns()
+        self.active_profile.__enter__()
+
+    def stop(self):
+        # Exiting the profiler context parses the collected events
+        session = PyTorchSession(self.active_profile, self.active_start_time_ns)
+        self.active_profile = None
+        session.profile.__exit__(None, None, None)
+        return session
+
+    def export(self, session, name, kind):
+        if kind == 'profile':
+            with open(os.path.join(self.log_dir, '{}.txt'.format(name)), 'w+') as log_file:
+                print(session.profile.key_averages().table(
+                    sort_by='cuda_time_total' if self.use_cuda else 'cpu_time_total', row_limit=1000000000),
+                    file=log_file)
+        elif kind == 'trace_binary':
+            with TraceFileWriter(os.path.join(self.log_dir, '{}.gmltrace'.format(name)), session.start_time_ns) as writer:
+                _write_binary_events(writer, session)
+        else:
+            trace_path = os.path.join(self.log_dir, '{}.json'.format(name))
+            session.profile.export_chrome_trace(trace_path)
+            write_trace_start_time(trace_path, session.start_time_ns)
+
+
+class StreamingTraceProfilerMode(ProfilerMode):
+    """Traces the entire run in sessions of a fixed number of batches, exported by a background thread
+
+    Every rotate_batches batches, the active session is stopped and handed to a writer thread through a bounded
+    queue, and a new session is started. The writer appends the events of each session to a single trace.json (with
+    timestamps relative to its baseTimeNanoseconds, the start of the run), or to trace.gmltrace with --trace-format
+    binary, so memory use is bounded by queue_size + 2 sessions instead of growing with the length of the run. Stopping a session (parsing) remains on the critical path, as does waiting for the writer when the queue is full or the run ends.
+    """
+
+    name = 'trace_streaming'
+    frameworks = ('pytorch',)
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('--trace-rotate-batches', type=int, default=100, metavar='N',
+                            help='number of batches per trace session in trace_streaming mode (default: 100)')
+        parser.add_argument('--trace-queue-size', type=int, default=2, metavar='N',
+                            help='number of stopped trace sessions waiting for export in trace_streaming mode (default: 2)')
+        parser.add_argument('--trace-format', default='json', choices=('json', 'binary'),
+                            help='output format of trace_streaming mode; binary writes trace.gmltrace (default: json)')
+
+    def configure(self, args):
+        self.rotate_batches = args.trace_rotate_batches
+        self.queue_size = args.trace_queue_size
+        self.trace_format = args.trace_format
+
+    def begin_run(self):
+        self.sessions = queue.Queue(maxsize=self.queue_size)
+        self.writer_time = 0.0
+        self.writer_error = None
+        self.critical_serialization_time = 0.0
+        self.writer_thread = threading.Thread(target=self._write_trace, name='StreamingTraceWriter', daemon=True)
+        self.writer_thread.start()
+
+        self.run_start_time = time.time()
+        self.batches_in_session = 0
+        self._start_session()
+
+    def end_run(self):
+        parsing_time, serialization_time = self._stop_session()
+
+        # Wait for the writer to export the remaining sessions
+        wait_start_time = time.time()
+        self.sessions.put(None)
+        self.writer_thread.join()
+        serialization_time += time.time() - wait_start_time
+        self.critical_serialization_time += time.time() - wait_start_time
+        if self.writer_error is not None:
+            raise self.writer_error
+
+        self.background_serialization_time = max(0.0, self.writer_time - self.critical_serialization_time)
+        return parsing_time, serialization_time
+
+    def end_batch(self):
+        self.batches_in_session += 1
+        if self.batches_in_session < self.rotate_batches:
+            return 0, 0
+        times = self._stop_session()
+        self._start_session()
+        return times
+
+    def _start_session(self):
+        self.batches_in_session = 0
+        self.session_start_time = time.time()
+        self.backend.start('trace')
+
+    def _stop_session(self):
+        parsing_start_time = time.time()
+        session = self.backend.stop()
+        enqueue_start_time = time.time()
+        # Blocks if the writer falls behind, which bounds the number of sessions held in memory
+        self.sessions.put((session, self.session_start_time - self.run_start_time))
+        end_time = time.time()
+        self.critical_serialization_time += end_time - enqueue_start_time
+        return enqueue_start_time - parsing_start_time, end_time - enqueue_start_time
+
+    def _write_trace(self):
+        log_chunks = open(os.path.join(self.backend.log_dir, 'trace_streaming.tsv'), 'w+')
+        print('chunk\tsession.offset\tevents\texport.time', file=log_chunks)
+        try:
+            if self.trace_format == 'binary':
+                self._write_binary_trace(log_chunks)
+            else:
+                self._write_json_trace(log_chunks)
+        except Exception as e:
+            self.writer_error = e
+            # Keep draining the queue so the training loop is never blocked by a failed writer
+            while self.sessions.get() is not None:
+                pass
+        finally:
+            log_chunks.close()
+
+    def _log_chunk(self, log_chunks, chunk, session_offset, events, export_start_time):
+        export_time = time.time() - export_start_time
+        self.writer_time += export_time
+        print('{}\t{}\t{}\t{}'.format(chunk, session_offset, events, export_time), file=log_chunks)
+        log_chunks.flush()
+
+    def _write_binary_trace(self, log_chunks):
+        # Sessions carry their own start time, so events are written directly without an intermediate export
+        base_time_ns = int(self.run_start_time * 1e9)
+        with TraceFileWriter(os.path.join(self.backend.log_dir, 'trace.gmltrace'), base_time_ns) as writer:
+            chunk = 0
+            while True:
+                item = self.sessions.get()
+                if item is None:
+                    break
+                session, session_offset = item
+                export_start_time = time.time()
+                events_before = writer.events
+                _write_binary_events(writer, session)
+                writer.flush()
+                del session, item
+
+                chunk += 1
+                self._log_chunk(log_chunks, chunk, session_offset, writer.events - events_before, export_start_time)
+
+    def _write_json_trace(self, log_chunks):
+        part_name = 'trace_streaming.part'
+        part_path = os.path.join(self.backend.log_dir, '{}.json'.format(part_name))
+        with open(os.path.join(self.backend.log_dir, 'trace.json'), 'w+') as trace_file:
+            trace_file.write('{{"baseTimeNanoseconds": {}, "traceEvents": ['.format(int(self.run_start_time * 1e9)))
+            chunk = 0
+            first_event = True
+            while True:
+                item = self.sessions.get()
+                if item is None:
+                    break
+                session, session_offset = item
+                export_start_time = time.time()
+
+                # Reuse the framework's exporter for every session, then append its events to the merged trace
+                self.backend.export(session, part_name, 'trace')
+                del session, item
+                with open(part_path) as part_file:
+                    events = json.load(part_file)
+                if isinstance(events, dict):
+                    events = events['traceEvents']
+
+                # Every session has its own time base; align them to the start of the session within the run
+                session_start = min((float(e['ts']) for e in events if e.get('ph') == 'X'), default=0)
+                ts_shift = session_offset * 1e6 - session_start
+                for event in events:
+                    if 'ts' in event:
+                        event['ts'] = float(event['ts']) + ts_shift
+                    if not first_event:
+                        trace_file.write(',\n')
+                    json.dump(event, trace_file)
+                    first_event = False
+                trace_file.flush()
+
+                chunk += 1
+                self._log_chunk(log_chunks, chunk, session_offset, len(events), export_start_time)
+                del events
+            trace_file.write(']}\n')
+        for path in (part_path, part_path + TRACE_START_TIME_SUFFIX):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+register_profiler_mode('trace_streaming', StreamingTraceProfilerMode)
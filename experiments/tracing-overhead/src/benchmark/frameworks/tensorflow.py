@@ -0,0 +1,129 @@
+import os
+import shutil
+import time
+
+import tensorflow as tf
+from tensorflow.python.profiler import profiler_v2 as profiler
+
+from ..profiling import ProfilerBackend, ProfilerMode, register_profiler_mode, write_trace_start_time
+
+
+class TensorFlowProfilerBackend(ProfilerBackend):
+    """Profiler backend based on the TensorFlow 2 profiler API"""
+
+    def __init__(self, log_dir):
+        super(TensorFlowProfilerBackend, self).__init__(log_dir)
+        self.active_log_dir = None
+        self.active_start_time_ns = None
+
+    def start(self, name):
+        self.active_log_dir = os.path.join(self.log_dir, name)
+        self.active_start_time_ns = time.time_ns()
+        profiler.start(logdir=self.active_log_dir)
+
+    def stop(self):
+        # TensorFlow collects and serializes events in a single call, which is accounted for in export()
+        return None
+
+    def export(self, session, name, kind):
+        profiler.stop()
+        # The profiler writes Chrome traces (*.trace.json.gz) with timestamps relative to the start of the session
+        for directory, _, file_names in os.walk(self.active_log_dir):
+            for file_name in file_names:
+                if file_name.endswith('.trace.json.gz'):
+                    write_trace_start_time(os.path.join(directory, file_name), self.active_start_time_ns)
+        self.active_log_dir = None
+
+    def discard(self):
+        # The profiler can only be stopped by writing its output, so remove the output instead
+        profiler.stop()
+        shutil.rmtree(self.active_log_dir, ignore_errors=True)
+        self.active_log_dir = None
+
+
+class TensorBoardProfilerMode(ProfilerMode):
+    """Profiles a Keras model through the TensorBoard callback"""
+
+    frameworks = ('tensorflow',)
+    # The TensorBoard callback decides which batches to profile
+    coverage = None
+
+    def __init__(self, full):
+        self.name = 'tensorboard_full' if full else 'tensorboard'
+        self.full = full
+        self.keras_callback = None
+        # Logs of the current epoch, set by KerasProfilingCallback before ending a step
+        self.epoch_logs = None
+
+    def begin_run(self):
+        if self.full:
+            self.keras_callback = tf.keras.callbacks.TensorBoard(
+                log_dir=os.path.join(self.backend.log_dir, 'tensorboard'),
+                write_graph=True,
+                profile_batch='1, 1000000'
+            )
+        else:
+            self.keras_callback = tf.keras.callbacks.TensorBoard(
+                log_dir=os.path.join(self.backend.log_dir, 'tensorboard')
+            )
+
+    def end_step(self, step):
+        # The TensorBoard callback writes its logs at the end of each epoch, so that is accounted for as serialization
+        serialization_start_time = time.time()
+        self.keras_callback.on_epoch_end(step - 1, self.epoch_logs)
+        return 0, time.time() - serialization_start_time
+
+
+register_profiler_mode('tensorboard', lambda: TensorBoardProfilerMode(full=False))
+register_profiler_mode('tensorboard_full', lambda: TensorBoardProfilerMode(full=True))
+
+
+class KerasProfilingCallback(tf.keras.callbacks.Callback):
+    """Drives a benchmark run from Keras training callbacks, treating each epoch as a step"""
+
+    def __init__(self, run):
+        super(KerasProfilingCallback, self).__init__()
+        self.run = run
+
+    def _inner(self):
+        return getattr(self.run.profiler, 'keras_callback', None)
+
+    def set_model(self, model):
+        super(KerasProfilingCallback, self).set_model(model)
+        if self._inner() is not None:
+            self._inner().set_model(model)
+
+    def on_train_begin(self, logs=None):
+        if self._inner() is not None:
+            self._inner().on_train_begin(logs)
+
+    def on_train_end(self, logs=None):
+        if self._inner() is not None:
+            self._inner().on_train_end(logs)
+
+    def on_test_begin(self, logs=None):
+        if self._inner() is not None:
+            self._inner().on_test_begin(logs)
+
+    def on_test_end(self, logs=None):
+        if self._inner() is not None:
+            self._inner().on_test_end(logs)
+
+    def on_train_batch_begin(self, batch, logs=None):
+        if self._inner() is not None:
+            self._inner().on_train_batch_begin(batch, logs)
+
+    def on_train_batch_end(self, batch, logs=None):
+        if self._inner() is not None:
+            self._inner().on_train_batch_end(batch, logs)
+        self.run.end_batch()
+
+    def on_epoch_begin(self, epoch, logs=None):
+        self.run.begin_step(epoch + 1)
+        if self._inner() is not None:
+            self._inner().on_epoch_begin(epoch, logs)
+
+    def on_epoch_end(self, epoch, logs=None):
+        if self._inner() is not None:
+            self.run.profiler.epoch_logs = logs
+        self.run.end_step(epoch + 1)
@@ -0,0 +1,129 @@
+"""Lightweight phase markers, recording the start and end of ML phases for GradeML's phase-markers input source.
+
+Markers are appended to a binary log consisting of a header followed by fixed-size little-endian records:
+
+    header:  magic (8 bytes, b'GMLPHSE1'), number of phase types (uint8),
+             per phase type: name length (uint8) and ASCII name
+    record:  event (uint8, 1 = begin, 2 = end), phase type (uint8, index into the header), reserved (uint16),
+             id (uint32, e.g., epoch or batch number), timestamp (int64, CLOCK_REALTIME ns)
+
+A phase is identified by its type and id, and spans from its begin to its end record. Records carry their own
+timestamps and need not be written in chronological order, so a phase can be recorded after it ended (see span()).
+Phases are nested by type (e.g., forward passes in batches in epochs) when the log is read, so the log itself does not
+encode a hierarchy. Recording a marker costs a clock read and a struct.pack_into(); records are written in blocks.
+"""
+
+import contextlib
+import struct
+import time
+
+MARKER_MAGIC = b'GMLPHSE1'
+MARKER_RECORD = struct.Struct('<BBHIq')
+
+EVENT_BEGIN = 1
+EVENT_END = 2
+
+# Phase types that can be recorded. The order determines the phase type indices in a log.
+PHASE_TYPES = ('epoch', 'batch', 'data', 'forward', 'backward', 'optimizer', 'validation')
+
+_PHASE_TYPE_INDICES = {phase: index for index, phase in enumerate(PHASE_TYPES)}
+_FLUSH_RECORDS = 4096
+
+
+class PhaseMarkerLog(object):
+    """Appends phase markers to a binary log file"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'wb')
+        header = bytearray(MARKER_MAGIC)
+        header.append(len(PHASE_TYPES))
+        for phase in PHASE_TYPES:
+            header.append(len(phase))
+            header += phase.encode('ascii')
+        self._file.write(header)
+        self._buffer = bytearray(MARKER_RECORD.size * _FLUSH_RECORDS)
+        self._records = 0
+
+    def record(self, event, phase, phase_id, time_ns):
+        MARKER_RECORD.pack_into(self._buffer, self._records * MARKER_RECORD.size,
+                                event, _PHASE_TYPE_INDICES[phase], 0, phase_id, time_ns)
+        self._records += 1
+        if self._records == _FLUSH_RECORDS:
+            self.flush()
+
+    def begin(self, phase, phase_id):
+        self.record(EVENT_BEGIN, phase, phase_id, time.time_ns())
+
+    def end(self, phase, phase_id):
+        self.record(EVENT_END, phase, phase_id, time.time_ns())
+
+    def span(self, phase, phase_id, start_ns, end_ns):
+        """Records a phase with known start and end timestamps"""
+        self.record(EVENT_BEGIN, phase, phase_id, start_ns)
+        self.record(EVENT_END, phase, phase_id, end_ns)
+
+    @contextlib.contextmanager
+    def phase(self, phase, phase_id):
+        self.begin(phase, phase_id)
+        try:
+            yield
+        finally:
+            self.end(phase, phase_id)
+
+    def flush(self):
+        self._file.write(memoryview(self._buffer)[:self._records * MARKER_RECORD.size])
+        self._file.flush()
+        self._records = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+class NullPhaseMarkerLog(object):
+    """Discards all markers, used when phase markers are disabled"""
+
+    def record(self, event, phase, phase_id, time_ns):
+        pass
+
+    def begin(self, phase, phase_id):
+        pass
+
+    def end(self, phase, phase_id):
+        pass
+
+    def span(self, phase, phase_id, start_ns, end_ns):
+        pass
+
+    @contextlib.contextmanager
+    def phase(self, phase, phase_id):
+        yield
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def read_markers(path):
+    """Reads a phase marker log, returning a list of (event, phase, id, time_ns) tuples in the order written"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    if content[:len(MARKER_MAGIC)] != MARKER_MAGIC:
+        raise ValueError('{} is not a phase marker log'.format(path))
+
+    offset = len(MARKER_MAGIC)
+    phase_types = []
+    for _ in range(content[offset]):
+        length = content[offset + 1]
+        phase_types.append(content[offset + 2:offset + 2 + length].decode('ascii'))
+        offset += 1 + length
+    offset += 1
+
+    # Ignore a partially written trailing record
+    body = memoryview(content)[offset:]
+    body = body[:len(body) - len(body) % MARKER_RECORD.size]
+    return [(event, phase_types[phase], phase_id, time_ns)
+            for event, phase, _, phase_id, time_ns in MARKER_RECORD.iter_unpack(body)]
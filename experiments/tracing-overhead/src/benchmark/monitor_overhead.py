@@ -0,0 +1,339 @@
+"""Overhead of the GradeML resource monitor (src/resource-monitor) on a workload.
+
+Runs a workload in a single process without the resource monitor and with the monitor at every combination of
+monitoring period and set of monitoring modules. Configurations are interleaved, so slow drift of the machine affects
+all of them equally. Per configuration, the following is reported:
+
+- the makespan delta relative to runs without the monitor, in seconds and as an overhead ratio with a bootstrap CI,
+- the CPU time (user + system) consumed by the monitor process, in total and as a fraction of the time it was active,
+- the rate at which the monitor writes output, in bytes per second of monitoring.
+
+The CPU time of the monitor is taken from the resource usage reported when it exits, so it includes the cost of
+flushing its output files.
+"""
+
+import gc
+import os
+import signal
+import subprocess
+import sys
+import time
+
+if __name__ == '__main__':
+    print('Importing benchmark harness...')
+
+from .analysis import overhead_interval
+from .cli import parse_workload_args
+from .run import run_benchmark
+
+MONITOR_MODULES = ('cpu', 'memory', 'network', 'disk', 'gpu')
+
+# Name of the configuration without the resource monitor
+NO_MONITOR = 'none'
+
+DEFAULT_MONITOR_BINARY = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                      '..', '..', '..', '..', 'src', 'resource-monitor', 'bin', 'resource-monitor')
+
+MONITOR_RUN_FIELDS = (
+    'framework',
+    'task',
+    'monitor',
+    'period',
+    'modules',
+    'repeat',
+    'makespan',
+    'monitor.cpu.time',
+    'monitor.active.time',
+    'monitor.output.bytes',
+)
+
+MONITOR_SUMMARY_FIELDS = (
+    'framework',
+    'task',
+    'monitor',
+    'period',
+    'modules',
+    'runs',
+    'makespan.mean',
+    'makespan.delta',
+    'makespan.overhead',
+    'makespan.overhead.ci.low',
+    'makespan.overhead.ci.high',
+    'monitor.cpu.time',
+    'monitor.cpu.utilization',
+    'monitor.output.bytes.per.second',
+)
+
+_STARTUP_TIMEOUT = 10.0
+
+
+class MonitorConfiguration(object):
+    """A monitoring period (in milliseconds) and set of modules, or no monitor if period is None"""
+
+    def __init__(self, period, modules):
+        self.period = period
+        self.modules = tuple(modules)
+        self.runs = []
+
+    @property
+    def name(self):
+        if self.period is None:
+            return NO_MONITOR
+        return 'monitor_{}ms_{}'.format(self.period, '+'.join(self.modules))
+
+    def values(self, field):
+        return [run[field] for run in self.runs]
+
+
+class ResourceMonitorProcess(object):
+    """Runs the resource monitor as a child process and measures its CPU time and output size"""
+
+    def __init__(self, binary, output_dir, period, modules, supported_modules):
+        self.output_dir = output_dir
+        self.pid_file = os.path.join(output_dir, 'resource-monitor.pid')
+        self.command = [binary, '--output-dir', output_dir, '--monitor-interval', str(period),
+                        '--pid-file', self.pid_file]
+        self.command += ['--no-{}'.format(module) for module in supported_modules if module not in modules]
+        self.module_count = len(modules)
+        self._process = None
+        self._start_time = None
+
+    def start(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._process = subprocess.Popen(self.command, stdout=subprocess.DEVNULL)
+        # The monitor writes its PID file and then creates one output file per module; wait for both, so the
+        # workload does not start before the first measurement
+        deadline = time.time() + _STARTUP_TIMEOUT
+        while not os.path.exists(self.pid_file) or len(self._output_files()) < self.module_count:
+            if self._process.poll() is not None:
+                raise RuntimeError('Resource monitor exited with status {} during startup: {}'.format(
+                    self._process.returncode, ' '.join(self.command)))
+            if time.time() > deadline:
+                self._process.kill()
+                self._process.wait()
+                raise RuntimeError('Resource monitor did not start within {} s: {}'.format(
+                    _STARTUP_TIMEOUT, ' '.join(self.command)))
+            time.sleep(0.001)
+        self._start_time = time.time()
+
+    def stop(self):
+        """Stops the monitor and returns its CPU time, the time it was active, and the size of its output in bytes"""
+        self._process.send_signal(signal.SIGINT)
+        # Reap the monitor ourselves to obtain its resource usage
+        _, status, usage = os.wait4(self._process.pid, 0)
+        active_time = time.time() - self._start_time
+        self._process.returncode = os.WEXITSTATUS(status) if os.WIFEXITED(status) else -os.WTERMSIG(status)
+        output_bytes = sum(os.path.getsize(path) for path in self._output_files())
+        return usage.ru_utime + usage.ru_stime, active_time, output_bytes
+
+    def _output_files(self):
+        return [os.path.join(self.output_dir, name) for name in os.listdir(self.output_dir)
+                if os.path.join(self.output_dir, name) != self.pid_file]
+
+
+def supported_monitor_modules(binary):
+    """Returns the monitoring modules that can be disabled in the given resource monitor binary
+
+    GPU monitoring is only available if the monitor was compiled with CUDA support.
+    """
+    help_text = subprocess.run([binary, '--help'], stdout=subprocess.PIPE, check=True).stdout.decode()
+    return tuple(module for module in MONITOR_MODULES if '--no-{}'.format(module) in help_text)
+
+
+def parse_module_sets(module_sets, supported_modules):
+    """Parses comma-separated sets of modules, e.g., 'cpu,memory', where 'all' selects every supported module"""
+    parsed = []
+    for module_set in module_sets:
+        modules = supported_modules if module_set == 'all' else tuple(module_set.split(','))
+        for module in modules:
+            if module not in supported_modules:
+                raise ValueError('Unsupported monitoring module {}, expected one of {}'.format(
+                    module, ', '.join(supported_modules)))
+        parsed.append(tuple(m for m in supported_modules if m in modules))
+    return parsed
+
+
+def _append_line(path, header, line):
+    is_new = not os.path.exists(path)
+    with open(path, 'a') as f:
+        if is_new:
+            print(header, file=f)
+        print(line, file=f)
+
+
+def _run_configuration(workload, configuration, profile_type, run_log_dir, repeat, setup_time, warmup_batches,
+                       monitor_binary, supported_modules):
+    os.makedirs(run_log_dir, exist_ok=True)
+    monitor = None
+    if configuration.period is not None:
+        monitor = ResourceMonitorProcess(monitor_binary, os.path.join(run_log_dir, 'resource-monitor'),
+                                         configuration.period, configuration.modules, supported_modules)
+        monitor.start()
+    try:
+        record = run_benchmark(workload, profile_type, run_log_dir, repeat=repeat, setup_time=setup_time,
+                               warmup_batches=warmup_batches)
+    finally:
+        cpu_time, active_time, output_bytes = monitor.stop() if monitor is not None else (0.0, 0.0, 0)
+    return {
+        'framework': workload.framework,
+        'task': workload.task,
+        'monitor': configuration.name,
+        'period': configuration.period if configuration.period is not None else '-',
+        'modules': ','.join(configuration.modules) if configuration.modules else '-',
+        'repeat': repeat,
+        'makespan': record.makespan,
+        'monitor.cpu.time': cpu_time,
+        'monitor.active.time': active_time,
+        'monitor.output.bytes': output_bytes,
+    }
+
+
+def measure_monitor_overhead(workload, configurations, log_dir, profile_type='none', monitor_binary=DEFAULT_MONITOR_BINARY,
+                             supported_modules=MONITOR_MODULES, setup_time=0.0, warmup_runs=1, warmup_batches=0,
+                             repeats=5):
+    """Runs the workload repeats times with every MonitorConfiguration, returning the configurations with their runs
+
+    Every run is appended to monitor_overhead_runs.ssv in log_dir, and the monitor's output is kept in the
+    resource-monitor subdirectory of the run's log directory.
+    """
+    runs_file = os.path.join(log_dir, 'monitor_overhead_runs.ssv')
+
+    # Discard complete runs to warm up the framework and caches
+    for warmup_run in range(1, warmup_runs + 1):
+        run_log_dir = os.path.join(log_dir, 'warmup{}'.format(warmup_run))
+        os.makedirs(run_log_dir, exist_ok=True)
+        print('Warm-up run {}/{}'.format(warmup_run, warmup_runs))
+        gc.collect()
+        run_benchmark(workload, profile_type, run_log_dir,
+                      repeat=-warmup_run, setup_time=setup_time, warmup_batches=warmup_batches)
+
+    for repeat in range(1, repeats + 1):
+        for configuration in configurations:
+            print('Run {}/{} with {}'.format(repeat, repeats, configuration.name))
+            gc.collect()
+            run = _run_configuration(workload, configuration, profile_type,
+                                     os.path.join(log_dir, configuration.name, str(repeat)), repeat, setup_time,
+                                     warmup_batches, monitor_binary, supported_modules)
+            configuration.runs.append(run)
+            _append_line(runs_file, ' '.join(MONITOR_RUN_FIELDS),
+                         ' '.join(str(run[field]) for field in MONITOR_RUN_FIELDS))
+
+    return configurations
+
+
+def summarize(configurations, confidence=0.95, bootstrap_samples=10000):
+    """Computes the overhead of every MonitorConfiguration, returning one dict per configuration with MONITOR_SUMMARY_FIELDS"""
+    baseline = next((c for c in configurations if c.period is None), None)
+    baseline_makespans = baseline.values('makespan') if baseline is not None else []
+    baseline_mean = sum(baseline_makespans) / len(baseline_makespans) if baseline_makespans else float('nan')
+    summaries = []
+    for configuration in configurations:
+        makespans = configuration.values('makespan')
+        makespan_mean = sum(makespans) / len(makespans)
+        cpu_time = sum(configuration.values('monitor.cpu.time')) / len(makespans)
+        active_time = sum(configuration.values('monitor.active.time'))
+        output_bytes = sum(configuration.values('monitor.output.bytes'))
+        overhead = overhead_interval(makespans, baseline_makespans, confidence, bootstrap_samples) \
+            if baseline_makespans else (float('nan'),) * 3
+        summaries.append({
+            'framework': configuration.runs[0]['framework'],
+            'task': configuration.runs[0]['task'],
+            'monitor': configuration.name,
+            'period': configuration.runs[0]['period'],
+            'modules': configuration.runs[0]['modules'],
+            'runs': len(makespans),
+            'makespan.mean': makespan_mean,
+            'makespan.delta': makespan_mean - baseline_mean,
+            'makespan.overhead': overhead[0],
+            'makespan.overhead.ci.low': overhead[1],
+            'makespan.overhead.ci.high': overhead[2],
+            'monitor.cpu.time': cpu_time,
+            'monitor.cpu.utilization': cpu_time * len(makespans) / active_time if active_time > 0 else 0.0,
+            'monitor.output.bytes.per.second': output_bytes / active_time if active_time > 0 else 0.0,
+        })
+    return summaries
+
+
+def write_summary(summaries, path):
+    with open(path, 'w+') as f:
+        print(' '.join(MONITOR_SUMMARY_FIELDS), file=f)
+        for summary in summaries:
+            print(' '.join(str(summary[field]) for field in MONITOR_SUMMARY_FIELDS), file=f)
+
+
+def print_summary(summaries, file=sys.stdout):
+    print('{:<40} {:>4} {:>10} {:>28} {:>10} {:>8} {:>12}'.format(
+        'monitor', 'runs', 'delta', 'makespan overhead', 'cpu time', 'cpu', 'output'), file=file)
+    for summary in summaries:
+        overhead = summary['makespan.overhead']
+        print('{:<40} {:>4} {:>+9.3f}s {:>28} {:>9.3f}s {:>8.2%} {:>10.0f}/s'.format(
+            summary['monitor'], summary['runs'], summary['makespan.delta'],
+            'n/a' if overhead != overhead else '{:+.1%} [{:+.1%}, {:+.1%}]'.format(
+                overhead, summary['makespan.overhead.ci.low'], summary['makespan.overhead.ci.high']),
+            summary['monitor.cpu.time'], summary['monitor.cpu.utilization'],
+            summary['monitor.output.bytes.per.second']), file=file)
+
+
+def add_monitor_overhead_arguments(parser, profiler_modes):
+    parser.add_argument('--profile-type', default='none', choices=profiler_modes,
+                        help='type of profiling to perform in every run (default: none)')
+    parser.add_argument('--monitor-binary', default=DEFAULT_MONITOR_BINARY, metavar='FILE',
+                        help='resource monitor executable (default: src/resource-monitor/bin/resource-monitor)')
+    parser.add_argument('--monitor-periods', type=int, nargs='+', default=[10, 100, 1000], metavar='MS',
+                        help='monitoring periods to measure, in milliseconds (default: 10 100 1000)')
+    parser.add_argument('--monitor-modules', nargs='+', default=['all'], metavar='MODULES',
+                        help='comma-separated sets of monitoring modules to measure, e.g., cpu cpu,memory all '
+                             '(modules: {}; default: all)'.format(', '.join(MONITOR_MODULES)))
+    parser.add_argument('--warmup-runs', type=int, default=1, metavar='N',
+                        help='number of discarded runs before measuring (default: 1)')
+    parser.add_argument('--warmup-batches', type=int, default=10, metavar='N',
+                        help='number of initial batches per run excluded from the batch time (default: 10)')
+    parser.add_argument('--repeats', type=int, default=5, metavar='N',
+                        help='number of measured runs per configuration (default: 5)')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='confidence level of the confidence intervals (default: 0.95)')
+    parser.add_argument('--bootstrap-samples', type=int, default=10000, metavar='N',
+                        help='number of bootstrap resamples for confidence intervals (default: 10000)')
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    workload_class, args = parse_workload_args(argv, 'Resource monitor overhead benchmark',
+                                               add_monitor_overhead_arguments)
+    if not os.path.isfile(args.monitor_binary):
+        raise ValueError('Resource monitor not found at {}, build it with make in src/resource-monitor'.format(
+            args.monitor_binary))
+    if any(period <= 0 for period in args.monitor_periods):
+        raise ValueError('Monitoring periods must be positive')
+    supported_modules = supported_monitor_modules(args.monitor_binary)
+    module_sets = parse_module_sets(args.monitor_modules, supported_modules)
+
+    os.makedirs(args.log_dir, exist_ok=True)
+    with open(os.path.join(args.log_dir, 'configuration'), 'w+') as f:
+        for key, value in sorted(vars(args).items()):
+            print('{}: {}'.format(key, value), file=f)
+
+    workload = workload_class(args)
+    setup_start_time = time.time()
+    workload.setup()
+    setup_time = time.time() - setup_start_time
+
+    configurations = [MonitorConfiguration(None, ())]
+    configurations += [MonitorConfiguration(period, modules) for period in args.monitor_periods
+                       for modules in module_sets]
+    measure_monitor_overhead(workload, configurations, args.log_dir,
+                             profile_type=args.profile_type,
+                             monitor_binary=args.monitor_binary,
+                             supported_modules=supported_modules,
+                             setup_time=setup_time,
+                             warmup_runs=args.warmup_runs,
+                             warmup_batches=args.warmup_batches,
+                             repeats=args.repeats)
+
+    summaries = summarize(configurations, args.confidence, args.bootstrap_samples)
+    write_summary(summaries, os.path.join(args.log_dir, 'monitor_overhead.ssv'))
+    print_summary(summaries)
+
+
+if __name__ == '__main__':
+    main()
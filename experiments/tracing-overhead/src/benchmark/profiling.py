@@ -0,0 +1,291 @@
+import os
+import time
+
+# Profiler modes are strategies that decide *when* a framework profiler is started, stopped, and exported.
+# Framework-specific code only implements a ProfilerBackend, so every mode defined here works for every framework.
+
+# Suffix of the file written next to an exported Chrome trace that records when its profiler was started (Unix time in
+# ns), as frameworks export Chrome traces with timestamps relative to the start of the profiler. GradeML's
+# framework-trace input source skips Chrome traces that specify neither a baseTimeNanoseconds nor this file.
+TRACE_START_TIME_SUFFIX = '.start'
+
+
+def write_trace_start_time(trace_path, start_time_ns):
+    with open(trace_path + TRACE_START_TIME_SUFFIX, 'w') as start_time_file:
+        print(int(start_time_ns), file=start_time_file)
+
+
+class ProfilerBackend(object):
+    """Framework-specific hooks for starting, stopping, and exporting a profiler session"""
+
+    # Output kinds supported by export(); 'trace' produces a timeline, 'trace_binary' produces a timeline in the
+    # binary format of benchmark.tracefile, and 'profile' produces aggregate statistics
+    export_kinds = ('trace',)
+
+    def __init__(self, log_dir):
+        self.log_dir = log_dir
+
+    def start(self, name):
+        """Starts a new profiler session that will be exported under the given name"""
+        raise NotImplementedError()
+
+    def stop(self):
+        """Stops the active profiler session and returns a handle to the collected events"""
+        raise NotImplementedError()
+
+    def export(self, session, name, kind):
+        """Writes the collected events of a stopped session to the log directory"""
+        raise NotImplementedError()
+
+    def discard(self):
+        """Ends the active profiler session without exporting it"""
+        self.stop()
+
+
+class ProfilerMode(object):
+    """Strategy controlling the profiler over the course of a single run"""
+
+    name = None
+    # Frameworks supporting this mode, or None if the mode only relies on the ProfilerBackend interface
+    frameworks = None
+    # Output kind requested from ProfilerBackend.export()
+    export_kind = 'trace'
+    # Time spent exporting profiler output that was hidden from the critical path, e.g., by a background thread
+    background_serialization_time = 0.0
+    # Fraction of batches that were traced, or None if unknown
+    coverage = 1.0
+
+    @classmethod
+    def add_arguments(cls, parser):
+        """Adds mode-specific command line arguments to an argparse parser"""
+        pass
+
+    def configure(self, args):
+        """Applies mode-specific command line arguments"""
+        pass
+
+    def supports(self, workload):
+        if self.frameworks is not None and workload.framework not in self.frameworks:
+            return False
+        return self.export_kind in workload.profiler_backend_class.export_kinds
+
+    def bind(self, backend, step_name):
+        self.backend = backend
+        self.step_name = step_name
+
+    def begin_run(self):
+        pass
+
+    def end_run(self):
+        """Returns the (parsing, serialization) time spent on profiling at the end of a run"""
+        return 0, 0
+
+    def begin_step(self, step):
+        pass
+
+    def end_step(self, step):
+        """Returns the (parsing, serialization) time spent on profiling at the end of a step"""
+        return 0, 0
+
+    def end_batch(self):
+        """Returns the (parsing, serialization) time spent on profiling at the end of a batch"""
+        return 0, 0
+
+    def _stop_and_export(self, name):
+        parsing_start_time = time.time()
+        session = self.backend.stop()
+        serialization_start_time = time.time()
+        self.backend.export(session, name, self.export_kind)
+        end_time = time.time()
+        return serialization_start_time - parsing_start_time, end_time - serialization_start_time
+
+
+class NoProfilerMode(ProfilerMode):
+    name = 'none'
+    coverage = 0.0
+
+
+class WholeRunProfilerMode(ProfilerMode):
+    """Profiles the entire run in a single session, exported after the last step"""
+
+    def __init__(self, export_kind):
+        self.export_kind = export_kind
+        self.name = export_kind
+
+    def begin_run(self):
+        self.backend.start(self.export_kind)
+
+    def end_run(self):
+        return self._stop_and_export(self.export_kind)
+
+
+class PerStepProfilerMode(ProfilerMode):
+    """Profiles every step (epoch or batch) in a separate session, exported directly after the step"""
+
+    def __init__(self, export_kind):
+        self.export_kind = export_kind
+        self.name = '{}_per_step'.format(export_kind)
+
+    def _session_name(self, step):
+        return '{}_{}{}'.format(self.export_kind, self.step_name, step)
+
+    def begin_step(self, step):
+        self.backend.start(self._session_name(step))
+
+    def end_step(self, step):
+        return self._stop_and_export(self._session_name(step))
+
+
+class SampledProfilerMode(ProfilerMode):
+    """Traces a subset of batches in windows, trading coverage for lower overhead
+
+    By default, the first K out of every N batches are traced (--trace-active-batches, --trace-cycle-batches).
+    Alternatively, a window of W seconds is traced every T seconds (--trace-window-seconds, --trace-interval-seconds).
+    Windows start and end at batch boundaries. Every window is a separate session, exported directly after it ends.
+    """
+
+    name = 'trace_sampled'
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('--trace-cycle-batches', type=int, default=10, metavar='N',
+                            help='length of a tracing cycle in batches in trace_sampled mode (default: 10)')
+        parser.add_argument('--trace-active-batches', type=int, default=1, metavar='K',
+                            help='number of traced batches per cycle in trace_sampled mode (default: 1)')
+        parser.add_argument('--trace-interval-seconds', type=float, default=None, metavar='T',
+                            help='trace a window every T seconds instead of a fixed number of batches '
+                                 'in trace_sampled mode (default: disabled)')
+        parser.add_argument('--trace-window-seconds', type=float, default=1.0, metavar='W',
+                            help='duration of a time-based window in trace_sampled mode (default: 1.0)')
+
+    def configure(self, args):
+        self.cycle_batches = args.trace_cycle_batches
+        self.active_batches = args.trace_active_batches
+        self.interval_seconds = args.trace_interval_seconds
+        self.window_seconds = args.trace_window_seconds
+        if self.interval_seconds is None and not 0 < self.active_batches <= self.cycle_batches:
+            raise ValueError('Expected 0 < --trace-active-batches <= --trace-cycle-batches')
+        if self.interval_seconds is not None and not 0 < self.window_seconds <= self.interval_seconds:
+            raise ValueError('Expected 0 < --trace-window-seconds <= --trace-interval-seconds')
+
+    def begin_run(self):
+        self.batches = 0
+        self.traced_batches = 0
+        self.windows = 0
+        self.window_start_time = None
+        self.window_first_batch = None
+        self.next_window_time = time.time()
+        self.log_windows = open(os.path.join(self.backend.log_dir, 'trace_windows.tsv'), 'w+')
+        print('window\tfirst.batch\tbatches\tstart.timestamp\tend.timestamp', file=self.log_windows)
+        self._update_window()
+
+    def end_run(self):
+        times = self._end_window() if self.window_start_time is not None else (0, 0)
+        self.log_windows.close()
+        self.coverage = self.traced_batches / self.batches if self.batches > 0 else 0.0
+        return times
+
+    def end_batch(self):
+        self.batches += 1
+        if self.window_start_time is not None:
+            self.traced_batches += 1
+        return self._update_window()
+
+    def _update_window(self):
+        now = time.time()
+        if self.interval_seconds is None:
+            phase = self.batches % self.cycle_batches
+            start_window = phase == 0
+            end_window = phase == self.active_batches
+        else:
+            start_window = now >= self.next_window_time
+            end_window = self.window_start_time is not None and now - self.window_start_time >= self.window_seconds
+
+        times = (0, 0)
+        if self.window_start_time is not None and end_window:
+            times = self._end_window()
+        if self.window_start_time is None and start_window:
+            self.windows += 1
+            self.window_start_time = now
+            self.window_first_batch = self.batches + 1
+            self.next_window_time = now + self.interval_seconds if self.interval_seconds is not None else None
+            self.backend.start('trace_window{}'.format(self.windows))
+        return times
+
+    def _end_window(self):
+        window_start_time = self.window_start_time
+        self.window_start_time = None
+        window_batches = self.batches + 1 - self.window_first_batch
+        if window_batches == 0:
+            # A window opened after the last batch of a run traced nothing, so it is discarded instead of exported
+            parsing_start_time = time.time()
+            self.backend.discard()
+            self.windows -= 1
+            return time.time() - parsing_start_time, 0
+        print('{}\t{}\t{}\t{}\t{}'.format(self.windows, self.window_first_batch, window_batches,
+                                          window_start_time, time.time()), file=self.log_windows)
+        return self._stop_and_export('trace_window{}'.format(self.windows))
+
+
+# Profiler modes by name. Per-step modes are exposed to users under the step name of a workload,
+# e.g., 'trace_per_epoch' for training workloads and 'trace_per_batch' for inference workloads.
+PROFILER_MODES = {
+    'none': NoProfilerMode,
+    'trace': lambda: WholeRunProfilerMode('trace'),
+    'trace_per_step': lambda: PerStepProfilerMode('trace'),
+    'trace_binary': lambda: WholeRunProfilerMode('trace_binary'),
+    'trace_binary_per_step': lambda: PerStepProfilerMode('trace_binary'),
+    'profile': lambda: WholeRunProfilerMode('profile'),
+    'profile_per_step': lambda: PerStepProfilerMode('profile'),
+    'trace_sampled': SampledProfilerMode,
+}
+
+
+def register_profiler_mode(name, factory):
+    if name in PROFILER_MODES:
+        raise ValueError('Profiler mode "{}" is already registered'.format(name))
+    PROFILER_MODES[name] = factory
+
+
+def _canonical_mode_name(name, step_name):
+    suffix = '_per_{}'.format(step_name)
+    if name.endswith(suffix):
+        return name[:-len(suffix)] + '_per_step'
+    return name
+
+
+def _display_mode_name(name, step_name):
+    if name.endswith('_per_step'):
+        return name[:-len('_per_step')] + '_per_{}'.format(step_name)
+    return name
+
+
+def available_profiler_modes(workload):
+    """Returns the user-facing names of all profiler modes supported by a workload"""
+    names = []
+    for name, factory in PROFILER_MODES.items():
+        if factory().supports(workload):
+            names.append(_display_mode_name(name, workload.step_name))
+    return names
+
+
+def add_profiler_mode_arguments(parser, workload):
+    """Adds the command line arguments of all profiler modes supported by a workload to an argparse parser"""
+    mode_classes = []
+    for factory in PROFILER_MODES.values():
+        mode = factory()
+        if mode.supports(workload) and type(mode) not in mode_classes:
+            mode_classes.append(type(mode))
+    for mode_class in mode_classes:
+        mode_class.add_arguments(parser)
+
+
+def create_profiler_mode(name, workload):
+    canonical_name = _canonical_mode_name(name, workload.step_name)
+    if canonical_name not in PROFILER_MODES:
+        raise ValueError('Unknown profiler mode "{}"'.format(name))
+    mode = PROFILER_MODES[canonical_name]()
+    if not mode.supports(workload):
+        raise ValueError('Profiler mode "{}" is not supported by workload "{}"'.format(name, workload.name))
+    mode.configure(workload.args)
+    return mode
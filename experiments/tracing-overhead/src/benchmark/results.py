@@ -0,0 +1,47 @@
+import collections
+import json
+import os
+
+# Version of the result record schema. Increment when fields are added, removed, or change meaning.
+RESULT_SCHEMA_VERSION = 4
+
+RESULT_FIELDS = (
+    'schema_version',
+    'workload',
+    'framework',
+    'task',
+    'profile',
+    'repeat',
+    'hostname',
+    'start_time',               # Wall-clock start of the run (seconds since the epoch)
+    'makespan',                 # Duration of the run, excluding one-off workload setup (seconds)
+    'setup_time',               # Duration of the one-off workload setup (seconds)
+    'steps',                    # Number of steps (epochs or batches) executed
+    'step_time',                # Total time spent in steps, excluding profiler stop/export (seconds)
+    'profile_parsing_time',     # Total time spent stopping the profiler and parsing events (seconds)
+    'profile_serialization_time',  # Total time spent exporting profiler output (seconds)
+    'profile_background_time',  # Total time spent exporting profiler output hidden from the critical path (seconds)
+    'trace_coverage',           # Fraction of batches that were traced, or null if unknown
+    'batches',                  # Number of batches executed
+    'warmup_batches',           # Number of initial batches excluded from batch_time_mean
+    'batch_time_mean',          # Mean duration of a steady-state batch (seconds)
+    'parameters',               # Workload-specific configuration
+)
+
+ResultRecord = collections.namedtuple('ResultRecord', RESULT_FIELDS)
+
+RESULT_FILE_NAME = 'result.json'
+
+
+def write_result(record, log_dir):
+    with open(os.path.join(log_dir, RESULT_FILE_NAME), 'w+') as f:
+        json.dump(record._asdict(), f, indent=2)
+        print(file=f)
+
+
+def read_result(log_dir):
+    with open(os.path.join(log_dir, RESULT_FILE_NAME)) as f:
+        values = json.load(f)
+    if values.get('schema_version') != RESULT_SCHEMA_VERSION:
+        raise ValueError('Unsupported result schema version {} in {}'.format(values.get('schema_version'), log_dir))
+    return ResultRecord(**values)
@@ -0,0 +1,189 @@
+import contextlib
+import os
+import socket
+import time
+
+from .markers import NullPhaseMarkerLog, PhaseMarkerLog
+from .profiling import create_profiler_mode
+from .results import RESULT_SCHEMA_VERSION, ResultRecord, write_result
+
+
+class BenchmarkRun(object):
+    """Tracks the steps of a single workload execution and drives its profiler mode"""
+
+    def __init__(self, workload, profiler, log_dir, markers=None):
+        self.workload = workload
+        self.profiler = profiler
+        self.log_dir = log_dir
+        # Phase markers of steps and batches; workloads may add finer-grained phases (e.g., forward and backward)
+        self.markers = markers if markers is not None else NullPhaseMarkerLog()
+
+        self.steps = 0
+        self.step_time = 0.0
+        self.profile_parsing_time = 0.0
+        self.profile_serialization_time = 0.0
+        self._step_start_time = None
+        self._step = None
+        # Profiling time spent at the end of batches within the current step
+        self._step_batch_profiling_time = 0.0
+        self._step_batch_parsing_time = 0.0
+        self._step_batch_serialization_time = 0.0
+
+        # Durations of individual batches, for steady-state statistics
+        self.batch_times = []
+        self._batch_start_time = None
+        self._batch_start_ns = None
+        self._batch_in_step = 0
+
+        # Log file for step durations, e.g., epoch_times.tsv for training workloads
+        self.log_step_times = open(os.path.join(log_dir, '{}_times.tsv'.format(workload.step_name)), 'w+')
+        print('{}\t{}.time\tprofile.parsing.time\tprofile.serialization.time\tend.timestamp'.format(
+            workload.step_name, workload.task), file=self.log_step_times)
+        self.log_step_times.flush()
+
+        # Log file for batch durations, if steps consist of multiple batches
+        if workload.step_name != 'batch':
+            self.log_batch_times = open(os.path.join(log_dir, 'batch_times.tsv'), 'w+')
+            print('{}\tbatch\t{}.time\tend.timestamp'.format(workload.step_name, workload.task), file=self.log_batch_times)
+        else:
+            self.log_batch_times = None
+
+    def begin_run(self):
+        self.profiler.begin_run()
+
+    def end_run(self):
+        parsing_time, serialization_time = self.profiler.end_run()
+        if parsing_time > 0 or serialization_time > 0:
+            self._record(-1, 0, parsing_time, serialization_time, time.time())
+
+    def begin_step(self, step):
+        self._step = step
+        self._batch_in_step = 0
+        self._step_batch_profiling_time = 0.0
+        self._step_batch_parsing_time = 0.0
+        self._step_batch_serialization_time = 0.0
+        self.profiler.begin_step(step)
+        self.markers.begin(self.workload.step_name, step)
+        self._step_start_time = time.time()
+        self._batch_start_time = self._step_start_time
+        self._batch_start_ns = time.time_ns()
+
+    def end_step(self, step):
+        step_end_time = time.time()
+        self.markers.end(self.workload.step_name, step)
+        step_time = step_end_time - self._step_start_time - self._step_batch_profiling_time
+        parsing_time = self._step_batch_parsing_time
+        serialization_time = self._step_batch_serialization_time
+        if self.log_batch_times is None:
+            self.batch_times.append(step_time)
+            batch_parsing_time, batch_serialization_time = self.profiler.end_batch()
+            parsing_time += batch_parsing_time
+            serialization_time += batch_serialization_time
+        step_parsing_time, step_serialization_time = self.profiler.end_step(step)
+        self.steps += 1
+        self._record(step, step_time, parsing_time + step_parsing_time, serialization_time + step_serialization_time,
+                     step_end_time)
+
+    def end_batch(self):
+        """Marks the end of a batch within a step; only needed for workloads whose steps are not batches
+
+        A batch is timed from the end of the previous batch or the start of the step, so it includes data loading.
+        """
+        batch_end_time = time.time()
+        batch_end_ns = time.time_ns()
+        batch_time = batch_end_time - self._batch_start_time
+        self.batch_times.append(batch_time)
+        self._batch_in_step += 1
+        self.markers.span('batch', self._batch_in_step, self._batch_start_ns, batch_end_ns)
+        print('{}\t{}\t{}\t{}'.format(self._step, self._batch_in_step, batch_time, batch_end_time), file=self.log_batch_times)
+
+        # Exclude profiling at the end of a batch from the batch and step times, as for steps
+        parsing_time, serialization_time = self.profiler.end_batch()
+        self._step_batch_parsing_time += parsing_time
+        self._step_batch_serialization_time += serialization_time
+        self._batch_start_time = time.time()
+        self._batch_start_ns = time.time_ns()
+        self._step_batch_profiling_time += self._batch_start_time - batch_end_time
+
+    @contextlib.contextmanager
+    def step(self, step):
+        self.begin_step(step)
+        yield
+        self.end_step(step)
+
+    def _record(self, step, step_time, parsing_time, serialization_time, end_timestamp):
+        self.step_time += step_time
+        self.profile_parsing_time += parsing_time
+        self.profile_serialization_time += serialization_time
+        print('{}\t{}\t{}\t{}\t{}'.format(step, step_time, parsing_time, serialization_time, end_timestamp),
+              file=self.log_step_times)
+        self.log_step_times.flush()
+
+    def close(self):
+        self.log_step_times.close()
+        self.markers.close()
+        if self.log_batch_times is not None:
+            self.log_batch_times.close()
+
+
+def run_benchmark(workload, profile_type, log_dir, repeat=1, setup_time=0.0, warmup_batches=0, sample_period=None,
+                  phase_markers=False):
+    """Executes a workload once with the given profiler mode and returns its ResultRecord
+
+    The first warmup_batches batches are excluded from the steady-state batch time in the result record.
+    If sample_period is set, the resource usage of this process is sampled to process_samples.bin.
+    If phase_markers is set, the start and end of every phase are recorded in phase_markers.bin.
+    """
+    profiler = create_profiler_mode(profile_type, workload)
+    profiler.bind(workload.create_profiler_backend(log_dir), workload.step_name)
+    markers = PhaseMarkerLog(os.path.join(log_dir, 'phase_markers.bin')) if phase_markers else None
+    run = BenchmarkRun(workload, profiler, log_dir, markers)
+    if sample_period is not None:
+        # Imported here to allow running the sampler module as a script without importing it twice
+        from .sampler import ProcessSampler
+        sampler = ProcessSampler(os.getpid(), os.path.join(log_dir, 'process_samples.bin'), sample_period)
+        sampler.start()
+    else:
+        sampler = None
+
+    start_time = time.time()
+    try:
+        run.begin_run()
+        workload.run(run)
+        run.end_run()
+    finally:
+        run.close()
+        if sampler is not None:
+            sampler.stop()
+    end_time = time.time()
+
+    with open(os.path.join(log_dir, 'makespan'), 'w+') as f:
+        print(str(end_time - start_time), file=f)
+
+    steady_batch_times = run.batch_times[warmup_batches:]
+    batch_time_mean = sum(steady_batch_times) / len(steady_batch_times) if steady_batch_times else None
+
+    record = ResultRecord(
+        schema_version=RESULT_SCHEMA_VERSION,
+        workload=workload.name,
+        framework=workload.framework,
+        task=workload.task,
+        profile=profile_type,
+        repeat=repeat,
+        hostname=socket.gethostname(),
+        start_time=start_time,
+        makespan=end_time - start_time,
+        setup_time=setup_time,
+        steps=run.steps,
+        step_time=run.step_time,
+        profile_parsing_time=run.profile_parsing_time,
+        profile_serialization_time=run.profile_serialization_time,
+        profile_background_time=profiler.background_serialization_time,
+        trace_coverage=profiler.coverage,
+        batches=len(run.batch_times),
+        warmup_batches=min(warmup_batches, len(run.batch_times)),
+        batch_time_mean=batch_time_mean,
+        parameters=workload.parameters()
+    )
+    write_result(record, log_dir)
+    return record
@@ -0,0 +1,206 @@
+"""Low-overhead sampler for the resource usage of a single process.
+
+Samples /proc/<pid>/{status,smaps_rollup,stat,io} from a background thread. The /proc files are opened once and
+re-read with pread(), so a sample costs a few system calls and no process creation.
+
+Samples are written to a binary file consisting of a header followed by fixed-size little-endian records:
+
+    header:  magic (8 bytes, b'GMLPSMP1'), realtime anchor (int64, ns), monotonic anchor (int64, ns), period (int64, ns)
+    record:  one int64 per field in SAMPLE_FIELDS
+
+Timestamps are CLOCK_MONOTONIC nanoseconds. The header anchors pair a CLOCK_REALTIME and CLOCK_MONOTONIC reading taken
+at the same moment, so samples can be aligned with the wall-clock timestamps in epoch_times.tsv and batch_times.tsv.
+Values that cannot be read (e.g., smaps_rollup on older kernels) are recorded as -1.
+"""
+
+import argparse
+import os
+import struct
+import sys
+import threading
+import time
+
+SAMPLE_MAGIC = b'GMLPSMP1'
+SAMPLE_HEADER = struct.Struct('<8sqqq')
+
+SAMPLE_FIELDS = (
+    'time_ns',          # CLOCK_MONOTONIC timestamp of the sample
+    'rss_bytes',        # Resident set size (VmRSS in status)
+    'pss_bytes',        # Proportional set size (Pss in smaps_rollup)
+    'user_time_ns',     # CPU time spent in user mode (utime in stat)
+    'system_time_ns',   # CPU time spent in kernel mode (stime in stat)
+    'minor_faults',     # Minor page faults (minflt in stat)
+    'major_faults',     # Major page faults (majflt in stat)
+    'read_bytes',       # Bytes read from storage (read_bytes in io)
+    'write_bytes',      # Bytes written to storage (write_bytes in io)
+)
+SAMPLE_RECORD = struct.Struct('<' + 'q' * len(SAMPLE_FIELDS))
+
+_CLOCK_TICK_NS = 1000000000 // os.sysconf('SC_CLK_TCK')
+_FLUSH_INTERVAL = 256
+
+
+def _open_proc_file(pid, name):
+    try:
+        return os.open('/proc/{}/{}'.format(pid, name), os.O_RDONLY)
+    except OSError:
+        return None
+
+
+def _read_proc_file(fd):
+    if fd is None:
+        return None
+    try:
+        return os.pread(fd, 65536, 0)
+    except OSError:
+        return None
+
+
+def _find_kb_value(content, key):
+    if content is None:
+        return -1
+    start = content.find(key)
+    if start < 0:
+        return -1
+    end = content.find(b'\n', start)
+    return int(content[start + len(key):end].split()[0]) * 1024
+
+
+def _find_value(content, key):
+    if content is None:
+        return -1
+    start = content.find(key)
+    if start < 0:
+        return -1
+    end = content.find(b'\n', start)
+    return int(content[start + len(key):end])
+
+
+class ProcessSampler(object):
+    """Periodically samples the resource usage of a process to a binary file"""
+
+    def __init__(self, pid, path, period=0.01):
+        self.pid = pid
+        self.path = path
+        self.period_ns = int(period * 1e9)
+        self.samples = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._fds = {}
+
+    def start(self):
+        for name in ('status', 'smaps_rollup', 'stat', 'io'):
+            self._fds[name] = _open_proc_file(self.pid, name)
+        if self._fds['stat'] is None:
+            raise ValueError('Process {} does not exist'.format(self.pid))
+
+        self._file = open(self.path, 'wb')
+        self._file.write(SAMPLE_HEADER.pack(SAMPLE_MAGIC, time.time_ns(), time.monotonic_ns(), self.period_ns))
+
+        self._thread = threading.Thread(target=self._sample_loop, name='ProcessSampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._thread.join()
+        self._file.close()
+        for fd in self._fds.values():
+            if fd is not None:
+                os.close(fd)
+        self._fds = {}
+
+    def wait(self):
+        """Blocks until the sampled process exits"""
+        self._thread.join()
+        self._file.close()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    def sample(self):
+        """Takes a single sample, or returns None if the process no longer exists"""
+        timestamp = time.monotonic_ns()
+        stat = _read_proc_file(self._fds['stat'])
+        if not stat:
+            return None
+        # Skip the command name, which may contain spaces, to find the numeric fields
+        stat_fields = stat[stat.rfind(b')') + 2:].split()
+        status = _read_proc_file(self._fds['status'])
+        smaps_rollup = _read_proc_file(self._fds['smaps_rollup'])
+        io = _read_proc_file(self._fds['io'])
+        return (
+            timestamp,
+            _find_kb_value(status, b'VmRSS:'),
+            _find_kb_value(smaps_rollup, b'Pss:'),
+            int(stat_fields[11]) * _CLOCK_TICK_NS,
+            int(stat_fields[12]) * _CLOCK_TICK_NS,
+            int(stat_fields[7]),
+            int(stat_fields[9]),
+            _find_value(io, b'read_bytes: '),
+            _find_value(io, b'write_bytes: '),
+        )
+
+    def _sample_loop(self):
+        buffer = bytearray()
+        next_sample_time = time.monotonic_ns()
+        while not self._stop_event.is_set():
+            values = self.sample()
+            if values is None:
+                break
+            buffer += SAMPLE_RECORD.pack(*values)
+            self.samples += 1
+            if self.samples % _FLUSH_INTERVAL == 0:
+                self._file.write(buffer)
+                buffer = bytearray()
+
+            # Schedule samples on a fixed grid, skipping missed samples instead of bursting to catch up
+            next_sample_time += self.period_ns
+            now = time.monotonic_ns()
+            if next_sample_time < now:
+                next_sample_time = now + self.period_ns - (now - next_sample_time) % self.period_ns
+            self._stop_event.wait((next_sample_time - now) / 1e9)
+        self._file.write(buffer)
+        self._file.flush()
+
+
+def read_samples(path):
+    """Reads a sample file, returning a dict with one list per field in SAMPLE_FIELDS
+
+    The dict additionally contains a 'realtime_ns' list with the samples' timestamps converted to CLOCK_REALTIME.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+    magic, realtime_anchor, monotonic_anchor, _ = SAMPLE_HEADER.unpack_from(content, 0)
+    if magic != SAMPLE_MAGIC:
+        raise ValueError('{} is not a process sample file'.format(path))
+
+    # Ignore a partially written trailing record, e.g., if the sampler was killed
+    body = memoryview(content)[SAMPLE_HEADER.size:]
+    body = body[:len(body) - len(body) % SAMPLE_RECORD.size]
+    columns = list(zip(*SAMPLE_RECORD.iter_unpack(body)))
+    samples = {field: list(columns[i]) if columns else [] for i, field in enumerate(SAMPLE_FIELDS)}
+    samples['realtime_ns'] = [t - monotonic_anchor + realtime_anchor for t in samples['time_ns']]
+    return samples
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Sample the resource usage of a process until it exits')
+    parser.add_argument('--pid', type=int, required=True,
+                        help='process to sample')
+    parser.add_argument('--output', required=True,
+                        help='file to write samples to')
+    parser.add_argument('--period', type=float, default=0.01,
+                        help='sampling period in seconds (default: 0.01)')
+    args = parser.parse_args(sys.argv[1:] if argv is None else argv)
+
+    sampler = ProcessSampler(args.pid, args.output, args.period)
+    sampler.start()
+    sampler.wait()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+import math
+
+# Two-sided critical values of Student's t-distribution for 1-30 degrees of freedom,
+# followed by the critical value of the standard normal distribution used for larger samples.
+_T_CRITICAL_VALUES = {
+    0.90: [6.314, 2.920, 2.353, 2.132, 2.015, 1.943, 1.895, 1.860, 1.833, 1.812,
+           1.796, 1.782, 1.771, 1.761, 1.753, 1.746, 1.740, 1.734, 1.729, 1.725,
+           1.721, 1.717, 1.714, 1.711, 1.708, 1.706, 1.703, 1.701, 1.699, 1.697, 1.645],
+    0.95: [12.706, 4.303, 3.182, 2.776, 2.571, 2.447, 2.365, 2.306, 2.262, 2.228,
+           2.201, 2.179, 2.160, 2.145, 2.131, 2.120, 2.110, 2.101, 2.093, 2.086,
+           2.080, 2.074, 2.069, 2.064, 2.060, 2.056, 2.052, 2.048, 2.045, 2.042, 1.960],
+    0.99: [63.657, 9.925, 5.841, 4.604, 4.032, 3.707, 3.499, 3.355, 3.250, 3.169,
+           3.106, 3.055, 3.012, 2.977, 2.947, 2.921, 2.898, 2.878, 2.861, 2.845,
+           2.831, 2.819, 2.807, 2.797, 2.787, 2.779, 2.771, 2.763, 2.756, 2.750, 2.576],
+}
+
+CONFIDENCE_LEVELS = sorted(_T_CRITICAL_VALUES.keys())
+
+
+def t_critical_value(confidence, degrees_of_freedom):
+    if confidence not in _T_CRITICAL_VALUES:
+        raise ValueError('Unsupported confidence level {}, expected one of {}'.format(confidence, CONFIDENCE_LEVELS))
+    if degrees_of_freedom < 1:
+        raise ValueError('At least one degree of freedom is required')
+    values = _T_CRITICAL_VALUES[confidence]
+    return values[min(degrees_of_freedom, len(values)) - 1]
+
+
+def mean(samples):
+    return sum(samples) / len(samples)
+
+
+def confidence_interval(samples, confidence=0.95):
+    """Returns the mean of the samples and the half-width of its confidence interval"""
+    n = len(samples)
+    if n < 2:
+        return mean(samples), math.inf
+    sample_mean = mean(samples)
+    variance = sum((x - sample_mean) ** 2 for x in samples) / (n - 1)
+    return sample_mean, t_critical_value(confidence, n - 1) * math.sqrt(variance / n)
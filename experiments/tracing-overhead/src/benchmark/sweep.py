@@ -0,0 +1,152 @@
+import gc
+import os
+import sys
+import time
+
+if __name__ == '__main__':
+    print('Importing benchmark harness...')
+
+from .analysis import add_analysis_arguments, run_analysis
+from .cli import parse_workload_args
+from .run import run_benchmark
+from .stats import CONFIDENCE_LEVELS, confidence_interval
+
+# Runs all profiler modes of a workload in a single process. The framework, dataset, and (for inference) model
+# are loaded once, and every configuration is repeated until the mean steady-state batch time is known with
+# the requested precision. Configurations are interleaved, so slow drift of the machine affects all of them equally.
+
+
+class SweepConfiguration(object):
+    def __init__(self, profile_type):
+        self.profile_type = profile_type
+        self.records = []
+        self.done = False
+
+    def batch_time_samples(self):
+        return [r.batch_time_mean for r in self.records if r.batch_time_mean is not None]
+
+
+def _append_line(path, header, line):
+    is_new = not os.path.exists(path)
+    with open(path, 'a') as f:
+        if is_new:
+            print(header, file=f)
+        print(line, file=f)
+
+
+def sweep(workload, profile_types, log_dir, setup_time=0.0, warmup_runs=1, warmup_batches=0,
+          min_repeats=3, max_repeats=30, ci_target=0.02, confidence=0.95, sample_period=None, phase_markers=False):
+    """Repeats every profiler mode until the confidence interval on its steady-state batch time is narrow enough
+
+    A configuration is done when the half-width of the confidence interval on the mean batch time (one sample per
+    run) is at most ci_target times the mean, or after max_repeats runs. Returns the SweepConfiguration objects.
+    """
+    configurations = [SweepConfiguration(profile_type) for profile_type in profile_types]
+    makespan_file = os.path.join(log_dir, '{}_makespan.ssv'.format(workload.task))
+    summary_file = os.path.join(log_dir, '{}_summary.ssv'.format(workload.task))
+
+    # Discard complete runs to warm up the framework, caches, and profiler of every configuration
+    for configuration in configurations:
+        for warmup_run in range(1, warmup_runs + 1):
+            run_log_dir = os.path.join(log_dir, 'profile_{}'.format(configuration.profile_type), 'warmup{}'.format(warmup_run))
+            os.makedirs(run_log_dir, exist_ok=True)
+            print('Warm-up run {}/{} with profile {}'.format(warmup_run, warmup_runs, configuration.profile_type))
+            gc.collect()
+            run_benchmark(workload, configuration.profile_type, run_log_dir, repeat=-warmup_run,
+                          setup_time=setup_time, warmup_batches=warmup_batches)
+
+    repeat = 0
+    while not all(c.done for c in configurations):
+        repeat += 1
+        for configuration in configurations:
+            if configuration.done:
+                continue
+
+            run_log_dir = os.path.join(log_dir, 'profile_{}'.format(configuration.profile_type), str(repeat))
+            os.makedirs(run_log_dir, exist_ok=True)
+            print('Run {} with profile {}'.format(repeat, configuration.profile_type))
+            gc.collect()
+            record = run_benchmark(workload, configuration.profile_type, run_log_dir, repeat=repeat,
+                                   setup_time=setup_time, warmup_batches=warmup_batches, sample_period=sample_period,
+                                   phase_markers=phase_markers)
+            configuration.records.append(record)
+            _append_line(makespan_file, 'framework profile makespan',
+                         '{} {} {}'.format(workload.framework, configuration.profile_type, record.makespan))
+
+            samples = configuration.batch_time_samples()
+            if len(samples) < max(min_repeats, 2):
+                configuration.done = repeat >= max_repeats
+                continue
+            batch_time_mean, batch_time_ci = confidence_interval(samples, confidence)
+            print('=> Mean batch time with profile {}: {:.6f} s +/- {:.6f} s ({} runs)'.format(
+                configuration.profile_type, batch_time_mean, batch_time_ci, len(samples)))
+            if batch_time_ci <= ci_target * batch_time_mean or repeat >= max_repeats:
+                configuration.done = True
+                makespans = [r.makespan for r in configuration.records]
+                _append_line(summary_file, 'framework profile runs batch.time.mean batch.time.ci makespan.mean',
+                             '{} {} {} {} {} {}'.format(workload.framework, configuration.profile_type, len(samples),
+                                                        batch_time_mean, batch_time_ci, sum(makespans) / len(makespans)))
+
+    return configurations
+
+
+def add_sweep_arguments(parser, profiler_modes):
+    parser.add_argument('--profile-types', nargs='+', default=profiler_modes, choices=profiler_modes,
+                        help='types of profiling to compare (default: all supported by the workload)')
+    parser.add_argument('--warmup-runs', type=int, default=1, metavar='N',
+                        help='number of discarded runs per profile type before measuring (default: 1)')
+    parser.add_argument('--warmup-batches', type=int, default=10, metavar='N',
+                        help='number of initial batches per run excluded from the batch time (default: 10)')
+    parser.add_argument('--min-repeats', type=int, default=3, metavar='N',
+                        help='minimum number of measured runs per profile type (default: 3)')
+    parser.add_argument('--max-repeats', type=int, default=30, metavar='N',
+                        help='maximum number of measured runs per profile type (default: 30)')
+    parser.add_argument('--ci-target', type=float, default=0.02, metavar='F',
+                        help='target half-width of the confidence interval on the mean batch time, '
+                             'relative to the mean (default: 0.02)')
+    parser.add_argument('--confidence', type=float, default=0.95, choices=CONFIDENCE_LEVELS,
+                        help='confidence level of the confidence interval (default: 0.95)')
+    add_analysis_arguments(parser)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    workload_class, args = parse_workload_args(argv, 'Tracing overhead sweep', add_sweep_arguments)
+    if args.min_repeats < 2 or args.max_repeats < args.min_repeats:
+        raise ValueError('Expected 2 <= --min-repeats <= --max-repeats')
+
+    os.makedirs(args.log_dir, exist_ok=True)
+    with open(os.path.join(args.log_dir, 'configuration'), 'w+') as f:
+        for key, value in sorted(vars(args).items()):
+            print('{}: {}'.format(key, value), file=f)
+
+    workload = workload_class(args)
+    setup_start_time = time.time()
+    workload.setup()
+    setup_time = time.time() - setup_start_time
+
+    sweep(workload, args.profile_types, args.log_dir,
+          setup_time=setup_time,
+          warmup_runs=args.warmup_runs,
+          warmup_batches=args.warmup_batches,
+          min_repeats=args.min_repeats,
+          max_repeats=args.max_repeats,
+          ci_target=args.ci_target,
+          confidence=args.confidence,
+          sample_period=args.sample_period,
+          phase_markers=args.phase_markers)
+
+    # Analyze all measured runs of the sweep, including runs appended to this log directory by earlier sweeps
+    _, regressions = run_analysis([args.log_dir], os.path.join(args.log_dir, '{}_analysis.ssv'.format(workload.task)),
+                                  confidence=args.confidence,
+                                  bootstrap_samples=args.bootstrap_samples,
+                                  baseline_path=args.baseline,
+                                  regression_tolerance=args.regression_tolerance)
+    if regressions:
+        print('{} profiler mode(s) regressed compared to {}'.format(len(regressions), args.baseline))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
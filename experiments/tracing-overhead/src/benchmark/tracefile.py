@@ -0,0 +1,128 @@
+"""Compact binary format for framework trace events, read by GradeML's framework-trace input source.
+
+A trace file consists of a header followed by a sequence of tagged records:
+
+    header:  magic (8 bytes, b'GMLTRC01'), base time (int64, CLOCK_REALTIME ns)
+    string:  tag 1, length (LEB128), UTF-8 bytes; strings are numbered in order of appearance, starting at 0
+    event:   tag 2, name (LEB128 string number), thread (LEB128), start (LEB128, ns since the base time),
+             duration (LEB128, ns)
+
+Event names are written once and referenced by number afterwards, so a multi-GB Chrome trace typically shrinks by an
+order of magnitude, and no JSON has to be produced or parsed. A partially written trailing record is ignored by
+readers, so a trace remains readable if the writer is interrupted.
+"""
+
+import struct
+
+TRACE_MAGIC = b'GMLTRC01'
+TRACE_HEADER = struct.Struct('<8sq')
+
+RECORD_STRING = 1
+RECORD_EVENT = 2
+
+_FLUSH_SIZE = 1 << 20
+
+
+def _append_leb128(buffer, value):
+    if value < 0:
+        raise ValueError('Cannot encode negative value {} in a trace file'.format(value))
+    while value >= 0x80:
+        buffer.append((value & 0x7F) | 0x80)
+        value >>= 7
+    buffer.append(value)
+
+
+class TraceFileWriter(object):
+    """Writes complete events (name, thread, start, duration) to a binary trace file"""
+
+    def __init__(self, path, base_time_ns):
+        self.path = path
+        self.base_time_ns = base_time_ns
+        self.events = 0
+        self._strings = {}
+        self._buffer = bytearray()
+        self._file = open(path, 'wb')
+        self._file.write(TRACE_HEADER.pack(TRACE_MAGIC, base_time_ns))
+
+    def add_event(self, name, thread, start_ns, duration_ns):
+        """Adds an event starting start_ns nanoseconds after the base time of the trace"""
+        buffer = self._buffer
+        name_id = self._strings.get(name)
+        if name_id is None:
+            name_id = len(self._strings)
+            self._strings[name] = name_id
+            encoded_name = name.encode('utf-8')
+            buffer.append(RECORD_STRING)
+            _append_leb128(buffer, len(encoded_name))
+            buffer += encoded_name
+        buffer.append(RECORD_EVENT)
+        _append_leb128(buffer, name_id)
+        _append_leb128(buffer, thread)
+        # Events recorded just before the base time are clamped rather than rejected
+        _append_leb128(buffer, max(0, int(start_ns)))
+        _append_leb128(buffer, max(0, int(duration_ns)))
+        self.events += 1
+        if len(buffer) >= _FLUSH_SIZE:
+            self.flush()
+
+    def flush(self):
+        self._file.write(self._buffer)
+        self._buffer = bytearray()
+        self._file.flush()
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _read_leb128(content, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = content[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            return value, offset
+
+
+def read_trace(path):
+    """Reads a trace file, returning the base time and a list of (name, thread, start_ns, duration_ns) events"""
+    with open(path, 'rb') as f:
+        content = f.read()
+    magic, base_time_ns = TRACE_HEADER.unpack_from(content, 0)
+    if magic != TRACE_MAGIC:
+        raise ValueError('{} is not a trace file'.format(path))
+
+    strings = []
+    events = []
+    offset = TRACE_HEADER.size
+    try:
+        while offset < len(content):
+            tag = content[offset]
+            if tag == RECORD_STRING:
+                length, string_offset = _read_leb128(content, offset + 1)
+                if string_offset + length > len(content):
+                    break
+                strings.append(content[string_offset:string_offset + length].decode('utf-8'))
+                offset = string_offset + length
+            elif tag == RECORD_EVENT:
+                name_id, next_offset = _read_leb128(content, offset + 1)
+                thread, next_offset = _read_leb128(content, next_offset)
+                start_ns, next_offset = _read_leb128(content, next_offset)
+                duration_ns, next_offset = _read_leb128(content, next_offset)
+                events.append((strings[name_id], thread, start_ns, duration_ns))
+                offset = next_offset
+            else:
+                raise ValueError('Unknown record type {} at offset {} in {}'.format(tag, offset, path))
+    except IndexError:
+        # Ignore a partially written trailing record
+        pass
+    return base_time_ns, events
@@ -0,0 +1,60 @@
+import importlib
+
+# Workloads by name, as "module:class" references. Workload modules import their framework,
+# so they are only loaded when a workload is requested.
+WORKLOADS = {
+    'pytorch_training_mnist': 'benchmark.workloads.pytorch_training_mnist:MnistTrainingWorkload',
+    'pytorch_inference_resnet50': 'benchmark.workloads.pytorch_inference_resnet50:ResNet50InferenceWorkload',
+    'tensorflow_training_mnist': 'benchmark.workloads.tensorflow_training_mnist:MnistTrainingWorkload',
+    'tensorflow_inference_resnet50': 'benchmark.workloads.tensorflow_inference_resnet50:ResNet50InferenceWorkload',
+}
+
+
+def register_workload(name, reference):
+    if name in WORKLOADS:
+        raise ValueError('Workload "{}" is already registered'.format(name))
+    WORKLOADS[name] = reference
+
+
+def get_workload_class(name):
+    if name not in WORKLOADS:
+        raise ValueError('Unknown workload "{}"'.format(name))
+    module_name, class_name = WORKLOADS[name].split(':')
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+class Workload(object):
+    """A benchmark workload for one framework and task, e.g., training a model with PyTorch"""
+
+    name = None
+    # Framework used by the workload: 'pytorch' or 'tensorflow'
+    framework = None
+    # Task performed by the workload: 'training' or 'inference'
+    task = None
+    # Unit of work that per-step profiler modes trace separately: 'epoch' or 'batch'
+    step_name = None
+    # ProfilerBackend subclass used to profile the workload
+    profiler_backend_class = None
+
+    def __init__(self, args):
+        self.args = args
+
+    @classmethod
+    def add_arguments(cls, parser):
+        """Adds workload-specific command line arguments to an argparse parser"""
+        pass
+
+    def parameters(self):
+        """Returns the workload configuration to include in result records"""
+        return {}
+
+    def setup(self):
+        """Performs one-off initialization (e.g., loading datasets) that is shared by all runs"""
+        pass
+
+    def create_profiler_backend(self, log_dir):
+        return self.profiler_backend_class(log_dir)
+
+    def run(self, run):
+        """Executes the workload once, reporting every step to the given BenchmarkRun"""
+        raise NotImplementedError()
@@ -0,0 +1 @@
+# Benchmark workloads, one module per framework and task. See benchmark.workload.WORKLOADS for the registry.
@@ -0,0 +1,55 @@
+import torch
+import torchvision.models as models
+
+from ..frameworks.pytorch import PyTorchProfilerBackend
+from ..workload import Workload
+
+
+class ResNet50InferenceWorkload(Workload):
+    name = 'pytorch_inference_resnet50'
+    framework = 'pytorch'
+    task = 'inference'
+    step_name = 'batch'
+    profiler_backend_class = PyTorchProfilerBackend
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('--batch-size', type=int, default=32,
+                            help='input batch size for inference')
+        parser.add_argument('--num-batches', type=int, default=100,
+                            help='number of batches to process')
+
+    def parameters(self):
+        return {
+            'batch_size': self.args.batch_size,
+            'num_batches': self.args.num_batches,
+            'cuda': self.use_cuda
+        }
+
+    def setup(self):
+        # Get a ResNet50 model with random weights
+        self.model = models.resnet50()
+
+        # Set up CUDA
+        self.use_cuda = not self.args.no_cuda and torch.cuda.is_available()
+        if self.use_cuda:
+            self.device = 'cuda:0'
+            torch.cuda.set_device(0)
+            self.model.cuda()
+        else:
+            self.device = 'cpu'
+
+    def create_profiler_backend(self, log_dir):
+        return PyTorchProfilerBackend(log_dir, self.use_cuda)
+
+    def do_batch(self, batch):
+        if batch % 10 == 1 or batch == self.args.num_batches:
+            print('Processing batch {} of {}...'.format(batch, self.args.num_batches))
+        batch_data = torch.randn(self.args.batch_size, 3, 224, 224).to(self.device)
+        self.model(batch_data)
+
+    def run(self, run):
+        # Benchmark inference with random inputs
+        for batch in range(1, 1 + self.args.num_batches):
+            with run.step(batch):
+                self.do_batch(batch)
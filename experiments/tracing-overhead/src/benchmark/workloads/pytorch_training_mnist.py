@@ -0,0 +1,362 @@
+import inspect
+import os
+import time
+
+import numpy as np
+import torch
+import torch.nn as nn
+import torch.nn.functional as F
+import torch.optim as optim
+from torchvision import datasets, transforms
+from torch.optim.lr_scheduler import StepLR
+
+from ..frameworks.pytorch import PyTorchProfilerBackend
+from ..workload import Workload
+
+# Derived from https://github.com/pytorch/examples/blob/master/mnist/main.py
+
+MNIST_MEAN = 0.1307
+MNIST_STD = 0.3081
+
+# Stages of a training batch, recorded per batch in batch_stages.tsv
+BATCH_STAGES = ('data', 'transfer', 'compute', 'learn')
+
+class Net(nn.Module):
+    def __init__(self):
+        super(Net, self).__init__()
+        self.conv1 = nn.Conv2d(1, 32, 3, 1)
+        self.conv2 = nn.Conv2d(32, 64, 3, 1)
+        self.dropout1 = nn.Dropout2d(0.25)
+        self.dropout2 = nn.Dropout2d(0.5)
+        self.fc1 = nn.Linear(9216, 128)
+        self.fc2 = nn.Linear(128, 10)
+
+    def forward(self, x):
+        x = self.conv1(x)
+        x = F.relu(x)
+        x = self.conv2(x)
+        x = F.relu(x)
+        x = F.max_pool2d(x, 2)
+        x = self.dropout1(x)
+        x = torch.flatten(x, 1)
+        x = self.fc1(x)
+        x = F.relu(x)
+        x = self.dropout2(x)
+        x = self.fc2(x)
+        output = F.log_softmax(x, dim=1)
+        return output
+
+# Copied from https://pytorch.org/tutorials/beginner/aws_distributed_training_tutorial.html
+class AverageMeter(object):
+    """Computes and stores the average and current value"""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.val = 0
+        self.avg = 0
+        self.sum = 0
+        self.count = 0
+
+    def update(self, val, n=1):
+        self.val = val
+        self.sum += val * n
+        self.count += n
+        self.avg = self.sum / self.count
+
+def decode_mnist(dataset):
+    """Decodes all images of a torchvision MNIST dataset at once, as ToTensor() and Normalize() would per image"""
+    images = dataset.data.unsqueeze(1).float().div_(255).sub_(MNIST_MEAN).div_(MNIST_STD)
+    return images, dataset.targets.clone()
+
+
+class MemoryMappedMnist(torch.utils.data.Dataset):
+    """Pre-decoded MNIST images read from a memory-mapped .npy file, so workers share the page cache"""
+
+    def __init__(self, images_path, targets):
+        self.images = np.load(images_path, mmap_mode='r')
+        self.targets = targets
+
+    def __len__(self):
+        return len(self.targets)
+
+    def __getitem__(self, index):
+        return torch.from_numpy(np.array(self.images[index])), self.targets[index]
+
+
+def train(args, model, device, use_cuda, train_loader, loss_fn, optimizer, epoch, run, log_stages):
+    # Counters to track training performance
+    data_time = AverageMeter()
+    transfer_time = AverageMeter()
+    compute_time = AverageMeter()
+    learn_time = AverageMeter()
+    losses = AverageMeter()
+
+    # Switch the model to train mode
+    model.train()
+
+    # Process batches
+    markers = run.markers
+    last_time = time.time()
+    data_start_ns = time.time_ns()
+    for batch_idx, (data, target) in enumerate(train_loader):
+        # Measure data loading time
+        t = time.time()
+        data_time.update(t - last_time)
+        last_time = t
+        markers.span('data', batch_idx + 1, data_start_ns, time.time_ns())
+
+        # Create tensors for training, non-blocking if on CUDA
+        #data = data.to(device, non_blocking=use_cuda)
+        #target = target.to(device, non_blocking=use_cuda)
+        data = data.to(device)
+        target = target.to(device)
+
+        # Measure transfer time
+        t = time.time()
+        transfer_time.update(t - last_time)
+        last_time = t
+
+        optimizer.zero_grad()
+
+        # Compute output and measure loss
+        markers.begin('forward', batch_idx + 1)
+        output = model(data)
+        loss = loss_fn(output, target)
+        losses.update(loss.item(), data.size(0))
+        markers.end('forward', batch_idx + 1)
+
+        # Measure compute time
+        t = time.time()
+        compute_time.update(t - last_time)
+        last_time = t
+
+        # Compute gradients in a backward pass
+        markers.begin('backward', batch_idx + 1)
+        loss.backward()
+        markers.end('backward', batch_idx + 1)
+
+        # Let the optimizer update model parameters
+        markers.begin('optimizer', batch_idx + 1)
+        optimizer.step()
+        markers.end('optimizer', batch_idx + 1)
+
+        # Measure learning time
+        t = time.time()
+        learn_time.update(t - last_time)
+        print('{}\t{}\t{}\t{}\t{}\t{}\t{}\t{}'.format(
+            epoch + 1, batch_idx + 1, data.size(0), data_time.val, transfer_time.val, compute_time.val,
+            learn_time.val, t), file=log_stages)
+
+        run.end_batch()
+
+        # Log training progess
+        if batch_idx % args.log_interval == 0:
+            print('Train Epoch: [{}][{}/{}]\t'
+                  'Time data {data_time.val:.3f} ({data_time.avg:.3f})\t'
+                  'Time transfer {transfer_time.val:.3f} ({transfer_time.avg:.3f})\t'
+                  'Time compute {compute_time.val:.3f} ({compute_time.avg:.3f})\t'
+                  'Time learn {learn_time.val:.3f} ({learn_time.avg:.3f})\t'
+                  'Loss: {losses.val:.4f} ({losses.avg:.4f})'.format(
+                  epoch, batch_idx, len(train_loader), data_time=data_time, transfer_time=transfer_time,
+                  compute_time=compute_time, learn_time=learn_time, losses=losses))
+
+        # Exclude profiling and logging at the end of the batch from the data loading time of the next batch
+        last_time = time.time()
+        data_start_ns = time.time_ns()
+
+def test(args, model, device, use_cuda, test_loader, loss_fn, epoch):
+    losses = AverageMeter()
+    correct = 0
+
+    # Switch the model to evaluate mode
+    model.eval()
+    with torch.no_grad():
+        for batch_idx, (data, target) in enumerate(test_loader):
+            # Map data and target tensors to the correct device, non-blocking if on CUDA
+            #data = data.to(device, non_blocking=use_cuda)
+            #target = target.to(device, non_blocking=use_cuda)
+            data = data.to(device)
+            target = target.to(device)
+
+            # Compute output and measure loss
+            output = model(data)
+            loss = loss_fn(output, target)
+            losses.update(loss.item(), data.size(0))
+
+            # Count the number of correct predictions to determine the model's accuracy
+            pred = output.argmax(dim=1, keepdim=True)  # get the index of the max log-probability
+            correct += pred.eq(target.view_as(pred)).sum().item()
+
+    print('Test set: Average loss: {:.4f}, Accuracy: {}/{} ({:.0f}%)\n'.format(
+        losses.avg, correct, len(test_loader.dataset),
+        100. * correct / len(test_loader.dataset)))
+
+def handle_epoch(args, model, device, use_cuda, train_loader, test_loader, loss_fn, optimizer, epoch, scheduler, run,
+                 log_stages):
+    # Train the model
+    print('\nBegin Training @ Epoch [{}]'.format(epoch + 1))
+    train(args, model, device, use_cuda, train_loader, loss_fn, optimizer, epoch, run, log_stages)
+
+    # Test the current accuracy of the model
+    print('Begin Validation @ Epoch [{}]'.format(epoch + 1))
+    with run.markers.phase('validation', epoch + 1):
+        test(args, model, device, use_cuda, test_loader, loss_fn, epoch)
+
+    # Adjust the learning rate
+    scheduler.step()
+
+
+class MnistTrainingWorkload(Workload):
+    name = 'pytorch_training_mnist'
+    framework = 'pytorch'
+    task = 'training'
+    step_name = 'epoch'
+    profiler_backend_class = PyTorchProfilerBackend
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('--batch-size', type=int, default=64, metavar='N',
+                            help='input batch size for training (default: 64)')
+        parser.add_argument('--test-batch-size', type=int, default=1000, metavar='N',
+                            help='input batch size for testing (default: 1000)')
+        parser.add_argument('--epochs', type=int, default=20, metavar='N',
+                            help='number of epochs to train (default: 20)')
+        parser.add_argument('--lr', type=float, default=1.0, metavar='LR',
+                            help='learning rate (default: 1.0)')
+        parser.add_argument('--gamma', type=float, default=0.7, metavar='M',
+                            help='Learning rate step gamma (default: 0.7)')
+        parser.add_argument('--seed', type=int, default=1, metavar='S',
+                            help='random seed (default: 1)')
+        parser.add_argument('--log-interval', type=int, default=10, metavar='N',
+                            help='how many batches to wait before logging training status')
+        parser.add_argument('--save-model', action='store_true', default=False,
+                            help='For Saving the current Model')
+        parser.add_argument('--data-dir', default=None,
+                            help='directory to download MNIST to (default: /local/$USER/sonet/datasets)')
+        parser.add_argument('--dataset-mode', default='torchvision', choices=('torchvision', 'memory', 'memmap'),
+                            help='decode images per sample with torchvision transforms, or decode all images once '
+                                 'into an in-memory tensor or a memory-mapped file in the data directory '
+                                 '(default: torchvision)')
+        parser.add_argument('--num-workers', type=int, default=None, metavar='N',
+                            help='number of data loader worker processes (default: 1 with CUDA, 0 without)')
+        parser.add_argument('--prefetch-factor', type=int, default=None, metavar='N',
+                            help='number of batches loaded in advance by each worker (default: framework default)')
+        parser.add_argument('--pin-memory', dest='pin_memory', action='store_true', default=None,
+                            help='load batches into pinned memory (default: only with CUDA)')
+        parser.add_argument('--no-pin-memory', dest='pin_memory', action='store_false',
+                            help='do not load batches into pinned memory')
+
+    def parameters(self):
+        return {
+            'batch_size': self.args.batch_size,
+            'test_batch_size': self.args.test_batch_size,
+            'epochs': self.args.epochs,
+            'lr': self.args.lr,
+            'gamma': self.args.gamma,
+            'seed': self.args.seed,
+            'cuda': self.use_cuda,
+            'dataset_mode': self.args.dataset_mode,
+            'num_workers': self.num_workers,
+            'prefetch_factor': self.args.prefetch_factor,
+            'pin_memory': self.pin_memory
+        }
+
+    def setup(self):
+        args = self.args
+        if not args.no_cuda and not torch.cuda.is_available():
+            raise RuntimeError('CUDA is not available. Either explicitly disable CUDA with --no-cuda, or run on a CUDA-enabled machine.')
+        self.use_cuda = not args.no_cuda
+        self.device = torch.device('cuda' if self.use_cuda else 'cpu')
+
+        self.num_workers = args.num_workers if args.num_workers is not None else (1 if self.use_cuda else 0)
+        self.pin_memory = args.pin_memory if args.pin_memory is not None else self.use_cuda
+        if args.prefetch_factor is not None:
+            if self.num_workers == 0:
+                raise ValueError('--prefetch-factor requires --num-workers > 0')
+            if 'prefetch_factor' not in inspect.signature(torch.utils.data.DataLoader.__init__).parameters:
+                raise ValueError('--prefetch-factor is not supported by PyTorch {}'.format(torch.__version__))
+
+        # Initialize datasets and data loaders
+        print('Setting up input data and data loaders...')
+        print('=> Downloading input data (if needed)...')
+        data_dir = args.data_dir
+        if data_dir is None:
+            data_dir = '/local/{}/sonet/datasets'.format(os.environ['USER'])
+        train_data = datasets.MNIST(data_dir,
+                train=True,
+                download=True,
+                transform=transforms.Compose([
+                    transforms.ToTensor(),
+                    transforms.Normalize((MNIST_MEAN,), (MNIST_STD,))
+                ]))
+        test_data = datasets.MNIST(data_dir,
+                train=False,
+                transform=transforms.Compose([
+                    transforms.ToTensor(),
+                    transforms.Normalize((MNIST_MEAN,), (MNIST_STD,))
+                ]))
+        if args.dataset_mode == 'memory':
+            print('=> Decoding input data into memory...')
+            train_data = torch.utils.data.TensorDataset(*decode_mnist(train_data))
+            test_data = torch.utils.data.TensorDataset(*decode_mnist(test_data))
+        elif args.dataset_mode == 'memmap':
+            print('=> Decoding input data into memory-mapped files (if needed)...')
+            decoded_dir = os.path.join(data_dir, 'MNIST', 'decoded')
+            train_data = self._memory_mapped_dataset(train_data, decoded_dir, 'train')
+            test_data = self._memory_mapped_dataset(test_data, decoded_dir, 'test')
+        print('=> Initializing data loaders...')
+        self.train_loader = self._create_loader(train_data, args.batch_size)
+        self.test_loader = self._create_loader(test_data, args.batch_size)
+        print('=> Done!')
+
+    def _create_loader(self, dataset, batch_size):
+        options = {}
+        if self.args.prefetch_factor is not None:
+            options['prefetch_factor'] = self.args.prefetch_factor
+        return torch.utils.data.DataLoader(dataset,
+                batch_size=batch_size,
+                shuffle=True,
+                num_workers=self.num_workers,
+                pin_memory=self.pin_memory,
+                **options)
+
+    @staticmethod
+    def _memory_mapped_dataset(dataset, directory, name):
+        images_path = os.path.join(directory, '{}_images.npy'.format(name))
+        if not os.path.exists(images_path):
+            os.makedirs(directory, exist_ok=True)
+            images, _ = decode_mnist(dataset)
+            # Write to a temporary file first, so an interrupted run never leaves a truncated cache behind
+            temporary_path = '{}.{}.tmp.npy'.format(images_path[:-len('.npy')], os.getpid())
+            np.save(temporary_path, images.numpy())
+            os.replace(temporary_path, images_path)
+        return MemoryMappedMnist(images_path, dataset.targets.clone())
+
+    def create_profiler_backend(self, log_dir):
+        return PyTorchProfilerBackend(log_dir, self.use_cuda)
+
+    def run(self, run):
+        args = self.args
+        device = self.device
+
+        # Create a freshly initialized neural network for every run
+        torch.manual_seed(args.seed)
+        model = Net().to(device)
+
+        # Create the loss function, optimizer, and learning rate schduler
+        loss_fn = nn.NLLLoss().to(device)
+        optimizer = optim.Adadelta(model.parameters(), lr=args.lr)
+        scheduler = StepLR(optimizer, step_size=1, gamma=args.gamma)
+
+        # Train the model, recording the duration of every stage of every batch
+        with open(os.path.join(run.log_dir, 'batch_stages.tsv'), 'w+') as log_stages:
+            print('epoch\tbatch\tsamples\t{}\tend.timestamp'.format(
+                '\t'.join('{}.time'.format(stage) for stage in BATCH_STAGES)), file=log_stages)
+            for epoch in range(args.epochs):
+                with run.step(epoch + 1):
+                    handle_epoch(args, model, device, self.use_cuda, self.train_loader, self.test_loader, loss_fn,
+                                 optimizer, epoch, scheduler, run, log_stages)
+
+        if args.save_model:
+            torch.save(model.state_dict(), os.path.join(run.log_dir, 'mnist_cnn.pt'))
@@ -0,0 +1,51 @@
+import tensorflow as tf
+
+from ..frameworks.tensorflow import TensorFlowProfilerBackend
+from ..workload import Workload
+
+
+class ResNet50InferenceWorkload(Workload):
+    name = 'tensorflow_inference_resnet50'
+    framework = 'tensorflow'
+    task = 'inference'
+    step_name = 'batch'
+    profiler_backend_class = TensorFlowProfilerBackend
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('--batch-size', type=int, default=32,
+                            help='input batch size for inference')
+        parser.add_argument('--num-batches', type=int, default=100,
+                            help='number of batches to process')
+
+    def parameters(self):
+        return {
+            'batch_size': self.args.batch_size,
+            'num_batches': self.args.num_batches,
+            'cuda': self.use_cuda
+        }
+
+    def setup(self):
+        # Set up CUDA
+        self.use_cuda = bool(not self.args.no_cuda and tf.config.list_physical_devices('GPU'))
+        if self.use_cuda:
+            device = '/GPU:0'
+        else:
+            device = '/CPU:0'
+            tf.config.set_visible_devices(tf.config.list_physical_devices('CPU'))
+        print('Using device {}'.format(device))
+
+        # Get a ResNet50 model with random weights
+        self.model = tf.keras.applications.ResNet50(weights=None)
+
+    def do_batch(self, batch):
+        if batch % 10 == 1 or batch == self.args.num_batches:
+            print('Processing batch {} of {}...'.format(batch, self.args.num_batches))
+        batch_data = tf.random.uniform(shape=[self.args.batch_size, 224, 224, 3])
+        self.model(batch_data)
+
+    def run(self, run):
+        # Benchmark inference with random inputs
+        for batch in range(1, 1 + self.args.num_batches):
+            with run.step(batch):
+                self.do_batch(batch)
@@ -0,0 +1,87 @@
+import tensorflow as tf
+
+from ..frameworks.tensorflow import KerasProfilingCallback, TensorFlowProfilerBackend
+from ..workload import Workload
+
+
+def create_model():
+    model = tf.keras.Sequential([
+        tf.keras.layers.Conv2D(32, (3, 3), activation='relu', input_shape=(28, 28, 1)),
+        tf.keras.layers.Conv2D(64, (3, 3), activation='relu'),
+        tf.keras.layers.MaxPooling2D((2, 2)),
+        tf.keras.layers.Dropout(0.25),
+        tf.keras.layers.Flatten(),
+        tf.keras.layers.Dense(128, activation='relu'),
+        tf.keras.layers.Dropout(0.5),
+        tf.keras.layers.Dense(10, activation='softmax')
+    ])
+
+    model.compile(
+        optimizer=tf.keras.optimizers.Adam(0.001),
+        loss=tf.keras.losses.SparseCategoricalCrossentropy(),
+        metrics=[tf.keras.metrics.SparseCategoricalAccuracy()]
+    )
+    return model
+
+
+class MnistTrainingWorkload(Workload):
+    name = 'tensorflow_training_mnist'
+    framework = 'tensorflow'
+    task = 'training'
+    step_name = 'epoch'
+    profiler_backend_class = TensorFlowProfilerBackend
+
+    @classmethod
+    def add_arguments(cls, parser):
+        parser.add_argument('--batch-size', type=int, default=64, metavar='N',
+                            help='input batch size for training (default: 64)')
+        parser.add_argument('--test-batch-size', type=int, default=1000, metavar='N',
+                            help='input batch size for testing (default: 1000)')
+        parser.add_argument('--epochs', type=int, default=20, metavar='N',
+                            help='number of epochs to train (default: 20)')
+
+    def parameters(self):
+        return {
+            'batch_size': self.args.batch_size,
+            'test_batch_size': self.args.test_batch_size,
+            'epochs': self.args.epochs,
+            'cuda': self.use_cuda
+        }
+
+    def setup(self):
+        # Set up CUDA
+        self.use_cuda = bool(not self.args.no_cuda and tf.config.list_physical_devices('GPU'))
+        if self.use_cuda:
+            device = '/GPU:0'
+        else:
+            device = '/CPU:0'
+            tf.config.set_visible_devices(tf.config.list_physical_devices('CPU'))
+        print('Using device {}'.format(device))
+
+        # Import the MNIST dataset
+        (train_images, train_labels), (test_images, test_labels) = tf.keras.datasets.mnist.load_data()
+
+        # Convert to floating point format and normalize
+        train_images = (train_images / 255.0 - 0.1307) / 0.3081
+        test_images = (test_images / 255.0 - 0.1307) / 0.3081
+        # Add dimension: [batch_size, x, y] => [batch_size, x, y, depth]
+        self.train_images = tf.expand_dims(train_images, -1)
+        self.test_images = tf.expand_dims(test_images, -1)
+        self.train_labels = train_labels
+        self.test_labels = test_labels
+
+    def run(self, run):
+        # Create a freshly initialized neural network for every run
+        model = create_model()
+
+        # Train the model
+        model.fit(
+            self.train_images,
+            self.train_labels,
+            batch_size=self.args.batch_size,
+            shuffle=True,
+            epochs=self.args.epochs,
+            validation_data=(self.test_images, self.test_labels),
+            validation_batch_size=self.args.test_batch_size,
+            callbacks=[KerasProfilingCallback(run)]
+        )
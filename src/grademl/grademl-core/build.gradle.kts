@@ -4,10 +4,11 @@ plugins {
     kotlin("jvm")
 }
 
-sourceSets {
-    main {
-        resources {
-            srcDir("src/main/R")
-        }
-    }
+dependencies {
+    testImplementation("org.junit.jupiter:junit-jupiter:5.8.0")
+    testImplementation(kotlin("test"))
+}
+
+tasks.test {
+    useJUnitPlatform()
 }
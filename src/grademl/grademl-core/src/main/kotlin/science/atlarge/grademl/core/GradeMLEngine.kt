@@ -19,6 +19,7 @@ object GradeMLEngine {
         jobDataDirectories: Iterable<Path>,
         jobOutputDirectory: Path,
         resourceAttributionSettings: ResourceAttributionSettings = ResourceAttributionSettings(),
+        enableJobSnapshot: Boolean = true,
         progressReport: (GradeMLJobStatusUpdate) -> Unit = { }
     ): GradeMLJob {
         fun createAttributionRuleProvider(
@@ -37,7 +38,6 @@ object GradeMLEngine {
             val bestFitProvider = BestFitAttributionRuleProvider.from(
                 executionModel,
                 resourceModel,
-                jobOutputDirectory,
                 MappingAttributionRuleProvider(listOf(machineMapping))
             )
             // Provider 3: Cache attribution rules to disk (if enabled)
@@ -54,7 +54,8 @@ object GradeMLEngine {
             knownInputSources,
             ::createAttributionRuleProvider,
             resourceAttributionSettings,
-            progressReport
+            enableJobSnapshot,
+            progressReport = progressReport
         )
     }
 
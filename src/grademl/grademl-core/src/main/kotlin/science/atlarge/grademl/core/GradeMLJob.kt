@@ -4,10 +4,21 @@ import science.atlarge.grademl.core.attribution.ResourceAttribution
 import science.atlarge.grademl.core.models.Environment
 import science.atlarge.grademl.core.models.ExecutionModel
 import science.atlarge.grademl.core.models.ResourceModel
+import java.io.Closeable
 
+// Models of an analyzed job. Closing the job releases the files it keeps open (i.e., the job snapshot that metric data
+// is read from) and deletes its temporary files (i.e., spilled attribution results), after which the job can no longer
+// be used.
 class GradeMLJob(
     val unifiedExecutionModel: ExecutionModel,
     val unifiedResourceModel: ResourceModel,
     val jobEnvironment: Environment,
     val resourceAttribution: ResourceAttribution,
-)
\ No newline at end of file
+    private val openFiles: List<Closeable> = emptyList()
+) : Closeable {
+
+    override fun close() {
+        for (openFile in openFiles) openFile.close()
+    }
+
+}
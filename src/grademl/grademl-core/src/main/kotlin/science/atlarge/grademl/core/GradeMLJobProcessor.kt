@@ -4,11 +4,18 @@ import science.atlarge.grademl.core.attribution.ResourceAttribution
 import science.atlarge.grademl.core.attribution.ResourceAttributionRuleProvider
 import science.atlarge.grademl.core.attribution.ResourceAttributionSettings
 import science.atlarge.grademl.core.input.InputSource
+import science.atlarge.grademl.core.input.LogScanner
 import science.atlarge.grademl.core.models.Environment
 import science.atlarge.grademl.core.models.ExecutionModel
 import science.atlarge.grademl.core.models.ResourceModel
+import science.atlarge.grademl.core.models.addAllFrom
+import science.atlarge.grademl.core.snapshot.JobSnapshot
+import java.io.IOException
 import java.nio.file.Path
-import kotlin.system.measureNanoTime
+import java.util.concurrent.Callable
+import java.util.concurrent.ExecutionException
+import java.util.concurrent.ForkJoinPool
+import java.util.concurrent.Future
 
 class GradeMLJobProcessor private constructor(
     private val inputDirectories: Iterable<Path>,
@@ -16,6 +23,8 @@ class GradeMLJobProcessor private constructor(
     private val inputSources: Iterable<InputSource>,
     private val attributionRuleProvider: (ExecutionModel, ResourceModel, Environment) -> ResourceAttributionRuleProvider,
     private val resourceAttributionSettings: ResourceAttributionSettings,
+    private val enableJobSnapshot: Boolean,
+    private val parsingParallelism: Int,
     private val progressReport: (GradeMLJobStatusUpdate) -> Unit
 ) {
 
@@ -25,31 +34,108 @@ class GradeMLJobProcessor private constructor(
     private lateinit var resourceAttribution: ResourceAttribution
 
     fun run(): GradeMLJob {
-        progressReport(GradeMLJobStatusUpdate.JOB_ANALYSIS_STARTING)
+        progressReport(GradeMLJobStatusUpdate.JobAnalysisStarting)
 
-        // Parse logs
-        progressReport(GradeMLJobStatusUpdate.LOG_PARSING_STARTING)
-        for (inputSource in inputSources) {
-            val t = measureNanoTime {
-                inputSource.parseJobData(inputDirectories, executionModel, resourceModel, jobEnvironment)
+        // Load the models from a snapshot of an earlier analysis if the input files are unchanged, or parse logs
+        val jobSnapshot = if (enableJobSnapshot) {
+            JobSnapshot(outputDirectory.resolve(".job-snapshot"), inputDirectories, inputSources, outputDirectory)
+        } else null
+        if (jobSnapshot != null && jobSnapshot.readInto(executionModel, resourceModel, jobEnvironment)) {
+            progressReport(GradeMLJobStatusUpdate.JobSnapshotLoaded)
+        } else {
+            parseLogs()
+            try {
+                jobSnapshot?.write(executionModel, resourceModel, jobEnvironment)
+            } catch (e: IOException) {
+                progressReport(GradeMLJobStatusUpdate.Warning(
+                    "Failed to write job snapshot, parsed logs will not be reused: ${e.message}"
+                ))
             }
-            println(
-                "Time taken to process input source ${inputSource.javaClass.canonicalName}: " +
-                        "${String.format("%.2f", t / 1_000_000.0)} ms"
-            )
         }
-        progressReport(GradeMLJobStatusUpdate.LOG_PARSING_COMPLETED)
 
         // Configure resource attribution
         resourceAttribution = ResourceAttribution(
             executionModel, resourceModel, attributionRuleProvider(executionModel, resourceModel, jobEnvironment),
-            resourceAttributionSettings
+            resourceAttributionSettings,
+            outputDirectory.resolve(".attribution-spill")
+        ) { message -> progressReport(GradeMLJobStatusUpdate.Warning(message)) }
+
+        progressReport(GradeMLJobStatusUpdate.JobAnalysisCompleted)
+        return GradeMLJob(
+            executionModel, resourceModel, jobEnvironment, resourceAttribution,
+            openFiles = listOfNotNull(jobSnapshot, resourceAttribution)
+        )
+    }
+
+    private fun parseLogs() {
+        progressReport(GradeMLJobStatusUpdate.LogParsingStarting)
+        // Input sources report progress from parsing threads, so serialize calls to the progress report
+        val reportLock = Any()
+        val synchronizedProgressReport = { update: GradeMLJobStatusUpdate ->
+            synchronized(reportLock) { progressReport(update) }
+        }
+        // Parse on a work-stealing pool, so input sources can split their work into tasks (e.g., per host) on the
+        // same bounded pool without blocking its threads
+        val parsingPool = ForkJoinPool(parsingParallelism)
+        try {
+            // Parse independent input sources concurrently, each into separate models
+            val (independentSources, dependentSources) = inputSources.partition { it.parsesIndependently }
+            val parsingTasks = independentSources.map { inputSource ->
+                parsingPool.submit(Callable {
+                    val parsedModels = ParsedModels()
+                    parseInputSource(inputSource, parsedModels, synchronizedProgressReport)
+                    parsedModels
+                })
+            }
+            // Merge models in the order of input sources, so the unified models do not depend on thread timing
+            for (parsingTask in parsingTasks) {
+                val parsedModels = parsingTask.getOrRethrow()
+                executionModel.addAllFrom(parsedModels.executionModel)
+                resourceModel.addAllFrom(parsedModels.resourceModel)
+                jobEnvironment.addAllFrom(parsedModels.environment)
+            }
+            // Parse input sources that depend on the results of other input sources in order
+            val unifiedModels = ParsedModels(executionModel, resourceModel, jobEnvironment)
+            for (inputSource in dependentSources) {
+                parsingPool.submit(Callable {
+                    parseInputSource(inputSource, unifiedModels, synchronizedProgressReport)
+                }).getOrRethrow()
+            }
+        } finally {
+            parsingPool.shutdown()
+            // Free log scan results that an input source did not claim, e.g., because it failed or found no data
+            LogScanner.releaseScans(inputDirectories)
+        }
+        progressReport(GradeMLJobStatusUpdate.LogParsingCompleted)
+    }
+
+    private fun parseInputSource(
+        inputSource: InputSource,
+        models: ParsedModels,
+        progressReport: (GradeMLJobStatusUpdate) -> Unit
+    ) {
+        val startTime = System.nanoTime()
+        val foundData = inputSource.parseJobData(
+            inputDirectories, models.executionModel, models.resourceModel, models.environment, progressReport
         )
+        progressReport(GradeMLJobStatusUpdate.InputSourceParsed(inputSource, foundData, System.nanoTime() - startTime))
+    }
 
-        progressReport(GradeMLJobStatusUpdate.JOB_ANALYSIS_COMPLETED)
-        return GradeMLJob(executionModel, resourceModel, jobEnvironment, resourceAttribution)
+    private fun <T> Future<T>.getOrRethrow(): T {
+        try {
+            return get()
+        } catch (e: ExecutionException) {
+            // Report failures of input sources as if they had been parsed on the calling thread
+            throw e.cause ?: e
+        }
     }
 
+    private class ParsedModels(
+        val executionModel: ExecutionModel = ExecutionModel(),
+        val resourceModel: ResourceModel = ResourceModel(),
+        val environment: Environment = Environment()
+    )
+
     companion object {
         fun processJob(
             inputDirectories: Iterable<Path>,
@@ -57,6 +143,8 @@ class GradeMLJobProcessor private constructor(
             inputSources: Iterable<InputSource>,
             attributionRuleProvider: (ExecutionModel, ResourceModel, Environment) -> ResourceAttributionRuleProvider,
             resourceAttributionSettings: ResourceAttributionSettings = ResourceAttributionSettings(),
+            enableJobSnapshot: Boolean = true,
+            parsingParallelism: Int = Runtime.getRuntime().availableProcessors(),
             progressReport: (GradeMLJobStatusUpdate) -> Unit = { }
         ): GradeMLJob {
             return GradeMLJobProcessor(
@@ -65,6 +153,8 @@ class GradeMLJobProcessor private constructor(
                 inputSources,
                 attributionRuleProvider,
                 resourceAttributionSettings,
+                enableJobSnapshot,
+                parsingParallelism,
                 progressReport
             ).run()
         }
@@ -1,8 +1,32 @@
 package science.atlarge.grademl.core
 
-enum class GradeMLJobStatusUpdate {
-    JOB_ANALYSIS_STARTING,
-    LOG_PARSING_STARTING,
-    LOG_PARSING_COMPLETED,
-    JOB_ANALYSIS_COMPLETED
-}
\ No newline at end of file
+import science.atlarge.grademl.core.input.InputSource
+import science.atlarge.grademl.core.util.DurationNs
+
+sealed class GradeMLJobStatusUpdate {
+
+    object JobAnalysisStarting : GradeMLJobStatusUpdate()
+    object LogParsingStarting : GradeMLJobStatusUpdate()
+    object LogParsingCompleted : GradeMLJobStatusUpdate()
+    object JobSnapshotLoaded : GradeMLJobStatusUpdate()
+    object JobAnalysisCompleted : GradeMLJobStatusUpdate()
+
+    // An input source finished parsing, whether or not it found any of its logs
+    class InputSourceParsed(
+        val inputSource: InputSource,
+        val foundData: Boolean,
+        val duration: DurationNs
+    ) : GradeMLJobStatusUpdate()
+
+    // An input source finished parsing part of its logs, e.g., the metrics of one host
+    class InputPartParsed(
+        val inputSource: InputSource,
+        val part: String,
+        val duration: DurationNs
+    ) : GradeMLJobStatusUpdate()
+
+    // A problem that does not stop the analysis, e.g., a cache file that could not be written; may be reported at any
+    // time while the job is in use, from any thread
+    class Warning(val message: String) : GradeMLJobStatusUpdate()
+
+}
@@ -0,0 +1,91 @@
+package science.atlarge.grademl.core.attribution
+
+import science.atlarge.grademl.core.models.Metric
+import science.atlarge.grademl.core.models.MetricData
+import science.atlarge.grademl.core.util.readVarLong
+import science.atlarge.grademl.core.util.writeVarLong
+import java.io.DataInputStream
+import java.io.DataOutputStream
+
+// Size estimates and compact encodings of intermediate attribution results, for bounded caches that spill to disk
+
+private const val OBJECT_OVERHEAD_BYTES = 64L
+
+internal fun MetricData.estimatedSizeInBytes(): Long {
+    return OBJECT_OVERHEAD_BYTES + sizeInBytes
+}
+
+internal fun ResourceDemandEstimate?.estimatedSizeInBytes(): Long {
+    if (this == null) return OBJECT_OVERHEAD_BYTES
+    return OBJECT_OVERHEAD_BYTES + exactDemandOverTime.estimatedSizeInBytes() +
+            variableDemandOverTime.estimatedSizeInBytes()
+}
+
+internal fun ResourceAttributionResult.estimatedSizeInBytes(): Long {
+    return when (this) {
+        is AttributedResourceData -> {
+            // Usage and capacity of leaf phases share a timestamp array
+            val capacitySize = if (availableCapacity.timestamps === metricData.timestamps) {
+                OBJECT_OVERHEAD_BYTES + 8L * availableCapacity.values.size
+            } else {
+                availableCapacity.estimatedSizeInBytes()
+            }
+            OBJECT_OVERHEAD_BYTES + metricData.estimatedSizeInBytes() + capacitySize
+        }
+        NoAttributedData -> OBJECT_OVERHEAD_BYTES
+    }
+}
+
+// Timestamps are encoded as variable-length deltas, as they are increasing and mostly evenly spaced
+internal fun DataOutputStream.writeMetricData(metricData: MetricData) {
+    val timestamps = metricData.timestamps
+    val values = metricData.values
+    writeInt(timestamps.size)
+    writeDouble(metricData.maxValue)
+    var previousTimestamp = 0L
+    for (timestamp in timestamps) {
+        writeVarLong(timestamp - previousTimestamp)
+        previousTimestamp = timestamp
+    }
+    for (value in values) writeDouble(value)
+}
+
+internal fun DataInputStream.readMetricData(): MetricData {
+    val timestampCount = readInt()
+    val maxValue = readDouble()
+    var previousTimestamp = 0L
+    val timestamps = LongArray(timestampCount) {
+        previousTimestamp += readVarLong { readUnsignedByte() }
+        previousTimestamp
+    }
+    val values = DoubleArray(maxOf(timestampCount - 1, 0)) { readDouble() }
+    return MetricData(timestamps, values, maxValue)
+}
+
+internal fun DataOutputStream.writeDemandEstimate(estimate: ResourceDemandEstimate?) {
+    writeBoolean(estimate != null)
+    if (estimate == null) return
+    writeMetricData(estimate.exactDemandOverTime)
+    writeMetricData(estimate.variableDemandOverTime)
+}
+
+internal fun DataInputStream.readDemandEstimate(metric: Metric): ResourceDemandEstimate? {
+    if (!readBoolean()) return null
+    return ResourceDemandEstimate(metric, readMetricData(), readMetricData())
+}
+
+internal fun DataOutputStream.writeAttributionResult(result: ResourceAttributionResult) {
+    when (result) {
+        is AttributedResourceData -> {
+            writeBoolean(true)
+            writeMetricData(result.metricData)
+            writeMetricData(result.availableCapacity)
+        }
+        NoAttributedData -> writeBoolean(false)
+    }
+}
+
+internal fun DataInputStream.readAttributionResult(): ResourceAttributionResult {
+    if (!readBoolean()) return NoAttributedData
+    return AttributedResourceData(readMetricData(), readMetricData())
+}
@@ -5,13 +5,12 @@ import science.atlarge.grademl.core.models.ExecutionModel
 import science.atlarge.grademl.core.models.ExecutionPhase
 import science.atlarge.grademl.core.models.Metric
 import science.atlarge.grademl.core.models.ResourceModel
+import science.atlarge.grademl.core.util.ConcurrentMemoizer
 import science.atlarge.grademl.core.util.TimestampNsArray
-import java.nio.file.Path
 
 class BestFitAttributionRuleProvider(
     phases: Iterable<ExecutionPhase>,
     metrics: Iterable<Metric>,
-    private val scratchDirectory: Path,
     private val overrideRuleProvider: ResourceAttributionRuleProvider?
 ) : ResourceAttributionRuleProvider {
 
@@ -19,40 +18,48 @@ class BestFitAttributionRuleProvider(
     private val phasesByType = phases.groupBy { it.type }
     private val orderedPhaseTypes = phasesByType.keys.sortedBy { it.path }
     private val metrics = metrics.toSet()
+    // One metric per metric type, whose fit is used as a starting point for fitting similar metrics (e.g., on other
+    // machines); chosen by path, so fits do not depend on the order in which metrics are fitted in parallel
+    private val representativeMetricPerType = this.metrics.groupBy { it.type }
+        .mapValues { (_, metricsOfType) -> metricsOfType.minByOrNull { it.path.toString() }!! }
 
-    private val cachedRules = mutableMapOf<Metric, Map<ExecutionPhase, ResourceAttributionRule>>()
+    private val cachedFits = ConcurrentMemoizer(::computeFitForMetric)
 
     override fun forPhaseAndMetric(phase: ExecutionPhase, metric: Metric): ResourceAttributionRule? {
         // Sanity check the arguments
         if (phase !in phases || metric !in metrics) return ResourceAttributionRule.None
-        // Return from cache if available
-        val cachedMetric = cachedRules[metric]
-        if (cachedMetric != null) {
-            return cachedMetric[phase]
-        }
-        // Otherwise, fit attribution rules to observed resource usage and phase activity
-        computeFitForMetric(metric)
-        return cachedRules[metric]!![phase]
+        // Fit attribution rules to observed resource usage and phase activity, or return them from cache
+        return cachedFits[metric].rules[phase]
     }
 
-    private fun computeFitForMetric(metric: Metric) {
+    private class MetricFit(val coefficients: DoubleArray, val rules: Map<ExecutionPhase, ResourceAttributionRule>)
+
+    private fun computeFitForMetric(metric: Metric): MetricFit {
         // Get any overriding rules
         val overridingRules = phases.mapNotNull { phase ->
             val overridingRule = overrideRuleProvider?.forPhaseAndMetric(phase, metric)
             if (overridingRule != null) phase to overridingRule else null
         }.toMap()
 
+        // Decode (compressed) metric data once
+        val timestamps = metric.data.timestamps
+        val values = metric.data.values
+
         // Create a vector summing the overriding variable demand
-        val variableDemandVector = createVariableDemandVector(metric.data.timestamps, overridingRules)
+        val variableDemandVector = createVariableDemandVector(timestamps, overridingRules)
         // Create a vector summing the overriding exact demand
-        val exactDemandVector = createExactDemandVector(metric.data.timestamps, overridingRules)
+        val exactDemandVector = createExactDemandVector(timestamps, overridingRules)
 
         // Create phase activity matrix and metric usage vector in preparation for NNLS fit
-        val activityMatrix = createPhaseActivityMatrix(metric.data.timestamps, overridingRules, variableDemandVector)
-        val observationVector = createObservationVector(metric.data.values, exactDemandVector)
+        val activityMatrix = createPhaseActivityMatrix(timestamps, overridingRules, variableDemandVector)
+        val observationVector = createObservationVector(values, exactDemandVector)
 
-        // Perform the NNLS fit
-        val bestFit = NonNegativeLeastSquares.fit(activityMatrix, observationVector, scratchDirectory)
+        // Perform the NNLS fit, starting from the fit of the representative metric of the same type
+        val representativeMetric = representativeMetricPerType[metric.type]
+        val initialSolution = if (representativeMetric != null && representativeMetric !== metric) {
+            cachedFits[representativeMetric].coefficients
+        } else null
+        val bestFit = NonNegativeLeastSquares.fit(activityMatrix, observationVector, initialSolution)
 
         // Translate the obtained coefficients to attribution rules
         val rulePerPhaseType = orderedPhaseTypes.mapIndexed { i, phaseType ->
@@ -69,9 +76,9 @@ class BestFitAttributionRuleProvider(
             }
         }
 
-        cachedRules[metric] = phases.associateWith { phase ->
+        return MetricFit(bestFit, phases.associateWith { phase ->
             adjustedOverridingRules[phase] ?: rulePerPhaseType[phase.type]!!
-        }
+        })
     }
 
     private fun createVariableDemandVector(
@@ -164,13 +171,11 @@ class BestFitAttributionRuleProvider(
         fun from(
             executionModel: ExecutionModel,
             resourceModel: ResourceModel,
-            outputPath: Path,
             overrideRuleProvider: ResourceAttributionRuleProvider? = null
         ): BestFitAttributionRuleProvider {
             return BestFitAttributionRuleProvider(
                 executionModel.rootPhase.descendants.filter { it.children.isEmpty() },
                 resourceModel.rootResource.metricsInTree,
-                outputPath.resolve(".scratch"),
                 overrideRuleProvider
             )
         }
@@ -60,11 +60,14 @@ class CachingAttributionRuleProvider(
     }
 
     override fun forPhaseAndMetric(phase: ExecutionPhase, metric: Metric): ResourceAttributionRule? {
-        val phaseCache = mapping[phase.path.toString()]
-        if (phaseCache != null) {
-            val metricPath = metric.path.toString()
-            if (metricPath in phaseCache) {
-                return phaseCache[metricPath]
+        // Look up cached rules under the writer lock, as other threads may be adding rules concurrently
+        writerLock.withLock {
+            val phaseCache = mapping[phase.path.toString()]
+            if (phaseCache != null) {
+                val metricPath = metric.path.toString()
+                if (metricPath in phaseCache) {
+                    return phaseCache[metricPath]
+                }
             }
         }
 
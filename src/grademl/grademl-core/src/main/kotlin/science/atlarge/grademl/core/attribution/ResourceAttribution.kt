@@ -1,29 +1,52 @@
 package science.atlarge.grademl.core.attribution
 
 import science.atlarge.grademl.core.models.*
+import science.atlarge.grademl.core.util.CacheStatistics
+import science.atlarge.grademl.core.util.MemoryBudget
+import java.io.Closeable
+import java.nio.file.Path
+import java.util.concurrent.Callable
+import java.util.concurrent.ExecutionException
+import java.util.concurrent.ForkJoinPool
+import java.util.concurrent.ForkJoinTask
 
 class ResourceAttribution(
     executionModel: ExecutionModel,
     resourceModel: ResourceModel,
     attributionRuleProvider: ResourceAttributionRuleProvider,
-    resourceAttributionSettings: ResourceAttributionSettings = ResourceAttributionSettings()
-) {
+    private val resourceAttributionSettings: ResourceAttributionSettings = ResourceAttributionSettings(),
+    // Directory for spilling intermediate results evicted from memory, or null to recompute evicted results
+    spillDirectory: Path? = null,
+    // Reports problems that do not stop the attribution, e.g., failures to write to the spill directory
+    reportWarning: (String) -> Unit = { }
+) : Closeable {
 
     val leafPhases = executionModel.rootPhase.descendants.filter { it.children.isEmpty() }.toSet()
     val phases = executionModel.phases
     val metrics = resourceModel.rootResource.metricsInTree
 
+    // Divide the cache budget over steps, favoring the (most numerous) attribution results
+    private val cacheByteBudget = resourceAttributionSettings.attributionCacheByteBudget
+    private val activeSpillDirectory =
+        spillDirectory?.takeIf { resourceAttributionSettings.enableAttributionCacheSpilling }
+
     private val demandEstimationStep = ResourceDemandEstimationStep(
         metrics,
         leafPhases,
         attributionRuleProvider,
-        enableTimeSeriesCompression = resourceAttributionSettings.enableTimeSeriesCompression
+        enableTimeSeriesCompression = resourceAttributionSettings.enableTimeSeriesCompression,
+        cacheByteBudget = cacheByteBudget / 10,
+        spillFile = activeSpillDirectory?.resolve("demand-estimates"),
+        reportWarning = reportWarning
     )
 
     private val upsamplingStep = ResourceUpsamplingStep(
         metrics,
         { metric -> demandEstimationStep.estimatedDemandForMetric(metric)!! },
-        enableTimeSeriesCompression = resourceAttributionSettings.enableTimeSeriesCompression
+        enableTimeSeriesCompression = resourceAttributionSettings.enableTimeSeriesCompression,
+        cacheByteBudget = cacheByteBudget / 10 * 3,
+        spillFile = activeSpillDirectory?.resolve("upsampled-metrics"),
+        reportWarning = reportWarning
     )
 
     private val attributionStep = ResourceAttributionStep(
@@ -34,9 +57,15 @@ class ResourceAttribution(
         { metric -> demandEstimationStep.estimatedDemandForMetric(metric)!! },
         { metric -> upsamplingStep.upsampleMetric(metric)!! },
         enableTimeSeriesCompression = resourceAttributionSettings.enableTimeSeriesCompression,
-        enableAttributionResultCaching = resourceAttributionSettings.enableAttributionResultCaching
+        enableAttributionResultCaching = resourceAttributionSettings.enableAttributionResultCaching,
+        cacheByteBudget = cacheByteBudget / 10 * 6,
+        spillFile = activeSpillDirectory?.resolve("attribution-results"),
+        reportWarning = reportWarning
     )
 
+    // Work-stealing pool for attributing many metric-phase pairs in parallel, created on first use
+    private val attributionPool by lazy { ForkJoinPool(resourceAttributionSettings.attributionParallelism) }
+
     fun attributeMetricToPhase(metric: Metric, phase: ExecutionPhase): ResourceAttributionResult {
         return attributionStep.attributeMetricToPhase(metric, phase)
     }
@@ -49,6 +78,71 @@ class ResourceAttribution(
         return demandEstimationStep.estimatedDemandForMetric(metric)
     }
 
+    // Attributes metrics to phases in parallel, returning results in the order of the given pairs.
+    // Intermediate results (demand estimates, upsampled metrics, attribution rules) are shared by pairs of a metric.
+    fun attributeAll(metricPhasePairs: List<Pair<Metric, ExecutionPhase>>): List<ResourceAttributionResult> {
+        if (metricPhasePairs.size <= 1) {
+            return metricPhasePairs.map { (metric, phase) -> attributeMetricToPhase(metric, phase) }
+        }
+        return runInAttributionPool {
+            // Attribute to leaf phases first, so attribution to composite phases mostly combines cached results
+            val (leafPairs, compositePairs) = metricPhasePairs.indices.partition {
+                metricPhasePairs[it].second in leafPhases
+            }
+            val results = arrayOfNulls<ResourceAttributionResult>(metricPhasePairs.size)
+            for (pairIndices in listOf(leafPairs, compositePairs)) {
+                ForkJoinTask.invokeAll(pairIndices.map { i ->
+                    ForkJoinTask.adapt(Runnable {
+                        val (metric, phase) = metricPhasePairs[i]
+                        results[i] = attributeMetricToPhase(metric, phase)
+                    })
+                })
+            }
+            results.map { it!! }
+        }
+    }
+
+    // Computes demand estimates and upsampled metrics for the given metrics in parallel, and attributes them to the
+    // given phases if attribution results are cached
+    fun precompute(metrics: Collection<Metric> = this.metrics, phases: Collection<ExecutionPhase> = this.phases) {
+        runInAttributionPool {
+            ForkJoinTask.invokeAll(metrics.map { metric ->
+                ForkJoinTask.adapt(Runnable {
+                    // Metrics without data points have no demand estimate and cannot be upsampled
+                    if (estimateDemand(metric) != null) upsampleMetric(metric)
+                })
+            })
+        }
+        if (resourceAttributionSettings.enableAttributionResultCaching) {
+            attributeAll(metrics.flatMap { metric -> phases.map { metric to it } })
+        }
+    }
+
+    fun cacheStatistics(): Map<String, CacheStatistics> {
+        return mapOf(
+            "demand estimates" to demandEstimationStep.cacheStatistics,
+            "upsampled metrics" to upsamplingStep.cacheStatistics,
+            "attribution results" to attributionStep.cacheStatistics
+        )
+    }
+
+    // Deletes the spill files of all steps, and the spill directory if it is empty
+    override fun close() {
+        demandEstimationStep.close()
+        upsamplingStep.close()
+        attributionStep.close()
+        activeSpillDirectory?.toFile()?.delete()
+    }
+
+    private fun <T> runInAttributionPool(task: () -> T): T {
+        try {
+            return attributionPool.submit(Callable(task)).get()
+        } catch (e: ExecutionException) {
+            // Report failures as if the attribution had been performed on the calling thread
+            throw e.cause ?: e
+        }
+    }
+
 }
 
 sealed class ResourceAttributionResult
@@ -63,5 +157,10 @@ object NoAttributedData : ResourceAttributionResult()
 class ResourceAttributionSettings(
     val enableTimeSeriesCompression: Boolean = true,
     val enableRuleCaching: Boolean = true,
-    val enableAttributionResultCaching: Boolean = true
+    val enableAttributionResultCaching: Boolean = true,
+    val attributionParallelism: Int = Runtime.getRuntime().availableProcessors(),
+    // Budget for cached intermediate results of resource attribution; least recently used results are evicted first.
+    // Processes that load multiple jobs at once should divide the process-wide budget over the jobs.
+    val attributionCacheByteBudget: Long = MemoryBudget.attributionCacheBytes,
+    val enableAttributionCacheSpilling: Boolean = true
 )
\ No newline at end of file
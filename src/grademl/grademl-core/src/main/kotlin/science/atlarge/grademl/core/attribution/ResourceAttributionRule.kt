@@ -18,6 +18,7 @@ sealed class ResourceAttributionRule {
     }
 }
 
+// Rule providers may be queried concurrently by ResourceAttribution and must be thread-safe
 interface ResourceAttributionRuleProvider {
     fun forPhaseAndMetric(phase: ExecutionPhase, metric: Metric): ResourceAttributionRule?
 }
\ No newline at end of file
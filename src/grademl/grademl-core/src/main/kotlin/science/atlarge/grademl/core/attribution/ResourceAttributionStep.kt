@@ -4,9 +4,10 @@ import science.atlarge.grademl.core.models.ExecutionPhase
 import science.atlarge.grademl.core.models.Metric
 import science.atlarge.grademl.core.models.MetricData
 import science.atlarge.grademl.core.models.sum
-import science.atlarge.grademl.core.util.DoubleArrayBuilder
-import science.atlarge.grademl.core.util.LongArrayBuilder
-import science.atlarge.grademl.core.util.TimestampNs
+import science.atlarge.grademl.core.util.*
+import java.io.Closeable
+import java.io.DataOutputStream
+import java.nio.file.Path
 
 class ResourceAttributionStep(
     private val leafPhases: Set<ExecutionPhase>,
@@ -16,27 +17,52 @@ class ResourceAttributionStep(
     private val resourceDemandEstimates: (Metric) -> ResourceDemandEstimate,
     private val upsampledMetricData: (Metric) -> MetricData,
     private val enableTimeSeriesCompression: Boolean,
-    private val enableAttributionResultCaching: Boolean
-) {
+    private val enableAttributionResultCaching: Boolean,
+    cacheByteBudget: Long,
+    spillFile: Path?,
+    reportWarning: (String) -> Unit = { }
+) : Closeable {
+
+    private val spillStore = spillFile?.let {
+        SpillFile<Pair<Metric, ExecutionPhase>, ResourceAttributionResult>(
+            it, DataOutputStream::writeAttributionResult, { readAttributionResult() }, reportWarning
+        )
+    }
 
-    private val cachedAttributedUsage = mutableMapOf<ExecutionPhase, MutableMap<Metric, ResourceAttributionResult>>()
+    private val cachedAttributedUsage = BoundedCache<Pair<Metric, ExecutionPhase>, ResourceAttributionResult>(
+        cacheByteBudget,
+        { it.estimatedSizeInBytes() },
+        spillStore
+    ) { (metric, phase) ->
+        computeAttributedUsage(metric, phase)
+    }
+
+    val cacheStatistics: CacheStatistics
+        get() = cachedAttributedUsage.statistics()
 
     fun attributeMetricToPhase(metric: Metric, phase: ExecutionPhase): ResourceAttributionResult {
-        // Return cached outcome if it exists
-        cachedAttributedUsage[phase]?.get(metric)?.let { return it }
-        // Otherwise, check arguments for validity
+        // Check arguments for validity
         if (metric !in metrics) return NoAttributedData
         if (phase !in allPhases) return NoAttributedData
-        // Perform attribution step
-        val newAttributedUsage = if (phase in leafPhases) {
+        // Perform attribution step, or return the cached outcome
+        return if (enableAttributionResultCaching) {
+            cachedAttributedUsage[metric to phase]
+        } else {
+            computeAttributedUsage(metric, phase)
+        }
+    }
+
+    // Deletes the spill file of the cache
+    override fun close() {
+        spillStore?.close()
+    }
+
+    private fun computeAttributedUsage(metric: Metric, phase: ExecutionPhase): ResourceAttributionResult {
+        return if (phase in leafPhases) {
             computeAttributedUsageLeaf(metric, phase)
         } else {
             computeAttributedUsageComposite(metric, phase)
         }
-        if (enableAttributionResultCaching) {
-            cachedAttributedUsage.getOrPut(phase) { mutableMapOf() }[metric] = newAttributedUsage
-        }
-        return newAttributedUsage
     }
 
     private fun computeAttributedUsageLeaf(metric: Metric, phase: ExecutionPhase): ResourceAttributionResult {
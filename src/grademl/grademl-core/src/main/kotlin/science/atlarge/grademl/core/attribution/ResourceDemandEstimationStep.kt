@@ -3,35 +3,56 @@ package science.atlarge.grademl.core.attribution
 import science.atlarge.grademl.core.models.ExecutionPhase
 import science.atlarge.grademl.core.models.Metric
 import science.atlarge.grademl.core.models.MetricData
-import science.atlarge.grademl.core.util.DoubleArrayBuilder
-import science.atlarge.grademl.core.util.LongArrayBuilder
-import science.atlarge.grademl.core.util.TimestampNs
+import science.atlarge.grademl.core.util.*
+import java.io.Closeable
+import java.io.DataInputStream
+import java.io.DataOutputStream
+import java.nio.file.Path
 
 class ResourceDemandEstimationStep(
     private val metrics: Set<Metric>,
     private val phases: Set<ExecutionPhase>,
     private val attributionRuleProvider: ResourceAttributionRuleProvider,
-    private val enableTimeSeriesCompression: Boolean
-) {
+    private val enableTimeSeriesCompression: Boolean,
+    cacheByteBudget: Long,
+    spillFile: Path?,
+    reportWarning: (String) -> Unit = { }
+) : Closeable {
 
-    private val cachedDemandEstimates = mutableMapOf<Metric, ResourceDemandEstimate>()
+    private val spillStore = spillFile?.let {
+        SpillFile<Metric, ResourceDemandEstimate?>(
+            it, DataOutputStream::writeDemandEstimate, DataInputStream::readDemandEstimate, reportWarning
+        )
+    }
+
+    private val cachedDemandEstimates = BoundedCache<Metric, ResourceDemandEstimate?>(
+        cacheByteBudget,
+        { it.estimatedSizeInBytes() },
+        spillStore,
+        ::estimateDemand
+    )
+
+    val cacheStatistics: CacheStatistics
+        get() = cachedDemandEstimates.statistics()
 
     fun estimatedDemandForMetric(metric: Metric): ResourceDemandEstimate? {
-        if (metric in cachedDemandEstimates) return cachedDemandEstimates[metric]
         if (metric !in metrics) return null
-        val newEstimate = estimateDemand(metric) ?: return null
-        cachedDemandEstimates[metric] = newEstimate
-        return newEstimate
+        return cachedDemandEstimates[metric]
+    }
+
+    // Deletes the spill file of the cache
+    override fun close() {
+        spillStore?.close()
     }
 
     private fun estimateDemand(metric: Metric): ResourceDemandEstimate? {
         // No demand estimate possible for metrics without data points
-        if (metric.data.timestamps.size < 2) return null
+        if (metric.data.periodCount < 1) return null
         // Determine the demand per phase
         val (exactDemandPerPhase, variableDemandPerPhase) = getDemandPerPhaseFor(metric)
         // Determine the total demand over time
-        val startTime = metric.data.timestamps.first()
-        val endTime = metric.data.timestamps.last()
+        val startTime = metric.data.firstTimestamp
+        val endTime = metric.data.lastTimestamp
         val exactDemandOverTime = computeDemandOverTime(exactDemandPerPhase, startTime, endTime)
         val variableDemandOverTime = computeDemandOverTime(variableDemandPerPhase, startTime, endTime)
         return ResourceDemandEstimate(metric, exactDemandOverTime, variableDemandOverTime)
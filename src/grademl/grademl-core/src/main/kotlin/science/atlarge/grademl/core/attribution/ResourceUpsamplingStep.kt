@@ -2,30 +2,50 @@ package science.atlarge.grademl.core.attribution
 
 import science.atlarge.grademl.core.models.Metric
 import science.atlarge.grademl.core.models.MetricData
-import science.atlarge.grademl.core.util.DoubleArrayBuilder
-import science.atlarge.grademl.core.util.LongArrayBuilder
-import science.atlarge.grademl.core.util.TimestampNs
+import science.atlarge.grademl.core.util.*
+import java.io.Closeable
+import java.io.DataInputStream
+import java.io.DataOutputStream
+import java.nio.file.Path
 
 class ResourceUpsamplingStep(
     private val metrics: Set<Metric>,
     private val resourceDemandEstimates: (Metric) -> ResourceDemandEstimate,
-    private val enableTimeSeriesCompression: Boolean
-) {
-
-    private val cachedUpsampledMetrics = mutableMapOf<Metric, MetricData>()
+    private val enableTimeSeriesCompression: Boolean,
+    cacheByteBudget: Long,
+    spillFile: Path?,
+    reportWarning: (String) -> Unit = { }
+) : Closeable {
+
+    private val spillStore = spillFile?.let {
+        SpillFile<Metric, MetricData>(it, DataOutputStream::writeMetricData, { readMetricData() }, reportWarning)
+    }
 
-    fun upsampleMetric(metric: Metric): MetricData? {
-        if (metric in cachedUpsampledMetrics) return cachedUpsampledMetrics[metric]
-        if (metric !in metrics) return null
+    private val cachedUpsampledMetrics = BoundedCache<Metric, MetricData>(
+        cacheByteBudget,
+        { it.estimatedSizeInBytes() },
+        spillStore
+    ) { metric ->
         val resourceDemandEstimate = resourceDemandEstimates(metric)
-        val newUpsampledMetric = MetricUpsampler(
+        MetricUpsampler(
             metric.data,
             resourceDemandEstimate.exactDemandOverTime,
             resourceDemandEstimate.variableDemandOverTime,
             enableTimeSeriesCompression
         ).getUpsampledMetric()
-        cachedUpsampledMetrics[metric] = newUpsampledMetric
-        return newUpsampledMetric
+    }
+
+    val cacheStatistics: CacheStatistics
+        get() = cachedUpsampledMetrics.statistics()
+
+    fun upsampleMetric(metric: Metric): MetricData? {
+        if (metric !in metrics) return null
+        return cachedUpsampledMetrics[metric]
+    }
+
+    // Deletes the spill file of the cache
+    override fun close() {
+        spillStore?.close()
     }
 
 }
@@ -37,6 +57,10 @@ private class MetricUpsampler(
     private val enableTimeSeriesCompression: Boolean
 ) {
 
+    // Decode (compressed) metric data once
+    private val observedTimestamps = observedUsage.timestamps
+    private val observedValues = observedUsage.values
+
     private var currentExactDemand = 0.0
     private var currentVariableDemand = 0.0
 
@@ -51,14 +75,14 @@ private class MetricUpsampler(
 
     init {
         // Sanity check the input
-        require(observedUsage.values.isNotEmpty()) { "Input metric must have at least one data point" }
+        require(observedValues.isNotEmpty()) { "Input metric must have at least one data point" }
         require(exactDemand.timestamps.isNotEmpty()) { "Exact demand must have at least one data points" }
         require(variableDemand.timestamps.isNotEmpty()) { "Variable demand must have at least one data points" }
         require(
-            observedUsage.timestamps.first() == exactDemand.timestamps.first() &&
-                    observedUsage.timestamps.last() == exactDemand.timestamps.last() &&
-                    observedUsage.timestamps.first() == variableDemand.timestamps.first() &&
-                    observedUsage.timestamps.last() == variableDemand.timestamps.last()
+            observedTimestamps.first() == exactDemand.timestamps.first() &&
+                    observedTimestamps.last() == exactDemand.timestamps.last() &&
+                    observedTimestamps.first() == variableDemand.timestamps.first() &&
+                    observedTimestamps.last() == variableDemand.timestamps.last()
         ) {
             "Demand time series must cover the same period of time as the input metric"
         }
@@ -73,19 +97,19 @@ private class MetricUpsampler(
 
     private fun upsampleMetric() {
         // Record the start of the first measurement period
-        timestamps.append(observedUsage.timestamps.first())
+        timestamps.append(observedTimestamps.first())
         // Get the initial demand
         updateExactDemand()
         updateVariableDemand()
         // Iterate over metric observation periods, split periods with intermittent changes in demand
-        for (periodIndex in observedUsage.values.indices) {
-            val periodEnd = observedUsage.timestamps[periodIndex + 1]
-            val periodValue = observedUsage.values[periodIndex]
+        for (periodIndex in observedValues.indices) {
+            val periodEnd = observedTimestamps[periodIndex + 1]
+            val periodValue = observedValues[periodIndex]
             // Only upsample if there are changes in demand during this measurement period
             if (nextExactDemandChange >= periodEnd && nextVariableDemandChange >= periodEnd) {
                 emitDataPoint(periodEnd, periodValue)
             } else {
-                upsampleDataPoint(observedUsage.timestamps[periodIndex], periodEnd, periodValue)
+                upsampleDataPoint(observedTimestamps[periodIndex], periodEnd, periodValue)
             }
             // Corner case: process any changes in demand on the border between measurement periods
             while (nextExactDemandChange == periodEnd) updateExactDemand()
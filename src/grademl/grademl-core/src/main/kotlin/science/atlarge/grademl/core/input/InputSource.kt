@@ -1,5 +1,6 @@
 package science.atlarge.grademl.core.input
 
+import science.atlarge.grademl.core.GradeMLJobStatusUpdate
 import science.atlarge.grademl.core.models.Environment
 import science.atlarge.grademl.core.models.ExecutionModel
 import science.atlarge.grademl.core.models.ResourceModel
@@ -7,6 +8,12 @@ import java.nio.file.Path
 
 interface InputSource {
 
+    // Input sources that only add to the models can parse in parallel with other input sources, into separate models.
+    // Input sources that inspect or modify what other input sources added (e.g., to connect phases of different
+    // frameworks) are invoked on the unified models after all independent input sources.
+    val parsesIndependently: Boolean
+        get() = true
+
     fun parseJobData(
         jobDataDirectories: Iterable<Path>,
         unifiedExecutionModel: ExecutionModel,
@@ -14,4 +21,15 @@ interface InputSource {
         jobEnvironment: Environment
     ): Boolean
 
-}
\ No newline at end of file
+    // Variant of parseJobData for input sources that report progress on parts of their logs, e.g., per host
+    fun parseJobData(
+        jobDataDirectories: Iterable<Path>,
+        unifiedExecutionModel: ExecutionModel,
+        unifiedResourceModel: ResourceModel,
+        jobEnvironment: Environment,
+        progressReport: (GradeMLJobStatusUpdate) -> Unit
+    ): Boolean {
+        return parseJobData(jobDataDirectories, unifiedExecutionModel, unifiedResourceModel, jobEnvironment)
+    }
+
+}
@@ -0,0 +1,270 @@
+package science.atlarge.grademl.core.input
+
+import java.io.File
+import java.nio.MappedByteBuffer
+import java.nio.channels.FileChannel
+import java.nio.file.Files
+import java.nio.file.Path
+import java.nio.file.StandardOpenOption
+import java.util.concurrent.Callable
+import java.util.concurrent.ConcurrentHashMap
+import java.util.concurrent.ForkJoinTask
+import kotlin.streams.toList
+
+// Files in a set of log directories that are scanned together, e.g., all "*.log" files in Airflow log directories
+data class LogFileSet(
+    val extension: String? = null,
+    val recursive: Boolean = false
+) {
+
+    fun findFiles(logDirectories: Iterable<Path>): List<File> {
+        return logDirectories.flatMap { directory ->
+            (if (recursive) Files.walk(directory) else Files.list(directory)).use { fileList ->
+                fileList.map { it.toFile() }
+                    .filter { it.isFile && (extension == null || it.extension == extension) }
+                    .toList()
+            }
+        }.sortedBy { it.path }
+    }
+
+}
+
+// Parser for one type of log file, which receives the lines of each log file in order. Lines are passed to the parser
+// only if they start with one of its line prefixes or contain one of its line substrings; a parser without either
+// receives all lines.
+interface LogParser<out T : Any> {
+
+    val linePrefixes: List<String>
+        get() = emptyList()
+    val lineSubstrings: List<String>
+        get() = emptyList()
+
+    fun startFile(logFile: File): LogFileScan<T>
+
+}
+
+// Parsing state of a LogParser for a single log file. Returns null from finish if the file is not of the parser's type.
+interface LogFileScan<out T : Any> {
+
+    fun processLine(line: String)
+
+    fun finish(): T?
+
+}
+
+class LogFileResult<out T : Any>(
+    val logFile: File,
+    val result: T
+)
+
+// Scans log files in a single pass for all parsers registered for a set of log files. Each file is memory-mapped and
+// split into lines, which are decoded and passed to parsers only if they match a parser's line filters. Files are
+// scanned in parallel, as tasks in the calling thread's ForkJoinPool. Input sources that read the same log files
+// register their parsers when the input source is created; the first input source to scan the files also collects the
+// results of the other parsers, which are kept until claimed by their input sources or released after parsing a job.
+object LogScanner {
+
+    // Large files are mapped in regions that each end with a complete line
+    private const val MAX_REGION_SIZE = 1L shl 30
+    private const val NEWLINE: Byte = 10
+    private const val CR: Byte = 13
+
+    private val registeredParsers = mutableMapOf<LogFileSet, MutableList<LogParser<*>>>()
+    private val sharedScans = mutableMapOf<Pair<LogFileSet, List<Path>>, SharedScan>()
+
+    @Synchronized
+    fun register(logFileSet: LogFileSet, parser: LogParser<*>) {
+        val parsers = registeredParsers.getOrPut(logFileSet) { mutableListOf() }
+        if (parser !in parsers) parsers.add(parser)
+    }
+
+    fun <T : Any> scan(
+        logDirectories: Iterable<Path>,
+        logFileSet: LogFileSet,
+        parser: LogParser<T>
+    ): List<LogFileResult<T>> {
+        val logFiles = logFileSet.findFiles(logDirectories)
+        val fileVersions = logFiles.map { FileVersion(it.path, it.length(), it.lastModified()) }
+        val key = logFileSet to logDirectories.toList()
+        // Reuse a scan by another input source if it included this parser and the log files are unchanged,
+        // or start a new scan for all parsers registered for the log files
+        val sharedScan = synchronized(this) {
+            val existingScan = sharedScans[key]
+            val scan = if (existingScan != null && existingScan.fileVersions == fileVersions &&
+                parser in existingScan.unclaimedParsers
+            ) {
+                existingScan
+            } else {
+                val parsers = (registeredParsers[logFileSet].orEmpty() + parser).distinct()
+                SharedScan(logFiles, fileVersions, parsers).also { sharedScans[key] = it }
+            }
+            scan.unclaimedParsers.remove(parser)
+            if (scan.unclaimedParsers.isEmpty()) sharedScans.remove(key)
+            scan
+        }
+        @Suppress("UNCHECKED_CAST")
+        return sharedScan.claimResults(parser) as List<LogFileResult<T>>
+    }
+
+    // Discards results of scans of log files in the given job directories that were not claimed by all parsers, e.g.,
+    // because an input source failed before claiming its results
+    @Synchronized
+    fun releaseScans(jobDirectories: Iterable<Path>) {
+        sharedScans.keys.removeIf { (_, logDirectories) ->
+            logDirectories.all { logDirectory -> jobDirectories.any { logDirectory.startsWith(it) } }
+        }
+    }
+
+    private data class FileVersion(val path: String, val length: Long, val lastModified: Long)
+
+    private class SharedScan(
+        private val logFiles: List<File>,
+        val fileVersions: List<FileVersion>,
+        private val parsers: List<LogParser<*>>
+    ) {
+
+        val unclaimedParsers = parsers.toMutableSet()
+
+        // Results per parser, or the first exception thrown by the parser; removed when claimed
+        private val results: Lazy<ConcurrentHashMap<LogParser<*>, Any>> = lazy { scanFiles() }
+
+        fun claimResults(parser: LogParser<*>): List<LogFileResult<*>> {
+            val parserResults = results.value.remove(parser)!!
+            if (parserResults is Throwable) throw parserResults
+            @Suppress("UNCHECKED_CAST")
+            return parserResults as List<LogFileResult<*>>
+        }
+
+        private fun scanFiles(): ConcurrentHashMap<LogParser<*>, Any> {
+            val tasks = logFiles.map { logFile ->
+                ForkJoinTask.adapt(Callable { FileScanner(logFile, parsers).scan() })
+            }
+            ForkJoinTask.invokeAll(tasks)
+            val fileResults = tasks.map { it.join() }
+            // Collect the results of each parser in the order of the log files
+            val parserResults = ConcurrentHashMap<LogParser<*>, Any>()
+            for ((p, parser) in parsers.withIndex()) {
+                val failure = fileResults.firstNotNullOfOrNull { it[p] as? ParserFailure }
+                parserResults[parser] = failure?.exception ?: logFiles.indices.mapNotNull { f ->
+                    fileResults[f][p]?.let { LogFileResult(logFiles[f], it) }
+                }
+            }
+            return parserResults
+        }
+
+    }
+
+    private class ParserFailure(val exception: Throwable)
+
+    // Scans a log file for a list of parsers, isolating the parsers from each other's failures
+    private class FileScanner(private val logFile: File, private val parsers: List<LogParser<*>>) {
+
+        private val filters = parsers.map { LineFilter(it) }
+        private val fileScans = arrayOfNulls<LogFileScan<*>>(parsers.size)
+        private val results = arrayOfNulls<Any>(parsers.size)
+        private var lineBytes = ByteArray(256)
+
+        fun scan(): Array<Any?> {
+            for (p in parsers.indices) {
+                runParser(p) { fileScans[p] = parsers[p].startFile(logFile) }
+            }
+            FileChannel.open(logFile.toPath(), StandardOpenOption.READ).use { channel ->
+                val fileSize = channel.size()
+                var regionStart = 0L
+                while (regionStart < fileSize) {
+                    val regionSize = minOf(MAX_REGION_SIZE, fileSize - regionStart)
+                    val region = channel.map(FileChannel.MapMode.READ_ONLY, regionStart, regionSize)
+                    val isLastRegion = regionStart + regionSize == fileSize
+                    regionStart += scanRegion(region, isLastRegion)
+                }
+            }
+            for (p in parsers.indices) {
+                runParser(p) { results[p] = fileScans[p]!!.finish() }
+            }
+            return results
+        }
+
+        // Passes all complete lines in a region to the parsers, and returns the number of bytes consumed
+        private fun scanRegion(region: MappedByteBuffer, isLastRegion: Boolean): Long {
+            val regionSize = region.limit()
+            var lineStart = 0
+            while (lineStart < regionSize) {
+                // Lines end at a newline, a carriage return, or both, as in readLines (e.g., progress bars that
+                // overwrite a line with carriage returns)
+                var lineEnd = lineStart
+                while (lineEnd < regionSize && region.get(lineEnd) != NEWLINE && region.get(lineEnd) != CR) lineEnd++
+                // A carriage return at the end of a region may be followed by a newline in the next region
+                val isLineComplete = lineEnd < regionSize - 1 ||
+                    (lineEnd == regionSize - 1 && region.get(lineEnd) == NEWLINE)
+                if (!isLineComplete && !isLastRegion) {
+                    require(lineStart > 0) { "Line exceeds $MAX_REGION_SIZE bytes in \"$logFile\"" }
+                    break
+                }
+                processLine(region, lineStart, lineEnd)
+                val isWindowsLineEnding = lineEnd < regionSize - 1 && region.get(lineEnd) == CR &&
+                    region.get(lineEnd + 1) == NEWLINE
+                lineStart = if (isWindowsLineEnding) lineEnd + 2 else lineEnd + 1
+            }
+            return minOf(lineStart, regionSize).toLong()
+        }
+
+        private fun processLine(region: MappedByteBuffer, start: Int, end: Int) {
+            // Decode the line only if at least one parser accepts it, and only once for all parsers
+            var line: String? = null
+            for (p in parsers.indices) {
+                if (results[p] is ParserFailure || !filters[p].accepts(region, start, end)) continue
+                val decodedLine = line ?: decodeLine(region, start, end).also { line = it }
+                runParser(p) { fileScans[p]!!.processLine(decodedLine) }
+            }
+        }
+
+        private fun decodeLine(region: MappedByteBuffer, start: Int, end: Int): String {
+            val length = end - start
+            if (lineBytes.size < length) lineBytes = ByteArray(maxOf(length, lineBytes.size * 2))
+            val view = region.duplicate()
+            view.position(start)
+            view.get(lineBytes, 0, length)
+            return String(lineBytes, 0, length, Charsets.UTF_8)
+        }
+
+        private inline fun runParser(parserIndex: Int, block: () -> Unit) {
+            if (results[parserIndex] is ParserFailure) return
+            try {
+                block()
+            } catch (e: Exception) {
+                results[parserIndex] = ParserFailure(e)
+            }
+        }
+
+    }
+
+    // Literal prefixes and substrings of a parser, matched against the undecoded bytes of a line
+    private class LineFilter(parser: LogParser<*>) {
+
+        private val prefixes = parser.linePrefixes.map { it.toByteArray(Charsets.UTF_8) }
+        private val substrings = parser.lineSubstrings.map { it.toByteArray(Charsets.UTF_8) }
+        private val acceptsAll = prefixes.isEmpty() && substrings.isEmpty()
+
+        fun accepts(region: MappedByteBuffer, start: Int, end: Int): Boolean {
+            if (acceptsAll) return true
+            for (prefix in prefixes) {
+                if (matchesAt(region, start, end, prefix)) return true
+            }
+            for (substring in substrings) {
+                for (offset in start..end - substring.size) {
+                    if (matchesAt(region, offset, end, substring)) return true
+                }
+            }
+            return false
+        }
+
+        private fun matchesAt(region: MappedByteBuffer, offset: Int, end: Int, literal: ByteArray): Boolean {
+            if (end - offset < literal.size) return false
+            for (i in literal.indices) {
+                if (region.get(offset + i) != literal[i]) return false
+            }
+            return true
+        }
+
+    }
+}
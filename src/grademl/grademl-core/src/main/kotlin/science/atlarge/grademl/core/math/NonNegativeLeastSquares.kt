@@ -1,21 +1,22 @@
 package science.atlarge.grademl.core.math
 
-import science.atlarge.grademl.core.util.asRPathString
-import science.atlarge.grademl.core.util.instantiateRScript
-import science.atlarge.grademl.core.util.runRScript
-import java.io.DataInputStream
-import java.io.DataOutputStream
-import java.io.File
-import java.nio.file.Path
+import kotlin.math.abs
+import kotlin.math.sqrt
 
+// Solves min ||Ax - b|| subject to x >= 0 with the active-set algorithm of Lawson and Hanson, applied to the normal
+// equations (A^T A) x = A^T b as in the "fast NNLS" variant by Bro and De Jong. The normal equations are computed in
+// one pass over the (typically tall, narrow, and sparse) matrix, so the cost of every iteration of the active-set
+// algorithm is independent of the number of rows.
 object NonNegativeLeastSquares {
 
-    private const val MATRIX_FILENAME = "nnls-matrix.bin"
-    private const val VECTOR_FILENAME = "nnls-vector.bin"
-    private const val OUTPUT_FILENAME = "nnls-output.bin"
-    private const val SCRIPT_FILENAME = "nnls.R"
+    // Maximum number of iterations of the active-set algorithm per problem column
+    private const val MAX_ITERATIONS_PER_COLUMN = 30
+    // Relative size of a Cholesky pivot below which a column is considered linearly dependent on preceding columns
+    private const val DEPENDENT_COLUMN_THRESHOLD = 1e-12
 
-    fun fit(matrix: Array<DoubleArray>, vector: DoubleArray, scratchDirectory: Path): DoubleArray {
+    // Fits x >= 0 to minimize ||matrix * x - vector||, optionally starting the search from a previous solution
+    // (e.g., of a similar problem). NaN values in the matrix and vector are treated as zeros.
+    fun fit(matrix: Array<DoubleArray>, vector: DoubleArray, initialSolution: DoubleArray? = null): DoubleArray {
         // Check that the input dimensions are sensible
         val matrixHeight = matrix.size
         require(matrixHeight > 0) { "Matrix must not be empty" }
@@ -24,79 +25,228 @@ object NonNegativeLeastSquares {
         require(matrixWidth > 0) { "Matrix must not be empty" }
         require(vector.size == matrixHeight) { "Matrix and vector heights must match" }
 
-        require(matrixHeight.toLong() * matrixWidth * 8 <= 128L * 1024 * 1024) {
-            "Matrix exceeds 128MB, stopping to prevent disk flooding and unreasonable execution times"
-        }
+        val gramMatrix = DoubleArray(matrixWidth * matrixWidth)
+        val correlationVector = DoubleArray(matrixWidth)
+        computeNormalEquations(matrix, vector, gramMatrix, correlationVector)
+        return fitNormalEquations(gramMatrix, correlationVector, initialSolution)
+    }
 
-        // Make sure that the scratch directory exists
-        scratchDirectory.toFile().mkdirs()
-
-        // Write the matrix and vector data to binary files
-        val matrixFile = scratchDirectory.resolve(MATRIX_FILENAME).toFile()
-        val vectorFile = scratchDirectory.resolve(VECTOR_FILENAME).toFile()
-        writeMatrix(matrix, matrixFile)
-        writeVector(vector, vectorFile)
-
-        // Instantiate the R script that computes the NNLS fit
-        val rScriptFile = scratchDirectory.resolve(SCRIPT_FILENAME).toFile()
-        val outputFile = scratchDirectory.resolve(OUTPUT_FILENAME).toFile()
-        instantiateRScript(
-            rScriptFile, mapOf(
-                "matrix_height" to matrixHeight.toString(),
-                "matrix_width" to matrixWidth.toString(),
-                "matrix_file_path" to matrixFile.asRPathString(),
-                "vector_file_path" to vectorFile.asRPathString(),
-                "output_file_path" to outputFile.asRPathString()
-            )
-        )
-
-        // Make sure the output file does not exist
-        if (outputFile.exists()) outputFile.delete()
-
-        // Run the R-based NNLS solver
-        if (!runRScript(rScriptFile)) throw IllegalStateException("NNLS solver did not complete successfully")
-
-        // Read the resulting fit vector from the output file
-        val resultVector = readVector(outputFile)
-        require(resultVector.size == matrixWidth) { "Output vector height must match matrix width" }
-
-        // Clean up the scratch files
-        matrixFile.delete()
-        vectorFile.delete()
-        outputFile.delete()
-
-        return resultVector
+    // Fits x >= 0 to the normal equations of a least-squares problem, given the Gram matrix A^T A (row-major)
+    // and the vector A^T b. This allows callers to accumulate the normal equations of very tall problems themselves.
+    fun fitNormalEquations(
+        gramMatrix: DoubleArray,
+        correlationVector: DoubleArray,
+        initialSolution: DoubleArray? = null
+    ): DoubleArray {
+        val width = correlationVector.size
+        require(width > 0) { "Problem must have at least one column" }
+        require(gramMatrix.size == width * width) { "Gram matrix must be square and match the vector size" }
+        require(initialSolution == null || initialSolution.size == width) {
+            "Initial solution must match the problem width"
+        }
+        return ActiveSetSolver(gramMatrix, correlationVector).solve(initialSolution)
     }
 
-    private fun writeMatrix(matrix: Array<DoubleArray>, file: File) {
-        DataOutputStream(file.outputStream().buffered(1024 * 1024)).use { outStream ->
-            for (row in matrix) {
-                for (value in row) {
-                    outStream.writeDouble(value)
+    private fun computeNormalEquations(
+        matrix: Array<DoubleArray>,
+        vector: DoubleArray,
+        gramMatrix: DoubleArray,
+        correlationVector: DoubleArray
+    ) {
+        val width = correlationVector.size
+        val nonZeroColumns = IntArray(width)
+        for (rowIndex in matrix.indices) {
+            val row = matrix[rowIndex]
+            val observation = vector[rowIndex].let { if (it.isNaN()) 0.0 else it }
+            // Phase activity matrices are sparse, so only accumulate products of non-zero entries
+            var nonZeroCount = 0
+            for (column in 0 until width) {
+                val value = row[column]
+                if (value != 0.0 && !value.isNaN()) nonZeroColumns[nonZeroCount++] = column
+            }
+            for (i in 0 until nonZeroCount) {
+                val column = nonZeroColumns[i]
+                val value = row[column]
+                correlationVector[column] += value * observation
+                val gramRowOffset = column * width
+                for (j in i until nonZeroCount) {
+                    val otherColumn = nonZeroColumns[j]
+                    gramMatrix[gramRowOffset + otherColumn] += value * row[otherColumn]
                 }
             }
         }
+        // Mirror the upper triangle of the Gram matrix
+        for (i in 0 until width) {
+            for (j in 0 until i) gramMatrix[i * width + j] = gramMatrix[j * width + i]
+        }
     }
 
-    private fun writeVector(vector: DoubleArray, file: File) {
-        DataOutputStream(file.outputStream().buffered(1024 * 1024)).use { outStream ->
-            for (value in vector) {
-                outStream.writeDouble(value)
+    private class ActiveSetSolver(
+        private val gramMatrix: DoubleArray,
+        private val correlationVector: DoubleArray
+    ) {
+
+        private val width = correlationVector.size
+        // Bound on the rounding error in the gradient, below which fixed variables are not freed
+        private var gradientTolerance = 0.0
+
+        // Variables in the passive set are free, all others are fixed at zero
+        private val passive = BooleanArray(width)
+        private val solution = DoubleArray(width)
+        private val candidate = DoubleArray(width)
+        private val gradient = DoubleArray(width)
+
+        // Workspace for solving the normal equations restricted to the passive set
+        private val passiveColumns = IntArray(width)
+        private val dependentColumns = BooleanArray(width)
+        private val cholesky = DoubleArray(width * width)
+        private val intermediate = DoubleArray(width)
+
+        fun solve(initialSolution: DoubleArray?): DoubleArray {
+            if (initialSolution != null) {
+                // Warm start: free all variables that are positive in the initial solution and restore feasibility
+                for (i in 0 until width) {
+                    passive[i] = initialSolution[i] > 0.0
+                    solution[i] = if (passive[i]) initialSolution[i] else 0.0
+                }
+                solvePassiveSet()
+                moveTowardsCandidate()
+            }
+            computeGradient()
+
+            val maxIterations = MAX_ITERATIONS_PER_COLUMN * width
+            var iterations = 0
+            while (true) {
+                // Free the fixed variable whose increase reduces the residual the most
+                var entering = -1
+                for (i in 0 until width) {
+                    if (!passive[i] && gradient[i] > gradientTolerance &&
+                        (entering < 0 || gradient[i] > gradient[entering])
+                    ) {
+                        entering = i
+                    }
+                }
+                if (entering < 0) break
+                if (++iterations > maxIterations) {
+                    throw IllegalStateException("NNLS did not converge within $maxIterations iterations")
+                }
+
+                passive[entering] = true
+                solvePassiveSet()
+                if (candidate[entering] <= 0.0) {
+                    // Freeing the variable does not help due to rounding errors; skip it until the gradient changes
+                    passive[entering] = false
+                    gradient[entering] = 0.0
+                    continue
+                }
+                moveTowardsCandidate()
+                computeGradient()
             }
+
+            return solution.copyOf()
         }
-    }
 
-    private fun readVector(file: File): DoubleArray {
-        val fileLength = file.length()
-        require(fileLength % 8 == 0L) { "Vector file must be an integer multiple of 8 bytes long" }
-        val vectorLength = (fileLength / 8).toInt()
-        val vector = DoubleArray(vectorLength)
-        DataInputStream(file.inputStream().buffered()).use { inStream ->
-            for (i in 0 until vectorLength) {
-                vector[i] = inStream.readDouble()
+        // Moves from the (feasible) solution towards the unconstrained solution on the passive set, fixing variables
+        // at zero whenever they would become negative, until the candidate solution is feasible. Coefficients are
+        // compared against zero rather than a tolerance, because their scale is unrelated to that of the Gram matrix.
+        private fun moveTowardsCandidate() {
+            while (true) {
+                var stepSize = Double.POSITIVE_INFINITY
+                var blocking = -1
+                for (i in 0 until width) {
+                    if (passive[i] && candidate[i] <= 0.0) {
+                        val variableStepSize = solution[i] / (solution[i] - candidate[i])
+                        if (variableStepSize < stepSize) {
+                            stepSize = variableStepSize
+                            blocking = i
+                        }
+                    }
+                }
+                if (blocking < 0) break
+
+                for (i in 0 until width) {
+                    if (!passive[i]) continue
+                    solution[i] += stepSize * (candidate[i] - solution[i])
+                    // The variable that limits the step reaches zero, barring rounding errors
+                    if (i == blocking || solution[i] <= 0.0) {
+                        passive[i] = false
+                        solution[i] = 0.0
+                    }
+                }
+                solvePassiveSet()
+            }
+            for (i in 0 until width) solution[i] = if (passive[i]) candidate[i] else 0.0
+        }
+
+        // Computes the gradient A^T b - A^T A x, and a tolerance proportional to the magnitude of the terms summed
+        private fun computeGradient() {
+            var maxMagnitude = 0.0
+            for (i in 0 until width) {
+                var value = correlationVector[i]
+                var magnitude = abs(value)
+                val rowOffset = i * width
+                for (j in 0 until width) {
+                    val term = gramMatrix[rowOffset + j] * solution[j]
+                    value -= term
+                    magnitude += abs(term)
+                }
+                gradient[i] = value
+                maxMagnitude = maxOf(maxMagnitude, magnitude)
+            }
+            gradientTolerance = 10 * Math.ulp(1.0) * width * maxMagnitude
+        }
+
+        // Solves the normal equations restricted to the passive set through a Cholesky decomposition, storing the
+        // result in candidate. Columns that are linearly dependent on earlier passive columns are fixed at zero.
+        private fun solvePassiveSet() {
+            var count = 0
+            var maxDiagonal = 0.0
+            for (i in 0 until width) {
+                candidate[i] = 0.0
+                if (passive[i]) {
+                    passiveColumns[count++] = i
+                    maxDiagonal = maxOf(maxDiagonal, gramMatrix[i * width + i])
+                }
+            }
+
+            // Decompose the restricted Gram matrix as L L^T, with L stored row-major in the lower triangle
+            for (a in 0 until count) {
+                val columnA = passiveColumns[a]
+                var pivot = gramMatrix[columnA * width + columnA]
+                for (c in 0 until a) pivot -= cholesky[a * width + c] * cholesky[a * width + c]
+                dependentColumns[a] = pivot <= DEPENDENT_COLUMN_THRESHOLD * maxDiagonal
+                if (dependentColumns[a]) {
+                    for (r in a until count) cholesky[r * width + a] = 0.0
+                    continue
+                }
+                val diagonal = sqrt(pivot)
+                cholesky[a * width + a] = diagonal
+                for (r in a + 1 until count) {
+                    var value = gramMatrix[passiveColumns[r] * width + columnA]
+                    for (c in 0 until a) value -= cholesky[r * width + c] * cholesky[a * width + c]
+                    cholesky[r * width + a] = value / diagonal
+                }
+            }
+
+            // Forward substitution: L y = A^T b
+            for (a in 0 until count) {
+                if (dependentColumns[a]) {
+                    intermediate[a] = 0.0
+                    continue
+                }
+                var value = correlationVector[passiveColumns[a]]
+                for (c in 0 until a) value -= cholesky[a * width + c] * intermediate[c]
+                intermediate[a] = value / cholesky[a * width + a]
+            }
+            // Backward substitution: L^T x = y
+            for (a in count - 1 downTo 0) {
+                if (dependentColumns[a]) continue
+                var value = intermediate[a]
+                for (r in a + 1 until count) value -= cholesky[r * width + a] * candidate[passiveColumns[r]]
+                candidate[passiveColumns[a]] = value / cholesky[a * width + a]
             }
         }
-        return vector
+
     }
 
-}
\ No newline at end of file
+}
@@ -0,0 +1,235 @@
+package science.atlarge.grademl.core.models
+
+import science.atlarge.grademl.core.util.TimestampNs
+import science.atlarge.grademl.core.util.TimestampNsArray
+import science.atlarge.grademl.core.util.readVarLong
+import science.atlarge.grademl.core.util.writeVarLong
+import java.io.ByteArrayOutputStream
+import java.io.DataInputStream
+import java.io.DataOutputStream
+
+// Compressed encodings of metric data in chunks of (up to) METRIC_CHUNK_SIZE measurement periods. A chunk of timestamps
+// includes the end of its last period, which is also the start of the next chunk's first period. Chunks are encoded
+// independently, so a time range can be decoded by seeking to the right chunks in a small uncompressed index.
+internal const val METRIC_CHUNK_SIZE = 512
+
+// Timestamps are stored per chunk as differences between consecutive deltas (zigzag varint-encoded), which take a
+// single byte per timestamp for regularly sampled metrics. Metrics of the same monitor (e.g., all CPU cores of a
+// machine) can share one instance.
+class ChunkedTimestamps private constructor(
+    val size: Int,
+    // First timestamp of every chunk, followed by the last timestamp
+    internal val chunkBoundaries: LongArray,
+    // Start of every chunk in the encoded timestamps, followed by their total size
+    private val chunkOffsets: IntArray,
+    private val encodedTimestamps: ByteArray
+) {
+
+    constructor(timestamps: TimestampNsArray) : this(Encoder(timestamps))
+
+    private constructor(encoder: Encoder) : this(
+        encoder.size, encoder.chunkBoundaries, encoder.chunkOffsets, encoder.encodedTimestamps
+    )
+
+    internal val periodCount = size - 1
+    internal val chunkCount = chunkCountOf(periodCount)
+
+    val first: TimestampNs
+        get() = chunkBoundaries[0]
+    val last: TimestampNs
+        get() = chunkBoundaries[chunkCount]
+
+    // Index of the last timestamp in the given chunk
+    internal fun chunkEnd(chunk: Int): Int = minOf((chunk + 1) * METRIC_CHUNK_SIZE, periodCount)
+
+    // Decodes all timestamps of a chunk to the destination array and returns the number of decoded timestamps
+    internal fun decodeChunk(chunk: Int, destination: LongArray, destinationOffset: Int): Int {
+        val timestampCount = chunkEnd(chunk) - chunk * METRIC_CHUNK_SIZE + 1
+        val reader = VarLongReader(encodedTimestamps, chunkOffsets[chunk])
+        var timestamp = chunkBoundaries[chunk]
+        var delta = 0L
+        destination[destinationOffset] = timestamp
+        for (i in 1 until timestampCount) {
+            delta += reader.next()
+            timestamp += delta
+            destination[destinationOffset + i] = timestamp
+        }
+        return timestampCount
+    }
+
+    fun toArray(): TimestampNsArray {
+        val timestamps = LongArray(size)
+        if (chunkCount == 0) timestamps[0] = first
+        for (chunk in 0 until chunkCount) decodeChunk(chunk, timestamps, chunk * METRIC_CHUNK_SIZE)
+        return timestamps
+    }
+
+    internal val encodedSizeInBytes: Long
+        get() = encodedTimestamps.size + 12L * chunkCount
+
+    // Writes the encoded timestamps and their index, e.g., to a job snapshot
+    internal fun write(output: DataOutputStream) {
+        output.writeInt(size)
+        for (boundary in chunkBoundaries) output.writeLong(boundary)
+        for (offset in chunkOffsets) output.writeInt(offset)
+        output.write(encodedTimestamps)
+    }
+
+    internal companion object {
+        fun read(input: DataInputStream): ChunkedTimestamps {
+            val size = input.readInt()
+            require(size > 0) { "Metric data must have at least one timestamp" }
+            val chunkCount = chunkCountOf(size - 1)
+            val chunkBoundaries = LongArray(chunkCount + 1) { input.readLong() }
+            val chunkOffsets = IntArray(chunkCount + 1) { input.readInt() }
+            val encodedTimestamps = ByteArray(chunkOffsets[chunkCount]).also { input.readFully(it) }
+            return ChunkedTimestamps(size, chunkBoundaries, chunkOffsets, encodedTimestamps)
+        }
+    }
+
+    private class Encoder(timestamps: TimestampNsArray) {
+        val size = timestamps.size
+        val chunkBoundaries: LongArray
+        val chunkOffsets: IntArray
+        val encodedTimestamps: ByteArray
+
+        init {
+            require(size > 0) { "Metric data must have at least one timestamp" }
+            val periodCount = size - 1
+            val chunkCount = chunkCountOf(periodCount)
+            chunkBoundaries = LongArray(chunkCount + 1) { timestamps[minOf(it * METRIC_CHUNK_SIZE, periodCount)] }
+            chunkOffsets = IntArray(chunkCount + 1)
+            val output = ByteArrayOutputStream(size + 16)
+            for (chunk in 0 until chunkCount) {
+                chunkOffsets[chunk] = output.size()
+                var previousTimestamp = timestamps[chunk * METRIC_CHUNK_SIZE]
+                var previousDelta = 0L
+                for (i in chunk * METRIC_CHUNK_SIZE + 1..minOf((chunk + 1) * METRIC_CHUNK_SIZE, periodCount)) {
+                    val delta = timestamps[i] - previousTimestamp
+                    require(delta >= 0) { "Timestamps must be non-decreasing" }
+                    output.writeVarLong(delta - previousDelta)
+                    previousTimestamp = timestamps[i]
+                    previousDelta = delta
+                }
+            }
+            chunkOffsets[chunkCount] = output.size()
+            encodedTimestamps = output.toByteArray()
+        }
+    }
+
+}
+
+// Values are stored per chunk as the XOR of consecutive values, trimmed to the non-zero bytes: a header byte encodes
+// the number of trailing zero bytes (high nibble) and the number of remaining bytes (low nibble), or is zero if the
+// value did not change. Minimum and maximum values per chunk are kept in the index.
+internal class ChunkedValues private constructor(
+    val valueCount: Int,
+    private val chunkOffsets: IntArray,
+    private val encodedValues: ByteArray,
+    val chunkMinimums: DoubleArray,
+    val chunkMaximums: DoubleArray
+) {
+
+    constructor(values: DoubleArray) : this(Encoder(values))
+
+    private constructor(encoder: Encoder) : this(
+        encoder.valueCount, encoder.chunkOffsets, encoder.encodedValues, encoder.chunkMinimums, encoder.chunkMaximums
+    )
+
+    private val chunkCount = chunkCountOf(valueCount)
+
+    // Decodes all values of a chunk to the destination array and returns the number of decoded values
+    fun decodeChunk(chunk: Int, destination: DoubleArray, destinationOffset: Int): Int {
+        val count = minOf((chunk + 1) * METRIC_CHUNK_SIZE, valueCount) - chunk * METRIC_CHUNK_SIZE
+        var position = chunkOffsets[chunk]
+        var bits = 0L
+        for (i in 0 until count) {
+            val header = encodedValues[position++].toInt() and 0xFF
+            if (header != 0) {
+                var xor = 0L
+                repeat(header and 0x0F) { xor = (xor shl 8) or (encodedValues[position++].toLong() and 0xFF) }
+                bits = bits xor (xor shl (8 * (header ushr 4)))
+            }
+            destination[destinationOffset + i] = Double.fromBits(bits)
+        }
+        return count
+    }
+
+    val encodedSizeInBytes: Long
+        get() = encodedValues.size + 20L * chunkCount
+
+    // Writes the encoded values and their index, e.g., to a job snapshot
+    fun write(output: DataOutputStream) {
+        output.writeInt(valueCount)
+        for (offset in chunkOffsets) output.writeInt(offset)
+        for (chunk in 0 until chunkCount) {
+            output.writeDouble(chunkMinimums[chunk])
+            output.writeDouble(chunkMaximums[chunk])
+        }
+        output.write(encodedValues)
+    }
+
+    companion object {
+        fun read(input: DataInputStream): ChunkedValues {
+            val valueCount = input.readInt()
+            require(valueCount >= 0) { "Value count must be non-negative" }
+            val chunkCount = chunkCountOf(valueCount)
+            val chunkOffsets = IntArray(chunkCount + 1) { input.readInt() }
+            val chunkMinimums = DoubleArray(chunkCount)
+            val chunkMaximums = DoubleArray(chunkCount)
+            for (chunk in 0 until chunkCount) {
+                chunkMinimums[chunk] = input.readDouble()
+                chunkMaximums[chunk] = input.readDouble()
+            }
+            val encodedValues = ByteArray(chunkOffsets[chunkCount]).also { input.readFully(it) }
+            return ChunkedValues(valueCount, chunkOffsets, encodedValues, chunkMinimums, chunkMaximums)
+        }
+    }
+
+    private class Encoder(values: DoubleArray) {
+        val valueCount = values.size
+        private val chunkCount = chunkCountOf(valueCount)
+        val chunkOffsets = IntArray(chunkCount + 1)
+        val encodedValues: ByteArray
+        val chunkMinimums = DoubleArray(chunkCount) { Double.POSITIVE_INFINITY }
+        val chunkMaximums = DoubleArray(chunkCount) { Double.NEGATIVE_INFINITY }
+
+        init {
+            val output = ByteArrayOutputStream(valueCount + 16)
+            for (chunk in 0 until chunkCount) {
+                chunkOffsets[chunk] = output.size()
+                var previousBits = 0L
+                for (i in chunk * METRIC_CHUNK_SIZE until minOf((chunk + 1) * METRIC_CHUNK_SIZE, valueCount)) {
+                    val bits = values[i].toRawBits()
+                    writeXor(output, bits xor previousBits)
+                    previousBits = bits
+                    chunkMinimums[chunk] = minOf(chunkMinimums[chunk], values[i])
+                    chunkMaximums[chunk] = maxOf(chunkMaximums[chunk], values[i])
+                }
+            }
+            chunkOffsets[chunkCount] = output.size()
+            encodedValues = output.toByteArray()
+        }
+
+        private fun writeXor(output: ByteArrayOutputStream, xor: Long) {
+            if (xor == 0L) {
+                output.write(0)
+                return
+            }
+            val trailingZeroBytes = java.lang.Long.numberOfTrailingZeros(xor) / 8
+            val significantBytes = 8 - java.lang.Long.numberOfLeadingZeros(xor) / 8 - trailingZeroBytes
+            output.write((trailingZeroBytes shl 4) or significantBytes)
+            for (i in significantBytes - 1 downTo 0) {
+                output.write((xor ushr (8 * (trailingZeroBytes + i))).toInt() and 0xFF)
+            }
+        }
+    }
+
+}
+
+// Number of chunks needed for the given number of measurement periods
+private fun chunkCountOf(periodCount: Int): Int = (periodCount + METRIC_CHUNK_SIZE - 1) / METRIC_CHUNK_SIZE
+
+private class VarLongReader(private val bytes: ByteArray, private var position: Int) {
+    fun next(): Long = readVarLong { bytes[position++].toInt() and 0xFF }
+}
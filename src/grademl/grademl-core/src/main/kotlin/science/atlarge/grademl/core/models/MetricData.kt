@@ -2,24 +2,62 @@ package science.atlarge.grademl.core.models
 
 import science.atlarge.grademl.core.util.TimestampNs
 import science.atlarge.grademl.core.util.TimestampNsArray
+import java.lang.ref.SoftReference
 
-class MetricData(
-    val timestamps: TimestampNsArray,
-    val values: DoubleArray,
+class MetricData private constructor(
+    private val arrays: Lazy<Pair<TimestampNsArray, DoubleArray>>,
+    // Compressed representation of the data, if any; arrays are then decoded on demand and may be reclaimed by the GC
+    private val chunks: MetricChunks?,
     val maxValue: Double
 ) {
 
-    init {
+    constructor(
+        timestamps: TimestampNsArray,
+        values: DoubleArray,
+        maxValue: Double
+    ) : this(lazyOf(timestamps to values), null, maxValue) {
         require(timestamps.size == values.size + 1) { "Size of timestamp and value arrays must be consistent" }
     }
 
+    val timestamps: TimestampNsArray
+        get() = arrays.value.first
+    val values: DoubleArray
+        get() = arrays.value.second
+
+    val isLoaded: Boolean
+        get() = chunks != null || arrays.isInitialized()
+    val isCompressed: Boolean
+        get() = chunks != null
+
+    // Compressed representation of the data, e.g., for storing it in a job snapshot without decoding it
+    internal val compressedTimestamps: ChunkedTimestamps?
+        get() = chunks?.timestamps
+    internal val compressedValues: ChunkedValues?
+        get() = chunks?.values
+
+    // First and last timestamps, available without decoding compressed data
+    val firstTimestamp: TimestampNs
+        get() = chunks?.timestamps?.first ?: timestamps.first()
+    val lastTimestamp: TimestampNs
+        get() = chunks?.timestamps?.last ?: timestamps.last()
+    val periodCount: Int
+        get() = chunks?.periodCount ?: values.size
+
     fun slice(startTime: TimestampNs, endTime: TimestampNs): MetricData {
-        if (startTime >= timestamps.last()) {
+        if (startTime >= lastTimestamp) {
             return MetricData(longArrayOf(startTime), doubleArrayOf(), maxValue)
-        } else if (endTime <= timestamps.first()) {
+        } else if (endTime <= firstTimestamp) {
             return MetricData(longArrayOf(endTime), doubleArrayOf(), maxValue)
         }
 
+        if (chunks != null) {
+            // Decode only the chunks covering the selected time range
+            val startIdx = maxOf(chunks.floorIndex(startTime), 0)
+            val endIdx = minOf(chunks.ceilingIndex(endTime), chunks.periodCount)
+            val (selectedTimestamps, selectedValues) = chunks.decodeRange(startIdx, endIdx)
+            return MetricData(selectedTimestamps, selectedValues, maxValue)
+        }
+
         var startIdx = timestamps.binarySearch(startTime)
         if (startIdx < 0) startIdx = maxOf(startIdx.inv() - 1, 0)
         var endIdx = timestamps.binarySearch(endTime)
@@ -31,16 +69,71 @@ class MetricData(
         return MetricData(selectedTimestamps, selectedValues, maxValue)
     }
 
+    // Returns the minimum and maximum values of periods overlapping the given time range, or null if there are none
+    fun valueRange(startTime: TimestampNs, endTime: TimestampNs): ClosedFloatingPointRange<Double>? {
+        if (startTime >= endTime || startTime >= lastTimestamp || endTime <= firstTimestamp) return null
+        if (chunks != null) return chunks.valueRange(startTime, endTime)
+
+        var startIdx = timestamps.binarySearch(startTime)
+        if (startIdx < 0) startIdx = maxOf(startIdx.inv() - 1, 0)
+        var endIdx = timestamps.binarySearch(endTime)
+        if (endIdx < 0) endIdx = minOf(endIdx.inv(), timestamps.lastIndex)
+
+        var minObservedValue = Double.POSITIVE_INFINITY
+        var maxObservedValue = Double.NEGATIVE_INFINITY
+        for (i in startIdx until endIdx) {
+            minObservedValue = minOf(minObservedValue, values[i])
+            maxObservedValue = maxOf(maxObservedValue, values[i])
+        }
+        return minObservedValue..maxObservedValue
+    }
+
     fun iterator(): MetricDataIterator {
+        if (chunks != null) return ChunkedMetricDataIterator(chunks)
         return MetricDataIteratorImpl(timestamps, values)
     }
 
     fun iteratorFrom(startTime: TimestampNs): MetricDataIterator {
+        if (chunks != null) return ChunkedMetricDataIterator(chunks, chunks.floorIndex(startTime))
         var startIdx = timestamps.binarySearch(startTime)
         if (startIdx < 0) startIdx = maxOf(startIdx.inv() - 1, -1)
         return MetricDataIteratorImpl(timestamps, values, startIdx)
     }
 
+    // Estimated memory footprint of this metric's data
+    val sizeInBytes: Long
+        get() = chunks?.encodedSizeInBytes ?: (8L * timestamps.size + 8L * values.size)
+
+    companion object {
+        // Creates MetricData whose timestamps and values are loaded on first use, e.g., from a job snapshot
+        fun loadOnDemand(maxValue: Double, loader: () -> Pair<TimestampNsArray, DoubleArray>): MetricData {
+            return MetricData(lazy {
+                loader().also { (timestamps, values) ->
+                    require(timestamps.size == values.size + 1) {
+                        "Size of timestamp and value arrays must be consistent"
+                    }
+                }
+            }, null, maxValue)
+        }
+
+        // Creates MetricData that is stored compressed in chunks, e.g., for long metrics sampled at a high frequency.
+        // Slices and iterators decode only the chunks they need; the timestamps and values properties decode all data.
+        fun compressed(timestamps: ChunkedTimestamps, values: DoubleArray, maxValue: Double): MetricData {
+            require(timestamps.size == values.size + 1) { "Size of timestamp and value arrays must be consistent" }
+            return compressed(timestamps, ChunkedValues(values), maxValue)
+        }
+
+        fun compressed(timestamps: TimestampNsArray, values: DoubleArray, maxValue: Double): MetricData {
+            return compressed(ChunkedTimestamps(timestamps), values, maxValue)
+        }
+
+        internal fun compressed(timestamps: ChunkedTimestamps, values: ChunkedValues, maxValue: Double): MetricData {
+            require(timestamps.size == values.valueCount + 1) { "Size of timestamps and values must be consistent" }
+            val chunks = MetricChunks(timestamps, values)
+            return MetricData(SoftLazy(chunks::decodeAll), chunks, maxValue)
+        }
+    }
+
 }
 
 interface MetricDataIterator {
@@ -103,4 +196,185 @@ private class MetricDataIteratorImpl(
         }
     }
 
-}
\ No newline at end of file
+}
+
+// Compressed metric data with an index of chunk boundaries and value ranges
+private class MetricChunks(val timestamps: ChunkedTimestamps, val values: ChunkedValues) {
+
+    val periodCount = timestamps.periodCount
+    private val chunkCount = timestamps.chunkCount
+
+    val encodedSizeInBytes: Long
+        get() = timestamps.encodedSizeInBytes + values.encodedSizeInBytes
+
+    fun decodeAll(): Pair<TimestampNsArray, DoubleArray> {
+        return decodeRange(0, periodCount)
+    }
+
+    // Decodes timestamps with indices in [fromIndex, toIndex] and the values of the periods between them
+    fun decodeRange(fromIndex: Int, toIndex: Int): Pair<TimestampNsArray, DoubleArray> {
+        if (chunkCount == 0) return longArrayOf(timestamps.first) to doubleArrayOf()
+        val firstChunk = minOf(fromIndex / METRIC_CHUNK_SIZE, chunkCount - 1)
+        val lastChunk = maxOf(firstChunk, (toIndex - 1) / METRIC_CHUNK_SIZE)
+        val baseIndex = firstChunk * METRIC_CHUNK_SIZE
+        val decodedTimestamps = LongArray(timestamps.chunkEnd(lastChunk) - baseIndex + 1)
+        val decodedValues = DoubleArray(decodedTimestamps.size - 1)
+        for (chunk in firstChunk..lastChunk) {
+            timestamps.decodeChunk(chunk, decodedTimestamps, chunk * METRIC_CHUNK_SIZE - baseIndex)
+            values.decodeChunk(chunk, decodedValues, chunk * METRIC_CHUNK_SIZE - baseIndex)
+        }
+        if (fromIndex == baseIndex && toIndex == timestamps.chunkEnd(lastChunk)) {
+            return decodedTimestamps to decodedValues
+        }
+        return decodedTimestamps.copyOfRange(fromIndex - baseIndex, toIndex - baseIndex + 1) to
+                decodedValues.copyOfRange(fromIndex - baseIndex, toIndex - baseIndex)
+    }
+
+    // Returns the index of the last timestamp at or before the given time, or -1 if there is none
+    fun floorIndex(time: TimestampNs): Int {
+        if (time < timestamps.first) return -1
+        if (time >= timestamps.last) return periodCount
+        // Find the last chunk starting at or before the given time, and search its timestamps
+        var chunk = timestamps.chunkBoundaries.binarySearch(time, 0, chunkCount)
+        if (chunk < 0) chunk = chunk.inv() - 1
+        val chunkTimestamps = decodeTimestamps(chunk)
+        var index = chunkTimestamps.binarySearch(time)
+        if (index < 0) index = index.inv() - 1
+        return chunk * METRIC_CHUNK_SIZE + index
+    }
+
+    // Returns the index of the first timestamp at or after the given time, or periodCount + 1 if there is none
+    fun ceilingIndex(time: TimestampNs): Int {
+        if (time <= timestamps.first) return 0
+        if (time > timestamps.last) return periodCount + 1
+        // Find the first chunk ending at or after the given time, and search its timestamps
+        var boundary = timestamps.chunkBoundaries.binarySearch(time)
+        if (boundary < 0) boundary = boundary.inv()
+        val chunk = boundary - 1
+        val chunkTimestamps = decodeTimestamps(chunk)
+        var index = chunkTimestamps.binarySearch(time)
+        if (index < 0) index = index.inv()
+        return chunk * METRIC_CHUNK_SIZE + index
+    }
+
+    fun valueRange(startTime: TimestampNs, endTime: TimestampNs): ClosedFloatingPointRange<Double> {
+        val firstPeriod = maxOf(floorIndex(startTime), 0)
+        val lastPeriod = minOf(ceilingIndex(endTime), periodCount) - 1
+        var minValue = Double.POSITIVE_INFINITY
+        var maxValue = Double.NEGATIVE_INFINITY
+        val chunkValues = DoubleArray(METRIC_CHUNK_SIZE)
+        for (chunk in firstPeriod / METRIC_CHUNK_SIZE..lastPeriod / METRIC_CHUNK_SIZE) {
+            val chunkStart = chunk * METRIC_CHUNK_SIZE
+            val chunkEnd = timestamps.chunkEnd(chunk) - 1
+            if (firstPeriod <= chunkStart && lastPeriod >= chunkEnd) {
+                // Use the index for chunks that are fully covered by the time range
+                minValue = minOf(minValue, values.chunkMinimums[chunk])
+                maxValue = maxOf(maxValue, values.chunkMaximums[chunk])
+            } else {
+                values.decodeChunk(chunk, chunkValues, 0)
+                for (period in maxOf(firstPeriod, chunkStart)..minOf(lastPeriod, chunkEnd)) {
+                    minValue = minOf(minValue, chunkValues[period - chunkStart])
+                    maxValue = maxOf(maxValue, chunkValues[period - chunkStart])
+                }
+            }
+        }
+        return minValue..maxValue
+    }
+
+    fun decodeTimestamps(chunk: Int): TimestampNsArray {
+        val chunkTimestamps = LongArray(timestamps.chunkEnd(chunk) - chunk * METRIC_CHUNK_SIZE + 1)
+        timestamps.decodeChunk(chunk, chunkTimestamps, 0)
+        return chunkTimestamps
+    }
+
+    fun decodeChunk(chunk: Int, timestampBuffer: LongArray, valueBuffer: DoubleArray) {
+        timestamps.decodeChunk(chunk, timestampBuffer, 0)
+        values.decodeChunk(chunk, valueBuffer, 0)
+    }
+
+}
+
+// Lazy value that may be reclaimed by the garbage collector under memory pressure, and is then recomputed on next use
+private class SoftLazy<T : Any>(private val initializer: () -> T) : Lazy<T> {
+
+    @Volatile
+    private var reference: SoftReference<T>? = null
+
+    override val value: T
+        get() = reference?.get() ?: initializer().also { reference = SoftReference(it) }
+
+    override fun isInitialized(): Boolean = reference?.get() != null
+
+}
+
+// Iterator over compressed metric data that decodes one chunk at a time
+private class ChunkedMetricDataIterator(
+    private val chunks: MetricChunks,
+    initialIndex: Int = -1
+) : MetricDataIterator {
+
+    override var currentStartTime: TimestampNs = Long.MIN_VALUE
+        private set
+    override var currentEndTime: TimestampNs = chunks.timestamps.first
+        private set
+    override var currentValue: Double = 0.0
+        private set
+
+    private var nextIndex = 0
+
+    // Decoded timestamps and values of the chunk containing the period at index loadedChunk * METRIC_CHUNK_SIZE
+    private val chunkTimestamps = LongArray(METRIC_CHUNK_SIZE + 1)
+    private val chunkValues = DoubleArray(METRIC_CHUNK_SIZE)
+    private var loadedChunk = -1
+    private var loadedChunkStart = 0
+
+    override val hasNext: Boolean
+        get() = nextIndex < chunks.periodCount
+
+    init {
+        if (initialIndex >= 0 && chunks.periodCount > 0) {
+            nextIndex = minOf(initialIndex + 1, chunks.periodCount)
+            loadChunkForPeriod(nextIndex - 1)
+            currentStartTime = chunkTimestamps[nextIndex - 1 - loadedChunkStart]
+            currentEndTime = chunkTimestamps[nextIndex - loadedChunkStart]
+            currentValue = chunkValues[nextIndex - 1 - loadedChunkStart]
+        }
+    }
+
+    private fun loadChunkForPeriod(periodIndex: Int) {
+        val chunk = periodIndex / METRIC_CHUNK_SIZE
+        if (chunk != loadedChunk) {
+            chunks.decodeChunk(chunk, chunkTimestamps, chunkValues)
+            loadedChunk = chunk
+            loadedChunkStart = chunk * METRIC_CHUNK_SIZE
+        }
+    }
+
+    override fun peekNextEndTime(): TimestampNs {
+        if (!hasNext) return Long.MAX_VALUE
+        loadChunkForPeriod(nextIndex)
+        return chunkTimestamps[nextIndex + 1 - loadedChunkStart]
+    }
+
+    override fun peekNextValue(): Double {
+        if (!hasNext) return 0.0
+        loadChunkForPeriod(nextIndex)
+        return chunkValues[nextIndex - loadedChunkStart]
+    }
+
+    override fun next() {
+        if (hasNext) {
+            loadChunkForPeriod(nextIndex)
+            currentStartTime = currentEndTime
+            currentEndTime = chunkTimestamps[nextIndex + 1 - loadedChunkStart]
+            currentValue = chunkValues[nextIndex - loadedChunkStart]
+            nextIndex++
+        } else {
+            currentStartTime = chunks.timestamps.last
+            currentEndTime = Long.MAX_VALUE
+            currentValue = 0.0
+            nextIndex = chunks.periodCount
+        }
+    }
+
+}
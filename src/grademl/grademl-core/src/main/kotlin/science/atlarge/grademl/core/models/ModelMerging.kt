@@ -0,0 +1,51 @@
+package science.atlarge.grademl.core.models
+
+// Adds copies of all phases and dataflows in another ExecutionModel, as if they had been added to this model directly
+fun ExecutionModel.addAllFrom(other: ExecutionModel) {
+    val copiedPhases = mutableMapOf(other.rootPhase to rootPhase)
+    // Copy phases in breadth-first order, so every parent is copied before its children
+    var phasesToCopy = other.rootPhase.children.toList()
+    while (phasesToCopy.isNotEmpty()) {
+        for (phase in phasesToCopy) {
+            copiedPhases[phase] = addPhase(
+                name = phase.name,
+                tags = phase.tags,
+                typeTags = phase.typeTags,
+                metadata = phase.metadata,
+                description = phase.description,
+                startTime = phase.startTime,
+                endTime = phase.endTime,
+                parent = copiedPhases[phase.parent!!]!!
+            )
+        }
+        phasesToCopy = phasesToCopy.flatMap { it.children }
+    }
+    for ((phase, copiedPhase) in copiedPhases) {
+        for (sink in phase.outFlows) copiedPhase.addOutgoingDataflow(copiedPhases[sink]!!)
+    }
+}
+
+// Adds copies of all resources in another ResourceModel, sharing their metric data
+fun ResourceModel.addAllFrom(other: ResourceModel) {
+    val copiedResources = mutableMapOf(other.rootResource to rootResource)
+    var resourcesToCopy = other.rootResource.children.toList()
+    while (resourcesToCopy.isNotEmpty()) {
+        for (resource in resourcesToCopy) {
+            val copiedResource = addResource(
+                name = resource.name,
+                tags = resource.tags,
+                typeTags = resource.typeTags,
+                metadata = resource.metadata,
+                description = resource.description,
+                parent = copiedResources[resource.parent!!]!!
+            )
+            for (metric in resource.metrics) copiedResource.addMetric(metric.name, metric.data)
+            copiedResources[resource] = copiedResource
+        }
+        resourcesToCopy = resourcesToCopy.flatMap { it.children }
+    }
+}
+
+fun Environment.addAllFrom(other: Environment) {
+    for (machine in other.machines) addMachine(machine)
+}
@@ -0,0 +1,517 @@
+package science.atlarge.grademl.core.snapshot
+
+import science.atlarge.grademl.core.input.InputSource
+import science.atlarge.grademl.core.models.ChunkedTimestamps
+import science.atlarge.grademl.core.models.ChunkedValues
+import science.atlarge.grademl.core.models.Environment
+import science.atlarge.grademl.core.models.ExecutionModel
+import science.atlarge.grademl.core.models.ExecutionPhase
+import science.atlarge.grademl.core.models.Machine
+import science.atlarge.grademl.core.models.MetricData
+import science.atlarge.grademl.core.models.Resource
+import science.atlarge.grademl.core.models.ResourceModel
+import science.atlarge.grademl.core.util.TimestampNs
+import java.io.BufferedInputStream
+import java.io.Closeable
+import java.io.BufferedOutputStream
+import java.io.DataInputStream
+import java.io.DataOutputStream
+import java.nio.ByteBuffer
+import java.nio.channels.Channels
+import java.nio.channels.FileChannel
+import java.nio.file.FileVisitResult
+import java.nio.file.Files
+import java.nio.file.Path
+import java.nio.file.SimpleFileVisitor
+import java.nio.file.StandardCopyOption
+import java.nio.file.StandardOpenOption
+import java.nio.file.attribute.BasicFileAttributes
+import java.util.IdentityHashMap
+
+// Persistent snapshot of the models parsed from a job's input files, so later analyses of the same job can skip
+// parsing. A snapshot is only used if it was written by the same format version, for the same set of input sources,
+// and for input files with the same paths, sizes, and modification times. Compressed metric data is stored in its
+// encoded form and read with the metadata, so metrics keep the compression and chunk index they had after parsing.
+// Uncompressed metric data is read on first use, so the snapshot file stays open until the snapshot is closed.
+//
+// Layout (all values big-endian):
+//   header:             magic "GMLSNAP1", format version (Int), offset of uncompressed data (Long)
+//   metadata:           fingerprint of inputs, environment, execution model, resource model
+//   compressed data:    chunked timestamps shared by compressed metrics, then chunked values per compressed metric
+//   uncompressed data:  8-byte aligned; per uncompressed metric: timestamps (Long) followed by values (Double)
+class JobSnapshot(
+    private val snapshotFile: Path,
+    inputDirectories: Iterable<Path>,
+    inputSources: Iterable<InputSource>,
+    excludedDirectory: Path? = null
+) : Closeable {
+
+    // Fingerprint the input files before they are parsed, so files modified during parsing invalidate the snapshot
+    private val fingerprint = InputFingerprint.of(inputDirectories, inputSources, excludedDirectory)
+    // Channel that uncompressed metric data is read from, if the snapshot has been read
+    private var dataChannel: FileChannel? = null
+
+    fun readInto(executionModel: ExecutionModel, resourceModel: ResourceModel, environment: Environment): Boolean {
+        if (!snapshotFile.toFile().isFile) return false
+        // Read all metadata before modifying the given models, so an outdated or damaged snapshot has no effect
+        val contents = try {
+            readContents() ?: return false
+        } catch (e: Exception) {
+            // Treat a damaged snapshot as missing
+            return false
+        }
+        contents.addTo(executionModel, resourceModel, environment)
+        return true
+    }
+
+    private fun readContents(): SnapshotContents? {
+        val channel = FileChannel.open(snapshotFile, StandardOpenOption.READ)
+        try {
+            // Read sequentially up to the uncompressed data; the stream is not closed, as that would close the channel
+            val input = DataInputStream(BufferedInputStream(Channels.newInputStream(channel)))
+            val magic = ByteArray(MAGIC.size)
+            input.readFully(magic)
+            if (!magic.contentEquals(MAGIC) || input.readInt() != FORMAT_VERSION) return null
+            val uncompressedDataOffset = input.readLong()
+            if (InputFingerprint.read(input) != fingerprint) return null
+            val contents = SnapshotContents.read(input)
+            contents.readCompressedData(input)
+
+            // Map the uncompressed data of every metric on first use; the channel stays open until the snapshot is
+            // closed
+            var dataOffset = uncompressedDataOffset
+            for (metric in contents.uncompressedMetrics) {
+                val offset = dataOffset
+                val valueCount = metric.valueCount
+                metric.data = MetricData.loadOnDemand(metric.maxValue) { readMetricData(channel, offset, valueCount) }
+                dataOffset += metricDataSize(valueCount)
+            }
+            if (dataOffset > channel.size()) return null
+            if (contents.uncompressedMetrics.isNotEmpty()) dataChannel = channel
+            return contents
+        } finally {
+            if (dataChannel !== channel) channel.close()
+        }
+    }
+
+    private fun readMetricData(
+        channel: FileChannel,
+        offset: Long,
+        valueCount: Int
+    ): Pair<LongArray, DoubleArray> {
+        val buffer = channel.map(FileChannel.MapMode.READ_ONLY, offset, metricDataSize(valueCount))
+        val timestamps = LongArray(valueCount + 1)
+        buffer.asLongBuffer().get(timestamps)
+        buffer.position(timestamps.size * Long.SIZE_BYTES)
+        val values = DoubleArray(valueCount)
+        buffer.asDoubleBuffer().get(values)
+        return timestamps to values
+    }
+
+    fun write(executionModel: ExecutionModel, resourceModel: ResourceModel, environment: Environment) {
+        val contents = SnapshotContents.of(executionModel, resourceModel, environment)
+
+        // Write to a temporary file first, so a concurrent or interrupted analysis never sees a partial snapshot
+        snapshotFile.parent?.toFile()?.mkdirs()
+        val temporaryFile = snapshotFile.resolveSibling("${snapshotFile.fileName}.tmp")
+        FileChannel.open(
+            temporaryFile, StandardOpenOption.CREATE, StandardOpenOption.WRITE, StandardOpenOption.TRUNCATE_EXISTING
+        ).use { channel ->
+            // Write the header, metadata, and compressed data sequentially; the stream is flushed but not closed, as
+            // that would close the channel
+            val output = DataOutputStream(BufferedOutputStream(Channels.newOutputStream(channel), WRITE_BUFFER_SIZE))
+            output.write(MAGIC)
+            output.writeInt(FORMAT_VERSION)
+            output.writeLong(0L)
+            fingerprint.write(output)
+            contents.write(output)
+            contents.writeCompressedData(output)
+            output.flush()
+
+            val uncompressedDataOffset = (channel.position() + 7) and 7L.inv()
+            channel.position(uncompressedDataOffset)
+            val buffer = ByteBuffer.allocate(WRITE_BUFFER_SIZE)
+            for (metric in contents.uncompressedMetrics) {
+                val data = metric.data!!
+                for (timestamp in data.timestamps) {
+                    if (!buffer.hasRemaining()) flushBuffer(channel, buffer)
+                    buffer.putLong(timestamp)
+                }
+                for (value in data.values) {
+                    if (!buffer.hasRemaining()) flushBuffer(channel, buffer)
+                    buffer.putDouble(value)
+                }
+            }
+            flushBuffer(channel, buffer)
+
+            // Fill in the offset of the uncompressed data in the header
+            val offsetBuffer = ByteBuffer.allocate(Long.SIZE_BYTES).putLong(uncompressedDataOffset)
+            offsetBuffer.flip()
+            while (offsetBuffer.hasRemaining()) {
+                channel.write(offsetBuffer, MAGIC.size + Int.SIZE_BYTES.toLong() + offsetBuffer.position())
+            }
+        }
+        Files.move(temporaryFile, snapshotFile, StandardCopyOption.REPLACE_EXISTING, StandardCopyOption.ATOMIC_MOVE)
+    }
+
+    // Closes the snapshot file; uncompressed metric data that has not been read yet can no longer be used
+    override fun close() {
+        dataChannel?.close()
+        dataChannel = null
+    }
+
+    private fun flushBuffer(channel: FileChannel, buffer: ByteBuffer) {
+        buffer.flip()
+        writeFully(channel, buffer)
+        buffer.clear()
+    }
+
+    private fun writeFully(channel: FileChannel, buffer: ByteBuffer) {
+        while (buffer.hasRemaining()) channel.write(buffer)
+    }
+
+    companion object {
+        private val MAGIC = "GMLSNAP1".toByteArray(Charsets.US_ASCII)
+        // Increment when the layout of snapshots or the models they contain change
+        private const val FORMAT_VERSION = 2
+        private const val WRITE_BUFFER_SIZE = 1 shl 20
+
+        private fun metricDataSize(valueCount: Int): Long {
+            return (2L * valueCount + 1) * Long.SIZE_BYTES
+        }
+    }
+
+}
+
+private data class InputFingerprint(
+    val inputSources: List<String>,
+    val files: List<InputFile>
+) {
+
+    fun write(output: DataOutputStream) {
+        output.writeInt(inputSources.size)
+        for (inputSource in inputSources) output.writeString(inputSource)
+        output.writeInt(files.size)
+        for (file in files) {
+            output.writeString(file.path)
+            output.writeLong(file.size)
+            output.writeLong(file.lastModified)
+        }
+    }
+
+    companion object {
+        fun of(
+            inputDirectories: Iterable<Path>,
+            inputSources: Iterable<InputSource>,
+            excludedDirectory: Path?
+        ): InputFingerprint {
+            val excludedPath = excludedDirectory?.toAbsolutePath()?.normalize()
+            val files = mutableListOf<InputFile>()
+            for (directory in inputDirectories) {
+                if (!Files.isDirectory(directory)) continue
+                Files.walkFileTree(directory, object : SimpleFileVisitor<Path>() {
+                    override fun preVisitDirectory(dir: Path, attrs: BasicFileAttributes): FileVisitResult {
+                        // Skip the job analysis directory if it is stored with the job's input files
+                        return if (dir.toAbsolutePath().normalize() == excludedPath) FileVisitResult.SKIP_SUBTREE
+                        else FileVisitResult.CONTINUE
+                    }
+
+                    override fun visitFile(file: Path, attrs: BasicFileAttributes): FileVisitResult {
+                        if (attrs.isRegularFile) {
+                            files.add(
+                                InputFile(
+                                    file.toAbsolutePath().normalize().toString(),
+                                    attrs.size(),
+                                    attrs.lastModifiedTime().toMillis()
+                                )
+                            )
+                        }
+                        return FileVisitResult.CONTINUE
+                    }
+                })
+            }
+            return InputFingerprint(
+                inputSources.map { it.javaClass.name }.sorted(),
+                files.sortedBy { it.path }
+            )
+        }
+
+        fun read(input: DataInputStream): InputFingerprint {
+            val inputSources = List(input.readInt()) { input.readString() }
+            val files = List(input.readInt()) { InputFile(input.readString(), input.readLong(), input.readLong()) }
+            return InputFingerprint(inputSources, files)
+        }
+    }
+
+}
+
+private data class InputFile(val path: String, val size: Long, val lastModified: Long)
+
+// Flat representation of a job's models, with parents referenced by their index in the preceding list (-1 for root)
+private class SnapshotContents(
+    val machines: List<Machine>,
+    val phases: List<PhaseRecord>,
+    val dataflows: List<Pair<Int, Int>>,
+    val resources: List<ResourceRecord>
+) {
+
+    val compressedMetrics = resources.flatMap { it.metrics }.filter { it.timestampsIndex >= 0 }
+    val uncompressedMetrics = resources.flatMap { it.metrics }.filter { it.timestampsIndex < 0 }
+
+    fun addTo(executionModel: ExecutionModel, resourceModel: ResourceModel, environment: Environment) {
+        for (machine in machines) environment.addMachine(machine)
+
+        val addedPhases = ArrayList<ExecutionPhase>(phases.size)
+        for (phase in phases) {
+            addedPhases.add(
+                executionModel.addPhase(
+                    name = phase.name,
+                    tags = phase.tags,
+                    typeTags = phase.typeTags,
+                    metadata = phase.metadata,
+                    description = phase.description,
+                    startTime = phase.startTime,
+                    endTime = phase.endTime,
+                    parent = if (phase.parent < 0) executionModel.rootPhase else addedPhases[phase.parent]
+                )
+            )
+        }
+        for ((source, sink) in dataflows) addedPhases[source].addOutgoingDataflow(addedPhases[sink])
+
+        val addedResources = ArrayList<Resource>(resources.size)
+        for (resource in resources) {
+            val addedResource = resourceModel.addResource(
+                name = resource.name,
+                tags = resource.tags,
+                typeTags = resource.typeTags,
+                metadata = resource.metadata,
+                description = resource.description,
+                parent = if (resource.parent < 0) resourceModel.rootResource else addedResources[resource.parent]
+            )
+            for (metric in resource.metrics) addedResource.addMetric(metric.name, metric.data!!)
+            addedResources.add(addedResource)
+        }
+    }
+
+    fun write(output: DataOutputStream) {
+        output.writeInt(machines.size)
+        for (machine in machines) {
+            output.writeString(machine.canonicalId)
+            output.writeStrings(machine.alternativeIds)
+        }
+
+        output.writeInt(phases.size)
+        for (phase in phases) {
+            output.writeInt(phase.parent)
+            output.writeString(phase.name)
+            output.writeStringMap(phase.tags)
+            output.writeStrings(phase.typeTags)
+            output.writeStringMap(phase.metadata)
+            output.writeNullableString(phase.description)
+            output.writeLong(phase.startTime)
+            output.writeLong(phase.endTime)
+        }
+        output.writeInt(dataflows.size)
+        for ((source, sink) in dataflows) {
+            output.writeInt(source)
+            output.writeInt(sink)
+        }
+
+        output.writeInt(resources.size)
+        for (resource in resources) {
+            output.writeInt(resource.parent)
+            output.writeString(resource.name)
+            output.writeStringMap(resource.tags)
+            output.writeStrings(resource.typeTags)
+            output.writeStringMap(resource.metadata)
+            output.writeNullableString(resource.description)
+            output.writeInt(resource.metrics.size)
+            for (metric in resource.metrics) {
+                output.writeString(metric.name)
+                output.writeDouble(metric.maxValue)
+                output.writeInt(metric.valueCount)
+                output.writeInt(metric.timestampsIndex)
+            }
+        }
+    }
+
+    // Writes the encoded timestamps shared by compressed metrics, followed by the encoded values of each metric
+    fun writeCompressedData(output: DataOutputStream) {
+        val timestampCount = (compressedMetrics.maxOfOrNull { it.timestampsIndex } ?: -1) + 1
+        val sharedTimestamps = arrayOfNulls<ChunkedTimestamps>(timestampCount)
+        for (metric in compressedMetrics) sharedTimestamps[metric.timestampsIndex] = metric.data!!.compressedTimestamps
+        output.writeInt(timestampCount)
+        for (timestamps in sharedTimestamps) timestamps!!.write(output)
+        for (metric in compressedMetrics) metric.data!!.compressedValues!!.write(output)
+    }
+
+    fun readCompressedData(input: DataInputStream) {
+        val sharedTimestamps = List(input.readInt()) { ChunkedTimestamps.read(input) }
+        for (metric in compressedMetrics) {
+            val values = ChunkedValues.read(input)
+            metric.data = MetricData.compressed(sharedTimestamps[metric.timestampsIndex], values, metric.maxValue)
+        }
+    }
+
+    companion object {
+        fun of(
+            executionModel: ExecutionModel,
+            resourceModel: ResourceModel,
+            environment: Environment
+        ): SnapshotContents {
+            // Order phases and resources such that every parent precedes its children
+            val phaseOrder = breadthFirstOrder(executionModel.rootPhase) { it.children }
+            val phaseIndices = phaseOrder.withIndex().associate { (index, phase) -> phase to index }
+            val phases = phaseOrder.map { phase ->
+                PhaseRecord(
+                    phaseIndices[phase.parent] ?: -1, phase.name, phase.tags, phase.typeTags, phase.metadata,
+                    phase.description, phase.startTime, phase.endTime
+                )
+            }
+            val dataflows = phaseOrder.flatMap { source ->
+                source.outFlows.map { sink -> phaseIndices[source]!! to phaseIndices[sink]!! }
+            }
+
+            val resourceOrder = breadthFirstOrder(resourceModel.rootResource) { it.children }
+            val resourceIndices = resourceOrder.withIndex().associate { (index, resource) -> resource to index }
+            // Store timestamps shared by compressed metrics (e.g., of the same monitor) once
+            val timestampsIndices = IdentityHashMap<ChunkedTimestamps, Int>()
+            val resources = resourceOrder.map { resource ->
+                ResourceRecord(
+                    resourceIndices[resource.parent] ?: -1, resource.name, resource.tags, resource.typeTags,
+                    resource.metadata, resource.description,
+                    resource.metrics.map { metric ->
+                        val timestampsIndex = metric.data.compressedTimestamps?.let {
+                            timestampsIndices.getOrPut(it) { timestampsIndices.size }
+                        } ?: -1
+                        MetricRecord(
+                            metric.name, metric.data.maxValue, metric.data.periodCount, timestampsIndex, metric.data
+                        )
+                    }
+                )
+            }
+
+            return SnapshotContents(environment.machines, phases, dataflows, resources)
+        }
+
+        private fun <T> breadthFirstOrder(root: T, childrenOf: (T) -> Iterable<T>): List<T> {
+            val order = mutableListOf<T>()
+            var level = childrenOf(root).toList()
+            while (level.isNotEmpty()) {
+                order.addAll(level)
+                level = level.flatMap(childrenOf)
+            }
+            return order
+        }
+
+        fun read(input: DataInputStream): SnapshotContents {
+            val machines = List(input.readInt()) {
+                Machine(input.readString(), input.readStrings())
+            }
+            val phases = List(input.readInt()) {
+                PhaseRecord(
+                    parent = input.readInt(),
+                    name = input.readString(),
+                    tags = input.readStringMap(),
+                    typeTags = input.readStrings(),
+                    metadata = input.readStringMap(),
+                    description = input.readNullableString(),
+                    startTime = input.readLong(),
+                    endTime = input.readLong()
+                )
+            }
+            val dataflows = List(input.readInt()) { input.readInt() to input.readInt() }
+            val resources = List(input.readInt()) {
+                ResourceRecord(
+                    parent = input.readInt(),
+                    name = input.readString(),
+                    tags = input.readStringMap(),
+                    typeTags = input.readStrings(),
+                    metadata = input.readStringMap(),
+                    description = input.readNullableString(),
+                    metrics = List(input.readInt()) {
+                        MetricRecord(input.readString(), input.readDouble(), input.readInt(), input.readInt(), null)
+                    }
+                )
+            }
+            return SnapshotContents(machines, phases, dataflows, resources)
+        }
+    }
+
+}
+
+private class PhaseRecord(
+    val parent: Int,
+    val name: String,
+    val tags: Map<String, String>,
+    val typeTags: Set<String>,
+    val metadata: Map<String, String>,
+    val description: String?,
+    val startTime: TimestampNs,
+    val endTime: TimestampNs
+)
+
+private class ResourceRecord(
+    val parent: Int,
+    val name: String,
+    val tags: Map<String, String>,
+    val typeTags: Set<String>,
+    val metadata: Map<String, String>,
+    val description: String?,
+    val metrics: List<MetricRecord>
+)
+
+private class MetricRecord(
+    val name: String,
+    val maxValue: Double,
+    val valueCount: Int,
+    // Index of the metric's compressed timestamps among those shared by compressed metrics, or -1 if uncompressed
+    val timestampsIndex: Int,
+    var data: MetricData?
+)
+
+private fun DataOutputStream.writeString(value: String) {
+    val bytes = value.toByteArray(Charsets.UTF_8)
+    writeInt(bytes.size)
+    write(bytes)
+}
+
+private fun DataOutputStream.writeNullableString(value: String?) {
+    writeBoolean(value != null)
+    if (value != null) writeString(value)
+}
+
+private fun DataOutputStream.writeStrings(values: Collection<String>) {
+    writeInt(values.size)
+    for (value in values) writeString(value)
+}
+
+private fun DataOutputStream.writeStringMap(values: Map<String, String>) {
+    writeInt(values.size)
+    for ((key, value) in values) {
+        writeString(key)
+        writeString(value)
+    }
+}
+
+private fun DataInputStream.readString(): String {
+    val bytes = ByteArray(readInt())
+    readFully(bytes)
+    return String(bytes, Charsets.UTF_8)
+}
+
+private fun DataInputStream.readNullableString(): String? {
+    return if (readBoolean()) readString() else null
+}
+
+private fun DataInputStream.readStrings(): Set<String> {
+    val count = readInt()
+    return (0 until count).mapTo(LinkedHashSet(count)) { readString() }
+}
+
+private fun DataInputStream.readStringMap(): Map<String, String> {
+    val count = readInt()
+    val values = LinkedHashMap<String, String>(count)
+    repeat(count) { values[readString()] = readString() }
+    return values
+}
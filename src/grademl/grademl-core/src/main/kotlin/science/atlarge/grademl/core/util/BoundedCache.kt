@@ -0,0 +1,128 @@
+package science.atlarge.grademl.core.util
+
+import java.util.concurrent.ConcurrentHashMap
+import java.util.concurrent.atomic.AtomicLong
+import java.util.concurrent.locks.ReentrantLock
+import kotlin.concurrent.withLock
+
+// Thread-safe cache of computed values with a budget for the (estimated) size of cached values in bytes. As with
+// ConcurrentMemoizer, concurrent requests for a key wait for a single computation, and computations may request other
+// keys of the same cache. When the cache exceeds its budget, the least recently used values are evicted. Evicted
+// values are written to an optional spill store, from which they are read back instead of being recomputed.
+class BoundedCache<K : Any, V>(
+    private val byteBudget: Long,
+    private val sizeOf: (V) -> Long,
+    private val spillStore: SpillStore<K, V>? = null,
+    private val compute: (K) -> V
+) {
+
+    // Cached values in order of last access, and their total size; guarded by lock
+    private val lock = ReentrantLock()
+    private val cachedValues = LinkedHashMap<K, CachedValue<V>>(16, 0.75f, true)
+    private var cachedBytes = 0L
+
+    // Values that are being computed or read from the spill store
+    private val pendingValues = ConcurrentHashMap<K, Lazy<V>>()
+
+    private val hits = AtomicLong()
+    private val misses = AtomicLong()
+    private val evictions = AtomicLong()
+    private val spillReads = AtomicLong()
+
+    init {
+        require(byteBudget >= 0) { "Cache budget must be non-negative" }
+    }
+
+    operator fun get(key: K): V {
+        lookUp(key)?.let { return it.value }
+        val pendingValue = pendingValues.computeIfAbsent(key) { lazy { load(key) } }
+        try {
+            return pendingValue.value
+        } finally {
+            pendingValues.remove(key, pendingValue)
+        }
+    }
+
+    fun statistics(): CacheStatistics {
+        return lock.withLock {
+            CacheStatistics(
+                hits = hits.get(),
+                misses = misses.get(),
+                evictions = evictions.get(),
+                spillReads = spillReads.get(),
+                cachedValues = cachedValues.size,
+                cachedBytes = cachedBytes,
+                spilledValues = spillStore?.size ?: 0
+            )
+        }
+    }
+
+    private fun lookUp(key: K): CachedValue<V>? {
+        val cachedValue = lock.withLock { cachedValues[key] } ?: return null
+        hits.incrementAndGet()
+        return cachedValue
+    }
+
+    private fun load(key: K): V {
+        // Check the cache again, as the value may have been added since the last lookup
+        lookUp(key)?.let { return it.value }
+        val value = if (spillStore != null && spillStore.contains(key)) {
+            spillReads.incrementAndGet()
+            spillStore.read(key)
+        } else {
+            misses.incrementAndGet()
+            compute(key)
+        }
+        insert(key, value)
+        return value
+    }
+
+    private fun insert(key: K, value: V) {
+        val size = sizeOf(value)
+        val evictedValues = mutableListOf<Pair<K, V>>()
+        lock.withLock {
+            if (size <= byteBudget) {
+                cachedValues[key] = CachedValue(value, size)
+                cachedBytes += size
+            } else {
+                // Values that exceed the budget by themselves are never kept in memory
+                evictedValues.add(key to value)
+            }
+            // Evict the least recently used values until the cache is within budget
+            val iterator = cachedValues.entries.iterator()
+            while (cachedBytes > byteBudget && iterator.hasNext()) {
+                val (evictedKey, evictedValue) = iterator.next()
+                iterator.remove()
+                cachedBytes -= evictedValue.size
+                evictions.incrementAndGet()
+                evictedValues.add(evictedKey to evictedValue.value)
+            }
+        }
+        // Spill evicted values outside the lock, so other threads can use the cache while writing to disk
+        if (spillStore != null) {
+            for ((evictedKey, evictedValue) in evictedValues) {
+                if (!spillStore.contains(evictedKey)) spillStore.write(evictedKey, evictedValue)
+            }
+        }
+    }
+
+    private class CachedValue<V>(val value: V, val size: Long)
+
+}
+
+class CacheStatistics(
+    val hits: Long,
+    val misses: Long,
+    val evictions: Long,
+    val spillReads: Long,
+    val cachedValues: Int,
+    val cachedBytes: Long,
+    val spilledValues: Int
+)
+
+interface SpillStore<K, V> {
+    val size: Int
+    fun contains(key: K): Boolean
+    fun read(key: K): V
+    fun write(key: K, value: V)
+}
@@ -0,0 +1,18 @@
+package science.atlarge.grademl.core.util
+
+import java.util.concurrent.ConcurrentHashMap
+
+// Thread-safe memoization of a function: each key is computed at most once, concurrent requests for a key wait for
+// the first computation to complete, and computations for different keys run concurrently. Computations may request
+// other keys of the same memoizer (e.g., to combine results of child phases), as long as they do not form a cycle.
+// Failed computations are not memoized and are retried on the next request.
+class ConcurrentMemoizer<K : Any, V>(private val compute: (K) -> V) {
+
+    // Results are wrapped in Lazy so computations run outside the map's internal locks
+    private val results = ConcurrentHashMap<K, Lazy<V>>()
+
+    operator fun get(key: K): V {
+        return results.computeIfAbsent(key) { lazy { compute(key) } }.value
+    }
+
+}
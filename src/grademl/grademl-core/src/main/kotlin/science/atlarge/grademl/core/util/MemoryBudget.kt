@@ -0,0 +1,27 @@
+package science.atlarge.grademl.core.util
+
+// Process-wide budget for the memory used by caches and by operators that spill to disk. The default budget of each
+// cache or operator is a share of this budget, so together they leave room on the heap for the models of loaded jobs
+// and for query results, even in a long-lived process (e.g., the query server) that uses all of them at once.
+object MemoryBudget {
+
+    // Total budget, as a fraction of the maximum heap size
+    val totalBytes: Long = Runtime.getRuntime().maxMemory() / 5 * 3
+
+    // Cached intermediate results of resource attribution, for all jobs loaded by the process combined
+    val attributionCacheBytes: Long
+        get() = totalBytes / 2
+
+    // Cached results of subplans of queries
+    val subplanCacheBytes: Long
+        get() = totalBytes / 6
+
+    // Rows buffered by a sort operator
+    val sortBytes: Long
+        get() = totalBytes / 6
+
+    // Groups kept in memory by a hash aggregation
+    val aggregationBytes: Long
+        get() = totalBytes / 6
+
+}
@@ -0,0 +1,96 @@
+package science.atlarge.grademl.core.util
+
+import java.io.ByteArrayInputStream
+import java.io.ByteArrayOutputStream
+import java.io.Closeable
+import java.io.DataInputStream
+import java.io.DataOutputStream
+import java.io.IOException
+import java.nio.ByteBuffer
+import java.nio.channels.FileChannel
+import java.nio.file.Files
+import java.nio.file.Path
+import java.nio.file.StandardOpenOption
+import java.util.concurrent.ConcurrentHashMap
+
+// Spill store that appends serialized values to a single file, which is created (or truncated) on the first write.
+// Values are only kept for the lifetime of the store, so the file is deleted when the store is closed. Failures to
+// write to the file are reported as warnings; values that could not be written are recomputed when needed.
+class SpillFile<K : Any, V>(
+    private val file: Path,
+    private val serialize: DataOutputStream.(V) -> Unit,
+    private val deserialize: DataInputStream.(K) -> V,
+    private val reportWarning: (String) -> Unit = { }
+) : SpillStore<K, V>, Closeable {
+
+    private val locations = ConcurrentHashMap<K, SpillLocation>()
+    @Volatile
+    private var channel: FileChannel? = null
+    private var nextPosition = 0L
+    private var isDisabled = false
+
+    override val size: Int
+        get() = locations.size
+
+    override fun contains(key: K): Boolean = key in locations
+
+    override fun read(key: K): V {
+        val location = locations[key] ?: throw NoSuchElementException("Value for $key has not been spilled")
+        val buffer = ByteBuffer.allocate(location.length)
+        while (buffer.hasRemaining()) {
+            val fileChannel = channel ?: throw IllegalStateException("Spill file $file is closed")
+            val bytesRead = fileChannel.read(buffer, location.position + buffer.position())
+            if (bytesRead < 0) throw IOException("Unexpected end of spill file $file")
+        }
+        return DataInputStream(ByteArrayInputStream(buffer.array())).deserialize(key)
+    }
+
+    override fun write(key: K, value: V) {
+        val bytes = ByteArrayOutputStream().also { DataOutputStream(it).serialize(value) }.toByteArray()
+        // Reserve space in the file, then write outside the lock using positional writes
+        val (fileChannel, position) = synchronized(this) {
+            if (isDisabled) return
+            val fileChannel = channel ?: try {
+                openChannel().also { channel = it }
+            } catch (e: IOException) {
+                reportWarning("Failed to create spill file $file, evicted values will be recomputed: ${e.message}")
+                isDisabled = true
+                return
+            }
+            val position = nextPosition
+            nextPosition += bytes.size
+            fileChannel to position
+        }
+        try {
+            val buffer = ByteBuffer.wrap(bytes)
+            while (buffer.hasRemaining()) fileChannel.write(buffer, position + buffer.position())
+        } catch (e: IOException) {
+            // Do not record the value, so it is recomputed when needed
+            reportWarning("Failed to write to spill file $file: ${e.message}")
+            return
+        }
+        locations[key] = SpillLocation(position, bytes.size)
+    }
+
+    // Deletes the spill file; values that have been spilled are recomputed if they are requested again
+    @Synchronized
+    override fun close() {
+        isDisabled = true
+        locations.clear()
+        channel?.close()
+        channel = null
+        Files.deleteIfExists(file)
+    }
+
+    private fun openChannel(): FileChannel {
+        Files.createDirectories(file.parent)
+        return FileChannel.open(
+            file,
+            StandardOpenOption.CREATE, StandardOpenOption.TRUNCATE_EXISTING,
+            StandardOpenOption.READ, StandardOpenOption.WRITE
+        )
+    }
+
+    private class SpillLocation(val position: Long, val length: Int)
+
+}
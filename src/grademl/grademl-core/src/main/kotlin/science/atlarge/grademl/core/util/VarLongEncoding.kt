@@ -0,0 +1,28 @@
+package science.atlarge.grademl.core.util
+
+import java.io.OutputStream
+
+// Zigzag-encoded LEB128 varints: zigzag encoding maps small negative values to small unsigned values, so small deltas
+// take a single byte regardless of their sign
+
+internal fun OutputStream.writeVarLong(value: Long) {
+    var remaining = (value shl 1) xor (value shr 63)
+    while (remaining and 0x7FL.inv() != 0L) {
+        write(((remaining and 0x7F) or 0x80).toInt())
+        remaining = remaining ushr 7
+    }
+    write(remaining.toInt())
+}
+
+// Decodes a varint from the unsigned bytes returned by nextByte
+internal inline fun readVarLong(nextByte: () -> Int): Long {
+    var result = 0L
+    var shift = 0
+    while (true) {
+        val byte = nextByte()
+        result = result or ((byte and 0x7F).toLong() shl shift)
+        if (byte and 0x80 == 0) break
+        shift += 7
+    }
+    return (result ushr 1) xor -(result and 1)
+}
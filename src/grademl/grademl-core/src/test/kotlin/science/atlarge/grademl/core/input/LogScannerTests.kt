@@ -0,0 +1,125 @@
+package science.atlarge.grademl.core.input
+
+import java.io.File
+import java.nio.file.Files
+import java.nio.file.Path
+import kotlin.test.Test
+import kotlin.test.assertEquals
+import kotlin.test.assertFailsWith
+
+class LogScannerTests {
+
+    // Collects the lines passed to it, and counts the files it was started for
+    private class CollectingParser(
+        override val linePrefixes: List<String> = emptyList(),
+        override val lineSubstrings: List<String> = emptyList()
+    ) : LogParser<List<String>> {
+        var filesStarted = 0
+
+        override fun startFile(logFile: File): LogFileScan<List<String>> {
+            synchronized(this) { filesStarted++ }
+            return object : LogFileScan<List<String>> {
+                val lines = mutableListOf<String>()
+                override fun processLine(line: String) {
+                    lines.add(line)
+                }
+
+                override fun finish(): List<String>? = lines.takeIf { it.isNotEmpty() }
+            }
+        }
+    }
+
+    private fun withLogDirectory(files: Map<String, String>, test: (Path) -> Unit) {
+        val directory = Files.createTempDirectory("log-scanner-test")
+        try {
+            for ((name, contents) in files) {
+                val file = directory.resolve(name)
+                Files.createDirectories(file.parent)
+                Files.writeString(file, contents)
+            }
+            test(directory)
+        } finally {
+            directory.toFile().deleteRecursively()
+        }
+    }
+
+    @Test
+    fun testLinesMatchReadLines() {
+        val contents = "first line\r\n\nthird line\nepoch 1/2\repoch 2/2\r\rlast line without newline"
+        withLogDirectory(mapOf("a.log" to contents)) { directory ->
+            val results = LogScanner.scan(listOf(directory), LogFileSet(extension = "log"), CollectingParser())
+            assertEquals(1, results.size)
+            assertEquals(contents.reader().readLines(), results[0].result)
+        }
+    }
+
+    @Test
+    fun testLinesAreFilteredByPrefixAndSubstring() {
+        val contents = "KEY=1\n[time] INFO - started\n[time] DEBUG - noise\nother KEY=2\n"
+        withLogDirectory(mapOf("a.log" to contents)) { directory ->
+            val parser = CollectingParser(linePrefixes = listOf("KEY="), lineSubstrings = listOf("INFO"))
+            val results = LogScanner.scan(listOf(directory), LogFileSet(extension = "log"), parser)
+            assertEquals(listOf("KEY=1", "[time] INFO - started"), results[0].result)
+        }
+    }
+
+    @Test
+    fun testRegisteredParsersShareOneScan() {
+        val files = mapOf("a.log" to "a1\na2\n", "nested/b.log" to "b1\n", "c.txt" to "c1\n")
+        withLogDirectory(files) { directory ->
+            val logFileSet = LogFileSet(extension = "log", recursive = true)
+            val firstParser = CollectingParser()
+            val secondParser = CollectingParser(lineSubstrings = listOf("1"))
+            LogScanner.register(logFileSet, firstParser)
+            LogScanner.register(logFileSet, secondParser)
+            // The first scan runs both parsers over all matching files
+            val firstResults = LogScanner.scan(listOf(directory), logFileSet, firstParser)
+            assertEquals(listOf(listOf("a1", "a2"), listOf("b1")), firstResults.map { it.result })
+            assertEquals(2, secondParser.filesStarted)
+            // The second parser receives the results of the first scan without scanning the files again
+            val secondResults = LogScanner.scan(listOf(directory), logFileSet, secondParser)
+            assertEquals(listOf(listOf("a1"), listOf("b1")), secondResults.map { it.result })
+            assertEquals(2, secondParser.filesStarted)
+            assertEquals(2, firstParser.filesStarted)
+        }
+    }
+
+    @Test
+    fun testUnclaimedResultsAreReleased() {
+        withLogDirectory(mapOf("a.log" to "a1\n")) { directory ->
+            val logFileSet = LogFileSet(extension = "log")
+            val firstParser = CollectingParser()
+            val secondParser = CollectingParser()
+            LogScanner.register(logFileSet, firstParser)
+            LogScanner.register(logFileSet, secondParser)
+            LogScanner.scan(listOf(directory), logFileSet, firstParser)
+            assertEquals(1, secondParser.filesStarted)
+            // After releasing the results of the second parser, it scans the files again
+            LogScanner.releaseScans(listOf(directory))
+            assertEquals(listOf("a1"), LogScanner.scan(listOf(directory), logFileSet, secondParser)[0].result)
+            assertEquals(2, secondParser.filesStarted)
+        }
+    }
+
+    @Test
+    fun testParserFailuresAreIsolated() {
+        withLogDirectory(mapOf("a.log" to "line\n")) { directory ->
+            val logFileSet = LogFileSet(extension = "log")
+            val failingParser = object : LogParser<String> {
+                override fun startFile(logFile: File): LogFileScan<String> = object : LogFileScan<String> {
+                    override fun processLine(line: String) {
+                        throw IllegalStateException("Cannot parse \"$line\"")
+                    }
+
+                    override fun finish(): String = "unreachable"
+                }
+            }
+            val parser = CollectingParser()
+            LogScanner.register(logFileSet, failingParser)
+            LogScanner.register(logFileSet, parser)
+            assertEquals(listOf("line"), LogScanner.scan(listOf(directory), logFileSet, parser)[0].result)
+            assertFailsWith<IllegalStateException> { LogScanner.scan(listOf(directory), logFileSet, failingParser) }
+        }
+    }
+
+}
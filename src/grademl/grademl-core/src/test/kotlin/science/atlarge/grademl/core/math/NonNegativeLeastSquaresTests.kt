@@ -0,0 +1,158 @@
+package science.atlarge.grademl.core.math
+
+import kotlin.math.abs
+import kotlin.random.Random
+import kotlin.test.Test
+import kotlin.test.assertEquals
+import kotlin.test.assertTrue
+
+class NonNegativeLeastSquaresTests {
+
+    // Expected solutions were computed with the BVLS algorithm by Stark and Parker (as used by R's bvls package)
+    // with bounds [0, Inf), which matches the output of the previous R-based implementation
+
+    @Test
+    fun testSmallProblemWithNegativeUnconstrainedSolution() {
+        val matrix = arrayOf(
+            doubleArrayOf(1.0, 0.0, 1.0),
+            doubleArrayOf(0.0, 1.0, 1.0),
+            doubleArrayOf(1.0, 1.0, 0.0),
+            doubleArrayOf(1.0, 1.0, 1.0)
+        )
+        val vector = doubleArrayOf(2.0, -1.0, 1.0, 0.5)
+        assertSolution(doubleArrayOf(1.1666666666666665, 0.0, 0.0), NonNegativeLeastSquares.fit(matrix, vector))
+    }
+
+    @Test
+    fun testDenseOverdeterminedProblem() {
+        val (matrix, vector) = denseProblem()
+        assertSolution(
+            doubleArrayOf(0.4542035551857491, 0.10228911339659852, 0.1778818005115039, 0.0, 0.16885225082806024),
+            NonNegativeLeastSquares.fit(matrix, vector)
+        )
+    }
+
+    @Test
+    fun testSparseProblemWithDuplicateColumn() {
+        val (matrix, vector) = phaseActivityProblem()
+        // Columns 0 and 3 are identical, so only the sum of their coefficients is well-defined
+        val solution = NonNegativeLeastSquares.fit(matrix, vector)
+        assertEquals(3.2525, solution[0] + solution[3], TOLERANCE)
+        assertSolution(
+            doubleArrayOf(1.165, 0.365, 0.74),
+            doubleArrayOf(solution[1], solution[2], solution[4])
+        )
+        assertTrue(solution.all { it >= 0.0 })
+    }
+
+    @Test
+    fun testNaNValuesAreTreatedAsZero() {
+        val (matrix, vector) = denseProblem()
+        val matrixWithNaNs = Array(matrix.size) { row ->
+            DoubleArray(matrix[row].size) { col -> if (matrix[row][col] == 0.0) Double.NaN else matrix[row][col] }
+        }
+        val vectorWithNaNs = DoubleArray(vector.size) { if (vector[it] == 0.0) Double.NaN else vector[it] }
+        assertSolution(
+            NonNegativeLeastSquares.fit(matrix, vector),
+            NonNegativeLeastSquares.fit(matrixWithNaNs, vectorWithNaNs)
+        )
+    }
+
+    @Test
+    fun testRandomProblemsSatisfyOptimalityConditions() {
+        val random = Random(42)
+        repeat(200) {
+            val height = random.nextInt(1, 60)
+            val width = random.nextInt(1, 12)
+            val matrix = Array(height) {
+                DoubleArray(width) { if (random.nextDouble() < 0.5) 0.0 else random.nextDouble() }
+            }
+            val vector = DoubleArray(height) { random.nextDouble(-0.5, 2.0) }
+            assertOptimal(matrix, vector, NonNegativeLeastSquares.fit(matrix, vector))
+        }
+    }
+
+    @Test
+    fun testTallProblemWithSmallCoefficients() {
+        // Large Gram matrix entries must not cause small (but well-determined) coefficients to be fixed at zero
+        val width = 10
+        val matrix = Array(100_000) { row ->
+            DoubleArray(width) { col -> if ((row * (col + 3) + col * 7) % 11 < 5) (row % 7 + 1) / 7.0 else 0.0 }
+        }
+        val expected = DoubleArray(width) { (it + 1) * 1e-9 }
+        val vector = DoubleArray(matrix.size) { row -> matrix[row].indices.sumOf { matrix[row][it] * expected[it] } }
+        val solution = NonNegativeLeastSquares.fit(matrix, vector)
+        for (i in expected.indices) {
+            assertEquals(expected[i], solution[i], expected[i] * 1e-6, "Coefficient $i differs")
+        }
+    }
+
+    @Test
+    fun testWarmStartFindsSameSolution() {
+        val (matrix, vector) = denseProblem()
+        val expected = NonNegativeLeastSquares.fit(matrix, vector)
+        val initialSolutions = listOf(
+            expected,
+            DoubleArray(expected.size) { 1.0 },
+            DoubleArray(expected.size) { if (it % 2 == 0) 0.0 else 5.0 }
+        )
+        for (initialSolution in initialSolutions) {
+            assertSolution(expected, NonNegativeLeastSquares.fit(matrix, vector, initialSolution))
+        }
+    }
+
+    private fun denseProblem(): Pair<Array<DoubleArray>, DoubleArray> {
+        val matrix = Array(40) { row -> DoubleArray(5) { col -> ((row * 7 + col * 3) % 11) / 10.0 } }
+        val vector = DoubleArray(40) { row -> ((row * 5) % 13) / 6.0 - 0.5 }
+        return matrix to vector
+    }
+
+    // Three alternating phase types plus a duplicate of the first, and a variable demand column for half the samples
+    private fun phaseActivityProblem(): Pair<Array<DoubleArray>, DoubleArray> {
+        val matrix = Array(30) { row ->
+            val activePhaseType = (row / 4) % 3
+            DoubleArray(5) { col ->
+                when (col) {
+                    in 0..2 -> if (col == activePhaseType) 1.0 else 0.0
+                    3 -> if (activePhaseType == 0) 1.0 else 0.0
+                    else -> if (row % 2 == 0) 0.5 else 0.0
+                }
+            }
+        }
+        val vector = DoubleArray(30) { row ->
+            val base = when ((row / 4) % 3) {
+                0 -> 3.0 + ((row * 3) % 5) * 0.25
+                1 -> 1.0
+                else -> 0.2
+            }
+            if ((row / 4) % 3 == 0) base else base + if (row % 2 == 0) 0.7 else 0.0
+        }
+        return matrix to vector
+    }
+
+    private fun assertSolution(expected: DoubleArray, actual: DoubleArray) {
+        assertEquals(expected.size, actual.size)
+        for (i in expected.indices) {
+            assertEquals(expected[i], actual[i], TOLERANCE, "Coefficient $i differs")
+        }
+    }
+
+    // Checks the Karush-Kuhn-Tucker conditions: x >= 0, and the gradient of the residual w = A^T (b - Ax) is zero
+    // for positive coefficients and non-positive for coefficients fixed at zero
+    private fun assertOptimal(matrix: Array<DoubleArray>, vector: DoubleArray, solution: DoubleArray) {
+        val residual = DoubleArray(vector.size) { row ->
+            vector[row] - matrix[row].indices.sumOf { col -> matrix[row][col] * solution[col] }
+        }
+        for (col in solution.indices) {
+            assertTrue(solution[col] >= 0.0)
+            val gradient = matrix.indices.sumOf { row -> matrix[row][col] * residual[row] }
+            if (solution[col] > 0.0) assertTrue(abs(gradient) < TOLERANCE, "Gradient $gradient of free coefficient")
+            else assertTrue(gradient < TOLERANCE, "Gradient $gradient of coefficient fixed at zero")
+        }
+    }
+
+    companion object {
+        private const val TOLERANCE = 1e-9
+    }
+
+}
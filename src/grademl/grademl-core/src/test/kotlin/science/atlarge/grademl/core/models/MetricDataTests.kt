@@ -0,0 +1,69 @@
+package science.atlarge.grademl.core.models
+
+import kotlin.test.Test
+import kotlin.test.assertEquals
+import kotlin.test.assertNull
+
+class MetricDataTests {
+
+    // Irregularly sampled data spanning several chunks, with repeated values and a gap in the timestamps
+    private val timestamps = MetricTestData.irregularTimestamps(1300, gapAt = 900)
+    private val values = DoubleArray(1300) { if (it % 5 == 0) 0.25 else (it % 97) * 0.125 - 3.0 }
+    private val arrayData = MetricData(timestamps, values, 10.0)
+    private val compressedData = MetricData.compressed(timestamps, values, 10.0)
+
+    // Times around the boundaries of chunks, within chunks, and outside of the data
+    private val queryTimes = listOf(
+        0L, timestamps.first(), timestamps[1] - 1,
+        timestamps[METRIC_CHUNK_SIZE - 1], timestamps[METRIC_CHUNK_SIZE], timestamps[METRIC_CHUNK_SIZE] + 1,
+        timestamps[700] + 5, timestamps[2 * METRIC_CHUNK_SIZE - 1], timestamps[2 * METRIC_CHUNK_SIZE + 1] - 1,
+        timestamps.last() - 1, timestamps.last(), Long.MAX_VALUE
+    )
+
+    @Test
+    fun testCompressedDataIsDecodedExactly() {
+        assertEquals(timestamps.toList(), compressedData.timestamps.toList())
+        assertEquals(values.toList(), compressedData.values.toList())
+        assertEquals(timestamps.first(), compressedData.firstTimestamp)
+        assertEquals(timestamps.last(), compressedData.lastTimestamp)
+        assertEquals(values.size, compressedData.periodCount)
+    }
+
+    @Test
+    fun testSlicesMatchUncompressedData() {
+        for (startTime in queryTimes) {
+            for (endTime in queryTimes) {
+                if (endTime <= startTime) continue
+                val expected = arrayData.slice(startTime, endTime)
+                val actual = compressedData.slice(startTime, endTime)
+                assertEquals(expected.timestamps.toList(), actual.timestamps.toList())
+                assertEquals(expected.values.toList(), actual.values.toList())
+                assertEquals(arrayData.valueRange(startTime, endTime), compressedData.valueRange(startTime, endTime))
+            }
+        }
+        assertNull(compressedData.valueRange(timestamps.last(), Long.MAX_VALUE))
+    }
+
+    @Test
+    fun testIteratorsMatchUncompressedData() {
+        assertIteratorsEqual(arrayData.iterator(), compressedData.iterator())
+        for (startTime in queryTimes) {
+            assertIteratorsEqual(arrayData.iteratorFrom(startTime), compressedData.iteratorFrom(startTime))
+        }
+    }
+
+    private fun assertIteratorsEqual(expected: MetricDataIterator, actual: MetricDataIterator) {
+        while (true) {
+            assertEquals(expected.currentStartTime, actual.currentStartTime)
+            assertEquals(expected.currentEndTime, actual.currentEndTime)
+            assertEquals(expected.currentValue, actual.currentValue)
+            assertEquals(expected.peekNextEndTime(), actual.peekNextEndTime())
+            assertEquals(expected.peekNextValue(), actual.peekNextValue())
+            assertEquals(expected.hasNext, actual.hasNext)
+            if (!expected.hasNext) break
+            expected.next()
+            actual.next()
+        }
+    }
+
+}
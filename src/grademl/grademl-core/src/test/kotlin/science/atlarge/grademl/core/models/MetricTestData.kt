@@ -0,0 +1,14 @@
+package science.atlarge.grademl.core.models
+
+// Metric data shared by tests of compressed metrics and of job snapshots
+internal object MetricTestData {
+
+    // Timestamps of an irregularly sampled metric with the given number of periods, which span several chunks of
+    // METRIC_CHUNK_SIZE periods if there are enough. Periods are about 10 ms long, and if gapAt is given, the sample
+    // at that index and all later samples are delayed by an extra 5 us.
+    fun irregularTimestamps(periodCount: Int, gapAt: Int? = null) = LongArray(periodCount + 1) {
+        val gap = if (gapAt != null && it >= gapAt) 5_000L else 0L
+        1_000_000_000L + it * 10_000_000L + (it % 7) * 13L + gap
+    }
+
+}
@@ -0,0 +1,89 @@
+package science.atlarge.grademl.core.snapshot
+
+import science.atlarge.grademl.core.models.ChunkedTimestamps
+import science.atlarge.grademl.core.models.Environment
+import science.atlarge.grademl.core.models.ExecutionModel
+import science.atlarge.grademl.core.models.MetricData
+import science.atlarge.grademl.core.models.MetricTestData
+import science.atlarge.grademl.core.models.ResourceModel
+import java.nio.file.Files
+import java.nio.file.Path
+import kotlin.test.Test
+import kotlin.test.assertEquals
+import kotlin.test.assertFalse
+import kotlin.test.assertTrue
+
+class JobSnapshotTests {
+
+    // Two compressed metrics of one monitor that share their timestamps, spanning several chunks, and one uncompressed
+    private val timestamps = MetricTestData.irregularTimestamps(1300)
+    private val cpuValues = DoubleArray(1300) { (it % 97) * 0.125 }
+    private val memoryValues = DoubleArray(1300) { if (it % 5 == 0) 0.5 else 2.0 + it }
+    private val diskValues = doubleArrayOf(1.0, 3.0, 2.0)
+
+    private fun withJobDirectory(test: (Path) -> Unit) {
+        val directory = Files.createTempDirectory("job-snapshot-test")
+        try {
+            Files.writeString(directory.resolve("input.log"), "log contents")
+            test(directory)
+        } finally {
+            directory.toFile().deleteRecursively()
+        }
+    }
+
+    // Stores the snapshot with the job's input files, as the query CLI does if the analysis directory is nested
+    private fun snapshotOf(directory: Path): JobSnapshot {
+        val analysisDirectory = directory.resolve("analysis")
+        return JobSnapshot(
+            analysisDirectory.resolve(".job-snapshot"), listOf(directory), emptyList(), analysisDirectory
+        )
+    }
+
+    @Test
+    fun testCompressedMetricsStayCompressedAfterLoading() {
+        withJobDirectory { directory ->
+            val resourceModel = ResourceModel()
+            val machine = resourceModel.addResource("machine")
+            val sharedTimestamps = ChunkedTimestamps(timestamps)
+            machine.addMetric("cpu", MetricData.compressed(sharedTimestamps, cpuValues, 100.0))
+            machine.addMetric("memory", MetricData.compressed(sharedTimestamps, memoryValues, 4096.0))
+            machine.addMetric("disk", MetricData(longArrayOf(0L, 10L, 20L, 30L), diskValues, 5.0))
+            snapshotOf(directory).write(ExecutionModel(), resourceModel, Environment())
+
+            val loadedResourceModel = ResourceModel()
+            snapshotOf(directory).use { snapshot ->
+                assertTrue(snapshot.readInto(ExecutionModel(), loadedResourceModel, Environment()))
+                val metrics = loadedResourceModel.resources.single { it.name == "machine" }.metricsByName
+                for ((name, values) in listOf("cpu" to cpuValues, "memory" to memoryValues)) {
+                    val data = metrics.getValue(name).data
+                    assertTrue(data.isCompressed, "Metric $name is not compressed")
+                    assertEquals(timestamps.toList(), data.timestamps.toList())
+                    assertEquals(values.toList(), data.values.toList())
+                    val valueRange = data.valueRange(timestamps[600], timestamps[700])
+                    assertEquals(values.slice(600 until 700).minOrNull(), valueRange?.start)
+                }
+                assertEquals(4096.0, metrics.getValue("memory").data.maxValue)
+
+                val diskData = metrics.getValue("disk").data
+                assertFalse(diskData.isCompressed)
+                assertFalse(diskData.isLoaded)
+                assertEquals(listOf(0L, 10L, 20L, 30L), diskData.timestamps.toList())
+                assertEquals(diskValues.toList(), diskData.values.toList())
+            }
+        }
+    }
+
+    @Test
+    fun testSnapshotIsIgnoredAfterInputChanges() {
+        withJobDirectory { directory ->
+            val resourceModel = ResourceModel()
+            resourceModel.addResource("machine").addMetric("cpu", MetricData.compressed(timestamps, cpuValues, 1.0))
+            snapshotOf(directory).write(ExecutionModel(), resourceModel, Environment())
+            Files.writeString(directory.resolve("input.log"), "modified log contents")
+            snapshotOf(directory).use { snapshot ->
+                assertFalse(snapshot.readInto(ExecutionModel(), ResourceModel(), Environment()))
+            }
+        }
+    }
+
+}
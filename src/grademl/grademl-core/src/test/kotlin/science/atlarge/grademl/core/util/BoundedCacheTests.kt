@@ -0,0 +1,74 @@
+package science.atlarge.grademl.core.util
+
+import java.nio.file.Files
+import kotlin.test.Test
+import kotlin.test.assertEquals
+import kotlin.test.assertFalse
+import kotlin.test.assertTrue
+
+class BoundedCacheTests {
+
+    @Test
+    fun testValuesAreComputedOnceWithinBudget() {
+        var computations = 0
+        val cache = BoundedCache<Int, String>(1000, { 10 }) { computations++; "value $it" }
+        repeat(3) {
+            for (key in 0 until 10) assertEquals("value $key", cache[key])
+        }
+        assertEquals(10, computations)
+        val statistics = cache.statistics()
+        assertEquals(20, statistics.hits)
+        assertEquals(10, statistics.misses)
+        assertEquals(0, statistics.evictions)
+        assertEquals(100, statistics.cachedBytes)
+    }
+
+    @Test
+    fun testLeastRecentlyUsedValuesAreEvicted() {
+        val computedKeys = mutableListOf<Int>()
+        val cache = BoundedCache<Int, Int>(30, { 10 }) { computedKeys.add(it); it * 2 }
+        cache[1]
+        cache[2]
+        cache[3]
+        cache[1]
+        // Adding a fourth value evicts the least recently used value (2)
+        cache[4]
+        cache[1]
+        cache[3]
+        cache[2]
+        assertEquals(listOf(1, 2, 3, 4, 2), computedKeys)
+        assertEquals(2, cache.statistics().evictions)
+        assertEquals(3, cache.statistics().cachedValues)
+    }
+
+    @Test
+    fun testEvictedValuesAreReadFromSpillFile() {
+        val spillDirectory = Files.createTempDirectory("bounded-cache-test")
+        try {
+            var computations = 0
+            val spillFile = SpillFile<Int, LongArray>(
+                spillDirectory.resolve("values"),
+                { value -> writeInt(value.size); value.forEach { writeLong(it) } },
+                { LongArray(readInt()) { readLong() } }
+            )
+            val cache = BoundedCache<Int, LongArray>(100, { it.size * 8L }, spillFile) { key ->
+                computations++
+                LongArray(key) { it * 3L }
+            }
+            for (key in listOf(10, 5, 10, 8, 5, 10)) {
+                assertEquals(LongArray(key) { it * 3L }.toList(), cache[key].toList())
+            }
+            // Every value is spilled once when first evicted, and read back instead of being recomputed
+            assertEquals(3, computations)
+            assertEquals(3, cache.statistics().spillReads)
+            assertEquals(3, cache.statistics().spilledValues)
+            // Closing the spill file deletes it
+            assertTrue(Files.exists(spillDirectory.resolve("values")))
+            spillFile.close()
+            assertFalse(Files.exists(spillDirectory.resolve("values")))
+        } finally {
+            spillDirectory.toFile().deleteRecursively()
+        }
+    }
+
+}
@@ -12,6 +12,14 @@ import kotlin.system.exitProcess
 
 object Airflow : InputSource {
 
+    init {
+        AirflowLogParser.registerLogParser()
+    }
+
+    // Airflow tasks are connected to the phases of the Spark and TensorFlow jobs they launched
+    override val parsesIndependently: Boolean
+        get() = false
+
     override fun parseJobData(
         jobDataDirectories: Iterable<Path>,
         unifiedExecutionModel: ExecutionModel,
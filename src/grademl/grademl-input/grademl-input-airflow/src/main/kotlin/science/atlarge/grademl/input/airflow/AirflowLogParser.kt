@@ -1,5 +1,9 @@
 package science.atlarge.grademl.input.airflow
 
+import science.atlarge.grademl.core.input.LogFileScan
+import science.atlarge.grademl.core.input.LogFileSet
+import science.atlarge.grademl.core.input.LogParser
+import science.atlarge.grademl.core.input.LogScanner
 import science.atlarge.grademl.core.util.TimestampNs
 import java.io.File
 import java.nio.file.Files
@@ -72,15 +76,6 @@ class AirflowLogParser private constructor(
             }
         }
 
-    private fun findLogFiles(): List<File> =
-        airflowLogDirectories.flatMap { directory ->
-            Files.walk(directory).use { fileList ->
-                fileList.map { it.toFile() }
-                    .filter { it.isFile && it.extension == "log" }
-                    .toList()
-            }
-        }
-
     private fun parseDagIds() {
         dagIds.addAll(findDagFiles().map { it.nameWithoutExtension })
         require(dagIds.isNotEmpty()) { "No files matching '*.dag' found in $airflowLogDirectories" }
@@ -162,34 +157,31 @@ class AirflowLogParser private constructor(
     }
 
     private fun parseTaskInformationFiles() {
-        for (logFile in findLogFiles()) {
-            parseTaskInformation(logFile)
+        // Scan the task logs, together with other parsers of Airflow task logs (e.g., for TensorFlow jobs)
+        for (taskLog in LogScanner.scan(airflowLogDirectories, TASK_LOG_FILES, TaskLogParser)) {
+            parseTaskInformation(taskLog.logFile, taskLog.result)
         }
     }
 
-    private fun parseTaskInformation(taskLogFile: File) {
-        // Read the log file
-        val logLines = taskLogFile.readLines()
+    private fun parseTaskInformation(taskLogFile: File, taskLog: TaskLog) {
+        val logLines = taskLog.lines
 
         // Find the DAG ID for this task
-        val dagId = logLines.first { it.startsWith("AIRFLOW_CTX_DAG_ID=") }
-            .split("=", limit = 2)[1].trim()
+        val dagId = requireNotNull(taskLog.dagId) { "No AIRFLOW_CTX_DAG_ID found in \"$taskLogFile\"" }
         require(dagId in dagIds) { "Found task log for unknown DAG: \"$dagId\"" }
 
         // Find the run ID for this task
-        val runId = logLines.first { it.startsWith("AIRFLOW_CTX_DAG_RUN_ID=") }
-            .split("=", limit = 2)[1].trim()
+        val runId = requireNotNull(taskLog.runId) { "No AIRFLOW_CTX_DAG_RUN_ID found in \"$taskLogFile\"" }
         require(runId in runIdsPerDag[dagId].orEmpty()) {
             "Found task log for unknown run: \"$runId\" (DAG: \"$dagId\")"
         }
 
         // Find the task ID for this task
-        val taskId = logLines.first { it.startsWith("AIRFLOW_CTX_TASK_ID=") }
-            .split("=", limit = 2)[1].trim()
+        val taskId = requireNotNull(taskLog.taskId) { "No AIRFLOW_CTX_TASK_ID found in \"$taskLogFile\"" }
 
         // Find records of the start and end time of the task
-        val startTimeLine = logLines.first { "INFO - Executing <Task" in it }
-        val endTimeLine = logLines.last { "INFO - Marking task" in it }
+        val startTimeLine = requireNotNull(taskLog.startTimeLine) { "No start of task found in \"$taskLogFile\"" }
+        val endTimeLine = requireNotNull(taskLog.endTimeLine) { "No end of task found in \"$taskLogFile\"" }
 
         // Parse dates and times (assuming local time)
         fun parseDateTime(dateTime: String): Long {
@@ -211,8 +203,58 @@ class AirflowLogParser private constructor(
             .getOrPut(runId) { mutableMapOf() }[taskId] = logLines
     }
 
+    // Lines of a task log, and the lines that identify the task and record its start and end time
+    private class TaskLog(
+        val lines: List<String>,
+        val dagId: AirflowDagId?,
+        val runId: AirflowRunId?,
+        val taskId: AirflowTaskId?,
+        val startTimeLine: String?,
+        val endTimeLine: String?
+    )
+
+    // Reads all lines of every task log, because task logs are kept to connect tasks to the jobs they launched
+    private object TaskLogParser : LogParser<TaskLog> {
+        override fun startFile(logFile: File): LogFileScan<TaskLog> = TaskLogScan()
+    }
+
+    private class TaskLogScan : LogFileScan<TaskLog> {
+
+        private val lines = mutableListOf<String>()
+        private var dagId: AirflowDagId? = null
+        private var runId: AirflowRunId? = null
+        private var taskId: AirflowTaskId? = null
+        private var startTimeLine: String? = null
+        private var endTimeLine: String? = null
+
+        override fun processLine(line: String) {
+            lines.add(line)
+            if (line.startsWith("AIRFLOW_CTX_")) {
+                val value = line.substringAfter("=", "").trim()
+                when {
+                    line.startsWith("AIRFLOW_CTX_DAG_ID=") -> if (dagId == null) dagId = value
+                    line.startsWith("AIRFLOW_CTX_DAG_RUN_ID=") -> if (runId == null) runId = value
+                    line.startsWith("AIRFLOW_CTX_TASK_ID=") -> if (taskId == null) taskId = value
+                }
+            }
+            if (startTimeLine == null && "INFO - Executing <Task" in line) startTimeLine = line
+            if ("INFO - Marking task" in line) endTimeLine = line
+        }
+
+        override fun finish(): TaskLog = TaskLog(lines, dagId, runId, taskId, startTimeLine, endTimeLine)
+
+    }
+
     companion object {
 
+        // Task logs, which are scanned once for Airflow tasks and the TensorFlow jobs they ran
+        private val TASK_LOG_FILES = LogFileSet(extension = "log", recursive = true)
+
+        // Registers the parser for task logs, so it is included when other input sources scan Airflow task logs
+        fun registerLogParser() {
+            LogScanner.register(TASK_LOG_FILES, TaskLogParser)
+        }
+
         fun parseFromDirectories(airflowLogDirectories: Iterable<Path>): AirflowLog {
             return AirflowLogParser(airflowLogDirectories).parse()
         }
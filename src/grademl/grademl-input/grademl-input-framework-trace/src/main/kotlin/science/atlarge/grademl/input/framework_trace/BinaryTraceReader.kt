@@ -0,0 +1,89 @@
+package science.atlarge.grademl.input.framework_trace
+
+import java.io.EOFException
+import java.io.File
+import java.io.IOException
+import java.io.InputStream
+
+// Reads the binary trace format written by the tracing-overhead benchmark harness (benchmark/tracefile.py):
+//   header:  magic "GMLTRC01", base time (little-endian Long, Unix time in ns)
+//   string:  tag 1, length (LEB128), UTF-8 bytes
+//   event:   tag 2, name (LEB128 string index), thread (LEB128), start (LEB128, ns since base time),
+//            duration (LEB128, ns)
+internal object BinaryTraceReader {
+
+    private val MAGIC = "GMLTRC01".toByteArray(Charsets.US_ASCII)
+    private const val RECORD_STRING = 1
+    private const val RECORD_EVENT = 2
+
+    fun read(traceFile: File, collector: TraceEventCollector) {
+        traceFile.inputStream().buffered(1 shl 16).use { stream ->
+            require(stream.readNBytes(MAGIC.size).contentEquals(MAGIC)) {
+                "File \"$traceFile\" is not a binary trace file"
+            }
+            collector.baseTime = stream.readLELong()
+
+            val names = mutableListOf<String>()
+            val threadIds = mutableMapOf<Long, String>()
+            try {
+                while (true) {
+                    when (val recordType = stream.read()) {
+                        -1 -> break
+                        RECORD_STRING -> {
+                            val length = stream.readLEB128Int()
+                            val bytes = stream.readNBytes(length)
+                            if (bytes.size < length) break
+                            names.add(String(bytes, Charsets.UTF_8))
+                        }
+                        RECORD_EVENT -> {
+                            val name = names[stream.readLEB128Int()]
+                            val thread = stream.readLEB128Long()
+                            val startTime = stream.readLEB128Long()
+                            val duration = stream.readLEB128Long()
+                            val threadId = threadIds.getOrPut(thread) { thread.toString() }
+                            collector.addEvent("", threadId, name, startTime, startTime + duration)
+                        }
+                        else -> throw IllegalArgumentException(
+                            "Unknown record type $recordType in binary trace file \"$traceFile\""
+                        )
+                    }
+                }
+            } catch (e: EOFException) {
+                // Ignore a partially written trailing record, e.g., if the benchmark was interrupted
+            }
+        }
+    }
+
+    private fun InputStream.readLELong(): Long {
+        var value = 0L
+        for (i in 0 until 8) {
+            val nextByte = read()
+            if (nextByte < 0)
+                throw EOFException("Reached end-of-stream before reaching the end of the Long value")
+            value = value or (nextByte.toLong() shl i * 8)
+        }
+        return value
+    }
+
+    private fun InputStream.readLEB128Int(): Int {
+        val value = readLEB128Long()
+        if (value > Int.MAX_VALUE)
+            throw IOException("LEB128 value $value does not fit in an Int")
+        return value.toInt()
+    }
+
+    private fun InputStream.readLEB128Long(): Long {
+        var value = 0L
+        var index = 0
+        var nextByte: Int
+        do {
+            nextByte = read()
+            if (nextByte < 0)
+                throw EOFException("Reached end-of-stream before reaching the end of the Long value")
+            value = value or ((nextByte.toLong() and 0x7F) shl index)
+            index += 7
+        } while ((nextByte and 0x80) != 0)
+        return value
+    }
+
+}
@@ -0,0 +1,235 @@
+package science.atlarge.grademl.input.framework_trace
+
+import java.io.EOFException
+import java.io.File
+import java.io.Reader
+import java.util.zip.GZIPInputStream
+import kotlin.math.roundToLong
+
+// Streaming reader for the Chrome trace event format, as produced by, e.g., PyTorch's export_chrome_trace and the
+// TensorFlow profiler. Events are read one at a time and only their name, phase, timestamps, process, and thread are
+// retained, so the size of a trace is not limited by the memory needed to hold it as a JSON tree. Both the JSON array
+// format and the JSON object format (with a "traceEvents" array) are supported. Complete ("X") events and matching
+// begin/end ("B"/"E") events are collected; all other event types are skipped.
+internal class ChromeTraceReader private constructor(
+    private val reader: Reader,
+    private val collector: TraceEventCollector
+) {
+
+    private val buffer = CharArray(BUFFER_SIZE)
+    private var position = 0
+    private var limit = 0
+    private val stringBuilder = StringBuilder()
+
+    private val openEvents = mutableMapOf<Pair<String, String>, ArrayDeque<Pair<String, Long>>>()
+
+    private fun read() {
+        try {
+            when (peek()) {
+                '['.code -> readEventArray()
+                '{'.code -> readTraceObject()
+                else -> throw parseError("Expected a JSON array or object")
+            }
+        } catch (e: EOFException) {
+            // Keep the events read so far from a truncated trace, e.g., if the benchmark was interrupted
+        }
+    }
+
+    private fun readTraceObject() {
+        expect('{')
+        if (tryConsume('}')) return
+        do {
+            val key = readString()
+            expect(':')
+            when (key) {
+                "traceEvents" -> readEventArray()
+                // Some profilers (e.g., Kineto) record timestamps relative to this base time
+                "baseTimeNanoseconds" -> collector.baseTime = readScalar().toDouble().roundToLong()
+                else -> skipValue()
+            }
+        } while (tryConsume(','))
+        expect('}')
+    }
+
+    private fun readEventArray() {
+        expect('[')
+        if (tryConsume(']')) return
+        do {
+            readEvent()
+        } while (tryConsume(','))
+        expect(']')
+    }
+
+    private fun readEvent() {
+        var name = ""
+        var phase = ""
+        var processId = ""
+        var threadId = ""
+        var timestamp: Long? = null
+        var duration = 0L
+
+        expect('{')
+        if (!tryConsume('}')) {
+            do {
+                val key = readString()
+                expect(':')
+                when (key) {
+                    "name" -> name = readScalar()
+                    "ph" -> phase = readScalar()
+                    "pid" -> processId = readScalar()
+                    "tid" -> threadId = readScalar()
+                    "ts" -> timestamp = microsecondsToNanoseconds(readScalar())
+                    "dur" -> duration = microsecondsToNanoseconds(readScalar())
+                    else -> skipValue()
+                }
+            } while (tryConsume(','))
+            expect('}')
+        }
+
+        if (timestamp == null) return
+        when (phase) {
+            "X" -> collector.addEvent(processId, threadId, name, timestamp, timestamp + duration)
+            "B" -> openEvents.getOrPut(processId to threadId) { ArrayDeque() }.addLast(name to timestamp)
+            "E" -> {
+                val (beginName, beginTimestamp) = openEvents[processId to threadId]?.removeLastOrNull() ?: return
+                collector.addEvent(processId, threadId, beginName, beginTimestamp, timestamp)
+            }
+        }
+    }
+
+    private fun skipValue() {
+        when (peek()) {
+            '{'.code -> {
+                expect('{')
+                if (tryConsume('}')) return
+                do {
+                    readString()
+                    expect(':')
+                    skipValue()
+                } while (tryConsume(','))
+                expect('}')
+            }
+            '['.code -> {
+                expect('[')
+                if (tryConsume(']')) return
+                do {
+                    skipValue()
+                } while (tryConsume(','))
+                expect(']')
+            }
+            else -> readScalar()
+        }
+    }
+
+    // Reads a string, number, or literal as text
+    private fun readScalar(): String {
+        if (peek() == '"'.code) return readString()
+        stringBuilder.setLength(0)
+        while (true) {
+            if (position >= limit && !fillBuffer()) break
+            val c = buffer[position]
+            if (c == ',' || c == '}' || c == ']' || c.isWhitespace()) break
+            stringBuilder.append(c)
+            position++
+        }
+        if (stringBuilder.isEmpty()) throw parseError("Expected a JSON value")
+        return stringBuilder.toString()
+    }
+
+    private fun readString(): String {
+        expect('"')
+        stringBuilder.setLength(0)
+        while (true) {
+            val c = nextChar()
+            when (c) {
+                '"' -> return stringBuilder.toString()
+                '\\' -> when (val escaped = nextChar()) {
+                    'b' -> stringBuilder.append('\b')
+                    'f' -> stringBuilder.append('\u000C')
+                    'n' -> stringBuilder.append('\n')
+                    'r' -> stringBuilder.append('\r')
+                    't' -> stringBuilder.append('\t')
+                    'u' -> {
+                        var codePoint = 0
+                        repeat(4) { codePoint = codePoint * 16 + Character.digit(nextChar(), 16) }
+                        stringBuilder.append(codePoint.toChar())
+                    }
+                    else -> stringBuilder.append(escaped)
+                }
+                else -> stringBuilder.append(c)
+            }
+        }
+    }
+
+    private fun expect(c: Char) {
+        if (peek() != c.code) throw parseError("Expected '$c'")
+        position++
+    }
+
+    private fun tryConsume(c: Char): Boolean {
+        if (peek() != c.code) return false
+        position++
+        return true
+    }
+
+    // Returns the next non-whitespace character without consuming it
+    private fun peek(): Int {
+        while (true) {
+            if (position >= limit && !fillBuffer()) throw EOFException("Reached end of trace while parsing")
+            if (!buffer[position].isWhitespace()) return buffer[position].code
+            position++
+        }
+    }
+
+    private fun nextChar(): Char {
+        if (position >= limit && !fillBuffer()) throw EOFException("Reached end of trace while parsing")
+        return buffer[position++]
+    }
+
+    private fun fillBuffer(): Boolean {
+        limit = reader.read(buffer)
+        position = 0
+        if (limit <= 0) {
+            limit = 0
+            return false
+        }
+        return true
+    }
+
+    private fun parseError(message: String): IllegalArgumentException {
+        val found = if (position < limit) "'${buffer[position]}'" else "end of buffer"
+        return IllegalArgumentException("$message in Chrome trace, found $found")
+    }
+
+    companion object {
+        private const val BUFFER_SIZE = 1 shl 16
+
+        fun read(traceFile: File, collector: TraceEventCollector) {
+            traceFile.bufferedReader().use { ChromeTraceReader(it, collector).read() }
+        }
+
+        // Reads a gzip-compressed trace, e.g., the *.trace.json.gz files written by the TensorFlow profiler
+        fun readCompressed(traceFile: File, collector: TraceEventCollector) {
+            GZIPInputStream(traceFile.inputStream(), BUFFER_SIZE).bufferedReader().use {
+                ChromeTraceReader(it, collector).read()
+            }
+        }
+
+        // Converts a decimal number of microseconds to nanoseconds without rounding errors for large timestamps
+        fun microsecondsToNanoseconds(value: String): Long {
+            if ('e' in value || 'E' in value) return (value.toDouble() * 1000).roundToLong()
+            val negative = value.startsWith('-')
+            val digits = if (negative) value.substring(1) else value
+            val dot = digits.indexOf('.')
+            val nanoseconds = if (dot < 0) {
+                digits.toLong() * 1000
+            } else {
+                val integerPart = if (dot == 0) 0L else digits.substring(0, dot).toLong()
+                val fractionPart = digits.substring(dot + 1).take(3).padEnd(3, '0').toLong()
+                integerPart * 1000 + fractionPart
+            }
+            return if (negative) -nanoseconds else nanoseconds
+        }
+    }
+
+}
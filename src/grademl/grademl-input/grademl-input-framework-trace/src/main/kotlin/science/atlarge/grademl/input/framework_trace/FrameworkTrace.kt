@@ -0,0 +1,151 @@
+package science.atlarge.grademl.input.framework_trace
+
+import science.atlarge.grademl.core.GradeMLJobStatusUpdate
+import science.atlarge.grademl.core.input.InputSource
+import science.atlarge.grademl.core.models.Environment
+import science.atlarge.grademl.core.models.ExecutionModel
+import science.atlarge.grademl.core.models.ExecutionPhase
+import science.atlarge.grademl.core.models.ResourceModel
+import java.nio.file.Path
+import java.nio.file.Paths
+import kotlin.system.exitProcess
+
+object FrameworkTrace : InputSource {
+
+    private val INVALID_NAME_CHARACTERS = "[/:\\[\\],=]".toRegex()
+
+    override fun parseJobData(
+        jobDataDirectories: Iterable<Path>,
+        unifiedExecutionModel: ExecutionModel,
+        unifiedResourceModel: ResourceModel,
+        jobEnvironment: Environment
+    ): Boolean {
+        return parseJobData(jobDataDirectories, unifiedExecutionModel, unifiedResourceModel, jobEnvironment) { }
+    }
+
+    override fun parseJobData(
+        jobDataDirectories: Iterable<Path>,
+        unifiedExecutionModel: ExecutionModel,
+        unifiedResourceModel: ResourceModel,
+        jobEnvironment: Environment,
+        progressReport: (GradeMLJobStatusUpdate) -> Unit
+    ): Boolean {
+        // Find framework trace directories
+        val traceDirectories = jobDataDirectories
+            .map { it.resolve("logs").resolve("framework-trace") }
+            .filter { it.toFile().isDirectory }
+        if (traceDirectories.isEmpty()) return false
+
+        // Parse trace files
+        val traceLog = FrameworkTraceParser.parseFromDirectories(traceDirectories) { message ->
+            progressReport(GradeMLJobStatusUpdate.Warning(message))
+        }
+
+        // Iterate over traces to build the execution model
+        for (trace in traceLog.traces) {
+            // Add execution phase for trace
+            val tracePhase = unifiedExecutionModel.addPhase(
+                name = "FrameworkTrace",
+                tags = mapOf("trace" to sanitizeName(trace.name)),
+                startTime = trace.startTime,
+                endTime = trace.endTime
+            )
+            // Add execution phases for threads
+            for (thread in trace.threads) {
+                val threadTags = if (thread.processId.isEmpty()) {
+                    mapOf("tid" to sanitizeName(thread.threadId))
+                } else {
+                    mapOf("pid" to sanitizeName(thread.processId), "tid" to sanitizeName(thread.threadId))
+                }
+                val threadPhase = unifiedExecutionModel.addPhase(
+                    name = "Thread",
+                    tags = threadTags,
+                    typeTags = emptySet(),
+                    startTime = thread.startTime,
+                    endTime = thread.endTime,
+                    parent = tracePhase
+                )
+                addEventPhases(thread.events, threadPhase, unifiedExecutionModel, !thread.eventsAggregated)
+            }
+        }
+
+        return true
+    }
+
+    private fun addEventPhases(
+        events: List<TraceEvent>,
+        parent: ExecutionPhase,
+        executionModel: ExecutionModel,
+        eventsInOrder: Boolean
+    ) {
+        val occurrencesPerName = mutableMapOf<String, Int>()
+        var lastEventPhase: ExecutionPhase? = null
+        for (event in events) {
+            // Add execution phase for event, numbering repeated events with the same name
+            val name = sanitizeName(event.name)
+            val occurrence = (occurrencesPerName[name] ?: 0) + 1
+            occurrencesPerName[name] = occurrence
+            val metadata = mutableMapOf<String, String>()
+            if (name != event.name) metadata["event"] = event.name
+            if (!eventsInOrder) {
+                metadata["occurrences"] = event.occurrences.toString()
+                metadata["busy-time-ns"] = event.busyTime.toString()
+            }
+            val eventPhase = executionModel.addPhase(
+                name = name,
+                tags = mapOf("id" to occurrence.toString()),
+                typeTags = emptySet(),
+                metadata = metadata,
+                startTime = event.startTime,
+                endTime = event.endTime,
+                parent = parent
+            )
+            // Events on the same thread execute in order, unless they are aggregated (and thus overlap)
+            if (eventsInOrder) {
+                lastEventPhase?.addOutgoingDataflow(eventPhase)
+                lastEventPhase = eventPhase
+            }
+            addEventPhases(event.children, eventPhase, executionModel, eventsInOrder)
+        }
+    }
+
+    // Replace characters that cannot be used in phase paths, e.g., in "aten::conv2d"
+    private fun sanitizeName(name: String): String {
+        return name.replace(INVALID_NAME_CHARACTERS, "_").ifEmpty { "_" }
+    }
+
+}
+
+// Wrapper for testing the trace parser
+fun main(args: Array<String>) {
+    if (args.isEmpty() || args[0] == "--help") {
+        println("Arguments: <jobDataDirectory> [...]")
+        exitProcess(if (args.isEmpty()) -1 else 0)
+    }
+
+    val executionModel = ExecutionModel()
+    val foundTraces =
+        FrameworkTrace.parseJobData(args.map { Paths.get(it) }, executionModel, ResourceModel(), Environment())
+    require(foundTraces) {
+        "Cannot find framework traces in any of the given jobDataDirectories"
+    }
+    println("Execution model extracted from framework traces:")
+
+    fun printPhase(phase: ExecutionPhase, indent: String) {
+        println("$indent/${phase.identifier}")
+        println(
+            "$indent      Start time:          %d.%09d"
+                .format(phase.startTime / 1_000_000_000, phase.startTime % 1_000_000_000)
+        )
+        println(
+            "$indent      End time:            %d.%09d"
+                .format(phase.endTime / 1_000_000_000, phase.endTime % 1_000_000_000)
+        )
+        for (childPhase in phase.children.sortedBy { it.startTime }) {
+            printPhase(childPhase, "$indent  ")
+        }
+    }
+    for (topLevelPhase in executionModel.rootPhase.children.sortedBy { it.identifier }) {
+        printPhase(topLevelPhase, "  ")
+    }
+}
@@ -0,0 +1,265 @@
+package science.atlarge.grademl.input.framework_trace
+
+import science.atlarge.grademl.core.util.DurationNs
+import science.atlarge.grademl.core.util.LongArrayBuilder
+import science.atlarge.grademl.core.util.TimestampNs
+import java.io.File
+import java.nio.file.Files
+import java.nio.file.Path
+import kotlin.streams.toList
+
+class FrameworkTraceParser private constructor(
+    private val traceDirectories: Iterable<Path>,
+    private val maxEventDepth: Int,
+    private val maxEventsPerThread: Int,
+    private val warningReport: (String) -> Unit
+) {
+
+    private fun parse(): FrameworkTraceLog {
+        val traceFiles = findTraceFiles()
+        // Name traces by their path in the trace directory, e.g., "run1/trace.json", numbering traces with the same
+        // path in different trace directories
+        val occurrencesPerName = mutableMapOf<String, Int>()
+        return FrameworkTraceLog(
+            traceFiles.mapNotNull { (traceDirectory, traceFile) ->
+                val relativePath = traceDirectory.relativize(traceFile.toPath()).joinToString("/")
+                val occurrence = (occurrencesPerName[relativePath] ?: 0) + 1
+                occurrencesPerName[relativePath] = occurrence
+                parseTraceFile(traceFile, if (occurrence == 1) relativePath else "$relativePath#$occurrence")
+            }
+        )
+    }
+
+    private fun findTraceFiles(): List<Pair<Path, File>> {
+        // Find all Chrome trace (JSON, optionally compressed as by TensorBoard's profiler) and binary trace files in
+        // the trace directories
+        return traceDirectories.flatMap { directory ->
+            Files.walk(directory).use { fileList ->
+                fileList.map { it.toFile() }
+                    .filter { file -> file.isFile && TRACE_EXTENSIONS.any { file.name.endsWith(".$it") } }
+                    .sorted()
+                    .map { directory to it }
+                    .toList()
+            }
+        }
+    }
+
+    private fun parseTraceFile(traceFile: File, traceName: String): FrameworkTraceFile? {
+        val collector = TraceEventCollector()
+        when {
+            traceFile.name.endsWith(".$BINARY_TRACE_EXTENSION") -> BinaryTraceReader.read(traceFile, collector)
+            traceFile.name.endsWith(".$COMPRESSED_CHROME_TRACE_EXTENSION") ->
+                ChromeTraceReader.readCompressed(traceFile, collector)
+            else -> ChromeTraceReader.read(traceFile, collector)
+        }
+        // Skip JSON files that do not contain any trace events
+        if (collector.isEmpty) return null
+        if (collector.baseTime == null) {
+            // Skip traces that cannot be placed in time, instead of failing the analysis of the job
+            val startTime = readStartTime(traceFile) ?: return null
+            collector.alignToStartTime(startTime)
+        }
+        return collector.build(traceName, maxEventDepth, maxEventsPerThread)
+    }
+
+    // Reads the wall-clock time at which the profiler that produced a Chrome trace was started, as recorded by the
+    // benchmark harness, because Chrome traces without a base time have timestamps relative to an unknown start time
+    private fun readStartTime(traceFile: File): TimestampNs? {
+        val startTimeFile = File(traceFile.path + START_TIME_SUFFIX)
+        if (!startTimeFile.isFile) {
+            warningReport(
+                "Skipping trace file \"$traceFile\", because it does not specify a baseTimeNanoseconds and the " +
+                        "profiler start time is not recorded in \"$startTimeFile\""
+            )
+            return null
+        }
+        val startTime = startTimeFile.readText().trim().toLongOrNull()
+        if (startTime == null) {
+            warningReport(
+                "Skipping trace file \"$traceFile\", because \"$startTimeFile\" does not contain a timestamp in " +
+                        "nanoseconds"
+            )
+        }
+        return startTime
+    }
+
+    companion object {
+        const val CHROME_TRACE_EXTENSION = "json"
+        const val COMPRESSED_CHROME_TRACE_EXTENSION = "json.gz"
+        const val BINARY_TRACE_EXTENSION = "gmltrace"
+        private val TRACE_EXTENSIONS =
+            setOf(CHROME_TRACE_EXTENSION, COMPRESSED_CHROME_TRACE_EXTENSION, BINARY_TRACE_EXTENSION)
+        // Suffix of the file next to a Chrome trace that contains the profiler's start time (Unix time in ns)
+        const val START_TIME_SUFFIX = ".start"
+        const val DEFAULT_MAX_EVENT_DEPTH = 1
+        const val DEFAULT_MAX_EVENTS_PER_THREAD = 10_000
+
+        fun parseFromDirectories(
+            traceDirectories: Iterable<Path>,
+            maxEventDepth: Int = DEFAULT_MAX_EVENT_DEPTH,
+            maxEventsPerThread: Int = DEFAULT_MAX_EVENTS_PER_THREAD,
+            warningReport: (String) -> Unit = { }
+        ): FrameworkTraceLog {
+            require(maxEventDepth >= 1) { "Maximum event depth must be at least 1" }
+            require(maxEventsPerThread >= 1) { "Maximum number of events per thread must be at least 1" }
+            return FrameworkTraceParser(traceDirectories, maxEventDepth, maxEventsPerThread, warningReport).parse()
+        }
+    }
+
+}
+
+// Accumulates the events of a single trace file in primitive arrays, as traces may contain millions of events
+internal class TraceEventCollector {
+
+    // Time to add to all event timestamps to obtain Unix timestamps, if specified by the trace
+    var baseTime: TimestampNs? = null
+
+    private val eventNames = mutableListOf<String>()
+    private val eventNameIds = mutableMapOf<String, Int>()
+    private val threads = mutableMapOf<Pair<String, String>, ThreadEvents>()
+
+    val isEmpty: Boolean
+        get() = threads.isEmpty()
+
+    fun addEvent(processId: String, threadId: String, name: String, startTime: Long, endTime: Long) {
+        val nameId = eventNameIds.getOrPut(name) {
+            eventNames.add(name)
+            eventNames.lastIndex
+        }
+        val thread = threads.getOrPut(processId to threadId) { ThreadEvents() }
+        thread.nameIds.append(nameId.toLong())
+        thread.startTimes.append(startTime)
+        thread.endTimes.append(maxOf(startTime, endTime))
+    }
+
+    // Sets the base time such that the earliest event starts at the given time, for traces whose timestamps are
+    // relative to the start of the profiler (or to an unknown epoch)
+    fun alignToStartTime(startTime: TimestampNs) {
+        val earliestEventTime = threads.values.minOf { events -> events.startTimes.toArray().minOrNull()!! }
+        baseTime = startTime - earliestEventTime
+    }
+
+    fun build(traceName: String, maxEventDepth: Int, maxEventsPerThread: Int): FrameworkTraceFile {
+        val traceThreads = threads.entries
+            .sortedWith(compareBy({ it.key.first }, { it.key.second }))
+            .map { (threadKey, events) ->
+                if (events.nameIds.size > maxEventsPerThread) {
+                    FrameworkTraceThread(threadKey.first, threadKey.second, aggregateEvents(events), true)
+                } else {
+                    FrameworkTraceThread(threadKey.first, threadKey.second, nestEvents(events, maxEventDepth), false)
+                }
+            }
+        return FrameworkTraceFile(traceName, traceThreads)
+    }
+
+    private fun nestEvents(events: ThreadEvents, maxEventDepth: Int): List<TraceEvent> {
+        val baseTime = baseTime ?: 0L
+        val nameIds = events.nameIds.toArray()
+        val startTimes = events.startTimes.toArray()
+        val endTimes = events.endTimes.toArray()
+        // Visit events in order of start time, with enclosing events before the events they contain
+        val order = (0 until nameIds.size).sortedWith(compareBy({ startTimes[it] }, { -endTimes[it] }))
+
+        // Reconstruct the call tree with a stack of enclosing events, keeping only the top maxEventDepth levels
+        val topLevelEvents = mutableListOf<TraceEvent>()
+        val stackEndTimes = LongArrayBuilder()
+        val stackChildren = arrayListOf<MutableList<TraceEvent>?>()
+        for (i in order) {
+            // Events that end before this event ends cannot enclose it; partially overlapping events become siblings
+            while (stackEndTimes.size > 0 && stackEndTimes.last() < endTimes[i]) {
+                stackEndTimes.dropLast()
+                stackChildren.removeAt(stackChildren.lastIndex)
+            }
+            val depth = stackChildren.size
+            val siblings = if (depth == 0) topLevelEvents else stackChildren.last()
+            var children: MutableList<TraceEvent>? = null
+            if (depth < maxEventDepth && siblings != null) {
+                children = mutableListOf()
+                siblings.add(
+                    TraceEvent(
+                        eventNames[nameIds[i].toInt()],
+                        baseTime + startTimes[i],
+                        baseTime + endTimes[i],
+                        children
+                    )
+                )
+            }
+            stackEndTimes.append(endTimes[i])
+            stackChildren.add(children)
+        }
+        return topLevelEvents
+    }
+
+    // Summarizes the events of a thread with too many events to represent individually as one event per name,
+    // spanning all occurrences of the name; nested events are included in the events that enclose them
+    private fun aggregateEvents(events: ThreadEvents): List<TraceEvent> {
+        val baseTime = baseTime ?: 0L
+        val nameIds = events.nameIds.toArray()
+        val startTimes = events.startTimes.toArray()
+        val endTimes = events.endTimes.toArray()
+        val order = (0 until nameIds.size).sortedWith(compareBy({ startTimes[it] }, { -endTimes[it] }))
+
+        class Aggregate(val startTime: Long, var endTime: Long, var occurrences: Int, var busyTime: Long)
+        val aggregates = LinkedHashMap<Long, Aggregate>()
+        var enclosingEventEnd = Long.MIN_VALUE
+        for (i in order) {
+            // Only aggregate top-level events, so the busy time of a name does not count nested events twice
+            if (endTimes[i] <= enclosingEventEnd) continue
+            enclosingEventEnd = endTimes[i]
+            val aggregate = aggregates.getOrPut(nameIds[i]) { Aggregate(startTimes[i], endTimes[i], 0, 0L) }
+            aggregate.endTime = maxOf(aggregate.endTime, endTimes[i])
+            aggregate.occurrences++
+            aggregate.busyTime += endTimes[i] - startTimes[i]
+        }
+        return aggregates.map { (nameId, aggregate) ->
+            TraceEvent(
+                eventNames[nameId.toInt()],
+                baseTime + aggregate.startTime,
+                baseTime + aggregate.endTime,
+                emptyList(),
+                aggregate.occurrences,
+                aggregate.busyTime
+            )
+        }
+    }
+
+    private class ThreadEvents {
+        val nameIds = LongArrayBuilder()
+        val startTimes = LongArrayBuilder()
+        val endTimes = LongArrayBuilder()
+    }
+
+}
+
+class FrameworkTraceLog(
+    val traces: List<FrameworkTraceFile>
+)
+
+class FrameworkTraceFile(
+    val name: String,
+    val threads: List<FrameworkTraceThread>
+) {
+    val startTime: TimestampNs = threads.minOf { it.startTime }
+    val endTime: TimestampNs = threads.maxOf { it.endTime }
+}
+
+// Events of a thread, which are aggregated by name if the thread has too many events to represent individually
+class FrameworkTraceThread(
+    val processId: String,
+    val threadId: String,
+    val events: List<TraceEvent>,
+    val eventsAggregated: Boolean
+) {
+    val startTime: TimestampNs = events.first().startTime
+    val endTime: TimestampNs = events.maxOf { it.endTime }
+}
+
+// A single event, or all occurrences of an event on a thread, of which busyTime was spent in the event
+class TraceEvent(
+    val name: String,
+    val startTime: TimestampNs,
+    val endTime: TimestampNs,
+    val children: List<TraceEvent>,
+    val occurrences: Int = 1,
+    val busyTime: DurationNs = endTime - startTime
+)
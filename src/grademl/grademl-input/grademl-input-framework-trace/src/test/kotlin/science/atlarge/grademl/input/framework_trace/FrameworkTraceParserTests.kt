@@ -0,0 +1,149 @@
+package science.atlarge.grademl.input.framework_trace
+
+import java.io.ByteArrayOutputStream
+import java.nio.file.Files
+import java.nio.file.Path
+import java.util.zip.GZIPOutputStream
+import kotlin.test.Test
+import kotlin.test.assertEquals
+import kotlin.test.assertTrue
+
+class FrameworkTraceParserTests {
+
+    private fun withTraceDirectory(files: Map<String, ByteArray>, test: (Path) -> Unit) {
+        val directory = Files.createTempDirectory("framework-trace-test")
+        try {
+            for ((name, contents) in files) {
+                val file = directory.resolve(name)
+                Files.createDirectories(file.parent)
+                Files.write(file, contents)
+            }
+            test(directory)
+        } finally {
+            directory.toFile().deleteRecursively()
+        }
+    }
+
+    // Flattens events to "name@start-end[children]", with times in ns since the given base time
+    private fun describe(events: List<TraceEvent>, baseTime: Long): List<String> = events.map { event ->
+        val children = if (event.children.isEmpty()) "" else describe(event.children, baseTime).toString()
+        "${event.name}@${event.startTime - baseTime}-${event.endTime - baseTime}$children"
+    }
+
+    @Test
+    fun testChromeTraceEventsAreNested() {
+        val trace = """
+            {"traceEvents": [
+              {"name": "step", "ph": "X", "pid": 1, "tid": 7, "ts": 10, "dur": 100},
+              {"name": "conv", "ph": "X", "pid": 1, "tid": 7, "ts": 20, "dur": 30},
+              {"name": "relu", "ph": "B", "pid": 1, "tid": 7, "ts": 60},
+              {"name": "inner", "ph": "X", "pid": 1, "tid": 7, "ts": 61, "dur": 2},
+              {"name": "relu", "ph": "E", "pid": 1, "tid": 7, "ts": 80},
+              {"name": "thread_name", "ph": "M", "pid": 1, "tid": 7, "args": {"name": "main [\"x\"]"}},
+              {"name": "copy", "ph": "X", "pid": 1, "tid": 8, "ts": 15.5, "dur": 1}
+            ], "baseTimeNanoseconds": 1000000000000}
+        """.trimIndent()
+        withTraceDirectory(mapOf("run/trace.json" to trace.toByteArray())) { directory ->
+            val traceLog = FrameworkTraceParser.parseFromDirectories(listOf(directory), maxEventDepth = 2)
+            val traceFile = traceLog.traces.single()
+            assertEquals("run/trace.json", traceFile.name)
+            assertEquals(listOf("7", "8"), traceFile.threads.map { it.threadId })
+            // Events below the maximum depth (here "inner") are dropped
+            val baseTime = 1_000_000_000_000L
+            assertEquals(
+                listOf("step@10000-110000[conv@20000-50000, relu@60000-80000]"),
+                describe(traceFile.threads[0].events, baseTime)
+            )
+            assertEquals(listOf("copy@15500-16500"), describe(traceFile.threads[1].events, baseTime))
+        }
+    }
+
+    @Test
+    fun testChromeTraceWithoutBaseTimeUsesStartTimeFile() {
+        val trace = """[{"name": "a", "ph": "X", "tid": 1, "ts": 5, "dur": 10},
+            {"name": "b", "ph": "X", "tid": 1, "ts": 20, "dur": 5}]"""
+        val files = mapOf(
+            "relative.json" to trace.toByteArray(),
+            "relative.json${FrameworkTraceParser.START_TIME_SUFFIX}" to "2000000000\n".toByteArray(),
+            "missing.json" to trace.toByteArray()
+        )
+        withTraceDirectory(files) { directory ->
+            // A trace without a start time is skipped with a warning instead of failing the whole job
+            val warnings = mutableListOf<String>()
+            val traceLog = FrameworkTraceParser.parseFromDirectories(listOf(directory)) { warnings.add(it) }
+            assertEquals(listOf("relative.json"), traceLog.traces.map { it.name })
+            assertEquals(1, warnings.size)
+            assertTrue("missing.json" in warnings[0])
+            // The earliest event starts at the recorded start time
+            assertEquals(
+                listOf("a@0-10000", "b@15000-20000"),
+                describe(traceLog.traces[0].threads.single().events, 2_000_000_000L)
+            )
+        }
+    }
+
+    @Test
+    fun testCompressedChromeTrace() {
+        val trace = """{"traceEvents": [
+            {"ph": "X", "pid": 2, "tid": 3, "ts": 0, "dur": 4, "name": "MatMul"}]}"""
+        val compressedTrace = ByteArrayOutputStream().also { bytes ->
+            GZIPOutputStream(bytes).use { it.write(trace.toByteArray()) }
+        }.toByteArray()
+        val files = mapOf(
+            "plugins/profile/host.trace.json.gz" to compressedTrace,
+            "plugins/profile/host.trace.json.gz${FrameworkTraceParser.START_TIME_SUFFIX}" to "5000".toByteArray()
+        )
+        withTraceDirectory(files) { directory ->
+            val traceFile = FrameworkTraceParser.parseFromDirectories(listOf(directory)).traces.single()
+            assertEquals("plugins/profile/host.trace.json.gz", traceFile.name)
+            val thread = traceFile.threads.single()
+            assertEquals("2" to "3", thread.processId to thread.threadId)
+            assertEquals(listOf("MatMul@5000-9000"), describe(thread.events, 0L))
+        }
+    }
+
+    @Test
+    fun testBinaryTraceIgnoresTruncatedRecord() {
+        val trace = ByteArrayOutputStream().apply {
+            write("GMLTRC01".toByteArray())
+            // Base time 1,000,000 ns as a little-endian Long
+            write(byteArrayOf(0x40, 0x42, 0x0F, 0, 0, 0, 0, 0))
+            // String "fwd", and an event on thread 300 starting at 1000 ns for 500 ns (as LEB128 values)
+            write(byteArrayOf(1, 3) + "fwd".toByteArray())
+            write(byteArrayOf(2, 0, 0xAC.toByte(), 0x02, 0xE8.toByte(), 0x07, 0xF4.toByte(), 0x03))
+            // A partially written event
+            write(byteArrayOf(2, 0))
+        }.toByteArray()
+        withTraceDirectory(mapOf("trace.gmltrace" to trace)) { directory ->
+            val thread = FrameworkTraceParser.parseFromDirectories(listOf(directory)).traces.single().threads.single()
+            assertEquals("" to "300", thread.processId to thread.threadId)
+            assertEquals(listOf("fwd@1001000-1001500"), describe(thread.events, 0L))
+        }
+    }
+
+    @Test
+    fun testThreadsWithManyEventsAreAggregated() {
+        val trace = """{"baseTimeNanoseconds": 0, "traceEvents": [
+            {"name": "a", "ph": "X", "tid": 1, "ts": 0, "dur": 10},
+            {"name": "b", "ph": "X", "tid": 1, "ts": 2, "dur": 2},
+            {"name": "a", "ph": "X", "tid": 1, "ts": 20, "dur": 5}]}"""
+        withTraceDirectory(mapOf("trace.json" to trace.toByteArray())) { directory ->
+            val traceLog = FrameworkTraceParser.parseFromDirectories(listOf(directory), maxEventsPerThread = 2)
+            val thread = traceLog.traces.single().threads.single()
+            assertTrue(thread.eventsAggregated)
+            // Nested events ("b") are included in the busy time of the events that enclose them
+            val event = thread.events.single()
+            assertEquals(listOf("a@0-25000"), describe(thread.events, 0L))
+            assertEquals(2, event.occurrences)
+            assertEquals(15_000L, event.busyTime)
+        }
+    }
+
+    @Test
+    fun testMicrosecondsToNanoseconds() {
+        assertEquals(1_634_000_000_123_456_789L, ChromeTraceReader.microsecondsToNanoseconds("1634000000123456.789"))
+        assertEquals(-1_500L, ChromeTraceReader.microsecondsToNanoseconds("-1.5"))
+        assertEquals(2_000L, ChromeTraceReader.microsecondsToNanoseconds("2e0"))
+    }
+
+}
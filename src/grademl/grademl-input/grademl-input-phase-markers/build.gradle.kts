@@ -0,0 +1,16 @@
+description = "Parsing for phase marker logs"
+
+plugins {
+    kotlin("jvm")
+}
+
+dependencies {
+    implementation(project(":grademl-core"))
+
+    testImplementation("org.junit.jupiter:junit-jupiter:5.8.0")
+    testImplementation(kotlin("test"))
+}
+
+tasks.test {
+    useJUnitPlatform()
+}
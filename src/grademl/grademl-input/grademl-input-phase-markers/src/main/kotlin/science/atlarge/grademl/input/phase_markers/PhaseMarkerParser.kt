@@ -0,0 +1,185 @@
+package science.atlarge.grademl.input.phase_markers
+
+import science.atlarge.grademl.core.util.TimestampNs
+import java.io.File
+import java.nio.ByteOrder
+import java.nio.channels.FileChannel
+import java.nio.file.Files
+import java.nio.file.Path
+import java.nio.file.StandardOpenOption
+import kotlin.streams.toList
+
+// Reads the phase marker logs written by the tracing-overhead benchmark harness (benchmark/markers.py):
+//   header:  magic "GMLPHSE1", number of phase types (UByte), per phase type: name length (UByte) and ASCII name
+//   record:  event (UByte, 1 = begin, 2 = end), phase type (UByte), reserved (UShort), id (UInt),
+//            timestamp (Long, Unix time in ns), all little-endian
+class PhaseMarkerParser private constructor(
+    private val markerDirectories: Iterable<Path>
+) {
+
+    private fun parse(): PhaseMarkerLog {
+        val markerFiles = findMarkerFiles()
+        return PhaseMarkerLog(
+            markerFiles.map { (directory, markerFile) -> parseMarkerFile(directory, markerFile) }
+                .filter { it.phases.isNotEmpty() }
+        )
+    }
+
+    private fun findMarkerFiles(): List<Pair<Path, File>> {
+        // Find all files in the marker directories that start with the magic bytes of a phase marker log
+        return markerDirectories.flatMap { directory ->
+            Files.walk(directory).use { fileList ->
+                fileList.map { it.toFile() }
+                    .filter { it.isFile && hasMarkerMagic(it) }
+                    .map { directory to it }
+                    .toList()
+            }
+        }.sortedBy { it.second }
+    }
+
+    private fun hasMarkerMagic(file: File): Boolean {
+        if (file.length() < MAGIC.size) return false
+        return file.inputStream().use { it.readNBytes(MAGIC.size) }.contentEquals(MAGIC)
+    }
+
+    private fun parseMarkerFile(directory: Path, markerFile: File): PhaseMarkerRun {
+        val buffer = FileChannel.open(markerFile.toPath(), StandardOpenOption.READ).use { channel ->
+            channel.map(FileChannel.MapMode.READ_ONLY, 0, channel.size()).order(ByteOrder.LITTLE_ENDIAN)
+        }
+
+        // Read the names of phase types from the header
+        buffer.position(MAGIC.size)
+        val phaseTypes = List(buffer.get().toInt() and 0xFF) {
+            val name = ByteArray(buffer.get().toInt() and 0xFF)
+            buffer.get(name)
+            String(name, Charsets.US_ASCII)
+        }
+
+        // Read all complete records, ignoring a partially written trailing record
+        val recordCount = buffer.remaining() / RECORD_SIZE
+        val events = ByteArray(recordCount)
+        val types = IntArray(recordCount)
+        val ids = LongArray(recordCount)
+        val timestamps = LongArray(recordCount)
+        for (i in 0 until recordCount) {
+            events[i] = buffer.get()
+            types[i] = buffer.get().toInt() and 0xFF
+            buffer.getShort()
+            ids[i] = buffer.getInt().toLong() and 0xFFFFFFFFL
+            timestamps[i] = buffer.getLong()
+        }
+
+        // Pair begin and end records in chronological order, as records need not be written in order
+        val order = (0 until recordCount).sortedWith(compareBy({ timestamps[it] }, { events[it] }))
+        val openPhases = mutableMapOf<Pair<Int, Long>, TimestampNs>()
+        val phases = mutableListOf<MarkedPhase>()
+        for (i in order) {
+            val key = types[i] to ids[i]
+            when (events[i].toInt()) {
+                EVENT_BEGIN -> openPhases[key] = timestamps[i]
+                EVENT_END -> {
+                    val startTime = openPhases.remove(key) ?: continue
+                    phases.add(MarkedPhase(phaseTypes[key.first], key.second, startTime, timestamps[i]))
+                }
+            }
+        }
+        // Close phases that were still running at the end of the log, e.g., if the workload was interrupted
+        val lastTimestamp = timestamps.maxOrNull() ?: 0L
+        for ((key, startTime) in openPhases) {
+            phases.add(MarkedPhase(phaseTypes[key.first], key.second, startTime, lastTimestamp))
+        }
+
+        return PhaseMarkerRun(runName(directory, markerFile), nestPhases(phases))
+    }
+
+    private fun runName(directory: Path, markerFile: File): String {
+        // Name runs after their directory, e.g., "profile_none.1" for profile_none/1/phase_markers.bin
+        val runDirectory = directory.relativize(markerFile.toPath().parent)
+        return if (runDirectory.toString().isEmpty()) {
+            markerFile.nameWithoutExtension
+        } else {
+            runDirectory.joinToString(separator = ".")
+        }
+    }
+
+    private fun nestPhases(phases: List<MarkedPhase>): List<MarkedPhase> {
+        // Visit phases in order of start time, with enclosing phases before the phases they contain
+        val sortedPhases = phases.sortedWith(compareBy({ it.startTime }, { -it.endTime }))
+        val topLevelPhases = mutableListOf<MarkedPhase>()
+        val lastPhaseOfType = mutableMapOf<String, MarkedPhase>()
+        for (phase in sortedPhases) {
+            val parent = findParent(phase, lastPhaseOfType)
+            if (parent != null) {
+                parent.addChild(phase)
+            } else {
+                topLevelPhases.add(phase)
+            }
+            lastPhaseOfType[phase.type] = phase
+        }
+        return topLevelPhases
+    }
+
+    private fun findParent(phase: MarkedPhase, lastPhaseOfType: Map<String, MarkedPhase>): MarkedPhase? {
+        // Walk up the hierarchy of phase types (e.g., forward, batch, epoch) to find the innermost enclosing phase
+        var parentType = PARENT_PHASE_TYPES[phase.type]
+        while (parentType != null) {
+            val candidate = lastPhaseOfType[parentType]
+            if (candidate != null && candidate.startTime <= phase.startTime && phase.endTime <= candidate.endTime) {
+                return candidate
+            }
+            parentType = PARENT_PHASE_TYPES[parentType]
+        }
+        return null
+    }
+
+    companion object {
+        private val MAGIC = "GMLPHSE1".toByteArray(Charsets.US_ASCII)
+        private const val RECORD_SIZE = 16
+        private const val EVENT_BEGIN = 1
+        private const val EVENT_END = 2
+
+        // Expected parent of every phase type; phases of other types are not nested
+        private val PARENT_PHASE_TYPES = mapOf(
+            "batch" to "epoch",
+            "validation" to "epoch",
+            "data" to "batch",
+            "forward" to "batch",
+            "backward" to "batch",
+            "optimizer" to "batch"
+        )
+
+        fun parseFromDirectories(markerDirectories: Iterable<Path>): PhaseMarkerLog {
+            return PhaseMarkerParser(markerDirectories).parse()
+        }
+    }
+
+}
+
+class PhaseMarkerLog(
+    val runs: List<PhaseMarkerRun>
+)
+
+class PhaseMarkerRun(
+    val name: String,
+    val phases: List<MarkedPhase>
+) {
+    val startTime: TimestampNs
+        get() = phases.minOf { it.startTime }
+    val endTime: TimestampNs
+        get() = phases.maxOf { it.endTime }
+}
+
+class MarkedPhase(
+    val type: String,
+    val id: Long,
+    val startTime: TimestampNs,
+    val endTime: TimestampNs
+) {
+    private val _children = mutableListOf<MarkedPhase>()
+    val children: List<MarkedPhase>
+        get() = _children
+
+    internal fun addChild(child: MarkedPhase) {
+        _children.add(child)
+    }
+}
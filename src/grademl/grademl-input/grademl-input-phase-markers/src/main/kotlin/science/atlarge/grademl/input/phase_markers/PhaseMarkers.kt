@@ -0,0 +1,101 @@
+package science.atlarge.grademl.input.phase_markers
+
+import science.atlarge.grademl.core.input.InputSource
+import science.atlarge.grademl.core.models.Environment
+import science.atlarge.grademl.core.models.ExecutionModel
+import science.atlarge.grademl.core.models.ExecutionPhase
+import science.atlarge.grademl.core.models.ResourceModel
+import java.nio.file.Path
+import java.nio.file.Paths
+import kotlin.system.exitProcess
+
+object PhaseMarkers : InputSource {
+
+    private val INVALID_NAME_CHARACTERS = "[/:\\[\\],=]".toRegex()
+
+    override fun parseJobData(
+        jobDataDirectories: Iterable<Path>,
+        unifiedExecutionModel: ExecutionModel,
+        unifiedResourceModel: ResourceModel,
+        jobEnvironment: Environment
+    ): Boolean {
+        // Find phase marker directories
+        val markerDirectories = jobDataDirectories
+            .map { it.resolve("logs").resolve("phase-markers") }
+            .filter { it.toFile().isDirectory }
+        if (markerDirectories.isEmpty()) return false
+
+        // Parse phase marker logs
+        val markerLog = PhaseMarkerParser.parseFromDirectories(markerDirectories)
+
+        // Iterate over runs to build the execution model
+        for (run in markerLog.runs) {
+            // Add execution phase for run
+            val runPhase = unifiedExecutionModel.addPhase(
+                name = "Run",
+                tags = mapOf("run" to run.name.replace(INVALID_NAME_CHARACTERS, "_")),
+                startTime = run.startTime,
+                endTime = run.endTime
+            )
+            addMarkedPhases(run.phases, runPhase, unifiedExecutionModel)
+        }
+
+        return true
+    }
+
+    private fun addMarkedPhases(phases: List<MarkedPhase>, parent: ExecutionPhase, executionModel: ExecutionModel) {
+        var lastPhase: ExecutionPhase? = null
+        for (phase in phases) {
+            // Add execution phase, e.g., "Epoch[id=1]" for a phase of type "epoch"
+            val executionPhase = executionModel.addPhase(
+                name = phase.type.replace(INVALID_NAME_CHARACTERS, "_").replaceFirstChar { it.uppercaseChar() },
+                tags = mapOf("id" to phase.id.toString()),
+                typeTags = emptySet(),
+                startTime = phase.startTime,
+                endTime = phase.endTime,
+                parent = parent
+            )
+            // Phases with the same parent execute in order, e.g., consecutive batches or forward and backward passes
+            lastPhase?.addOutgoingDataflow(executionPhase)
+            lastPhase = executionPhase
+            addMarkedPhases(phase.children, executionPhase, executionModel)
+        }
+    }
+
+}
+
+// Wrapper for testing the phase marker parser
+fun main(args: Array<String>) {
+    if (args.isEmpty() || args[0] == "--help") {
+        println("Arguments: <jobDataDirectory> [...]")
+        exitProcess(if (args.isEmpty()) -1 else 0)
+    }
+
+    val executionModel = ExecutionModel()
+    val foundPhaseMarkers =
+        PhaseMarkers.parseJobData(args.map { Paths.get(it) }, executionModel, ResourceModel(), Environment())
+    require(foundPhaseMarkers) {
+        "Cannot find phase marker logs in any of the given jobDataDirectories"
+    }
+    println("Execution model extracted from phase marker logs:")
+
+    fun printPhase(phase: ExecutionPhase, indent: String) {
+        val outFlows = phase.outFlows.sortedBy { it.identifier }
+        println("$indent/${phase.identifier}")
+        println(
+            "$indent      Start time:          %d.%09d"
+                .format(phase.startTime / 1_000_000_000, phase.startTime % 1_000_000_000)
+        )
+        println(
+            "$indent      End time:            %d.%09d"
+                .format(phase.endTime / 1_000_000_000, phase.endTime % 1_000_000_000)
+        )
+        println("$indent      Outgoing dataflows:  (${outFlows.joinToString(", ") { it.identifier }})")
+        for (childPhase in phase.children.sortedBy { it.startTime }) {
+            printPhase(childPhase, "$indent  ")
+        }
+    }
+    for (topLevelPhase in executionModel.rootPhase.children.sortedBy { it.identifier }) {
+        printPhase(topLevelPhase, "  ")
+    }
+}
@@ -0,0 +1,136 @@
+package science.atlarge.grademl.input.phase_markers
+
+import science.atlarge.grademl.core.models.Environment
+import science.atlarge.grademl.core.models.ExecutionModel
+import science.atlarge.grademl.core.models.ExecutionPhase
+import science.atlarge.grademl.core.models.ResourceModel
+import java.io.ByteArrayOutputStream
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
+import java.nio.file.Files
+import java.nio.file.Path
+import kotlin.test.Test
+import kotlin.test.assertEquals
+import kotlin.test.assertTrue
+
+class PhaseMarkerParserTests {
+
+    // Phase types in the order of PHASE_TYPES in benchmark/markers.py
+    private val phaseTypes = listOf("epoch", "batch", "data", "forward", "backward", "optimizer", "validation")
+
+    private class Marker(val event: Int, val type: String, val id: Int, val time: Long)
+
+    private fun begin(type: String, id: Int, time: Long) = Marker(1, type, id, time)
+    private fun end(type: String, id: Int, time: Long) = Marker(2, type, id, time)
+
+    // Writes a phase marker log like benchmark/markers.py does
+    private fun markerLog(vararg markers: Marker): ByteArray {
+        val output = ByteArrayOutputStream()
+        output.write("GMLPHSE1".toByteArray())
+        output.write(phaseTypes.size)
+        for (type in phaseTypes) {
+            output.write(type.length)
+            output.write(type.toByteArray())
+        }
+        val record = ByteBuffer.allocate(16).order(ByteOrder.LITTLE_ENDIAN)
+        for (marker in markers) {
+            record.clear()
+            record.put(marker.event.toByte()).put(phaseTypes.indexOf(marker.type).toByte()).putShort(0)
+            record.putInt(marker.id).putLong(marker.time)
+            output.write(record.array())
+        }
+        return output.toByteArray()
+    }
+
+    // A run of two epochs that was interrupted in the second epoch. Markers are written out of chronological order
+    // (the data phase of batch 2 is recorded after the batch) and trail off in a partially written record.
+    private val interruptedRun = markerLog(
+        begin("epoch", 1, 0),
+        begin("batch", 1, 10),
+        begin("forward", 1, 12),
+        end("forward", 1, 20),
+        end("batch", 1, 40),
+        begin("batch", 2, 50),
+        end("batch", 2, 90),
+        begin("data", 2, 45),
+        end("data", 2, 50),
+        begin("validation", 1, 92),
+        end("backward", 9, 95),
+        end("validation", 1, 98),
+        end("epoch", 1, 100),
+        begin("epoch", 2, 110),
+        begin("batch", 3, 120),
+        end("batch", 3, 150)
+    ) + byteArrayOf(1, 1, 0, 0, 3)
+
+    private fun withMarkerDirectory(files: Map<String, ByteArray>, test: (Path) -> Unit) {
+        val directory = Files.createTempDirectory("phase-marker-test")
+        try {
+            for ((name, contents) in files) {
+                val file = directory.resolve(name)
+                Files.createDirectories(file.parent)
+                Files.write(file, contents)
+            }
+            test(directory)
+        } finally {
+            directory.toFile().deleteRecursively()
+        }
+    }
+
+    // Flattens phases to "type id@start-end[children]"
+    private fun describe(phases: List<MarkedPhase>): List<String> = phases.map { phase ->
+        val children = if (phase.children.isEmpty()) "" else describe(phase.children).toString()
+        "${phase.type} ${phase.id}@${phase.startTime}-${phase.endTime}$children"
+    }
+
+    @Test
+    fun testPhasesArePairedAndNested() {
+        withMarkerDirectory(mapOf("phase_markers.bin" to interruptedRun)) { directory ->
+            val run = PhaseMarkerParser.parseFromDirectories(listOf(directory)).runs.single()
+            // Begin and end markers pair up by type and id, so batch 1 and forward pass 1 are separate phases, and the
+            // unmatched end of backward pass 9 is ignored. The data phase of batch 2 starts before the batch, so it
+            // nests in the epoch instead, and the interrupted epoch ends at the last marker.
+            assertEquals(
+                listOf(
+                    "epoch 1@0-100[batch 1@10-40[forward 1@12-20], data 2@45-50, batch 2@50-90, validation 1@92-98]",
+                    "epoch 2@110-150[batch 3@120-150]"
+                ),
+                describe(run.phases)
+            )
+            assertEquals(0L to 150L, run.startTime to run.endTime)
+        }
+    }
+
+    @Test
+    fun testRunsAreNamedAfterTheirDirectory() {
+        val files = mapOf(
+            "profile_none/1/phase_markers.bin" to markerLog(begin("epoch", 1, 0), end("epoch", 1, 10)),
+            "standalone.bin" to markerLog(begin("epoch", 1, 20), end("epoch", 1, 30)),
+            "empty/phase_markers.bin" to markerLog(),
+            "profile_none/1/result.json" to "{}".toByteArray()
+        )
+        withMarkerDirectory(files) { directory ->
+            // Runs without phases and files that are not phase marker logs are skipped
+            val runs = PhaseMarkerParser.parseFromDirectories(listOf(directory)).runs
+            assertEquals(listOf("profile_none.1", "standalone"), runs.map { it.name })
+        }
+    }
+
+    @Test
+    fun testExecutionModelOfPhaseMarkers() {
+        withMarkerDirectory(mapOf("logs/phase-markers/run/phase_markers.bin" to interruptedRun)) { jobDirectory ->
+            val executionModel = ExecutionModel()
+            assertTrue(PhaseMarkers.parseJobData(listOf(jobDirectory), executionModel, ResourceModel(), Environment()))
+            val runPhase = executionModel.rootPhase.children.single()
+            assertEquals("Run[run=run]", runPhase.identifier)
+            val epoch = runPhase.children.single { it.identifier == "Epoch[id=1]" }
+            fun childrenOf(phase: ExecutionPhase) = phase.children.sortedBy { it.startTime }.map { it.identifier }
+            assertEquals(listOf("Batch[id=1]", "Data[id=2]", "Batch[id=2]", "Validation[id=1]"), childrenOf(epoch))
+            // Consecutive phases with the same parent are connected by dataflows
+            val batch1 = epoch.children.single { it.identifier == "Batch[id=1]" }
+            assertEquals(listOf("Data[id=2]"), batch1.outFlows.map { it.identifier })
+            assertEquals(listOf("Forward[id=1]"), childrenOf(batch1))
+        }
+    }
+
+}
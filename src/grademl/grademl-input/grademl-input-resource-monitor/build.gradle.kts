@@ -6,4 +6,11 @@ plugins {
 
 dependencies {
     implementation(project(":grademl-core"))
+
+    testImplementation("org.junit.jupiter:junit-jupiter:5.8.0")
+    testImplementation(kotlin("test"))
+}
+
+tasks.test {
+    useJUnitPlatform()
 }
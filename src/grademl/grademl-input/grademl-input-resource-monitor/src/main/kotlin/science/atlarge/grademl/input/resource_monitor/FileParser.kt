@@ -1,9 +1,12 @@
 package science.atlarge.grademl.input.resource_monitor
 
+import science.atlarge.grademl.core.util.TimestampNs
 import java.io.File
 
 interface FileParser<out T> {
 
-    fun parse(hostname: String, metricFiles: Iterable<File>): T
+    // Parses the metric files of a host. If a time range is given, parsers may skip samples outside of it, and return
+    // null if the metric files contain no samples in the time range.
+    fun parse(hostname: String, metricFiles: Iterable<File>, timeRange: ClosedRange<TimestampNs>?): T?
 
 }
\ No newline at end of file
@@ -1,5 +1,6 @@
 package science.atlarge.grademl.input.resource_monitor
 
+import science.atlarge.grademl.core.GradeMLJobStatusUpdate
 import science.atlarge.grademl.core.input.InputSource
 import science.atlarge.grademl.core.models.*
 import science.atlarge.grademl.input.resource_monitor.procfs.CpuUtilizationData
@@ -11,11 +12,26 @@ import kotlin.system.exitProcess
 
 object ResourceMonitor : InputSource {
 
+    // Metrics are only read for the time range of the phases added by other input sources, so block-indexed metric
+    // files of long-running monitors are read in part
+    override val parsesIndependently: Boolean
+        get() = false
+
     override fun parseJobData(
         jobDataDirectories: Iterable<Path>,
         unifiedExecutionModel: ExecutionModel,
         unifiedResourceModel: ResourceModel,
         jobEnvironment: Environment
+    ): Boolean {
+        return parseJobData(jobDataDirectories, unifiedExecutionModel, unifiedResourceModel, jobEnvironment) { }
+    }
+
+    override fun parseJobData(
+        jobDataDirectories: Iterable<Path>,
+        unifiedExecutionModel: ExecutionModel,
+        unifiedResourceModel: ResourceModel,
+        jobEnvironment: Environment,
+        progressReport: (GradeMLJobStatusUpdate) -> Unit
     ): Boolean {
         // Find Resource Monitor metric directories
         val resourceMonitorMetricDirectories = jobDataDirectories
@@ -23,8 +39,15 @@ object ResourceMonitor : InputSource {
             .filter { it.toFile().isDirectory }
         if (resourceMonitorMetricDirectories.isEmpty()) return false
 
-        // Parse Resource Monitor metrics
-        val resourceMonitorMetrics = ResourceMonitorParser.parseFromDirectories(resourceMonitorMetricDirectories)
+        // Parse Resource Monitor metrics for the time range of the job, if other input sources found any phases
+        val rootPhase = unifiedExecutionModel.rootPhase
+        val jobTimeRange = if (rootPhase.children.isEmpty()) null else rootPhase.startTime..rootPhase.endTime
+        val resourceMonitorMetrics = ResourceMonitorParser.parseFromDirectories(
+            resourceMonitorMetricDirectories,
+            jobTimeRange
+        ) { filePrefix, hostname, duration ->
+            progressReport(GradeMLJobStatusUpdate.InputPartParsed(this, "$filePrefix-$hostname", duration))
+        }
 
         // Add a top-level resource for the cluster
         val clusterResource = unifiedResourceModel.addResource("cluster")
@@ -63,6 +86,8 @@ object ResourceMonitor : InputSource {
         machineResources: Map<String, Resource>
     ) {
         for ((hostname, cpuUtilization) in cpuUtilizationData) {
+            // Compress the timestamps once for all CPU metrics of a machine
+            val timestamps = ChunkedTimestamps(cpuUtilization.timestamps)
             // Create metric for total CPU utilization and add it as a resource
             val cpuResource = resourceModel.addResource(
                 name = "cpu",
@@ -70,16 +95,16 @@ object ResourceMonitor : InputSource {
             )
             cpuResource.addMetric(
                 name = "utilization",
-                data = MetricData(
-                    cpuUtilization.timestamps,
+                data = MetricData.compressed(
+                    timestamps,
                     cpuUtilization.totalCoreUtilization,
                     cpuUtilization.numCpuCores.toDouble()
                 )
             )
             cpuResource.addMetric(
                 name = "cores-fully-utilized",
-                data = MetricData(
-                    cpuUtilization.timestamps,
+                data = MetricData.compressed(
+                    timestamps,
                     DoubleArray(cpuUtilization.coresFullyUtilized.size) {
                         cpuUtilization.coresFullyUtilized[it].toDouble()
                     },
@@ -95,8 +120,8 @@ object ResourceMonitor : InputSource {
                 )
                 coreResource.addMetric(
                     name = "utilization",
-                    data = MetricData(
-                        cpuUtilization.timestamps,
+                    data = MetricData.compressed(
+                        timestamps,
                         cpuUtilization.coreUtilization[coreId],
                         1.0
                     )
@@ -112,6 +137,7 @@ object ResourceMonitor : InputSource {
     ) {
         // Enumerate over each network interface in the monitored cluster
         for ((hostname, networkUtilization) in networkUtilizationData) {
+            val timestamps = ChunkedTimestamps(networkUtilization.timestamps)
             for (ifaceIndex in 0 until networkUtilization.interfaceIds.size) {
                 // Create a resource for the network interface
                 val ifaceResource = resourceModel.addResource(
@@ -122,15 +148,15 @@ object ResourceMonitor : InputSource {
                 // Add metrics for incoming and outgoing traffic
                 ifaceResource.addMetric(
                     name = "bytes-received",
-                    data = MetricData(
-                        timestamps = networkUtilization.timestamps,
+                    data = MetricData.compressed(
+                        timestamps = timestamps,
                         values = networkUtilization.bytesReceived[ifaceIndex],
                         maxValue = 1e9
                     )
                 )
                 ifaceResource.addMetric(
-                    name = "bytes-sent", MetricData(
-                        timestamps = networkUtilization.timestamps,
+                    name = "bytes-sent", MetricData.compressed(
+                        timestamps = timestamps,
                         values = networkUtilization.bytesSent[ifaceIndex],
                         maxValue = 1e9
                     )
@@ -146,6 +172,7 @@ object ResourceMonitor : InputSource {
     ) {
         // Enumerate over each disk device in the monitored cluster
         for ((hostname, diskUtilization) in diskUtilizationData) {
+            val timestamps = ChunkedTimestamps(diskUtilization.timestamps)
             for (deviceIndex in 0 until diskUtilization.deviceIds.size) {
                 // Create a resource for the disk device
                 val deviceResource = resourceModel.addResource(
@@ -156,32 +183,32 @@ object ResourceMonitor : InputSource {
                 // Add metrics for bytes read/written, read/write time, etc.
                 deviceResource.addMetric(
                     name = "bytes-read",
-                    data = MetricData(
-                        timestamps = diskUtilization.timestamps,
+                    data = MetricData.compressed(
+                        timestamps = timestamps,
                         values = diskUtilization.bytesRead[deviceIndex],
                         maxValue = 1e8
                     )
                 )
                 deviceResource.addMetric(
                     name = "bytes-written",
-                    data = MetricData(
-                        timestamps = diskUtilization.timestamps,
+                    data = MetricData.compressed(
+                        timestamps = timestamps,
                         values = diskUtilization.bytesWritten[deviceIndex],
                         maxValue = 1e8
                     )
                 )
                 deviceResource.addMetric(
                     name = "read-time",
-                    data = MetricData(
-                        timestamps = diskUtilization.timestamps,
+                    data = MetricData.compressed(
+                        timestamps = timestamps,
                         values = diskUtilization.readTimeFraction[deviceIndex],
                         maxValue = 1.0
                     )
                 )
                 deviceResource.addMetric(
                     name = "write-time",
-                    data = MetricData(
-                        timestamps = diskUtilization.timestamps,
+                    data = MetricData.compressed(
+                        timestamps = timestamps,
                         values = diskUtilization.writeTimeFraction[deviceIndex],
                         maxValue = 1.0
                     )
@@ -189,8 +216,8 @@ object ResourceMonitor : InputSource {
                 diskUtilization.totalTimeSpentFraction[deviceIndex]?.let { totalTimeSpentFraction ->
                     deviceResource.addMetric(
                         name = "total-utilization",
-                        data = MetricData(
-                            timestamps = diskUtilization.timestamps,
+                        data = MetricData.compressed(
+                            timestamps = timestamps,
                             values = totalTimeSpentFraction,
                             maxValue = 1.0
                         )
@@ -223,10 +250,10 @@ fun main(args: Array<String>) {
 
     fun printMetric(metric: Metric, indent: String) {
         val metricData = metric.data
-        val minTimestamp = metricData.timestamps.first().let {
+        val minTimestamp = metricData.firstTimestamp.let {
             "%d.%09d".format(it / 1_000_000_000, it % 1_000_000_000)
         }
-        val maxTimestamp = metricData.timestamps.last().let {
+        val maxTimestamp = metricData.lastTimestamp.let {
             "%d.%09d".format(it / 1_000_000_000, it % 1_000_000_000)
         }
         val valueStats = if (metricData.values.isNotEmpty()) {
@@ -1,57 +1,84 @@
 package science.atlarge.grademl.input.resource_monitor
 
+import science.atlarge.grademl.core.util.DurationNs
+import science.atlarge.grademl.core.util.TimestampNs
 import science.atlarge.grademl.input.resource_monitor.procfs.*
+import java.io.File
 import java.nio.file.Path
+import java.util.concurrent.Callable
+import java.util.concurrent.ForkJoinTask
 
 class ResourceMonitorParser private constructor(
-    private val resourceMonitorMetricDirectories: Iterable<Path>
+    private val resourceMonitorMetricDirectories: Iterable<Path>,
+    private val timeRange: ClosedRange<TimestampNs>?,
+    private val reportHostParsed: (filePrefix: String, hostname: String, duration: DurationNs) -> Unit
 ) {
 
-    private val hostnames = mutableSetOf<String>()
-    private val cpuUtilizationData = mutableMapOf<String, CpuUtilizationData>()
-    private val networkUtilizationData = mutableMapOf<String, NetworkUtilizationData>()
-    private val diskUtilizationData = mutableMapOf<String, DiskUtilizationData>()
+    private lateinit var metricFiles: List<File>
+    private val hostnames = sortedSetOf<String>()
 
     private fun parse(): ResourceMonitorMetrics {
-        parseHostnames()
-        parseMetricFiles("proc-stat", ProcStatParser, cpuUtilizationData)
-        parseMetricFiles("proc-net-dev", ProcNetDevParser, networkUtilizationData)
-        parseMetricFiles("proc-diskstats", ProcDiskstatsParser, diskUtilizationData)
-        return ResourceMonitorMetrics(hostnames, cpuUtilizationData, networkUtilizationData, diskUtilizationData)
+        findMetricFiles()
+        // Parse the metric files of every host and type in parallel, as a task in the calling thread's ForkJoinPool
+        // (or in the common pool when called from outside a ForkJoinPool)
+        val cpuUtilizationTasks = createParsingTasks("proc-stat", ProcStatParser)
+        val networkUtilizationTasks = createParsingTasks("proc-net-dev", ProcNetDevParser)
+        val diskUtilizationTasks = createParsingTasks("proc-diskstats", ProcDiskstatsParser)
+        ForkJoinTask.invokeAll(cpuUtilizationTasks.values + networkUtilizationTasks.values + diskUtilizationTasks.values)
+        return ResourceMonitorMetrics(
+            hostnames,
+            joinParsingTasks(cpuUtilizationTasks),
+            joinParsingTasks(networkUtilizationTasks),
+            joinParsingTasks(diskUtilizationTasks)
+        )
     }
 
-    private fun parseHostnames() {
-        // Enumerate metric files and extract hostnames from the filenames
-        for (directory in resourceMonitorMetricDirectories) {
+    private fun findMetricFiles() {
+        // Enumerate metric files once for all types of metrics, in a deterministic order
+        metricFiles = resourceMonitorMetricDirectories.flatMap { directory ->
             directory.toFile()
                 .walk()
                 .filter { it.isFile && "-" in it.name }
-                .map { it.name.split("-").last() }
-                .toCollection(hostnames)
-        }
+                .toList()
+        }.sortedBy { it.path }
+        // Extract hostnames from the filenames
+        metricFiles.mapTo(hostnames) { hostnameOf(it) }
     }
 
-    private fun <T> parseMetricFiles(filePrefix: String, parser: FileParser<T>, outMap: MutableMap<String, T>) {
-        // Find relevant metric files
-        val allMetricFiles = resourceMonitorMetricDirectories.flatMap { dir ->
-            dir.toFile()
-                .walk()
-                .filter { it.isFile && it.name.startsWith(filePrefix) }
-        }
-        // Group files by hostname
-        val metricFilesByHostname = allMetricFiles.groupBy {
-            it.name.split("-").last()
-        }
-        // Parse all metric files to produce one data structure per hostname
-        for ((hostname, metricFiles) in metricFilesByHostname) {
-            outMap[hostname] = parser.parse(hostname, metricFiles)
+    private fun <T> createParsingTasks(filePrefix: String, parser: FileParser<T>): Map<String, ForkJoinTask<T?>> {
+        // Group relevant metric files by hostname
+        val metricFilesByHostname = metricFiles
+            .filter { it.name.startsWith(filePrefix) }
+            .groupBy { hostnameOf(it) }
+            .toSortedMap()
+        // Create a task to parse all metric files of each host, producing one data structure per hostname
+        return metricFilesByHostname.mapValues { (hostname, hostMetricFiles) ->
+            ForkJoinTask.adapt(Callable {
+                val startTime = System.nanoTime()
+                val result = parser.parse(hostname, hostMetricFiles, timeRange)
+                reportHostParsed(filePrefix, hostname, System.nanoTime() - startTime)
+                result
+            })
         }
     }
 
+    // Collects the results of parsing tasks, skipping hosts without metric data in the time range
+    private fun <T : Any> joinParsingTasks(tasks: Map<String, ForkJoinTask<T?>>): Map<String, T> {
+        return tasks.entries.mapNotNull { (hostname, task) -> task.join()?.let { hostname to it } }.toMap()
+    }
+
+    private fun hostnameOf(metricFile: File): String = metricFile.name.split("-").last()
+
     companion object {
 
-        fun parseFromDirectories(resourceMonitorMetricDirectories: Iterable<Path>): ResourceMonitorMetrics {
-            return ResourceMonitorParser(resourceMonitorMetricDirectories).parse()
+        // Parses all metric files in the given directories. If a time range is given, block-indexed metric files are
+        // only read in part, i.e., the blocks that overlap the time range.
+        fun parseFromDirectories(
+            resourceMonitorMetricDirectories: Iterable<Path>,
+            timeRange: ClosedRange<TimestampNs>? = null,
+            reportHostParsed: (filePrefix: String, hostname: String, duration: DurationNs) -> Unit = { _, _, _ -> }
+        ): ResourceMonitorMetrics {
+            return ResourceMonitorParser(resourceMonitorMetricDirectories, timeRange, reportHostParsed).parse()
         }
 
     }
@@ -63,4 +90,4 @@ data class ResourceMonitorMetrics(
     val cpuUtilizationData: Map<String, CpuUtilizationData>,
     val networkUtilizationData: Map<String, NetworkUtilizationData>,
     val diskUtilizationData: Map<String, DiskUtilizationData>
-)
\ No newline at end of file
+)
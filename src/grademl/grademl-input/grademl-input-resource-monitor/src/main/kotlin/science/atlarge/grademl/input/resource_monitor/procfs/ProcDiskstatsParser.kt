@@ -2,19 +2,21 @@ package science.atlarge.grademl.input.resource_monitor.procfs
 
 import science.atlarge.grademl.core.util.DoubleArrayBuilder
 import science.atlarge.grademl.core.util.LongArrayBuilder
+import science.atlarge.grademl.core.util.TimestampNs
 import science.atlarge.grademl.core.util.TimestampNsArray
 import science.atlarge.grademl.input.resource_monitor.FileParser
 import science.atlarge.grademl.input.resource_monitor.util.*
 import java.io.File
 import java.io.IOException
+import java.io.InputStream
 
 object ProcDiskstatsParser : FileParser<DiskUtilizationData> {
 
-    private var uncompressedBytesRead: Long = 0L
-
-    private fun parse(logFile: File): DiskUtilizationData {
-        uncompressedBytesRead = 0L
-        return logFile.inputStream().buffered().use { inStream ->
+    // Parses a metric file from the start (previousTimestamp == null), or a block of a block-indexed metric file that
+    // starts with a repeated DISK_LIST message and continues from the sample at previousTimestamp
+    private fun parse(inStream: InputStream, previousTimestamp: TimestampNs?): DiskUtilizationData {
+        var uncompressedBytesRead = 0L
+        return inStream.use {
             // Read first message to determine number and names of disks
             val initialTimestamp = inStream.readLELong()
             uncompressedBytesRead += 8
@@ -23,13 +25,13 @@ object ProcDiskstatsParser : FileParser<DiskUtilizationData> {
             val diskNames = (0 until numDisks).map { inStream.readString() }
 
             val timestamps = LongArrayBuilder()
-            timestamps.append(initialTimestamp)
+            timestamps.append(previousTimestamp ?: initialTimestamp)
             val bytesReadMetric = (0 until numDisks).map { DoubleArrayBuilder() }
             val bytesWrittenMetric = (0 until numDisks).map { DoubleArrayBuilder() }
             val readTimeFractionMetric = (0 until numDisks).map { DoubleArrayBuilder() }
             val writeTimeFractionMetric = (0 until numDisks).map { DoubleArrayBuilder() }
             val totalTimeSpentFractionMetric = (0 until numDisks).map { DoubleArrayBuilder() }
-            var lastTimestamp = 0L
+            var lastTimestamp = previousTimestamp ?: 0L
             while (true) {
                 val timestamp = inStream.tryReadLELong() ?: break
                 uncompressedBytesRead += 8
@@ -89,13 +91,19 @@ object ProcDiskstatsParser : FileParser<DiskUtilizationData> {
         }
     }
 
-    override fun parse(hostname: String, metricFiles: Iterable<File>): DiskUtilizationData {
+    override fun parse(
+        hostname: String,
+        metricFiles: Iterable<File>,
+        timeRange: ClosedRange<TimestampNs>?
+    ): DiskUtilizationData? {
         // Parse each metric file individually
-        val utilizationDataStructures = metricFiles.map {
-            val parseResult = parse(it)
+        val utilizationDataStructures = metricFiles.mapNotNull {
+            if (BlockIndexedFile.isBlockIndexed(it)) return@mapNotNull parseBlocks(it, timeRange)
+            val parseResult = parse(it.inputStream().buffered(), null)
 //            println("[DEBUG] Read $uncompressedBytesRead uncompressed bytes from \"${it.path}\"")
             parseResult
         }.filter { it.timestamps.size > 1 }
+        if (utilizationDataStructures.isEmpty() && timeRange != null) return null
         require(utilizationDataStructures.isNotEmpty()) { "No metric data found for disk utilization" }
         // Shortcut: return if there was only one file
         if (utilizationDataStructures.size == 1) return utilizationDataStructures[0]
@@ -103,6 +111,32 @@ object ProcDiskstatsParser : FileParser<DiskUtilizationData> {
         return mergeUtilizationData(utilizationDataStructures)
     }
 
+    private fun parseBlocks(metricFile: File, timeRange: ClosedRange<TimestampNs>?): DiskUtilizationData? {
+        // Parse the blocks that overlap the time range in parallel and concatenate their results
+        val blockFile = BlockIndexedFile.open(metricFile)
+        val blockResults = blockFile.decodeBlocks(blockFile.blocksOverlapping(timeRange)) { block ->
+            parse(block.records, block.previousTimestamp)
+        }
+        if (blockResults.isEmpty()) return null
+        val deviceIds = blockResults[0].deviceIds
+        val parts = contiguousBlockResults(blockResults) { it.timestamps }.takeWhile { it.deviceIds == deviceIds }
+        if (parts.size == 1) return parts[0]
+        return DiskUtilizationData(
+            timestamps = concatenateBlockTimestamps(parts.map { it.timestamps }),
+            deviceIds = deviceIds,
+            bytesRead = deviceIds.indices.map { i -> concatenateArrays(parts.map { it.bytesRead[i] }) },
+            bytesWritten = deviceIds.indices.map { i -> concatenateArrays(parts.map { it.bytesWritten[i] }) },
+            readTimeFraction = deviceIds.indices.map { i -> concatenateArrays(parts.map { it.readTimeFraction[i] }) },
+            writeTimeFraction = deviceIds.indices.map { i -> concatenateArrays(parts.map { it.writeTimeFraction[i] }) },
+            totalTimeSpentFraction = deviceIds.indices.map { i ->
+                concatenateOptionalArrays(
+                    parts.map { it.totalTimeSpentFraction[i] },
+                    expectedArraySizes = parts.map { it.timestamps.size - 1 }
+                )
+            }
+        )
+    }
+
     private fun mergeUtilizationData(utilizationDataStructures: List<DiskUtilizationData>): DiskUtilizationData {
         // Check that none of the metrics overlap
         val sortedUtilizationData = utilizationDataStructures.sortedBy { it.timestamps.first() }
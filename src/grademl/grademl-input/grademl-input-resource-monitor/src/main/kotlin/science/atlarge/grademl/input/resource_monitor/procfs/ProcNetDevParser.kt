@@ -2,18 +2,20 @@ package science.atlarge.grademl.input.resource_monitor.procfs
 
 import science.atlarge.grademl.core.util.DoubleArrayBuilder
 import science.atlarge.grademl.core.util.LongArrayBuilder
+import science.atlarge.grademl.core.util.TimestampNs
 import science.atlarge.grademl.core.util.TimestampNsArray
 import science.atlarge.grademl.input.resource_monitor.FileParser
 import science.atlarge.grademl.input.resource_monitor.util.*
 import java.io.File
+import java.io.InputStream
 
 object ProcNetDevParser : FileParser<NetworkUtilizationData> {
 
-    private var uncompressedBytesRead: Long = 0L
-
-    private fun parse(logFile: File): NetworkUtilizationData {
-        uncompressedBytesRead = 0L
-        return logFile.inputStream().buffered().use { inStream ->
+    // Parses a metric file from the start (previousTimestamp == null), or a block of a block-indexed metric file that
+    // starts with a repeated IFACE_LIST message and continues from the sample at previousTimestamp
+    private fun parse(inStream: InputStream, previousTimestamp: TimestampNs?): NetworkUtilizationData {
+        var uncompressedBytesRead = 0L
+        return inStream.use {
             // Read first message to determine number and names of interfaces
             val initialTimestamp = inStream.readLELong()
             uncompressedBytesRead += 8
@@ -22,10 +24,10 @@ object ProcNetDevParser : FileParser<NetworkUtilizationData> {
             val interfaceNames = (0 until numInterfaces).map { inStream.readString() }
 
             val timestamps = LongArrayBuilder()
-            timestamps.append(initialTimestamp)
+            timestamps.append(previousTimestamp ?: initialTimestamp)
             val receivedUtilization = (0 until numInterfaces).map { DoubleArrayBuilder() }
             val sentUtilization = (0 until numInterfaces).map { DoubleArrayBuilder() }
-            var lastTimestamp = 0L
+            var lastTimestamp = previousTimestamp ?: 0L
             while (true) {
                 val timestamp = inStream.tryReadLELong() ?: break
                 uncompressedBytesRead += 8
@@ -67,13 +69,19 @@ object ProcNetDevParser : FileParser<NetworkUtilizationData> {
         }
     }
 
-    override fun parse(hostname: String, metricFiles: Iterable<File>): NetworkUtilizationData {
+    override fun parse(
+        hostname: String,
+        metricFiles: Iterable<File>,
+        timeRange: ClosedRange<TimestampNs>?
+    ): NetworkUtilizationData? {
         // Parse each metric file individually
-        val utilizationDataStructures = metricFiles.map {
-            val parseResult = parse(it)
+        val utilizationDataStructures = metricFiles.mapNotNull {
+            if (BlockIndexedFile.isBlockIndexed(it)) return@mapNotNull parseBlocks(it, timeRange)
+            val parseResult = parse(it.inputStream().buffered(), null)
 //            println("[DEBUG] Read $uncompressedBytesRead uncompressed bytes from \"${it.path}\"")
             parseResult
         }.filter { it.timestamps.size > 1 }
+        if (utilizationDataStructures.isEmpty() && timeRange != null) return null
         require(utilizationDataStructures.isNotEmpty()) { "No metric data found for network utilization" }
         // Shortcut: return if there was only one file
         if (utilizationDataStructures.size == 1) return utilizationDataStructures[0]
@@ -81,6 +89,24 @@ object ProcNetDevParser : FileParser<NetworkUtilizationData> {
         return mergeUtilizationData(utilizationDataStructures)
     }
 
+    private fun parseBlocks(metricFile: File, timeRange: ClosedRange<TimestampNs>?): NetworkUtilizationData? {
+        // Parse the blocks that overlap the time range in parallel and concatenate their results
+        val blockFile = BlockIndexedFile.open(metricFile)
+        val blockResults = blockFile.decodeBlocks(blockFile.blocksOverlapping(timeRange)) { block ->
+            parse(block.records, block.previousTimestamp)
+        }
+        if (blockResults.isEmpty()) return null
+        val interfaceIds = blockResults[0].interfaceIds
+        val parts = contiguousBlockResults(blockResults) { it.timestamps }.takeWhile { it.interfaceIds == interfaceIds }
+        if (parts.size == 1) return parts[0]
+        return NetworkUtilizationData(
+            timestamps = concatenateBlockTimestamps(parts.map { it.timestamps }),
+            interfaceIds = interfaceIds,
+            bytesReceived = interfaceIds.indices.map { i -> concatenateArrays(parts.map { it.bytesReceived[i] }) },
+            bytesSent = interfaceIds.indices.map { i -> concatenateArrays(parts.map { it.bytesSent[i] }) }
+        )
+    }
+
     private fun mergeUtilizationData(utilizationDataStructures: List<NetworkUtilizationData>): NetworkUtilizationData {
         // Check that none of the metrics overlap
         val sortedUtilizationData = utilizationDataStructures.sortedBy { it.timestamps.first() }
@@ -2,21 +2,25 @@ package science.atlarge.grademl.input.resource_monitor.procfs
 
 import science.atlarge.grademl.core.util.DoubleArrayBuilder
 import science.atlarge.grademl.core.util.LongArrayBuilder
+import science.atlarge.grademl.core.util.TimestampNs
 import science.atlarge.grademl.core.util.TimestampNsArray
 import science.atlarge.grademl.input.resource_monitor.FileParser
-import science.atlarge.grademl.input.resource_monitor.util.concatenateArrays
-import science.atlarge.grademl.input.resource_monitor.util.readLEB128Int
-import science.atlarge.grademl.input.resource_monitor.util.readLEB128Long
-import science.atlarge.grademl.input.resource_monitor.util.readLELong
+import science.atlarge.grademl.input.resource_monitor.util.*
 import java.io.Closeable
 import java.io.File
+import java.io.InputStream
 
 object ProcStatParser : FileParser<CpuUtilizationData> {
 
     private const val FULL_CORE_THRESHOLD = 0.95
 
-    private class ParserState(logFile: File) : Closeable {
-        private val stream = logFile.inputStream().buffered()
+    // Parses a metric file from the start (previousTimestamp == null), or a block of a block-indexed metric file that
+    // continues from the sample at previousTimestamp, in which case the first message contains deltas instead of
+    // initial CPU metric values
+    private class ParserState(
+        private val stream: InputStream,
+        private val previousTimestamp: TimestampNs? = null
+    ) : Closeable {
 
         private val timestamps = LongArrayBuilder()
         private val totalCoreUtilization = DoubleArrayBuilder()
@@ -32,8 +36,10 @@ object ProcStatParser : FileParser<CpuUtilizationData> {
 
         fun parse(): CpuUtilizationData {
             // Read first message to set initial timestamp and determine the number of CPUs
+            if (previousTimestamp != null) timestamps.append(previousTimestamp)
             readFirstMessage()
             timestamps.append(currentTimestamp)
+            if (previousTimestamp != null) computeUtilization()
             // Read and process messages until an exception occurs while reading
             try {
                 while (true) {
@@ -115,14 +121,20 @@ object ProcStatParser : FileParser<CpuUtilizationData> {
         }
     }
 
-    override fun parse(hostname: String, metricFiles: Iterable<File>): CpuUtilizationData {
+    override fun parse(
+        hostname: String,
+        metricFiles: Iterable<File>,
+        timeRange: ClosedRange<TimestampNs>?
+    ): CpuUtilizationData? {
         // Parse each metric file individually
-        val utilizationDataStructures = metricFiles.map { metricFile ->
-            val parser = ParserState(metricFile)
-            val parseResult = parser.parse()
+        val utilizationDataStructures = metricFiles.mapNotNull { metricFile ->
+            if (BlockIndexedFile.isBlockIndexed(metricFile)) return@mapNotNull parseBlocks(metricFile, timeRange)
+            val parser = ParserState(metricFile.inputStream().buffered())
+            val parseResult = parser.use { it.parse() }
 //            println("[DEBUG] Read ${parser.uncompressedBytesRead} uncompressed bytes from \"${metricFile.path}\"")
             parseResult
         }.filter { it.timestamps.size > 1 }
+        if (utilizationDataStructures.isEmpty() && timeRange != null) return null
         require(utilizationDataStructures.isNotEmpty()) { "No metric data found for CPU utilization" }
         // Shortcut: return if there was only one file
         if (utilizationDataStructures.size == 1) return utilizationDataStructures[0]
@@ -130,6 +142,25 @@ object ProcStatParser : FileParser<CpuUtilizationData> {
         return mergeUtilizationData(utilizationDataStructures)
     }
 
+    private fun parseBlocks(metricFile: File, timeRange: ClosedRange<TimestampNs>?): CpuUtilizationData? {
+        // Parse the blocks that overlap the time range in parallel and concatenate their results
+        val blockFile = BlockIndexedFile.open(metricFile)
+        val blockResults = blockFile.decodeBlocks(blockFile.blocksOverlapping(timeRange)) { block ->
+            ParserState(block.records, block.previousTimestamp).use { it.parse() }
+        }
+        if (blockResults.isEmpty()) return null
+        val numCpuCores = blockResults[0].numCpuCores
+        val parts = contiguousBlockResults(blockResults) { it.timestamps }.takeWhile { it.numCpuCores == numCpuCores }
+        if (parts.size == 1) return parts[0]
+        return CpuUtilizationData(
+            concatenateBlockTimestamps(parts.map { it.timestamps }),
+            concatenateArrays(parts.map { it.totalCoreUtilization }),
+            concatenateArrays(parts.map { it.coresFullyUtilized }),
+            numCpuCores,
+            (0 until numCpuCores).map { i -> concatenateArrays(parts.map { it.coreUtilization[i] }) }
+        )
+    }
+
     private fun mergeUtilizationData(utilizationDataStructures: List<CpuUtilizationData>): CpuUtilizationData {
         // Check that none of the metrics overlap
         val sortedUtilizationData = utilizationDataStructures.sortedBy { it.timestamps.first() }
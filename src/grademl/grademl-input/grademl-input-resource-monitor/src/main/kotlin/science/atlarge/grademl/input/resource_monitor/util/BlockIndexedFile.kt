@@ -0,0 +1,187 @@
+package science.atlarge.grademl.input.resource_monitor.util
+
+import science.atlarge.grademl.core.util.TimestampNs
+import science.atlarge.grademl.core.util.TimestampNsArray
+import java.io.ByteArrayInputStream
+import java.io.EOFException
+import java.io.File
+import java.io.IOException
+import java.io.InputStream
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
+import java.nio.channels.FileChannel
+import java.nio.file.StandardOpenOption
+import java.util.concurrent.Callable
+import java.util.concurrent.ForkJoinTask
+import java.util.zip.CRC32
+import java.util.zip.DataFormatException
+import java.util.zip.Inflater
+
+// Metric file written by the resource monitor with --block-samples, i.e., a sequence of blocks of compressed records
+// that each cover a range of timestamps, followed by an index of all blocks if the monitor shut down cleanly (see
+// doc/file-formats.md of the resource monitor). Files without an index are indexed by following the block headers,
+// ignoring a last block that was only partially written.
+class BlockIndexedFile private constructor(private val file: File, val blocks: List<Block>) {
+
+    class Block(val offset: Long, val firstTimestamp: TimestampNs, val lastTimestamp: TimestampNs)
+
+    // Records of a decoded block, and the timestamp of the last sample before the block (null for the first block)
+    class DecodedBlock(val previousTimestamp: TimestampNs?, val records: InputStream)
+
+    // Selects the blocks that describe any part of the given time range; each block describes the period from the
+    // last sample of the previous block to its own last sample
+    fun blocksOverlapping(timeRange: ClosedRange<TimestampNs>?): List<Block> {
+        if (timeRange == null) return blocks
+        return blocks.filterIndexed { index, block ->
+            val periodStart = if (index == 0) block.firstTimestamp else blocks[index - 1].lastTimestamp
+            block.lastTimestamp >= timeRange.start && periodStart <= timeRange.endInclusive
+        }
+    }
+
+    // Decodes the given blocks in parallel, as tasks in the calling thread's ForkJoinPool, and returns the results in
+    // the order of the blocks
+    fun <T> decodeBlocks(blocksToDecode: List<Block>, decode: (DecodedBlock) -> T): List<T> {
+        return FileChannel.open(file.toPath(), StandardOpenOption.READ).use { channel ->
+            val tasks = blocksToDecode.map { block ->
+                ForkJoinTask.adapt(Callable { decode(readBlock(channel, block)) })
+            }
+            ForkJoinTask.invokeAll(tasks)
+            tasks.map { it.join() }
+        }
+    }
+
+    private fun readBlock(channel: FileChannel, block: Block): DecodedBlock {
+        val header = channel.readFully(block.offset, BLOCK_HEADER_SIZE)
+        require(header.hasMagic(BLOCK_MAGIC)) { "Expected a block at offset ${block.offset} of \"$file\"" }
+        val previousTimestamp = header.getLong(24)
+        val uncompressedSize = header.getInt(32)
+        val compressedSize = header.getInt(36)
+        val checksum = header.getInt(40)
+        val compressedRecords = channel.readFully(block.offset + BLOCK_HEADER_SIZE, compressedSize)
+
+        // Decompress the block's records and verify their checksum
+        val records = ByteArray(uncompressedSize)
+        val inflater = Inflater()
+        try {
+            inflater.setInput(compressedRecords.array())
+            var bytesInflated = 0
+            while (bytesInflated < records.size && !inflater.finished()) {
+                val count = inflater.inflate(records, bytesInflated, records.size - bytesInflated)
+                if (count == 0 && inflater.needsInput()) break
+                bytesInflated += count
+            }
+            if (bytesInflated != records.size) {
+                throw IOException("Truncated block at offset ${block.offset} of \"$file\"")
+            }
+        } catch (e: DataFormatException) {
+            throw IOException("Corrupt block at offset ${block.offset} of \"$file\"", e)
+        } finally {
+            inflater.end()
+        }
+        if (CRC32().apply { update(records) }.value.toInt() != checksum) {
+            throw IOException("Checksum mismatch in block at offset ${block.offset} of \"$file\"")
+        }
+
+        return DecodedBlock(previousTimestamp.takeIf { it != 0L }, ByteArrayInputStream(records))
+    }
+
+    companion object {
+
+        private val FILE_MAGIC = "GMLRMB01".toByteArray(Charsets.US_ASCII)
+        private val BLOCK_MAGIC = "GMLB".toByteArray(Charsets.US_ASCII)
+        private val INDEX_MAGIC = "GMLRMIDX".toByteArray(Charsets.US_ASCII)
+        private const val FILE_HEADER_SIZE = 16
+        private const val BLOCK_HEADER_SIZE = 48
+        private const val INDEX_ENTRY_SIZE = 24
+        private const val INDEX_TRAILER_SIZE = 24
+
+        fun isBlockIndexed(file: File): Boolean {
+            if (file.length() < FILE_HEADER_SIZE) return false
+            return file.inputStream().use { it.readNBytes(FILE_MAGIC.size).contentEquals(FILE_MAGIC) }
+        }
+
+        fun open(file: File): BlockIndexedFile {
+            return FileChannel.open(file.toPath(), StandardOpenOption.READ).use { channel ->
+                require(channel.readFully(0, FILE_HEADER_SIZE).hasMagic(FILE_MAGIC)) {
+                    "File \"$file\" is not a block-indexed metric file"
+                }
+                BlockIndexedFile(file, readIndex(channel) ?: findBlocks(channel))
+            }
+        }
+
+        private fun readIndex(channel: FileChannel): List<Block>? {
+            val fileSize = channel.size()
+            if (fileSize < FILE_HEADER_SIZE + INDEX_TRAILER_SIZE) return null
+            val trailer = channel.readFully(fileSize - INDEX_TRAILER_SIZE, INDEX_TRAILER_SIZE)
+            val indexOffset = trailer.getLong(0)
+            val blockCount = trailer.getInt(8)
+            trailer.position(16)
+            if (!trailer.hasMagic(INDEX_MAGIC) || blockCount < 0 ||
+                indexOffset + blockCount.toLong() * INDEX_ENTRY_SIZE + INDEX_TRAILER_SIZE != fileSize
+            ) {
+                return null
+            }
+            val index = channel.readFully(indexOffset, blockCount * INDEX_ENTRY_SIZE)
+            return (0 until blockCount).map { i ->
+                val entryOffset = i * INDEX_ENTRY_SIZE
+                Block(index.getLong(entryOffset), index.getLong(entryOffset + 8), index.getLong(entryOffset + 16))
+            }
+        }
+
+        // Finds all complete blocks by following the block headers, e.g., if the monitor was killed
+        private fun findBlocks(channel: FileChannel): List<Block> {
+            val fileSize = channel.size()
+            val blocks = mutableListOf<Block>()
+            var offset = FILE_HEADER_SIZE.toLong()
+            while (offset + BLOCK_HEADER_SIZE <= fileSize) {
+                val header = channel.readFully(offset, BLOCK_HEADER_SIZE)
+                if (!header.hasMagic(BLOCK_MAGIC)) break
+                val blockEnd = offset + BLOCK_HEADER_SIZE + header.getInt(36).toUInt().toLong()
+                if (blockEnd > fileSize) break
+                blocks.add(Block(offset, header.getLong(8), header.getLong(16)))
+                offset = blockEnd
+            }
+            return blocks
+        }
+
+        private fun FileChannel.readFully(position: Long, size: Int): ByteBuffer {
+            val buffer = ByteBuffer.allocate(size).order(ByteOrder.LITTLE_ENDIAN)
+            while (buffer.hasRemaining()) {
+                if (read(buffer, position + buffer.position()) < 0) {
+                    throw EOFException("Reached end-of-file before reading $size bytes at offset $position")
+                }
+            }
+            buffer.flip()
+            return buffer
+        }
+
+        // Checks for the given magic bytes at the buffer's current position
+        private fun ByteBuffer.hasMagic(magic: ByteArray): Boolean {
+            if (remaining() < magic.size) return false
+            return magic.indices.all { get(position() + it) == magic[it] }
+        }
+
+    }
+
+}
+
+// Selects the leading results of consecutive blocks that each continue from the last timestamp of the previous result;
+// a parser stops reading a block early if, e.g., the set of monitored devices changes, so later blocks are dropped
+fun <T> contiguousBlockResults(blockResults: List<T>, timestampsOf: (T) -> TimestampNsArray): List<T> {
+    var count = if (blockResults.isEmpty()) 0 else 1
+    while (count < blockResults.size) {
+        val previousTimestamps = timestampsOf(blockResults[count - 1])
+        val nextTimestamps = timestampsOf(blockResults[count])
+        if (previousTimestamps.isEmpty() || nextTimestamps.isEmpty()) break
+        if (nextTimestamps.first() != previousTimestamps.last()) break
+        count++
+    }
+    return blockResults.subList(0, count)
+}
+
+// Concatenates the timestamps of contiguous block results, which share the timestamp at each block boundary
+fun concatenateBlockTimestamps(timestampArrays: List<TimestampNsArray>): TimestampNsArray {
+    return concatenateArrays(timestampArrays.mapIndexed { i, timestamps ->
+        if (i == 0) timestamps else timestamps.copyOfRange(1, timestamps.size)
+    })
+}
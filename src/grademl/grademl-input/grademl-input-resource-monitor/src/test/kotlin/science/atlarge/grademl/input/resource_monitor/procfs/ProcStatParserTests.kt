@@ -0,0 +1,73 @@
+package science.atlarge.grademl.input.resource_monitor.procfs
+
+import java.io.File
+import java.nio.file.Files
+import kotlin.test.Test
+import kotlin.test.assertContentEquals
+import kotlin.test.assertEquals
+import kotlin.test.assertNull
+
+class ProcStatParserTests {
+
+    // Written by the resource monitor's output code ("make reference-file" in src/resource-monitor): ten samples of
+    // two CPUs at 1 s + i * 100 ms in blocks of four samples, where CPU c is busy for (7 * i + 30 * c) % 100 percent
+    // of sample i
+    private val referenceFile = javaClass.getResourceAsStream(
+        "/science/atlarge/grademl/input/resource_monitor/proc-stat-node1"
+    )!!.use { it.readBytes() }
+
+    private fun withMetricFile(contents: ByteArray, test: (File) -> Unit) {
+        val directory = Files.createTempDirectory("proc-stat-parser-test")
+        try {
+            val file = directory.resolve("proc-stat-node1").toFile()
+            file.writeBytes(contents)
+            test(file)
+        } finally {
+            directory.toFile().deleteRecursively()
+        }
+    }
+
+    private fun timestampOf(sample: Int) = 1_000_000_000L + sample * 100_000_000L
+
+    private fun utilizationOf(sample: Int, cpuId: Int) = ((7 * sample + 30 * cpuId) % 100) / 100.0
+
+    // Checks the utilization of the given samples, i.e., of the periods ending at those samples
+    private fun assertSamples(samples: IntRange, data: CpuUtilizationData) {
+        assertContentEquals(LongArray(samples.count() + 1) { timestampOf(samples.first - 1 + it) }, data.timestamps)
+        assertEquals(2, data.numCpuCores)
+        for (cpuId in 0 until 2) {
+            assertContentEquals(samples.map { utilizationOf(it, cpuId) }.toDoubleArray(), data.coreUtilization[cpuId])
+        }
+        assertContentEquals(
+            samples.map { utilizationOf(it, 0) + utilizationOf(it, 1) }.toDoubleArray(),
+            data.totalCoreUtilization
+        )
+        assertContentEquals(LongArray(samples.count()), data.coresFullyUtilized)
+    }
+
+    @Test
+    fun testParseAllBlocks() {
+        withMetricFile(referenceFile) { file ->
+            assertSamples(1..9, ProcStatParser.parse("node1", listOf(file), null)!!)
+        }
+    }
+
+    @Test
+    fun testParseBlocksInTimeRange() {
+        withMetricFile(referenceFile) { file ->
+            // Only the second block overlaps the time range; its first sample continues from the first block
+            assertSamples(4..7, ProcStatParser.parse("node1", listOf(file), timestampOf(5)..timestampOf(6))!!)
+            assertSamples(4..9, ProcStatParser.parse("node1", listOf(file), timestampOf(7)..timestampOf(8))!!)
+            assertNull(ProcStatParser.parse("node1", listOf(file), timestampOf(20)..timestampOf(30)))
+        }
+    }
+
+    @Test
+    fun testParseFileOfKilledMonitor() {
+        // Without an index and with a partially written last block, the complete blocks are parsed
+        withMetricFile(referenceFile.copyOf(264 + 48 + 20)) { file ->
+            assertSamples(1..7, ProcStatParser.parse("node1", listOf(file), null)!!)
+        }
+    }
+
+}
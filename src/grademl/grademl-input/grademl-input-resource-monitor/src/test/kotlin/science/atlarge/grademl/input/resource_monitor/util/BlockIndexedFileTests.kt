@@ -0,0 +1,133 @@
+package science.atlarge.grademl.input.resource_monitor.util
+
+import java.io.File
+import java.nio.file.Files
+import kotlin.test.Test
+import kotlin.test.assertContentEquals
+import kotlin.test.assertEquals
+import kotlin.test.assertFails
+import kotlin.test.assertFalse
+import kotlin.test.assertTrue
+
+class BlockIndexedFileTests {
+
+    // Written by the resource monitor's output code ("make reference-file" in src/resource-monitor): ten samples at
+    // 1 s + i * 100 ms in blocks of four samples, i.e., blocks at offsets 16, 141, and 264, followed by an index
+    private val referenceFile = javaClass.getResourceAsStream(
+        "/science/atlarge/grademl/input/resource_monitor/proc-stat-node1"
+    )!!.use { it.readBytes() }
+
+    private val indexOffset = 357
+
+    private fun withMetricFile(contents: ByteArray, test: (File) -> Unit) {
+        val directory = Files.createTempDirectory("block-indexed-file-test")
+        try {
+            val file = directory.resolve("proc-stat-node1").toFile()
+            file.writeBytes(contents)
+            test(file)
+        } finally {
+            directory.toFile().deleteRecursively()
+        }
+    }
+
+    private fun describe(blocks: List<BlockIndexedFile.Block>): List<Triple<Long, Long, Long>> =
+        blocks.map { Triple(it.offset, it.firstTimestamp, it.lastTimestamp) }
+
+    private val allBlocks = listOf(
+        Triple(16L, 1_000_000_000L, 1_300_000_000L),
+        Triple(141L, 1_400_000_000L, 1_700_000_000L),
+        Triple(264L, 1_800_000_000L, 1_900_000_000L)
+    )
+
+    @Test
+    fun testBlocksAreReadFromIndex() {
+        withMetricFile(referenceFile) { file ->
+            assertTrue(BlockIndexedFile.isBlockIndexed(file))
+            assertEquals(allBlocks, describe(BlockIndexedFile.open(file).blocks))
+        }
+    }
+
+    @Test
+    fun testPlainMetricFileIsNotBlockIndexed() {
+        withMetricFile(ByteArray(32) { it.toByte() }) { file ->
+            assertFalse(BlockIndexedFile.isBlockIndexed(file))
+            assertFails { BlockIndexedFile.open(file) }
+        }
+    }
+
+    @Test
+    fun testBlocksAreFoundWithoutIndex() {
+        // A monitor that was killed writes no index, or only part of it
+        withMetricFile(referenceFile.copyOf(indexOffset)) { file ->
+            assertEquals(allBlocks, describe(BlockIndexedFile.open(file).blocks))
+        }
+        withMetricFile(referenceFile.copyOf(referenceFile.size - 10)) { file ->
+            assertEquals(allBlocks, describe(BlockIndexedFile.open(file).blocks))
+        }
+        // A partially written last block is ignored, whether it is cut off in its header or in its records
+        withMetricFile(referenceFile.copyOf(264 + 20)) { file ->
+            assertEquals(allBlocks.take(2), describe(BlockIndexedFile.open(file).blocks))
+        }
+        withMetricFile(referenceFile.copyOf(264 + 48 + 20)) { file ->
+            assertEquals(allBlocks.take(2), describe(BlockIndexedFile.open(file).blocks))
+        }
+    }
+
+    @Test
+    fun testBlocksOverlappingTimeRange() {
+        withMetricFile(referenceFile) { file ->
+            val blockFile = BlockIndexedFile.open(file)
+            assertEquals(allBlocks, describe(blockFile.blocksOverlapping(null)))
+            assertEquals(allBlocks.subList(1, 2), describe(blockFile.blocksOverlapping(1_450_000_000L..1_500_000_000L)))
+            // The second block also describes the period since the last sample of the first block
+            assertEquals(allBlocks.subList(1, 2), describe(blockFile.blocksOverlapping(1_350_000_000L..1_350_000_000L)))
+            assertEquals(allBlocks.subList(1, 3), describe(blockFile.blocksOverlapping(1_700_000_000L..1_750_000_000L)))
+            assertEquals(emptyList(), describe(blockFile.blocksOverlapping(2_000_000_000L..3_000_000_000L)))
+        }
+    }
+
+    @Test
+    fun testDecodeBlocks() {
+        withMetricFile(referenceFile) { file ->
+            val blockFile = BlockIndexedFile.open(file)
+            val decodedBlocks = blockFile.decodeBlocks(blockFile.blocks) { block ->
+                // Every proc-stat record is a timestamp followed by 21 single-byte values (2 CPUs)
+                val timestamps = mutableListOf<Long>()
+                while (block.records.available() > 0) {
+                    timestamps.add(block.records.readLELong())
+                    block.records.readNBytes(21)
+                }
+                block.previousTimestamp to timestamps
+            }
+            assertEquals(
+                listOf(
+                    null to (10..13).map { it * 100_000_000L },
+                    1_300_000_000L to (14..17).map { it * 100_000_000L },
+                    1_700_000_000L to (18..19).map { it * 100_000_000L }
+                ),
+                decodedBlocks
+            )
+        }
+    }
+
+    @Test
+    fun testCorruptBlockIsRejected() {
+        val corruptFile = referenceFile.copyOf().also { it[141 + 48 + 10] = (it[141 + 48 + 10] + 1).toByte() }
+        withMetricFile(corruptFile) { file ->
+            val blockFile = BlockIndexedFile.open(file)
+            blockFile.decodeBlocks(blockFile.blocks.take(1)) { it.records.readLELong() }
+            assertFails { blockFile.decodeBlocks(blockFile.blocks.subList(1, 2)) { it.records.readLELong() } }
+        }
+    }
+
+    @Test
+    fun testContiguousBlockResults() {
+        val results = listOf(longArrayOf(1, 2, 3), longArrayOf(3, 4), longArrayOf(4, 5), longArrayOf(6, 7))
+        assertEquals(results.take(3), contiguousBlockResults(results) { it })
+        // A block result without timestamps ends the contiguous results
+        assertEquals(results.take(1), contiguousBlockResults(listOf(results[0], longArrayOf(), results[1])) { it })
+        assertEquals(emptyList(), contiguousBlockResults(emptyList<LongArray>()) { it })
+        assertContentEquals(longArrayOf(1, 2, 3, 4, 5), concatenateBlockTimestamps(results.take(3)))
+    }
+
+}
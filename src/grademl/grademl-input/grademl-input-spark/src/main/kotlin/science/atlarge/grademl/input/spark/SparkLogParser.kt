@@ -4,11 +4,13 @@ import kotlinx.serialization.json.Json
 import kotlinx.serialization.json.JsonArray
 import kotlinx.serialization.json.JsonObject
 import kotlinx.serialization.json.JsonPrimitive
+import science.atlarge.grademl.core.input.LogFileScan
+import science.atlarge.grademl.core.input.LogFileSet
+import science.atlarge.grademl.core.input.LogParser
+import science.atlarge.grademl.core.input.LogScanner
 import science.atlarge.grademl.core.util.TimestampNs
 import java.io.File
-import java.nio.file.Files
 import java.nio.file.Path
-import kotlin.streams.toList
 
 typealias SparkAppId = String
 typealias SparkJobId = UInt
@@ -39,77 +41,81 @@ class SparkLogParser private constructor(
     private val sparkLogDirectories: Iterable<Path>
 ) {
 
-    private val appLogFiles = mutableSetOf<File>()
-    private val sparkApps = mutableMapOf<SparkAppId, SparkAppInfo>()
-    private val sparkJobsPerApp = mutableMapOf<SparkAppId, List<SparkJobInfo>>()
-    private val sparkStagesPerApp = mutableMapOf<SparkAppId, List<SparkStageInfo>>()
-    private val sparkTasksPerApp = mutableMapOf<SparkAppId, List<SparkTaskInfo>>()
-    private val sparkJobDependenciesPerApp = mutableMapOf<SparkAppId, Map<SparkJobId, Set<SparkJobId>>>()
+    private val sparkApps = mutableMapOf<SparkAppId, SparkAppLog>()
 
     private fun parse(): SparkLog {
-        findAppLogFiles()
-        for (logFile in appLogFiles) {
-            parseSparkLogFile(logFile)
+        // Scan the files in the Spark log directories in parallel, parsing the events of each application as its
+        // event log is scanned
+        for (appLog in LogScanner.scan(sparkLogDirectories, EVENT_LOG_FILES, EventLogParser())) {
+            sparkApps[appLog.result.appInfo.id] = appLog.result
         }
-        return SparkLog(
-            sparkApps.keys.map { appId ->
-                SparkAppLog(
-                    sparkApps[appId]!!,
-                    sparkJobsPerApp[appId]!!,
-                    sparkStagesPerApp[appId]!!,
-                    sparkTasksPerApp[appId]!!,
-                    sparkJobDependenciesPerApp[appId]!!
-                )
-            }
-        )
+        return SparkLog(sparkApps.values.toList())
+    }
+
+    private inner class EventLogParser : LogParser<SparkAppLog> {
+        override fun startFile(logFile: File): LogFileScan<SparkAppLog> = EventLogScan()
     }
 
-    private fun findAppLogFiles() {
-        // Find all files in the Spark log directory
-        val logFiles = sparkLogDirectories.flatMap { directory ->
-            Files.list(directory).use { fileList ->
-                fileList.map { it.toFile() }
-                    .filter { it.isFile }
-                    .toList()
+    private inner class EventLogScan : LogFileScan<SparkAppLog> {
+
+        // Whether this file is a Spark application log file, determined by its first ApplicationStart event
+        private var isAppLog: Boolean? = null
+        // Events of the application, and lines read before the file is known to be an application log file
+        private val sparkEvents = mutableListOf<JsonObject>()
+        private val pendingLines = mutableListOf<String>()
+
+        override fun processLine(line: String) {
+            if (line.isBlank() || isAppLog == false) return
+            if (isAppLog == true) {
+                sparkEvents.add(Json.parseToJsonElement(line) as JsonObject)
+                return
+            }
+            pendingLines.add(line)
+            // Check the first ApplicationStart event, if it exists in this file, to verify that this file is
+            // a Spark application log file. Spark writes it among the first events of an application, so stop
+            // buffering lines of files that do not start with it (e.g., other logs in the same directory).
+            if ("SparkListenerApplicationStart" !in line) {
+                if (pendingLines.size >= MAX_LINES_BEFORE_APPLICATION_START) {
+                    isAppLog = false
+                    pendingLines.clear()
+                }
+                return
             }
+            isAppLog = hasAppId(line)
+            if (isAppLog == true) pendingLines.mapTo(sparkEvents) { Json.parseToJsonElement(it) as JsonObject }
+            pendingLines.clear()
         }
-        // Check each file for a Spark application ID
-        for (logFile in logFiles) {
-            // Find the first ApplicationStart event, if it exists in this file, to verify that this file is
-            // a Spark application log file
-            val applicationStartLine = logFile.useLines { lines ->
-                lines.firstOrNull { "SparkListenerApplicationStart" in it }
-            } ?: continue
-            try {
-                val eventJson = Json.parseToJsonElement(applicationStartLine)
-                if (eventJson !is JsonObject) continue
-                val appIdJson = eventJson["App ID"] ?: continue
-                if (appIdJson !is JsonPrimitive) continue
 
-                appLogFiles.add(logFile)
+        private fun hasAppId(applicationStartLine: String): Boolean {
+            return try {
+                val eventJson = Json.parseToJsonElement(applicationStartLine)
+                eventJson is JsonObject && eventJson["App ID"] is JsonPrimitive
             } catch (_: Exception) {
-                continue
+                false
             }
         }
-    }
 
-    private fun parseSparkLogFile(logFile: File) {
-        // Parse each line in the file to a JSON object representing one Spark event
-        val sparkEvents = logFile.useLines { lines ->
-            lines.filter { it.isNotBlank() }
-                .map { Json.parseToJsonElement(it) as JsonObject }
-                .toList()
+        override fun finish(): SparkAppLog? {
+            if (isAppLog != true) return null
+            return parseSparkEvents(sparkEvents)
         }
+
+    }
+
+    private fun parseSparkEvents(sparkEvents: List<JsonObject>): SparkAppLog {
         // Group events by event type for easier lookups
         val groupedSparkEvents = sparkEvents.groupBy { (it["Event"] as JsonPrimitive).content }
         // Parse different kinds of events for relevant information
-        val appId = parseAppId(groupedSparkEvents)
-        sparkApps[appId] = parseAppInfo(groupedSparkEvents)
-        sparkJobsPerApp[appId] = parseSparkJobs(groupedSparkEvents)
+        parseAppId(groupedSparkEvents)
+        val sparkJobs = parseSparkJobs(groupedSparkEvents)
         val (tasks, stagesToTasksMap) = parseSparkTasks(groupedSparkEvents)
-        sparkTasksPerApp[appId] = tasks
-        sparkStagesPerApp[appId] = parseSparkStages(groupedSparkEvents, stagesToTasksMap)
-        sparkJobDependenciesPerApp[appId] = inferJobDependencies(sparkJobsPerApp[appId]!!)
+        return SparkAppLog(
+            parseAppInfo(groupedSparkEvents),
+            sparkJobs,
+            parseSparkStages(groupedSparkEvents, stagesToTasksMap),
+            tasks,
+            inferJobDependencies(sparkJobs)
+        )
     }
 
     private fun parseAppId(groupedSparkEvents: Map<String, List<JsonObject>>): String {
@@ -291,6 +297,9 @@ class SparkLogParser private constructor(
 
     companion object {
 
+        private val EVENT_LOG_FILES = LogFileSet()
+        private const val MAX_LINES_BEFORE_APPLICATION_START = 100
+
         fun parseFromDirectories(sparkLogDirectories: Iterable<Path>): SparkLog {
             return SparkLogParser(sparkLogDirectories).parse()
         }
@@ -11,6 +11,10 @@ import kotlin.system.exitProcess
 
 object TensorFlow : InputSource {
 
+    init {
+        TensorFlowLogParser.registerLogParser()
+    }
+
     override fun parseJobData(
         jobDataDirectories: Iterable<Path>,
         unifiedExecutionModel: ExecutionModel,
@@ -1,125 +1,135 @@
 package science.atlarge.grademl.input.tensorflow
 
+import science.atlarge.grademl.core.input.LogFileScan
+import science.atlarge.grademl.core.input.LogFileSet
+import science.atlarge.grademl.core.input.LogParser
+import science.atlarge.grademl.core.input.LogScanner
 import science.atlarge.grademl.core.util.TimestampNs
 import java.io.File
-import java.nio.file.Files
 import java.nio.file.Path
 import java.time.LocalDateTime
 import java.time.ZoneId
 import java.time.format.DateTimeFormatter
-import kotlin.streams.toList
 
 class TensorFlowLogParser private constructor(
     private val airflowLogDirectories: Iterable<Path>
 ) {
 
     private fun parse(): TensorFlowLog {
-        val jobLogFiles = findAppLogFiles()
-        return TensorFlowLog(
-            jobLogFiles.map { parseTensorFlowLogFile(it) }
-        )
+        // Scan the Airflow task logs for TensorFlow jobs, together with other parsers of Airflow task logs
+        val jobLogs = LogScanner.scan(airflowLogDirectories, AIRFLOW_TASK_LOG_FILES, JobLogParser)
+        return TensorFlowLog(jobLogs.map { it.result })
     }
 
-    private fun findAppLogFiles(): MutableList<File> {
-        // Find all log files in the Airflow log directories
-        val logFiles = airflowLogDirectories.flatMap { directory ->
-            Files.walk(directory).use { fileList ->
-                fileList.map { it.toFile() }
-                    .filter { it.isFile && it.extension == "log" }
-                    .toList()
+    // Parses Airflow task logs that contain a TensorFlow log entry, reading only the lines that describe the Airflow
+    // task or contain TensorFlow and INFO log entries
+    private object JobLogParser : LogParser<TensorFlowJobLog> {
+        override val linePrefixes = listOf("AIRFLOW_CTX_")
+        override val lineSubstrings = listOf("I tensorflow/", "INFO")
+
+        override fun startFile(logFile: File): LogFileScan<TensorFlowJobLog> = JobLogScan(logFile)
+    }
+
+    private class JobLogScan(private val jobLogFile: File) : LogFileScan<TensorFlowJobLog> {
+
+        private var isTensorFlowLog = false
+        private var dagId: String? = null
+        private var runId: String? = null
+        private var taskId: String? = null
+        private var startTimeLine: String? = null
+        private var endTimeLine: String? = null
+
+        // Epochs found so far, and the epoch whose end is marked by the next INFO log line
+        private val epochs = mutableMapOf<Int, Pair<TimestampNs, TimestampNs>>()
+        private var currentEpoch: Int? = null
+        private var currentEpochStartTime: TimestampNs = 0L
+
+        override fun processLine(line: String) {
+            if ("I tensorflow/" in line) isTensorFlowLog = true
+
+            // Find the DAG, run, and task IDs for the Airflow task corresponding to this TensorFlow job
+            if (line.startsWith("AIRFLOW_CTX_")) {
+                val value = line.substringAfter("=", "").trim()
+                when {
+                    line.startsWith("AIRFLOW_CTX_DAG_ID=") -> if (dagId == null) dagId = value
+                    line.startsWith("AIRFLOW_CTX_DAG_RUN_ID=") -> if (runId == null) runId = value
+                    line.startsWith("AIRFLOW_CTX_TASK_ID=") -> if (taskId == null) taskId = value
+                }
+                return
             }
-        }
-        // Check each file for a TensorFlow reference
-        val tensorFlowLogs = mutableListOf<File>()
-        for (logFile in logFiles) {
-            // Check if this log file contains a TensorFlow log entry
-            val isTensorFlowLog = logFile.useLines { lines ->
-                if (lines.any { "I tensorflow/" in it }) {
-                    tensorFlowLogs.add(logFile)
+
+            // Find records of the start and end time of the task
+            if (startTimeLine == null && "INFO - Executing <Task" in line) startTimeLine = line
+            if ("INFO - Marking task" in line) endTimeLine = line
+
+            // Find log lines indicating the start of an epoch
+            // The next "empty" (i.e., multi-line) log line after is the end of the epoch
+            val epoch = currentEpoch
+            if (epoch != null) {
+                if (END_LINE_REGEX.matchEntire(line) != null) {
+                    epochs[epoch] = currentEpochStartTime to parseDateTimeForLogLine(line)
+                    currentEpoch = null
                 }
+                return
             }
+            val matchingStartOfEpoch = START_LINE_REGEX.matchEntire(line) ?: return
+            currentEpoch = matchingStartOfEpoch.groupValues[1].toInt()
+            currentEpochStartTime = parseDateTimeForLogLine(line)
         }
-        return tensorFlowLogs
-    }
-
-    private fun parseTensorFlowLogFile(jobLogFile: File): TensorFlowJobLog {
-        // Read the log file
-        val logLines = jobLogFile.readLines()
-
-        // Find the DAG ID for the Airflow task corresponding to this TensorFlow job
-        val dagId = logLines.first { it.startsWith("AIRFLOW_CTX_DAG_ID=") }
-            .split("=", limit = 2)[1].trim()
 
-        // Find the run ID for the Airflow task corresponding to this TensorFlow job
-        val runId = logLines.first { it.startsWith("AIRFLOW_CTX_DAG_RUN_ID=") }
-            .split("=", limit = 2)[1].trim()
-
-        // Find the task ID for the Airflow task corresponding to this TensorFlow job
-        val taskId = logLines.first { it.startsWith("AIRFLOW_CTX_TASK_ID=") }
-            .split("=", limit = 2)[1].trim()
-
-        // Construct a job ID
-        val jobId = TensorFlowJobId(dagId, runId, taskId)
-
-        // Find records of the start and end time of the task
-        val startTimeLine = logLines.first { "INFO - Executing <Task" in it }
-        val endTimeLine = logLines.last { "INFO - Marking task" in it }
+        override fun finish(): TensorFlowJobLog? {
+            if (!isTensorFlowLog) return null
+
+            // Construct a job ID
+            val jobId = TensorFlowJobId(
+                requireNotNull(dagId) { "No AIRFLOW_CTX_DAG_ID found in \"$jobLogFile\"" },
+                requireNotNull(runId) { "No AIRFLOW_CTX_DAG_RUN_ID found in \"$jobLogFile\"" },
+                requireNotNull(taskId) { "No AIRFLOW_CTX_TASK_ID found in \"$jobLogFile\"" }
+            )
+            val jobStartTime = parseDateTimeForLogLine(
+                requireNotNull(startTimeLine) { "No start of task found in \"$jobLogFile\"" }
+            )
+            val jobEndTime = parseDateTimeForLogLine(
+                requireNotNull(endTimeLine) { "No end of task found in \"$jobLogFile\"" }
+            )
+
+            val sortedEopchs = epochs.toList()
+                .sortedWith(compareBy({ it.second.first }, { it.second.second }, { it.first }))
+
+            return TensorFlowJobLog(
+                jobId,
+                jobStartTime,
+                jobEndTime,
+                sortedEopchs.map { it.first.toString() },
+                sortedEopchs.map { it.second.first },
+                sortedEopchs.map { it.second.second }
+            )
+        }
 
         // Parse dates and times (assuming local time)
-        fun parseDateTimeForLogLine(logLine: String): TimestampNs {
+        private fun parseDateTimeForLogLine(logLine: String): TimestampNs {
             val dateTime = logLine.substring(1, logLine.indexOf(']'))
             val instant = LocalDateTime
-                .parse(dateTime, DateTimeFormatter.ofPattern("yyyy-MM-dd HH:mm:ss,SSS"))
+                .parse(dateTime, DATE_TIME_FORMATTER)
                 .atZone(ZoneId.systemDefault())
                 .toInstant()
             return instant.epochSecond * 1_000_000_000L + instant.nano
         }
 
-        val jobStartTime = parseDateTimeForLogLine(startTimeLine)
-        val jobEndTime = parseDateTimeForLogLine(endTimeLine)
-
-        // Find log lines indicating the start of an epoch
-        // The next "empty" (i.e., multi-line) log line after is the end of the epoch
-        val epochs = mutableMapOf<Int, Pair<TimestampNs, TimestampNs>>()
-        var logLineNumber = 0
-        while (logLineNumber < logLines.size) {
-            val line = logLines[logLineNumber]
-            // Check if the current log line indicates the start of an epoch
-            val matchingStartOfEpoch = START_LINE_REGEX.matchEntire(line)
-            if (matchingStartOfEpoch == null) {
-                // If not, continue processing the next log line
-                logLineNumber++
-                continue
-            }
-            // Extract the start time and epoch number
-            val startTime = parseDateTimeForLogLine(line)
-            val epoch = matchingStartOfEpoch.groupValues[1].toInt()
-            // Find the next line representing the end of an epoch
-            logLineNumber++
-            while (END_LINE_REGEX.matchEntire(logLines[logLineNumber]) == null) logLineNumber++
-            // Extract the end time of the epoch
-            val endTime = parseDateTimeForLogLine(logLines[logLineNumber])
-
-            epochs[epoch] = startTime to endTime
-
-            logLineNumber++
-        }
-        val sortedEopchs = epochs.toList()
-            .sortedWith(compareBy({ it.second.first }, { it.second.second }, { it.first }))
-
-        return TensorFlowJobLog(
-            jobId,
-            jobStartTime,
-            jobEndTime,
-            sortedEopchs.map { it.first.toString() },
-            sortedEopchs.map { it.second.first },
-            sortedEopchs.map { it.second.second }
-        )
     }
 
     companion object {
         private val START_LINE_REGEX = """\[[0-9- :,]*] .* INFO -.*<stdout>:Epoch ([0-9]+)/[0-9+]+""".toRegex()
         private val END_LINE_REGEX = """\[[0-9- :,]*] .* INFO .*""".toRegex()
+        private val DATE_TIME_FORMATTER = DateTimeFormatter.ofPattern("yyyy-MM-dd HH:mm:ss,SSS")
+
+        // Airflow task logs, which are scanned once for TensorFlow jobs and the Airflow tasks themselves
+        private val AIRFLOW_TASK_LOG_FILES = LogFileSet(extension = "log", recursive = true)
+
+        // Registers the parser for TensorFlow jobs, so it is included when other input sources scan Airflow task logs
+        fun registerLogParser() {
+            LogScanner.register(AIRFLOW_TASK_LOG_FILES, JobLogParser)
+        }
 
         fun parseFromDirectories(tensorFlowLogDirectories: Iterable<Path>): TensorFlowLog {
             return TensorFlowLogParser(tensorFlowLogDirectories).parse()
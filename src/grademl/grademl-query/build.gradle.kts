@@ -12,6 +12,8 @@ application {
 dependencies {
     implementation(project(":grademl-core"))
     implementation(project(":grademl-input:grademl-input-airflow"))
+    implementation(project(":grademl-input:grademl-input-framework-trace"))
+    implementation(project(":grademl-input:grademl-input-phase-markers"))
     implementation(project(":grademl-input:grademl-input-resource-monitor"))
     implementation(project(":grademl-input:grademl-input-spark"))
     implementation(project(":grademl-input:grademl-input-tensorflow"))
@@ -29,3 +31,22 @@ dependencies {
 tasks.test {
     useJUnitPlatform()
 }
+
+// Add a start script for the query server to the distribution, next to the start script of the query CLI
+val queryServerStartScripts by tasks.registering(CreateStartScripts::class) {
+    mainClass.set("science.atlarge.grademl.query.QueryServer")
+    applicationName = "grademl-query-server"
+    optsEnvironmentVar = "GRADEML_QUERY_OPTS"
+    outputDir = file("$buildDir/query-server-scripts")
+    classpath = tasks.startScripts.get().classpath
+}
+
+distributions {
+    main {
+        contents {
+            from(queryServerStartScripts) {
+                into("bin")
+            }
+        }
+    }
+}
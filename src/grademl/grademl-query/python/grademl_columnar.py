@@ -0,0 +1,201 @@
+"""Reader for the columnar binary format written by GradeML's EXPORT statement for files ending in ".gmlc".
+
+A file consists of a header, a sequence of chunks, and a footer. All values are little-endian, and every section is
+padded to a multiple of 8 bytes, so column blocks are memory-mapped as aligned NumPy arrays without copying:
+
+    header:  magic (8 bytes, b'GMLCOL01'), column count (int32), 0 (int32), and per column: type (uint8, 0 = BOOLEAN,
+             1 = NUMERIC, 2 = STRING), key flag (uint8), name length (uint16), UTF-8 name
+    chunk:   row count (int64), followed by a block per column:
+             BOOLEAN: one byte per row (0 or 1)
+             NUMERIC: one float64 per row
+             STRING:  number of new dictionary entries (int32), their total size in bytes (int32), the end offset of
+                      each entry (int32), UTF-8 entries; followed by one dictionary code per row (int32)
+    footer:  -1 (int64), total row count (int64)
+
+String columns are dictionary-encoded: each chunk adds the strings it introduces to the column's dictionary, and codes
+index into the dictionary built by all chunks so far. Example:
+
+    with ColumnarTable('query-output/metrics.gmlc') as table:
+        usage = table.column('utilization')               # float64 array
+        phases = table.strings('phase')                   # object array of str
+        codes, names = table.column('phase'), table.dictionary('phase')
+"""
+
+import mmap
+import struct
+
+import numpy as np
+
+COLUMNAR_MAGIC = b'GMLCOL01'
+COLUMNAR_HEADER = struct.Struct('<8sii')
+COLUMN_HEADER = struct.Struct('<BBH')
+CHUNK_HEADER = struct.Struct('<q')
+DICTIONARY_HEADER = struct.Struct('<ii')
+
+TYPE_BOOLEAN = 0
+TYPE_NUMERIC = 1
+TYPE_STRING = 2
+
+_END_OF_CHUNKS = -1
+
+
+def _padded(size):
+    return (size + 7) & ~7
+
+
+class Column(object):
+    """Name, type, and key flag of a column in a columnar table"""
+
+    def __init__(self, name, column_type, is_key):
+        self.name = name
+        self.type = column_type
+        self.is_key = is_key
+
+    def __repr__(self):
+        return 'Column({!r}, {}, is_key={})'.format(self.name, ('BOOLEAN', 'NUMERIC', 'STRING')[self.type], self.is_key)
+
+
+class ColumnarTable(object):
+    """Memory-maps a columnar table and exposes its columns as NumPy arrays
+
+    Arrays of a single chunk are views of the file and remain valid only while the table is open. Arrays of tables
+    with multiple chunks are concatenated on first use; use chunks() to access each chunk without copying.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.columns = []
+        self._column_indices = {}
+        self._chunks = []
+        self._dictionaries = []
+        self._merged_columns = {}
+        self.num_rows = 0
+        self._parse()
+
+    def _parse(self):
+        buffer = self._map
+        magic, column_count, _ = COLUMNAR_HEADER.unpack_from(buffer, 0)
+        if magic != COLUMNAR_MAGIC:
+            raise ValueError('File "{}" is not a GradeML columnar table'.format(self.path))
+        offset = COLUMNAR_HEADER.size
+        for index in range(column_count):
+            column_type, is_key, name_length = COLUMN_HEADER.unpack_from(buffer, offset)
+            offset += COLUMN_HEADER.size
+            name = bytes(buffer[offset:offset + name_length]).decode('utf-8')
+            offset += name_length
+            self.columns.append(Column(name, column_type, bool(is_key)))
+            self._column_indices[name] = index
+        offset = _padded(offset)
+        self._dictionaries = [[] if column.type == TYPE_STRING else None for column in self.columns]
+
+        while True:
+            row_count, = CHUNK_HEADER.unpack_from(buffer, offset)
+            offset += CHUNK_HEADER.size
+            if row_count == _END_OF_CHUNKS:
+                break
+            chunk = []
+            for index, column in enumerate(self.columns):
+                if column.type == TYPE_BOOLEAN:
+                    chunk.append(np.frombuffer(buffer, dtype=np.bool_, count=row_count, offset=offset))
+                    offset += _padded(row_count)
+                elif column.type == TYPE_NUMERIC:
+                    chunk.append(np.frombuffer(buffer, dtype='<f8', count=row_count, offset=offset))
+                    offset += 8 * row_count
+                elif column.type == TYPE_STRING:
+                    offset = self._read_dictionary_entries(index, offset)
+                    chunk.append(np.frombuffer(buffer, dtype='<i4', count=row_count, offset=offset))
+                    offset += _padded(4 * row_count)
+                else:
+                    raise ValueError('Unknown type {} of column "{}" in "{}"'.format(column.type, column.name,
+                                                                                  self.path))
+            self._chunks.append(chunk)
+            self.num_rows += row_count
+
+        total_rows, = CHUNK_HEADER.unpack_from(buffer, offset)
+        if total_rows != self.num_rows:
+            raise ValueError('File "{}" is truncated: expected {} rows, found {}'.format(self.path, total_rows,
+                                                                                     self.num_rows))
+
+    def _read_dictionary_entries(self, column_index, offset):
+        buffer = self._map
+        entry_count, byte_count = DICTIONARY_HEADER.unpack_from(buffer, offset)
+        offset += DICTIONARY_HEADER.size
+        end_offsets = np.frombuffer(buffer, dtype='<i4', count=entry_count, offset=offset)
+        offset += 4 * entry_count
+        data = bytes(buffer[offset:offset + byte_count])
+        start = 0
+        dictionary = self._dictionaries[column_index]
+        for end in end_offsets.tolist():
+            dictionary.append(data[start:end].decode('utf-8'))
+            start = end
+        return _padded(offset + byte_count)
+
+    def _index_of(self, name):
+        try:
+            return self._column_indices[name]
+        except KeyError:
+            raise KeyError('Table "{}" has no column "{}"'.format(self.path, name))
+
+    def chunks(self):
+        """Returns a list of chunks, each a dict of column name to an array that is a view of the file"""
+        return [{column.name: values for column, values in zip(self.columns, chunk)} for chunk in self._chunks]
+
+    def column(self, name):
+        """Returns the values of a column: bool for BOOLEAN, float64 for NUMERIC, and int32 codes for STRING"""
+        index = self._index_of(name)
+        if len(self._chunks) == 1:
+            return self._chunks[0][index]
+        values = self._merged_columns.get(index)
+        if values is None:
+            if self._chunks:
+                values = np.concatenate([chunk[index] for chunk in self._chunks])
+            else:
+                values = np.empty(0, dtype=(np.bool_, '<f8', '<i4')[self.columns[index].type])
+            self._merged_columns[index] = values
+        return values
+
+    def dictionary(self, name):
+        """Returns the strings of a STRING column's dictionary, indexed by code"""
+        dictionary = self._dictionaries[self._index_of(name)]
+        if dictionary is None:
+            raise ValueError('Column "{}" is not a STRING column'.format(name))
+        return np.array(dictionary, dtype=object)
+
+    def strings(self, name):
+        """Returns the decoded values of a STRING column"""
+        return self.dictionary(name)[self.column(name)]
+
+    def to_dict(self):
+        """Returns a dict of column name to values, with STRING columns decoded"""
+        return {column.name: self.strings(column.name) if column.type == TYPE_STRING else self.column(column.name)
+                for column in self.columns}
+
+    def to_pandas(self):
+        """Returns a pandas DataFrame, with STRING columns as categoricals that share the file's dictionaries"""
+        import pandas as pd
+        data = {}
+        for column in self.columns:
+            if column.type == TYPE_STRING:
+                data[column.name] = pd.Categorical.from_codes(self.column(column.name), self.dictionary(column.name))
+            else:
+                data[column.name] = self.column(column.name)
+        return pd.DataFrame(data)
+
+    def close(self):
+        """Unmaps the file; arrays that are views of the file must no longer be used"""
+        self._chunks = []
+        self._merged_columns = {}
+        try:
+            self._map.close()
+        except BufferError:
+            # Arrays returned to the caller still refer to the mapping, which is released when they are collected
+            pass
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
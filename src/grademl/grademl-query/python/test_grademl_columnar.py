@@ -0,0 +1,66 @@
+"""Tests for grademl_columnar.py, using a table exported by the query engine's tests in three chunks of up to 4 rows"""
+
+import os
+import unittest
+
+import numpy as np
+
+from grademl_columnar import ColumnarTable, TYPE_BOOLEAN, TYPE_NUMERIC, TYPE_STRING
+
+REFERENCE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'src', 'test', 'resources', 'science',
+                              'atlarge', 'grademl', 'query', 'execution', 'table-export.gmlc')
+
+PHASES = ['load'] * 4 + ['évaluer'] * 3 + ['train'] * 3
+UTILIZATION = [0.0, 0.5, -1.25, 1e300, 2.0, 3.75, 42.0, 0.125, 1e-3, 7.0]
+ACTIVE = [True, False, False, True, True, True, False, False, True, False]
+LABELS = ['a', 'b', 'a', 'c', 'b', 'd', 'd', 'a', 'e', 'c']
+
+
+class ColumnarTableTests(unittest.TestCase):
+
+    def setUp(self):
+        self.table = ColumnarTable(REFERENCE_FILE)
+
+    def tearDown(self):
+        self.table.close()
+
+    def test_columns(self):
+        self.assertEqual(['phase', 'utilization', 'active', 'label'], [column.name for column in self.table.columns])
+        self.assertEqual([TYPE_STRING, TYPE_NUMERIC, TYPE_BOOLEAN, TYPE_STRING],
+                         [column.type for column in self.table.columns])
+        self.assertEqual([True, False, False, False], [column.is_key for column in self.table.columns])
+        self.assertEqual(10, self.table.num_rows)
+
+    def test_chunks(self):
+        chunks = self.table.chunks()
+        self.assertEqual([4, 4, 2], [len(chunk['utilization']) for chunk in chunks])
+        self.assertEqual(ACTIVE[4:8], chunks[1]['active'].tolist())
+        # Codes index into the dictionary built by all chunks so far
+        self.assertEqual([1, 3, 3, 0], chunks[1]['label'].tolist())
+
+    def test_values(self):
+        self.assertEqual(UTILIZATION, self.table.column('utilization').tolist())
+        self.assertEqual(np.float64, self.table.column('utilization').dtype)
+        self.assertEqual(ACTIVE, self.table.column('active').tolist())
+        self.assertEqual(np.bool_, self.table.column('active').dtype)
+
+    def test_strings(self):
+        self.assertEqual(['load', 'évaluer', 'train'], self.table.dictionary('phase').tolist())
+        self.assertEqual(['a', 'b', 'c', 'd', 'e'], self.table.dictionary('label').tolist())
+        self.assertEqual([0, 1, 0, 2, 1, 3, 3, 0, 4, 2], self.table.column('label').tolist())
+        self.assertEqual(PHASES, self.table.strings('phase').tolist())
+        self.assertRaises(ValueError, self.table.dictionary, 'active')
+
+    def test_to_dict(self):
+        data = self.table.to_dict()
+        self.assertEqual(PHASES, data['phase'].tolist())
+        self.assertEqual(UTILIZATION, data['utilization'].tolist())
+        self.assertEqual(ACTIVE, data['active'].tolist())
+        self.assertEqual(LABELS, data['label'].tolist())
+
+    def test_unknown_column(self):
+        self.assertRaises(KeyError, self.table.column, 'missing')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -4,14 +4,19 @@ import com.github.h0tk3y.betterParse.grammar.tryParseToEnd
 import com.github.h0tk3y.betterParse.parser.ErrorResult
 import com.github.h0tk3y.betterParse.parser.Parsed
 import science.atlarge.grademl.core.GradeMLEngine
+import science.atlarge.grademl.core.GradeMLJob
 import science.atlarge.grademl.core.GradeMLJobStatusUpdate
 import science.atlarge.grademl.core.attribution.ResourceAttributionSettings
+import science.atlarge.grademl.core.util.MemoryBudget
 import science.atlarge.grademl.input.airflow.Airflow
+import science.atlarge.grademl.input.framework_trace.FrameworkTrace
+import science.atlarge.grademl.input.phase_markers.PhaseMarkers
 import science.atlarge.grademl.input.resource_monitor.ResourceMonitor
 import science.atlarge.grademl.input.spark.Spark
 import science.atlarge.grademl.input.tensorflow.TensorFlow
 import science.atlarge.grademl.query.parsing.QueryGrammar
 import java.io.File
+import java.io.PrintStream
 import java.nio.file.Path
 import java.nio.file.Paths
 import kotlin.io.path.readLines
@@ -34,25 +39,71 @@ object QueryCli {
         val outputPath = Paths.get(args[1])
         val queryScript = if (args.size >= 3) Paths.get(args[2]) else null
 
-        GradeMLEngine.registerInputSource(ResourceMonitor)
+        registerInputSources()
+        loadJob(inputPaths, outputPath, System.out).use { gradeMLJob ->
+            if (queryScript != null) {
+                runScript(QueryEngine(gradeMLJob, outputPath.resolve("query-output")), queryScript)
+            } else {
+                runCli(QueryEngine(gradeMLJob, outputPath.resolve("query-output")))
+            }
+
+            printCacheStatistics(gradeMLJob)
+        }
+    }
+
+    internal fun registerInputSources() {
         GradeMLEngine.registerInputSource(Spark)
         GradeMLEngine.registerInputSource(TensorFlow)
         GradeMLEngine.registerInputSource(Airflow)
+        GradeMLEngine.registerInputSource(FrameworkTrace)
+        GradeMLEngine.registerInputSource(PhaseMarkers)
+        // Registered last, so it reads metrics for the phases added by all other input sources (including Airflow)
+        GradeMLEngine.registerInputSource(ResourceMonitor)
+    }
 
+    // Analyzes a job, or loads it from a snapshot, and reports progress to the given output
+    internal fun loadJob(
+        inputPaths: List<Path>,
+        outputPath: Path,
+        output: PrintStream,
+        attributionCacheByteBudget: Long = MemoryBudget.attributionCacheBytes
+    ): GradeMLJob {
         val gradeMLJob = GradeMLEngine.analyzeJob(
             inputPaths, outputPath, ResourceAttributionSettings(
                 enableTimeSeriesCompression = true,
                 enableRuleCaching = true,
-                enableAttributionResultCaching = true
+                enableAttributionResultCaching = true,
+                attributionCacheByteBudget = attributionCacheByteBudget
             )
         ) { update ->
             when (update) {
-                GradeMLJobStatusUpdate.LOG_PARSING_STARTING -> {
-                    println("Parsing job log files.")
+                GradeMLJobStatusUpdate.LogParsingStarting -> {
+                    output.println("Parsing job log files.")
+                }
+                is GradeMLJobStatusUpdate.InputPartParsed -> {
+                    output.println(
+                        "Time taken to process ${update.part} in input source " +
+                                "${update.inputSource.javaClass.canonicalName}: " +
+                                "${String.format("%.2f", update.duration / 1_000_000.0)} ms"
+                    )
                 }
-                GradeMLJobStatusUpdate.LOG_PARSING_COMPLETED -> {
-                    println("Completed parsing of input files.")
-                    println()
+                is GradeMLJobStatusUpdate.InputSourceParsed -> {
+                    output.println(
+                        "Time taken to process input source ${update.inputSource.javaClass.canonicalName}: " +
+                                "${String.format("%.2f", update.duration / 1_000_000.0)} ms"
+                    )
+                }
+                GradeMLJobStatusUpdate.LogParsingCompleted -> {
+                    output.println("Completed parsing of input files.")
+                    output.println()
+                }
+                GradeMLJobStatusUpdate.JobSnapshotLoaded -> {
+                    output.println("Loaded job data from snapshot of previously parsed input files.")
+                    output.println()
+                }
+                is GradeMLJobStatusUpdate.Warning -> {
+                    // Warnings may be reported after loading, so report them on the process's own error output
+                    System.err.println("Warning: ${update.message}")
                 }
                 else -> {
                 }
@@ -63,21 +114,52 @@ object QueryCli {
             gradeMLJob.unifiedExecutionModel.phases.size == 1 &&
             gradeMLJob.unifiedResourceModel.resources.any { it.metrics.isNotEmpty() }
         ) {
-            println(
+            output.println(
                 "Did not find any execution logs. " +
                         "Creating dummy execution model to allow analysis of the resource model."
             )
-            println()
+            output.println()
             val (startTime, endTime) = gradeMLJob.unifiedResourceModel.resources.flatMap { it.metrics }
-                .map { it.data.timestamps.first() to it.data.timestamps.last() }
+                .map { it.data.firstTimestamp to it.data.lastTimestamp }
                 .reduce { acc, pair -> minOf(acc.first, pair.first) to maxOf(acc.second, pair.second) }
             gradeMLJob.unifiedExecutionModel.addPhase("dummy_phase", startTime = startTime, endTime = endTime)
         }
 
-        if (queryScript != null) {
-            runScript(QueryEngine(gradeMLJob, outputPath.resolve("query-output")), queryScript)
-        } else {
-            runCli(QueryEngine(gradeMLJob, outputPath.resolve("query-output")))
+        return gradeMLJob
+    }
+
+    internal fun printCacheStatistics(gradeMLJob: GradeMLJob, output: PrintStream = System.out) {
+        output.println("Resource attribution cache statistics:")
+        for ((cacheName, statistics) in gradeMLJob.resourceAttribution.cacheStatistics()) {
+            output.println(
+                "  $cacheName: ${statistics.hits} hits, ${statistics.misses} misses, " +
+                        "${statistics.evictions} evictions, ${statistics.spillReads} reads from disk; " +
+                        "${statistics.cachedValues} values (${statistics.cachedBytes / (1024 * 1024)} MiB) " +
+                        "in memory, ${statistics.spilledValues} values on disk"
+            )
+        }
+    }
+
+    // Parses one or more statements and executes them in order, reporting any failures to the given output
+    internal fun executeQueries(queryEngine: QueryEngine, queryText: String, output: PrintStream = System.out) {
+        // Parse the query/queries
+        val queries = when (val parseResult = QueryGrammar.tryParseToEnd(queryText)) {
+            is Parsed -> parseResult.value
+            is ErrorResult -> {
+                output.println()
+                output.println("Failed to parse query: $parseResult")
+                return
+            }
+        }
+
+        // Run the queries
+        queries.forEach {
+            try {
+                queryEngine.executeStatement(it, output)
+            } catch (t: Throwable) {
+                t.printStackTrace(output)
+                output.println()
+            }
         }
     }
 
@@ -101,25 +183,7 @@ object QueryCli {
             for (line in queryLines) println("| $line")
             println()
 
-            // Parse the query/queries
-            val queries = when (val parseResult = QueryGrammar.tryParseToEnd(queryLines.joinToString("\n"))) {
-                is Parsed -> parseResult.value
-                is ErrorResult -> {
-                    println()
-                    println("Failed to parse query: $parseResult")
-                    continue
-                }
-            }
-
-            // Run the queries
-            queries.forEach {
-                try {
-                    queryEngine.executeStatement(it)
-                } catch (t: Throwable) {
-                    t.printStackTrace()
-                    println()
-                }
-            }
+            executeQueries(queryEngine, queryLines.joinToString("\n"))
         }
     }
 
@@ -139,25 +203,7 @@ object QueryCli {
                 queryLines.add(nextLine)
             } while (queryLines.isEmpty() || !queryLines.last().endsWith(";"))
 
-            // Parse the query/queries
-            val queries = when (val parseResult = QueryGrammar.tryParseToEnd(queryLines.joinToString("\n"))) {
-                is Parsed -> parseResult.value
-                is ErrorResult -> {
-                    println()
-                    println("Failed to parse query: $parseResult")
-                    continue
-                }
-            }
-
-            // Run the queries
-            queries.forEach {
-                try {
-                    queryEngine.executeStatement(it)
-                } catch (t: Throwable) {
-                    t.printStackTrace()
-                    println()
-                }
-            }
+            executeQueries(queryEngine, queryLines.joinToString("\n"))
         }
     }
 
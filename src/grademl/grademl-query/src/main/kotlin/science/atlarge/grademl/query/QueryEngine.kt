@@ -7,14 +7,20 @@ import science.atlarge.grademl.query.execution.TablePrinter
 import science.atlarge.grademl.query.execution.VirtualTable
 import science.atlarge.grademl.query.execution.data.DefaultTables
 import science.atlarge.grademl.query.language.*
+import science.atlarge.grademl.query.model.RowBatch
+import science.atlarge.grademl.query.model.Table
 import science.atlarge.grademl.query.plan.ExplainLogicalPlan
 import science.atlarge.grademl.query.plan.ExplainPhysicalPlan
 import science.atlarge.grademl.query.plan.QueryPlanner
 import science.atlarge.grademl.query.plan.StatisticsPhysicalPlan
+import science.atlarge.grademl.query.plan.SubplanCache
 import science.atlarge.grademl.query.plan.physical.PhysicalQueryPlan
+import java.io.PrintStream
 import java.nio.file.Path
 import kotlin.system.measureNanoTime
 
+// Executes statements against the tables of a job. Tables created or cached by a statement are visible to all later
+// statements, also when statements are executed concurrently, e.g., by clients of a QueryServer sharing a job.
 class QueryEngine(
     gradeMLJob: GradeMLJob,
     private val outputDirectory: Path
@@ -24,133 +30,160 @@ class QueryEngine(
     private val concreteTables = mutableMapOf<String, ConcreteTable>()
     private val virtualTables = mutableMapOf<String, VirtualTable>()
     private val tables = builtinTables.toMutableMap()
+    // Guards the maps of tables; statements are planned and executed without holding the lock
+    private val tablesLock = Any()
+    // Results of subplans that are executed repeatedly by SELECT and EXPORT statements
+    private val subplanCache = SubplanCache()
 
-    fun executeStatement(statement: Statement) {
+    fun executeStatement(statement: Statement, output: PrintStream = System.out) {
         when (statement) {
             is SelectStatement -> {
                 val queryDurationNs = measureNanoTime {
-                    val optimizedQueryPlan = planSelect(statement)
-                    TablePrinter.print(
-                        optimizedQueryPlan.toQueryOperator().execute(),
-                        limit = statement.limit?.limitFirst
-                    )
+                    val optimizedQueryPlan = subplanCache.rewrite(planSelect(statement), statement.limit != null)
+                    // Close the query to clean up after operators that are not read to completion due to a LIMIT
+                    optimizedQueryPlan.toQueryOperator().execute().use { tsIterator ->
+                        TablePrinter.print(tsIterator, limit = statement.limit?.limitFirst, output = output)
+                    }
                 }
-                println("Query completed in ${(queryDurationNs + 500000) / 1000000} ms")
-                println()
+                output.println("Query completed in ${(queryDurationNs + 500000) / 1000000} ms")
+                output.println()
             }
             is CreateTableStatement -> {
                 val tableName = statement.tableName.trim()
                 require(tableName.isNotEmpty()) { "Table must be given a non-empty name" }
-                require(tableName !in tables) { "Table with name \"$tableName\" already exists" }
 
-                val logicalPlan = QueryPlanner.createLogicalPlanFromSelect(statement.tableDefinition, tables)
-                val physicalQueryPlan = QueryPlanner.convertLogicalToPhysicalPlan(logicalPlan)
-                val optimizedQueryPlan = QueryPlanner.optimizePhysicalPlan(physicalQueryPlan)
+                synchronized(tablesLock) {
+                    require(tableName !in tables) { "Table with name \"$tableName\" already exists" }
 
-                val virtualTable = VirtualTable(logicalPlan, optimizedQueryPlan)
-                virtualTables[tableName] = virtualTable
-                tables[tableName] = virtualTable
+                    val logicalPlan = QueryPlanner.createLogicalPlanFromSelect(statement.tableDefinition, tables)
+                    val physicalQueryPlan = QueryPlanner.convertLogicalToPhysicalPlan(logicalPlan)
+                    val optimizedQueryPlan = QueryPlanner.optimizePhysicalPlan(physicalQueryPlan)
 
-                println("Table \"$tableName\" created.")
-                println()
+                    val virtualTable = VirtualTable(logicalPlan, optimizedQueryPlan)
+                    virtualTables[tableName] = virtualTable
+                    tables[tableName] = virtualTable
+                }
+
+                output.println("Table \"$tableName\" created.")
+                output.println()
             }
             is DeleteTableStatement -> {
                 val tableName = statement.tableName.trim()
                 require(tableName.isNotEmpty()) { "Cannot delete table with an empty name" }
-                require(tableName in tables) { "Table with name \"$tableName\" does not exist" }
-                require(tableName !in builtinTables) { "Cannot delete built-in table \"$tableName\"" }
 
-                concreteTables.remove(tableName)
-                tables.remove(tableName)
+                val deletedTable = synchronized(tablesLock) {
+                    require(tableName in tables) { "Table with name \"$tableName\" does not exist" }
+                    require(tableName !in builtinTables) { "Cannot delete built-in table \"$tableName\"" }
+
+                    concreteTables.remove(tableName)
+                    tables.remove(tableName)!!
+                }
+                subplanCache.invalidate(deletedTable)
 
-                println("Table \"$tableName\" deleted.")
-                println()
+                output.println("Table \"$tableName\" deleted.")
+                output.println()
             }
             is CacheTableStatement -> {
                 val tableName = statement.tableName.trim()
                 require(tableName.isNotEmpty()) { "Cannot delete table with an empty name" }
-                require(tableName in tables) { "Table with name \"$tableName\" does not exist" }
 
-                if (tableName !in concreteTables) {
-                    val concreteTable = ConcreteTable.from(tables[tableName]!!.timeSeriesIterator())
+                val table = synchronized(tablesLock) {
+                    require(tableName in tables) { "Table with name \"$tableName\" does not exist" }
+                    if (tableName in concreteTables) null else tables[tableName]!!
+                }
+                // Materialize the table without holding the lock, and keep the first result if the table was cached
+                // concurrently
+                val concreteTable = table?.let { ConcreteTable.from(it.timeSeriesIterator()) }
+                val isAdded = concreteTable != null && synchronized(tablesLock) {
+                    if (tables[tableName] !== table) return@synchronized false
                     concreteTables[tableName] = concreteTable
                     tables[tableName] = concreteTable
-                    println(
-                        "Table \"$tableName\" with ${concreteTable.timeSeriesCount} time series and " +
+                    true
+                }
+
+                if (isAdded) {
+                    output.println(
+                        "Table \"$tableName\" with ${concreteTable!!.timeSeriesCount} time series and " +
                                 "${concreteTable.rowCount} rows added to the cache."
                     )
-                    println()
+                    output.println()
                 } else {
-                    println("Table \"$tableName\" was already in the cache.")
-                    println()
+                    output.println("Table \"$tableName\" was already in the cache.")
+                    output.println()
                 }
             }
             is DropTableFromCacheStatement -> {
                 val tableName = statement.tableName.trim()
                 require(tableName.isNotEmpty()) { "Cannot delete table with an empty name" }
 
-                concreteTables.remove(tableName) ?: throw IllegalArgumentException(
-                    "Table with name \"$tableName\" does not exist or is not cached"
-                )
-                tables.remove(tableName)
+                val droppedTable = synchronized(tablesLock) {
+                    val concreteTable = concreteTables.remove(tableName) ?: throw IllegalArgumentException(
+                        "Table with name \"$tableName\" does not exist or is not cached"
+                    )
+                    tables.remove(tableName)
 
-                // Reinstate virtual table from which the concrete table was created (if it exists)
-                val virtualTable = virtualTables[tableName]
-                if (virtualTable != null) {
-                    tables[tableName] = virtualTable
+                    // Reinstate virtual table from which the concrete table was created (if it exists)
+                    val virtualTable = virtualTables[tableName]
+                    if (virtualTable != null) {
+                        tables[tableName] = virtualTable
+                    }
+                    concreteTable
                 }
+                subplanCache.invalidate(droppedTable)
 
-                println("Table \"$tableName\" dropped from the cache.")
-                println()
+                output.println("Table \"$tableName\" dropped from the cache.")
+                output.println()
             }
             is ExplainStatement -> {
-                println()
-                val logicalPlan = QueryPlanner.createLogicalPlanFromSelect(statement.selectStatement, tables)
-                println("LOGICAL QUERY PLAN:")
-                println(ExplainLogicalPlan.explain(logicalPlan))
-                println()
+                output.println()
+                val logicalPlan = QueryPlanner.createLogicalPlanFromSelect(statement.selectStatement, currentTables())
+                output.println("LOGICAL QUERY PLAN:")
+                output.println(ExplainLogicalPlan.explain(logicalPlan))
+                output.println()
                 val physicalQueryPlan = QueryPlanner.convertLogicalToPhysicalPlan(logicalPlan)
-                println("PHYSICAL QUERY PLAN:")
-                println(ExplainPhysicalPlan.explain(physicalQueryPlan))
-                println()
+                output.println("PHYSICAL QUERY PLAN:")
+                output.println(ExplainPhysicalPlan.explain(physicalQueryPlan))
+                output.println()
                 val optimizedQueryPlan = QueryPlanner.optimizePhysicalPlan(physicalQueryPlan)
-                println("OPTIMIZED PHYSICAL QUERY PLAN:")
-                println(ExplainPhysicalPlan.explain(optimizedQueryPlan))
-                println()
+                output.println("OPTIMIZED PHYSICAL QUERY PLAN:")
+                output.println(ExplainPhysicalPlan.explain(optimizedQueryPlan))
+                output.println()
             }
             is StatisticsStatement -> {
                 val optimizedQueryPlan = planSelect(statement.selectStatement)
                 // Read as many rows as needed for the select statement
                 var rowsRead = 0L
                 val maxRows = statement.selectStatement.limit?.limitFirst?.toLong() ?: Long.MAX_VALUE
-                val tsIterator = optimizedQueryPlan.toQueryOperator().execute()
-                while (rowsRead < maxRows && tsIterator.loadNext()) {
-                    val rowIterator = tsIterator.currentTimeSeries.rowIterator()
-                    while (rowsRead < maxRows && rowIterator.loadNext()) {
-                        rowsRead++
+                optimizedQueryPlan.toQueryOperator().execute().use { tsIterator ->
+                    val batch = RowBatch(tsIterator.schema)
+                    while (rowsRead < maxRows && tsIterator.loadNext()) {
+                        val rowIterator = tsIterator.currentTimeSeries.rowIterator()
+                        while (rowsRead < maxRows && rowIterator.loadNextBatch(batch)) {
+                            rowsRead += batch.selectedCount
+                        }
                     }
                 }
                 // Print execution statistics
-                println()
-                println("EXECUTION STATISTICS PER PHYSICAL QUERY OPERATOR:")
-                println(StatisticsPhysicalPlan.collectStatistics(optimizedQueryPlan))
-                println()
+                output.println()
+                output.println("EXECUTION STATISTICS PER PHYSICAL QUERY OPERATOR:")
+                output.println(StatisticsPhysicalPlan.collectStatistics(optimizedQueryPlan))
+                output.println()
             }
             is ExportStatement -> {
                 // Create the output directory if needed
                 val outputPath = outputDirectory.resolve(statement.filename)
                 outputPath.parent.toFile().mkdirs()
                 // Plan the query to be executed and exported
-                val optimizedQueryPlan = planSelect(statement.selectStatement)
-                // Export the query's output
-                println("Exporting query output to ${outputPath.toAbsolutePath()}.")
-                val rowsWritten = TableExporter.export(
-                    outputPath,
-                    optimizedQueryPlan.toQueryOperator().execute(),
-                    statement.selectStatement.limit?.limitFirst
+                val optimizedQueryPlan = subplanCache.rewrite(
+                    planSelect(statement.selectStatement), statement.selectStatement.limit != null
                 )
-                println("Query produced $rowsWritten rows.")
-                println()
+                // Export the query's output
+                output.println("Exporting query output to ${outputPath.toAbsolutePath()}.")
+                val rowsWritten = optimizedQueryPlan.toQueryOperator().execute().use { tsIterator ->
+                    TableExporter.export(outputPath, tsIterator, statement.selectStatement.limit?.limitFirst)
+                }
+                output.println("Query produced $rowsWritten rows.")
+                output.println()
             }
         }
     }
@@ -160,9 +193,11 @@ class QueryEngine(
             QueryPlanner.convertLogicalToPhysicalPlan(
                 QueryPlanner.createLogicalPlanFromSelect(
                     selectStatement,
-                    tables
+                    currentTables()
                 )
             )
         )
 
+    private fun currentTables(): Map<String, Table> = synchronized(tablesLock) { tables.toMap() }
+
 }
@@ -0,0 +1,247 @@
+package science.atlarge.grademl.query
+
+import science.atlarge.grademl.core.GradeMLJob
+import science.atlarge.grademl.core.util.MemoryBudget
+import java.io.BufferedOutputStream
+import java.io.File
+import java.io.PrintStream
+import java.net.InetAddress
+import java.net.ServerSocket
+import java.net.Socket
+import java.nio.file.Files
+import java.nio.file.Path
+import java.nio.file.Paths
+import java.security.MessageDigest
+import java.util.concurrent.Executors
+import kotlin.streams.toList
+import kotlin.system.exitProcess
+
+// Long-lived query engine that keeps analyzed jobs, their resource attribution caches, and their cached tables in
+// memory, and executes statements for any number of concurrent clients. Clients connect to a socket on the loopback
+// interface and use a line-based protocol:
+//  1. The client sends the server's token, which the server reads from a file that only its user can read. The server
+//     closes the connection if the token does not match.
+//  2. The client sends two lines with the job's log directories (separated by the path separator character) and the
+//     job's analysis directory. The server loads the job, unless it has been loaded for an earlier client.
+//  3. The client sends statements, each ending with a line that ends in a semicolon. Lines starting with "//" are
+//     ignored. The server executes the statements in order.
+// The server responds to the token, to the job selection, and to every statement with the output it produced, followed
+// by a line that contains only END_OF_RESPONSE. Clients of the same job share its tables, so a table created or cached
+// by one client can be used by all other clients. At most a fixed number of jobs is kept loaded: the least recently
+// used job that no client is using is unloaded to make room for another job, and a job is loaded again if its log
+// files changed since it was loaded and no other client is using it.
+object QueryServer {
+
+    const val DEFAULT_PORT = 5016
+    const val DEFAULT_MAX_LOADED_JOBS = 4
+    const val END_OF_RESPONSE = "\u0004"
+
+    // Loaded jobs in order of last use, guarded by the lock of the map
+    private val loadedJobs = LinkedHashMap<JobKey, LoadedJob>(16, 0.75f, true)
+    private var maxLoadedJobs = DEFAULT_MAX_LOADED_JOBS
+    private var token = ByteArray(0)
+
+    @JvmStatic
+    fun main(args: Array<String>) {
+        val tokenFile = args.getOrNull(0)?.let { Paths.get(it) }
+        val port = if (args.size < 2) DEFAULT_PORT else args[1].toIntOrNull()?.takeIf { it in 0..65535 }
+        val maxJobs = if (args.size < 3) DEFAULT_MAX_LOADED_JOBS else args[2].toIntOrNull()?.takeIf { it > 0 }
+        if (tokenFile == null || !Files.isReadable(tokenFile) || port == null || maxJobs == null || args.size > 3) {
+            println("Usage: query-server <tokenFile> [port [maxLoadedJobs]]")
+            println("  tokenFile contains the token that clients must send to connect")
+            println("  port defaults to $DEFAULT_PORT")
+            println("  maxLoadedJobs defaults to $DEFAULT_MAX_LOADED_JOBS")
+            exitProcess(1)
+        }
+        token = Files.readAllLines(tokenFile).firstOrNull()?.trim().orEmpty().toByteArray(Charsets.UTF_8)
+        require(token.isNotEmpty()) { "Token file \"$tokenFile\" is empty" }
+        maxLoadedJobs = maxJobs
+
+        QueryCli.registerInputSources()
+        Runtime.getRuntime().addShutdownHook(Thread {
+            for (job in synchronized(loadedJobs) { loadedJobs.values.toList() }) {
+                job.printCacheStatistics()
+                job.close()
+            }
+        })
+
+        ServerSocket(port, 0, InetAddress.getLoopbackAddress()).use { serverSocket ->
+            println("GradeML query server is listening on ${serverSocket.localSocketAddress}.")
+            println("Keeping up to $maxLoadedJobs jobs loaded.")
+            println()
+            val sessionThreads = Executors.newCachedThreadPool { runnable ->
+                Thread(runnable, "query-session").apply { isDaemon = true }
+            }
+            while (true) {
+                val socket = serverSocket.accept()
+                sessionThreads.execute { runSession(socket) }
+            }
+        }
+    }
+
+    private fun runSession(socket: Socket) {
+        socket.use {
+            val input = socket.getInputStream().bufferedReader()
+            val output = PrintStream(BufferedOutputStream(socket.getOutputStream()), true, Charsets.UTF_8.name())
+
+            // Reject clients that do not know the token
+            val clientToken = input.readLine() ?: return
+            if (!MessageDigest.isEqual(clientToken.trim().toByteArray(Charsets.UTF_8), token)) {
+                output.println("Invalid token for GradeML query server, closing connection.")
+                output.println(END_OF_RESPONSE)
+                return
+            }
+            output.println(END_OF_RESPONSE)
+
+            // Select the job to query, and load it if needed
+            val jobLogDirectories = input.readLine() ?: return
+            val jobAnalysisDirectory = input.readLine() ?: return
+            val jobKey = JobKey(
+                jobLogDirectories.split(File.pathSeparatorChar).map { Paths.get(it).toAbsolutePath().normalize() },
+                Paths.get(jobAnalysisDirectory).toAbsolutePath().normalize()
+            )
+            val job = try {
+                acquireJob(jobKey)
+            } catch (e: IllegalStateException) {
+                output.println("Failed to load job: ${e.message}")
+                output.println(END_OF_RESPONSE)
+                return
+            }
+            try {
+                val queryEngine = try {
+                    job.queryEngine(output)
+                } catch (t: Throwable) {
+                    output.println("Failed to load job:")
+                    t.printStackTrace(output)
+                    output.println(END_OF_RESPONSE)
+                    return
+                }
+                output.println(END_OF_RESPONSE)
+
+                // Repeatedly read and execute statements until the client disconnects
+                while (true) {
+                    // Read until a semicolon
+                    val queryLines = mutableListOf<String>()
+                    do {
+                        val nextLine = input.readLine() ?: return
+                        if (nextLine.trim().startsWith("//")) continue
+                        queryLines.add(nextLine)
+                    } while (queryLines.isEmpty() || !queryLines.last().endsWith(";"))
+
+                    QueryCli.executeQueries(queryEngine, queryLines.joinToString("\n"), output)
+                    output.println(END_OF_RESPONSE)
+                }
+            } finally {
+                releaseJob(job)
+            }
+        }
+    }
+
+    // Registers a client of a job, and unloads the least recently used jobs without clients if too many are loaded
+    private fun acquireJob(key: JobKey): LoadedJob {
+        val unloadedJobs = mutableListOf<LoadedJob>()
+        val job = synchronized(loadedJobs) {
+            val isNewJob = key !in loadedJobs
+            val job = loadedJobs.getOrPut(key) { LoadedJob(key) }
+            job.clientCount++
+            val iterator = loadedJobs.values.iterator()
+            while (loadedJobs.size > maxLoadedJobs && iterator.hasNext()) {
+                val candidate = iterator.next()
+                if (candidate.clientCount > 0) continue
+                iterator.remove()
+                unloadedJobs.add(candidate)
+            }
+            if (loadedJobs.size > maxLoadedJobs) {
+                job.clientCount--
+                if (isNewJob) loadedJobs.remove(key)
+                throw IllegalStateException("All $maxLoadedJobs jobs loaded by the query server are in use")
+            }
+            job
+        }
+        for (unloadedJob in unloadedJobs) {
+            println("Unloading job ${unloadedJob.key.jobAnalysisDirectory} to make room for another job.")
+            unloadedJob.printCacheStatistics()
+            unloadedJob.close()
+        }
+        return job
+    }
+
+    private fun releaseJob(job: LoadedJob) {
+        synchronized(loadedJobs) { job.clientCount-- }
+    }
+
+    // Other clients of a job hold on to its query engine, so a job is only reloaded if this client is its only client
+    private fun isOnlyClient(job: LoadedJob): Boolean = synchronized(loadedJobs) { job.clientCount == 1 }
+
+    private data class JobKey(val jobLogDirectories: List<Path>, val jobAnalysisDirectory: Path)
+
+    private data class LogFileVersion(val path: Path, val size: Long, val lastModified: Long)
+
+    private class LoadedJob(val key: JobKey) {
+
+        // Number of clients using the job, guarded by the lock of loadedJobs
+        var clientCount = 0
+
+        private var gradeMLJob: GradeMLJob? = null
+        private var queryEngine: QueryEngine? = null
+        private var logFileVersions = emptyList<LogFileVersion>()
+
+        // Loads the job for the first client that selects it; later clients wait for the job to be loaded. A job is
+        // loaded again if its log files changed, e.g., because the job was still running when it was loaded.
+        @Synchronized
+        fun queryEngine(output: PrintStream): QueryEngine {
+            val currentLogFileVersions = findLogFileVersions()
+            queryEngine?.let {
+                if (currentLogFileVersions == logFileVersions || !isOnlyClient(this)) {
+                    if (currentLogFileVersions != logFileVersions) {
+                        output.println("The job's log files changed, but the job is in use by other clients.")
+                    }
+                    output.println("Using job data loaded by the query server.")
+                    output.println()
+                    return it
+                }
+                output.println("The job's log files changed since they were loaded by the query server.")
+                output.println()
+                printCacheStatistics()
+                close()
+            }
+            // Divide the attribution cache budget over all jobs that the server may keep loaded
+            val job = QueryCli.loadJob(
+                key.jobLogDirectories, key.jobAnalysisDirectory, output,
+                attributionCacheByteBudget = MemoryBudget.attributionCacheBytes / maxLoadedJobs
+            )
+            val engine = QueryEngine(job, key.jobAnalysisDirectory.resolve("query-output"))
+            gradeMLJob = job
+            queryEngine = engine
+            logFileVersions = currentLogFileVersions
+            return engine
+        }
+
+        @Synchronized
+        fun printCacheStatistics() {
+            val job = gradeMLJob ?: return
+            println("Job ${key.jobAnalysisDirectory}:")
+            QueryCli.printCacheStatistics(job)
+        }
+
+        @Synchronized
+        fun close() {
+            gradeMLJob?.close()
+            gradeMLJob = null
+            queryEngine = null
+        }
+
+        // Lists the files in the job's log directories, except the analysis directory if it is stored with the logs
+        private fun findLogFileVersions(): List<LogFileVersion> {
+            return key.jobLogDirectories.filter { Files.isDirectory(it) }.flatMap { directory ->
+                Files.walk(directory).use { paths ->
+                    paths.filter { !it.startsWith(key.jobAnalysisDirectory) && Files.isRegularFile(it) }
+                        .map { LogFileVersion(it, Files.size(it), Files.getLastModifiedTime(it).toMillis()) }
+                        .toList()
+                }
+            }.sortedBy { it.path }
+        }
+
+    }
+
+}
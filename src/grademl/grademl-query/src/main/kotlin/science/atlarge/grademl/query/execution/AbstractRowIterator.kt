@@ -1,5 +1,6 @@
 package science.atlarge.grademl.query.execution
 
+import science.atlarge.grademl.query.model.RowBatch
 import science.atlarge.grademl.query.model.RowIterator
 import science.atlarge.grademl.query.model.TableSchema
 
@@ -28,4 +29,22 @@ abstract class AbstractRowIterator(
         isCurrentRowPushedBack = true
         return true
     }
+
+    // Loads rows into a cleared batch; returns after loading at least one selected row, or when no rows are left
+    protected open fun internalLoadNextBatch(batch: RowBatch) {
+        while (!batch.isFull && internalLoadNext()) batch.appendRow(currentRow)
+    }
+
+    override fun loadNextBatch(batch: RowBatch): Boolean {
+        batch.clear()
+        if (isCurrentRowPushedBack) {
+            // Return the pushed back row by itself, to keep batches of an iterator aligned with its data
+            batch.appendRow(currentRow)
+            isCurrentRowPushedBack = false
+        } else {
+            internalLoadNextBatch(batch)
+        }
+        isCurrentRowValid = false
+        return batch.selectedCount > 0
+    }
 }
\ No newline at end of file
@@ -1,6 +1,7 @@
 package science.atlarge.grademl.query.execution
 
 import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.RowBatch
 import science.atlarge.grademl.query.model.RowIterator
 import science.atlarge.grademl.query.model.TableSchema
 
@@ -44,4 +45,23 @@ abstract class AccountingRowIterator(
         isCurrentRowPushedBack = true
         return true
     }
+
+    // Loads rows into a cleared batch; returns after loading at least one selected row, or when no rows are left
+    protected open fun internalLoadNextBatch(batch: RowBatch) {
+        while (!batch.isFull && internalLoadNext()) batch.appendRow(this)
+    }
+
+    final override fun loadNextBatch(batch: RowBatch): Boolean {
+        batch.clear()
+        if (isCurrentRowPushedBack) {
+            // Return the pushed back row by itself; it has already been counted when it was first loaded
+            batch.appendRow(this)
+            isCurrentRowPushedBack = false
+        } else {
+            internalLoadNextBatch(batch)
+            rowsProduced += batch.selectedCount
+        }
+        isCurrentRowValid = false
+        return batch.selectedCount > 0
+    }
 }
\ No newline at end of file
@@ -0,0 +1,170 @@
+package science.atlarge.grademl.query.execution
+
+import java.util.concurrent.ForkJoinPool
+import java.util.concurrent.ForkJoinTask
+import java.util.concurrent.RecursiveAction
+
+// Sorts the rows of a TimeSeriesCache by a list of columns. Values of the sort columns are first converted to 64-bit
+// keys that compare in the same order as the values (strings by their rank among the distinct strings in a column), so
+// rows are compared on primitive keys without dispatching on column types. Row IDs are sorted as a primitive array with
+// a stable merge sort, which is split into tasks that run in parallel for large inputs.
+class CachedRowSorter(
+    private val columnTypes: IntArray,
+    private val sortColumns: IntArray,
+    private val sortColumnsAscending: BooleanArray,
+    private val parallelSortThreshold: Int
+) {
+
+    fun sort(cache: TimeSeriesCache): SortedRows {
+        val rowCount = cache.numCachedRows
+        val keys = Array(sortColumns.size) { i -> computeKeys(cache, sortColumns[i], sortColumnsAscending[i]) }
+        val rowOrder = IntArray(rowCount) { it }
+        if (rowCount > 1) {
+            val mergeSort = KeyMergeSort(keys, rowOrder)
+            if (rowCount >= parallelSortThreshold) mergeSort.sortInParallel()
+            else mergeSort.sort(0, rowCount)
+        }
+        return SortedRows(cache, rowOrder, keys)
+    }
+
+    private fun computeKeys(cache: TimeSeriesCache, column: Int, ascending: Boolean): LongArray {
+        val rowCount = cache.numCachedRows
+        val keys = when (columnTypes[column]) {
+            IntTypes.TYPE_BOOLEAN -> LongArray(rowCount) { if (cache.getBoolean(column, it)) 1L else 0L }
+            IntTypes.TYPE_NUMERIC -> LongArray(rowCount) { numericKey(cache.getNumeric(column, it)) }
+            IntTypes.TYPE_STRING -> {
+                // Replace strings by their rank among the distinct strings in the column
+                val ranks = HashMap<String, Long>()
+                for (rowId in 0 until rowCount) ranks[cache.getString(column, rowId)] = 0L
+                val distinctStrings = ranks.keys.toTypedArray()
+                distinctStrings.sort()
+                distinctStrings.forEachIndexed { rank, string -> ranks[string] = rank.toLong() }
+                LongArray(rowCount) { ranks.getValue(cache.getString(column, it)) }
+            }
+            else -> throw IllegalArgumentException("Sort does not support type: ${columnTypes[column]}")
+        }
+        // Inverting all bits of the keys reverses their order
+        if (!ascending) {
+            for (i in keys.indices) keys[i] = keys[i].inv()
+        }
+        return keys
+    }
+
+}
+
+// Maps a double to a long with the same order as Double.compareTo, i.e., -0.0 is smaller than 0.0 and NaN is larger
+// than any other value
+private fun numericKey(value: Double): Long {
+    val bits = value.toBits()
+    return if (bits < 0) bits xor Long.MAX_VALUE else bits
+}
+
+// Row IDs of a TimeSeriesCache in sorted order, with the keys used to sort them
+class SortedRows(
+    val cache: TimeSeriesCache,
+    val rowOrder: IntArray,
+    private val keys: Array<LongArray>
+) {
+
+    val rowCount: Int
+        get() = rowOrder.size
+
+    fun haveEqualSortKeys(leftRowId: Int, rightRowId: Int): Boolean {
+        for (columnKeys in keys) {
+            if (columnKeys[leftRowId] != columnKeys[rightRowId]) return false
+        }
+        return true
+    }
+
+    // Consecutive rows in the sorted order belong to the same output time series if they are from the same input time
+    // series and have equal values in all sort columns
+    fun isInSameTimeSeriesAsPreviousRow(sortedIndex: Int): Boolean {
+        require(sortedIndex > 0 && sortedIndex < rowOrder.size)
+        val rowId = rowOrder[sortedIndex]
+        val previousRowId = rowOrder[sortedIndex - 1]
+        return cache.timeSeriesIdOf(rowId) == cache.timeSeriesIdOf(previousRowId) &&
+                haveEqualSortKeys(previousRowId, rowId)
+    }
+
+}
+
+private class KeyMergeSort(
+    private val keys: Array<LongArray>,
+    private val rows: IntArray
+) {
+
+    private val buffer = IntArray(rows.size)
+
+    private fun compare(leftRowId: Int, rightRowId: Int): Int {
+        for (columnKeys in keys) {
+            val result = columnKeys[leftRowId].compareTo(columnKeys[rightRowId])
+            if (result != 0) return result
+        }
+        return 0
+    }
+
+    fun sort(fromIndex: Int, toIndex: Int) {
+        if (toIndex - fromIndex <= INSERTION_SORT_THRESHOLD) {
+            insertionSort(fromIndex, toIndex)
+            return
+        }
+        val middleIndex = (fromIndex + toIndex) ushr 1
+        sort(fromIndex, middleIndex)
+        sort(middleIndex, toIndex)
+        merge(fromIndex, middleIndex, toIndex)
+    }
+
+    fun sortInParallel() {
+        // Split the input in a few tasks per thread, so threads that finish early can steal work
+        val parallelism = ForkJoinTask.getPool()?.parallelism ?: ForkJoinPool.getCommonPoolParallelism()
+        val taskSize = maxOf((rows.size + 4 * parallelism - 1) / (4 * parallelism), INSERTION_SORT_THRESHOLD)
+        SortTask(0, rows.size, taskSize).invoke()
+    }
+
+    private fun insertionSort(fromIndex: Int, toIndex: Int) {
+        for (i in fromIndex + 1 until toIndex) {
+            val rowId = rows[i]
+            var j = i - 1
+            while (j >= fromIndex && compare(rows[j], rowId) > 0) {
+                rows[j + 1] = rows[j]
+                j--
+            }
+            rows[j + 1] = rowId
+        }
+    }
+
+    // Merges two sorted ranges, taking rows from the left range first if keys are equal to keep the sort stable
+    private fun merge(fromIndex: Int, middleIndex: Int, toIndex: Int) {
+        if (compare(rows[middleIndex - 1], rows[middleIndex]) <= 0) return
+        rows.copyInto(buffer, fromIndex, fromIndex, toIndex)
+        var left = fromIndex
+        var right = middleIndex
+        var out = fromIndex
+        while (left < middleIndex && right < toIndex) {
+            rows[out++] = if (compare(buffer[right], buffer[left]) < 0) buffer[right++] else buffer[left++]
+        }
+        while (left < middleIndex) rows[out++] = buffer[left++]
+        while (right < toIndex) rows[out++] = buffer[right++]
+    }
+
+    private inner class SortTask(
+        private val fromIndex: Int,
+        private val toIndex: Int,
+        private val taskSize: Int
+    ) : RecursiveAction() {
+        override fun compute() {
+            if (toIndex - fromIndex <= taskSize) {
+                sort(fromIndex, toIndex)
+                return
+            }
+            val middleIndex = (fromIndex + toIndex) ushr 1
+            ForkJoinTask.invokeAll(SortTask(fromIndex, middleIndex, taskSize), SortTask(middleIndex, toIndex, taskSize))
+            merge(fromIndex, middleIndex, toIndex)
+        }
+    }
+
+    companion object {
+        private const val INSERTION_SORT_THRESHOLD = 32
+    }
+
+}
@@ -1,5 +1,6 @@
 package science.atlarge.grademl.query.execution
 
+import science.atlarge.grademl.core.util.ConcurrentMemoizer
 import science.atlarge.grademl.query.execution.IntTypes.toInt
 import science.atlarge.grademl.query.model.*
 
@@ -10,11 +11,51 @@ class ConcreteTable private constructor(
     private val stringColumns: Array<Array<String>>,
     private val timeSeriesIndices: IntArray,
     private val timeSeriesSizes: IntArray,
-) : Table {
+) : SizedTable {
 
     val timeSeriesCount = timeSeriesSizes.size
     val rowCount = timeSeriesSizes.sum()
 
+    override val estimatedTimeSeriesCount: Long
+        get() = timeSeriesCount.toLong()
+    override val estimatedRowCount: Long
+        get() = rowCount.toLong()
+
+    private val columnTypes = schema.columns.map { it.type.toInt() }.toIntArray()
+    private val isKeyColumn = schema.columns.map { it.isKey }.toBooleanArray()
+
+    // Estimate of the memory used by the table's data arrays; every string is counted, even if it is shared
+    val estimatedSizeBytes: Long by lazy {
+        var size = 8L * (timeSeriesIndices.size + timeSeriesSizes.size)
+        for (c in columnTypes.indices) {
+            size += booleanColumns[c].size + 8L * numericColumns[c].size + 8L * stringColumns[c].size
+            if (columnTypes[c] == IntTypes.TYPE_STRING) {
+                val valueCount = if (isKeyColumn[c]) timeSeriesCount else rowCount
+                for (i in 0 until valueCount) size += BYTES_PER_STRING + 2L * stringColumns[c][i].length
+            }
+        }
+        size
+    }
+
+    // Indexes for joining with this table on a list of columns, built on first use and kept with the table. Indexes
+    // refer to the table's data arrays through a shared view instead of copying the table.
+    private val indexedRows by lazy {
+        @Suppress("UNCHECKED_CAST")
+        TimeSeriesCache(
+            schema,
+            booleanColumns,
+            numericColumns,
+            stringColumns as Array<Array<String?>>,
+            timeSeriesIndices,
+            timeSeriesSizes
+        )
+    }
+    private val temporalJoinIndexes = ConcurrentMemoizer<List<Int>, TemporalJoinIndex> { joinColumns ->
+        TemporalJoinIndex.build(indexedRows, schema, joinColumns.toIntArray())
+    }
+
+    fun temporalJoinIndex(joinColumns: List<Int>): TemporalJoinIndex = temporalJoinIndexes[joinColumns]
+
     override fun timeSeriesIterator() = object : AbstractTimeSeriesIterator(this@ConcreteTable.schema) {
         private var currentTimeSeriesId = -1
 
@@ -26,40 +67,86 @@ class ConcreteTable private constructor(
             override fun getNumeric(columnIndex: Int) = numericColumns[columnIndex][currentTimeSeriesId]
             override fun getString(columnIndex: Int) = stringColumns[columnIndex][currentTimeSeriesId]
 
-            override fun rowIterator() = object : AbstractRowIterator(this@ConcreteTable.schema) {
-                private var currentRowId = timeSeriesIndices[currentTimeSeriesId] - 1
-                private val lastRowId = currentRowId + timeSeriesSizes[currentTimeSeriesId]
+            override fun rowIterator(): RowIterator = ConcreteRowIterator(currentTimeSeriesId)
+        }
+
+        override fun internalLoadNext(): Boolean {
+            if (currentTimeSeriesId + 1 >= timeSeriesCount) return false
+            currentTimeSeriesId++
+            return true
+        }
+    }
 
-                override val currentRow = object : Row {
-                    override val schema: TableSchema
-                        get() = this@ConcreteTable.schema
+    private inner class ConcreteRowIterator(
+        private val timeSeriesId: Int
+    ) : AbstractRowIterator(this@ConcreteTable.schema) {
 
-                    override fun getBoolean(columnIndex: Int) = booleanColumns[columnIndex][currentRowId]
-                    override fun getNumeric(columnIndex: Int) = numericColumns[columnIndex][currentRowId]
-                    override fun getString(columnIndex: Int) = stringColumns[columnIndex][currentRowId]
-                }
+        private var currentRowId = timeSeriesIndices[timeSeriesId] - 1
+        private val lastRowId = currentRowId + timeSeriesSizes[timeSeriesId]
 
-                override fun internalLoadNext(): Boolean {
-                    if (currentRowId >= lastRowId) return false
-                    currentRowId++
-                    return true
-                }
-            }
+        // Key columns are stored once per time series, value columns once per row
+        override val currentRow = object : Row {
+            override val schema: TableSchema
+                get() = this@ConcreteTable.schema
+
+            override fun getBoolean(columnIndex: Int) =
+                booleanColumns[columnIndex][if (isKeyColumn[columnIndex]) timeSeriesId else currentRowId]
+
+            override fun getNumeric(columnIndex: Int) =
+                numericColumns[columnIndex][if (isKeyColumn[columnIndex]) timeSeriesId else currentRowId]
+
+            override fun getString(columnIndex: Int) =
+                stringColumns[columnIndex][if (isKeyColumn[columnIndex]) timeSeriesId else currentRowId]
         }
 
         override fun internalLoadNext(): Boolean {
-            if (currentTimeSeriesId + 1 >= timeSeriesCount) return false
-            currentTimeSeriesId++
+            if (currentRowId >= lastRowId) return false
+            currentRowId++
             return true
         }
+
+        override fun internalLoadNextBatch(batch: RowBatch) {
+            val rowCount = minOf(lastRowId - currentRowId, batch.capacity)
+            if (rowCount <= 0) return
+            // Copy ranges of value columns and repeat the values of key columns
+            val fromRowId = currentRowId + 1
+            val toRowId = fromRowId + rowCount
+            for (c in columnTypes.indices) {
+                when (columnTypes[c]) {
+                    IntTypes.TYPE_BOOLEAN -> {
+                        if (isKeyColumn[c]) batch.booleanColumns[c].fill(booleanColumns[c][timeSeriesId], 0, rowCount)
+                        else booleanColumns[c].copyInto(batch.booleanColumns[c], 0, fromRowId, toRowId)
+                    }
+                    IntTypes.TYPE_NUMERIC -> {
+                        if (isKeyColumn[c]) batch.numericColumns[c].fill(numericColumns[c][timeSeriesId], 0, rowCount)
+                        else numericColumns[c].copyInto(batch.numericColumns[c], 0, fromRowId, toRowId)
+                    }
+                    IntTypes.TYPE_STRING -> {
+                        if (isKeyColumn[c]) batch.stringColumns[c].fill(stringColumns[c][timeSeriesId], 0, rowCount)
+                        else stringColumns[c].copyInto(batch.stringColumns[c], 0, fromRowId, toRowId)
+                    }
+                }
+            }
+            currentRowId += rowCount
+            batch.setSizeAndSelectAll(rowCount)
+        }
+
     }
 
     companion object {
 
         private const val INITIAL_ARRAY_SIZE = 16
+        private const val BYTES_PER_STRING = 40L
+
+        fun from(timeSeriesIterator: TimeSeriesIterator): ConcreteTable = build(timeSeriesIterator, Long.MAX_VALUE)!!
+
+        // Materializes a table only if its estimated size (see estimatedSizeBytes) does not exceed the given budget,
+        // and stops reading the input as soon as it does
+        fun fromWithinBudget(timeSeriesIterator: TimeSeriesIterator, maxSizeBytes: Long): ConcreteTable? =
+            build(timeSeriesIterator, maxSizeBytes)
 
         @Suppress("UNCHECKED_CAST")
-        fun from(timeSeriesIterator: TimeSeriesIterator): ConcreteTable {
+        private fun build(timeSeriesIterator: TimeSeriesIterator, maxSizeBytes: Long): ConcreteTable? {
             // Determine the schema and column types
             val schema = timeSeriesIterator.schema
             val columnTypes = schema.columns.map { it.type.toInt() }.toIntArray()
@@ -91,8 +178,10 @@ class ConcreteTable private constructor(
             var timeSeriesSizes = IntArray(INITIAL_ARRAY_SIZE)
 
             // Read every time series and every row from the input table and add it to the data arrays
+            val batch = RowBatch(schema)
             var timeSeriesAdded = 0
             var rowsAdded = 0
+            var estimatedSize = 0L
             while (timeSeriesIterator.loadNext()) {
                 val timeSeries = timeSeriesIterator.currentTimeSeries
                 val timeSeriesId = timeSeriesAdded++
@@ -113,27 +202,37 @@ class ConcreteTable private constructor(
                 }
 
                 // Add the key columns for this time series to the data arrays
+                estimatedSize += 16
                 for (c in keyColumns) {
                     when (columnTypes[c]) {
-                        IntTypes.TYPE_BOOLEAN -> booleanColumns[c][timeSeriesId] = timeSeries.getBoolean(c)
-                        IntTypes.TYPE_NUMERIC -> numericColumns[c][timeSeriesId] = timeSeries.getNumeric(c)
-                        IntTypes.TYPE_STRING -> stringColumns[c][timeSeriesId] = timeSeries.getString(c)
+                        IntTypes.TYPE_BOOLEAN -> {
+                            booleanColumns[c][timeSeriesId] = timeSeries.getBoolean(c)
+                            estimatedSize += 1
+                        }
+                        IntTypes.TYPE_NUMERIC -> {
+                            numericColumns[c][timeSeriesId] = timeSeries.getNumeric(c)
+                            estimatedSize += 8
+                        }
+                        IntTypes.TYPE_STRING -> {
+                            val value = timeSeries.getString(c)
+                            stringColumns[c][timeSeriesId] = value
+                            estimatedSize += 8 + BYTES_PER_STRING + 2L * value.length
+                        }
                         else -> throw IllegalArgumentException("Unsupported column type")
                     }
                 }
 
-                // Iterate over rows to add them to the data arrays
+                // Iterate over batches of rows to add them to the data arrays
                 val timeSeriesStartIndex = rowsAdded
                 var timeSeriesRowCount = 0
                 val rowIterator = timeSeries.rowIterator()
-                while (rowIterator.loadNext()) {
-                    val rowId = rowsAdded++
-                    val row = rowIterator.currentRow
-                    timeSeriesRowCount++
-
-                    // Extend the data arrays if needed to store the row's values
-                    if (rowId >= rowArraySize) {
-                        rowArraySize *= 2
+                while (rowIterator.loadNextBatch(batch)) {
+                    val batchRowCount = batch.selectedCount
+                    val selection = batch.selection
+
+                    // Extend the data arrays if needed to store the batch's values
+                    if (rowsAdded + batchRowCount > rowArraySize) {
+                        while (rowsAdded + batchRowCount > rowArraySize) rowArraySize *= 2
                         for (c in valueColumns) {
                             when (columnTypes[c]) {
                                 IntTypes.TYPE_BOOLEAN -> booleanColumns[c] = booleanColumns[c].copyOf(rowArraySize)
@@ -144,15 +243,36 @@ class ConcreteTable private constructor(
                         }
                     }
 
-                    // Add the row's values to the data arrays
+                    // Add the selected rows' values to the data arrays
                     for (c in valueColumns) {
                         when (columnTypes[c]) {
-                            IntTypes.TYPE_BOOLEAN -> booleanColumns[c][timeSeriesId] = timeSeries.getBoolean(c)
-                            IntTypes.TYPE_NUMERIC -> numericColumns[c][timeSeriesId] = timeSeries.getNumeric(c)
-                            IntTypes.TYPE_STRING -> stringColumns[c][timeSeriesId] = timeSeries.getString(c)
+                            IntTypes.TYPE_BOOLEAN -> {
+                                val source = batch.booleanColumns[c]
+                                val destination = booleanColumns[c]
+                                for (i in 0 until batchRowCount) destination[rowsAdded + i] = source[selection[i]]
+                                estimatedSize += batchRowCount
+                            }
+                            IntTypes.TYPE_NUMERIC -> {
+                                val source = batch.numericColumns[c]
+                                val destination = numericColumns[c]
+                                for (i in 0 until batchRowCount) destination[rowsAdded + i] = source[selection[i]]
+                                estimatedSize += 8L * batchRowCount
+                            }
+                            IntTypes.TYPE_STRING -> {
+                                val source = batch.stringColumns[c]
+                                val destination = stringColumns[c]
+                                for (i in 0 until batchRowCount) {
+                                    val value = source[selection[i]]
+                                    destination[rowsAdded + i] = value
+                                    estimatedSize += 8 + BYTES_PER_STRING + 2L * value!!.length
+                                }
+                            }
                             else -> throw IllegalArgumentException("Unsupported column type")
                         }
                     }
+                    rowsAdded += batchRowCount
+                    timeSeriesRowCount += batchRowCount
+                    if (estimatedSize > maxSizeBytes) return null
                 }
 
                 // Store the time series' starting index and size
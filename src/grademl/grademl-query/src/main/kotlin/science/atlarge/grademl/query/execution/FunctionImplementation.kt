@@ -3,6 +3,7 @@ package science.atlarge.grademl.query.execution
 import science.atlarge.grademl.query.language.FunctionDefinition
 import science.atlarge.grademl.query.language.Type
 import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.RowBatch
 
 sealed interface FunctionImplementation {
     val definition: FunctionDefinition
@@ -19,6 +20,21 @@ interface AggregatingFunctionImplementation : FunctionImplementation {
 interface Aggregator {
     fun reset()
     fun addRow(row: Row)
+
+    // Adds every selected row in the batch; aggregators that can process a column of values at once should override it
+    fun addBatch(batch: RowBatch) {
+        val row = batch.rowView()
+        val selection = batch.selection
+        for (i in 0 until batch.selectedCount) {
+            row.index = selection[i]
+            addRow(row)
+        }
+    }
+
+    // Adds the state of another aggregator created for the same function and arguments, which aggregated rows that
+    // follow the rows added to this aggregator, e.g., to combine partial aggregations of parts of the input
+    fun merge(other: Aggregator)
+
     fun getBooleanResult(): Boolean {
         throw UnsupportedOperationException("Aggregator does not produce a BOOLEAN value")
     }
@@ -0,0 +1,233 @@
+package science.atlarge.grademl.query.execution
+
+import it.unimi.dsi.fastutil.HashCommon
+import science.atlarge.grademl.core.util.MemoryBudget
+import science.atlarge.grademl.query.execution.IntTypes.toInt
+import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.TableSchema
+import java.nio.file.Path
+import java.util.concurrent.ForkJoinPool
+
+class AggregationSettings(
+    // Budget for groups kept in memory by a hash aggregation; rows of groups that do not fit are spilled to disk in
+    // partitions, which are aggregated after the groups in memory
+    val memoryBudgetBytes: Long = MemoryBudget.aggregationBytes,
+    // Directory for spilled partitions, or null to use the system's temporary directory
+    val spillDirectory: Path? = null,
+    // Number of input rows per task when aggregating in parallel; smaller inputs are aggregated by a single thread
+    val parallelAggregationChunkSize: Int = 1 shl 16,
+    // Number of threads aggregating chunks in parallel, or 1 to aggregate on the thread reading the input
+    val aggregationParallelism: Int = Runtime.getRuntime().availableProcessors()
+) {
+    init {
+        require(memoryBudgetBytes > 0) { "Aggregation memory budget must be positive" }
+        require(parallelAggregationChunkSize > 0) { "Parallel aggregation chunk size must be positive" }
+        require(aggregationParallelism > 0) { "Aggregation parallelism must be positive" }
+    }
+
+    // Pool for aggregating chunks in parallel, shared by all hash aggregations with these settings and created on first
+    // use, so aggregations do not compete with other work in the common pool
+    internal val aggregationPool by lazy { ForkJoinPool(aggregationParallelism) }
+
+    companion object {
+        val DEFAULT = AggregationSettings()
+    }
+}
+
+// Groups of a hash aggregation, identified by the values of their group-by columns. Groups are numbered in the order in
+// which they are added, and are found through an open-addressing table of group IDs with linear probing. The values of
+// every input column in the first row of a group are stored per column, so the only objects allocated per group are
+// its aggregators. The start and end time of each group are extended to cover every row added to the group.
+class AggregationHashTable(
+    val schema: TableSchema,
+    private val groupByColumns: IntArray,
+    private val hashSeed: Int,
+    aggregatorCount: Int,
+    private val newAggregators: () -> Array<Aggregator>
+) {
+
+    private val columnTypes = schema.columns.map { it.type.toInt() }.toIntArray()
+    private val startTimeColumn = schema.indexOfStartTimeColumn() ?: throw IllegalArgumentException(
+        "Input to hash aggregation must have _start_time column"
+    )
+    private val endTimeColumn = schema.indexOfEndTimeColumn() ?: throw IllegalArgumentException(
+        "Input to hash aggregation must have _end_time column"
+    )
+
+    var groupCount = 0
+        private set
+    private var groupCapacity = INITIAL_GROUP_CAPACITY
+
+    // Slots of the open-addressing table contain a group ID, or -1 if they are empty
+    private var slots = IntArray(2 * INITIAL_GROUP_CAPACITY) { -1 }
+    private var slotMask = slots.size - 1
+
+    // Hash, aggregators, and first row values of each group
+    private var groupHashes = IntArray(INITIAL_GROUP_CAPACITY)
+    private var groupAggregators = arrayOfNulls<Array<Aggregator>>(INITIAL_GROUP_CAPACITY)
+    private val booleanValues = Array(columnTypes.size) { c ->
+        if (columnTypes[c] == IntTypes.TYPE_BOOLEAN) BooleanArray(INITIAL_GROUP_CAPACITY) else booleanArrayOf()
+    }
+    private val numericValues = Array(columnTypes.size) { c ->
+        if (columnTypes[c] == IntTypes.TYPE_NUMERIC) DoubleArray(INITIAL_GROUP_CAPACITY) else doubleArrayOf()
+    }
+    private val stringValues = Array(columnTypes.size) { c ->
+        if (columnTypes[c] == IntTypes.TYPE_STRING) arrayOfNulls<String>(INITIAL_GROUP_CAPACITY) else emptyArray()
+    }
+
+    // Estimate the memory used per group: up to four slots, its hash, its values, and its aggregators
+    private val estimatedBytesPerGroup = 20L + columnTypes.sumOf { type ->
+        when (type) {
+            IntTypes.TYPE_BOOLEAN -> 1L
+            IntTypes.TYPE_NUMERIC -> 8L
+            else -> BYTES_PER_STRING
+        }
+    } + 24L + aggregatorCount * BYTES_PER_AGGREGATOR
+
+    val estimatedSizeBytes: Long
+        get() = groupCount * estimatedBytesPerGroup
+
+    fun hashOf(row: Row): Int {
+        var hash = hashSeed
+        for (c in groupByColumns) {
+            val valueHash = when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> row.getBoolean(c).hashCode()
+                IntTypes.TYPE_NUMERIC -> row.getNumeric(c).let { if (it == 0.0) 0 else it.hashCode() }
+                IntTypes.TYPE_STRING -> row.getString(c).hashCode()
+                else -> throw IllegalArgumentException(
+                    "Hash aggregation does not support type: ${schema.columns[c].type}"
+                )
+            }
+            hash = 31 * hash + valueHash
+        }
+        // Spread the bits of the hash, because slots and spilled partitions are selected using different bits
+        return HashCommon.mix(hash)
+    }
+
+    // Returns the ID of the group of the given row, or -1 if the table does not contain its group
+    fun findGroup(row: Row, hash: Int): Int {
+        var slot = hash and slotMask
+        while (true) {
+            val groupId = slots[slot]
+            if (groupId < 0) return -1
+            if (groupHashes[groupId] == hash && isInGroup(row, groupId)) return groupId
+            slot = (slot + 1) and slotMask
+        }
+    }
+
+    // Adds a group for the given row, which must not be part of any group in the table yet
+    fun addGroup(row: Row, hash: Int, aggregators: Array<Aggregator> = newAggregators()): Int {
+        if (groupCount == groupCapacity) expandGroups()
+        val groupId = groupCount++
+        groupHashes[groupId] = hash
+        groupAggregators[groupId] = aggregators
+        for (c in columnTypes.indices) {
+            when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> booleanValues[c][groupId] = row.getBoolean(c)
+                IntTypes.TYPE_NUMERIC -> numericValues[c][groupId] = row.getNumeric(c)
+                IntTypes.TYPE_STRING -> stringValues[c][groupId] = row.getString(c)
+            }
+        }
+        // Keep the table at most half full
+        if (2 * groupCount > slots.size) expandSlots() else insertIntoSlot(groupId)
+        return groupId
+    }
+
+    fun aggregatorsOf(groupId: Int): Array<Aggregator> = groupAggregators[groupId]!!
+
+    fun addTimeRange(groupId: Int, startTime: Double, endTime: Double) {
+        val startTimes = numericValues[startTimeColumn]
+        val endTimes = numericValues[endTimeColumn]
+        startTimes[groupId] = minOf(startTimes[groupId], startTime)
+        endTimes[groupId] = maxOf(endTimes[groupId], endTime)
+    }
+
+    fun getBoolean(columnIndex: Int, groupId: Int) = booleanValues[columnIndex][groupId]
+    fun getNumeric(columnIndex: Int, groupId: Int) = numericValues[columnIndex][groupId]
+    fun getString(columnIndex: Int, groupId: Int) = stringValues[columnIndex][groupId]!!
+
+    // Adds the groups of another table, which aggregated rows that follow the rows aggregated by this table. Groups
+    // that are not in this table yet take over the aggregators of the other table.
+    fun mergeFrom(other: AggregationHashTable) {
+        require(other.hashSeed == hashSeed) { "Can only merge hash tables with the same hash function" }
+        val otherGroup = other.GroupRow()
+        for (otherGroupId in 0 until other.groupCount) {
+            otherGroup.groupId = otherGroupId
+            val hash = other.groupHashes[otherGroupId]
+            val otherAggregators = other.aggregatorsOf(otherGroupId)
+            val groupId = findGroup(otherGroup, hash)
+            if (groupId < 0) {
+                addGroup(otherGroup, hash, otherAggregators)
+            } else {
+                val aggregators = aggregatorsOf(groupId)
+                for (i in aggregators.indices) aggregators[i].merge(otherAggregators[i])
+                addTimeRange(
+                    groupId,
+                    other.getNumeric(startTimeColumn, otherGroupId),
+                    other.getNumeric(endTimeColumn, otherGroupId)
+                )
+            }
+        }
+    }
+
+    private fun isInGroup(row: Row, groupId: Int): Boolean {
+        for (c in groupByColumns) {
+            val isEqual = when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> booleanValues[c][groupId] == row.getBoolean(c)
+                IntTypes.TYPE_NUMERIC -> {
+                    // Treat NaN as a single group, like its hash code does
+                    val value = row.getNumeric(c)
+                    numericValues[c][groupId] == value || numericValues[c][groupId].isNaN() && value.isNaN()
+                }
+                IntTypes.TYPE_STRING -> stringValues[c][groupId] == row.getString(c)
+                else -> throw IllegalArgumentException()
+            }
+            if (!isEqual) return false
+        }
+        return true
+    }
+
+    private fun insertIntoSlot(groupId: Int) {
+        var slot = groupHashes[groupId] and slotMask
+        while (slots[slot] >= 0) slot = (slot + 1) and slotMask
+        slots[slot] = groupId
+    }
+
+    private fun expandSlots() {
+        slots = IntArray(slots.size * 2) { -1 }
+        slotMask = slots.size - 1
+        for (groupId in 0 until groupCount) insertIntoSlot(groupId)
+    }
+
+    private fun expandGroups() {
+        groupCapacity *= 2
+        groupHashes = groupHashes.copyOf(groupCapacity)
+        groupAggregators = groupAggregators.copyOf(groupCapacity)
+        for (c in columnTypes.indices) {
+            when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> booleanValues[c] = booleanValues[c].copyOf(groupCapacity)
+                IntTypes.TYPE_NUMERIC -> numericValues[c] = numericValues[c].copyOf(groupCapacity)
+                IntTypes.TYPE_STRING -> stringValues[c] = stringValues[c].copyOf(groupCapacity)
+            }
+        }
+    }
+
+    // View of the values of a group as a row
+    private inner class GroupRow : Row {
+        var groupId = -1
+
+        override val schema: TableSchema
+            get() = this@AggregationHashTable.schema
+
+        override fun getBoolean(columnIndex: Int) = getBoolean(columnIndex, groupId)
+        override fun getNumeric(columnIndex: Int) = getNumeric(columnIndex, groupId)
+        override fun getString(columnIndex: Int) = getString(columnIndex, groupId)
+    }
+
+    companion object {
+        private const val INITIAL_GROUP_CAPACITY = 16
+        private const val BYTES_PER_STRING = 48L
+        private const val BYTES_PER_AGGREGATOR = 48L
+    }
+
+}
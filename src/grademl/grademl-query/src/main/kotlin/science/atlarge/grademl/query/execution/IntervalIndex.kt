@@ -0,0 +1,59 @@
+package science.atlarge.grademl.query.execution
+
+import it.unimi.dsi.fastutil.ints.IntArrayList
+import it.unimi.dsi.fastutil.ints.IntArrays
+
+// Static interval tree over half-open intervals [start, end). Intervals are sorted by their start and stored in an
+// implicit balanced binary tree (the middle of every range of the sorted array is the root of that range), in which
+// every node also stores the largest end of the intervals in its subtree. All intervals overlapping a query range are
+// found in O(log n + k) time, in order of their start.
+class IntervalIndex(starts: DoubleArray, ends: DoubleArray) {
+
+    val size = starts.size
+
+    init {
+        require(ends.size == size) { "Must have the same number of interval starts and ends" }
+    }
+
+    // Ordinals of the intervals in order of their start, and their start, end, and subtree maximum end in that order
+    private val ids = IntArray(size) { it }.also { ids ->
+        IntArrays.mergeSort(ids) { left, right -> starts[left].compareTo(starts[right]) }
+    }
+    private val sortedStarts = DoubleArray(size) { starts[ids[it]] }
+    private val sortedEnds = DoubleArray(size) { ends[ids[it]] }
+    private val maxEnds = DoubleArray(size)
+
+    init {
+        computeMaxEnds(0, size)
+    }
+
+    // Appends the ordinals of all intervals overlapping [start, end) to the result
+    fun findOverlapping(start: Double, end: Double, result: IntArrayList) {
+        findOverlapping(start, end, 0, size, result)
+    }
+
+    private fun findOverlapping(start: Double, end: Double, fromIndex: Int, toIndex: Int, result: IntArrayList) {
+        if (fromIndex >= toIndex) return
+        val middleIndex = (fromIndex + toIndex) ushr 1
+        // Skip the subtree if none of its intervals end after the query range starts
+        if (maxEnds[middleIndex] <= start) return
+        findOverlapping(start, end, fromIndex, middleIndex, result)
+        // The middle interval and all intervals after it start at or after the end of the query range
+        if (sortedStarts[middleIndex] >= end) return
+        if (sortedEnds[middleIndex] > start) result.add(ids[middleIndex])
+        findOverlapping(start, end, middleIndex + 1, toIndex, result)
+    }
+
+    private fun computeMaxEnds(fromIndex: Int, toIndex: Int): Double {
+        if (fromIndex >= toIndex) return Double.NEGATIVE_INFINITY
+        val middleIndex = (fromIndex + toIndex) ushr 1
+        val maxEnd = maxOf(
+            sortedEnds[middleIndex],
+            computeMaxEnds(fromIndex, middleIndex),
+            computeMaxEnds(middleIndex + 1, toIndex)
+        )
+        maxEnds[middleIndex] = maxEnd
+        return maxEnd
+    }
+
+}
@@ -2,28 +2,61 @@ package science.atlarge.grademl.query.execution
 
 import science.atlarge.grademl.query.language.*
 import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.RowBatch
 
+// Physical expressions are evaluated either per row, or over the selected rows of a RowBatch. Batch evaluation writes
+// the result for each selected row to the output array at the row's index in the batch. Its default implementation
+// evaluates the expression row by row; expressions that can be evaluated column by column override it.
 sealed interface PhysicalExpression
 
 interface BooleanPhysicalExpression : PhysicalExpression {
     fun evaluateAsBoolean(row: Row): Boolean
 
+    fun evaluateAsBoolean(batch: RowBatch, output: BooleanArray) {
+        val row = batch.rowView()
+        val selection = batch.selection
+        for (i in 0 until batch.selectedCount) {
+            row.index = selection[i]
+            output[row.index] = evaluateAsBoolean(row)
+        }
+    }
+
     companion object {
         val ALWAYS_TRUE = object : BooleanPhysicalExpression {
             override fun evaluateAsBoolean(row: Row) = true
+            override fun evaluateAsBoolean(batch: RowBatch, output: BooleanArray) = batch.fill(output, true)
         }
         val ALWAYS_FALSE = object : BooleanPhysicalExpression {
             override fun evaluateAsBoolean(row: Row) = false
+            override fun evaluateAsBoolean(batch: RowBatch, output: BooleanArray) = batch.fill(output, false)
         }
     }
 }
 
 interface NumericPhysicalExpression : PhysicalExpression {
     fun evaluateAsNumeric(row: Row): Double
+
+    fun evaluateAsNumeric(batch: RowBatch, output: DoubleArray) {
+        val row = batch.rowView()
+        val selection = batch.selection
+        for (i in 0 until batch.selectedCount) {
+            row.index = selection[i]
+            output[row.index] = evaluateAsNumeric(row)
+        }
+    }
 }
 
 interface StringPhysicalExpression : PhysicalExpression {
     fun evaluateAsString(row: Row): String
+
+    fun evaluateAsString(batch: RowBatch, output: Array<String?>) {
+        val row = batch.rowView()
+        val selection = batch.selection
+        for (i in 0 until batch.selectedCount) {
+            row.index = selection[i]
+            output[row.index] = evaluateAsString(row)
+        }
+    }
 }
 
 fun Expression.toPhysicalExpression(): PhysicalExpression {
@@ -46,6 +79,10 @@ private class PhysicalExpressionConverter : ExpressionVisitor {
             override fun evaluateAsBoolean(row: Row): Boolean {
                 return e.value
             }
+
+            override fun evaluateAsBoolean(batch: RowBatch, output: BooleanArray) {
+                batch.fill(output, e.value)
+            }
         }
     }
 
@@ -54,6 +91,10 @@ private class PhysicalExpressionConverter : ExpressionVisitor {
             override fun evaluateAsNumeric(row: Row): Double {
                 return e.value
             }
+
+            override fun evaluateAsNumeric(batch: RowBatch, output: DoubleArray) {
+                batch.fill(output, e.value)
+            }
         }
     }
 
@@ -62,6 +103,10 @@ private class PhysicalExpressionConverter : ExpressionVisitor {
             override fun evaluateAsString(row: Row): String {
                 return e.value
             }
+
+            override fun evaluateAsString(batch: RowBatch, output: Array<String?>) {
+                batch.fill(output, e.value)
+            }
         }
     }
 
@@ -72,16 +117,28 @@ private class PhysicalExpressionConverter : ExpressionVisitor {
                 override fun evaluateAsBoolean(row: Row): Boolean {
                     return row.getBoolean(e.columnIndex)
                 }
+
+                override fun evaluateAsBoolean(batch: RowBatch, output: BooleanArray) {
+                    batch.copySelected(batch.booleanColumns[e.columnIndex], output)
+                }
             }
             Type.NUMERIC -> object : NumericPhysicalExpression {
                 override fun evaluateAsNumeric(row: Row): Double {
                     return row.getNumeric(e.columnIndex)
                 }
+
+                override fun evaluateAsNumeric(batch: RowBatch, output: DoubleArray) {
+                    batch.copySelected(batch.numericColumns[e.columnIndex], output)
+                }
             }
             Type.STRING -> object : StringPhysicalExpression {
                 override fun evaluateAsString(row: Row): String {
                     return row.getString(e.columnIndex)
                 }
+
+                override fun evaluateAsString(batch: RowBatch, output: Array<String?>) {
+                    batch.copySelected(batch.stringColumns[e.columnIndex], output)
+                }
             }
         }
     }
@@ -95,6 +152,15 @@ private class PhysicalExpressionConverter : ExpressionVisitor {
                     override fun evaluateAsBoolean(row: Row): Boolean {
                         return !innerExpression.evaluateAsBoolean(row)
                     }
+
+                    override fun evaluateAsBoolean(batch: RowBatch, output: BooleanArray) {
+                        innerExpression.evaluateAsBoolean(batch, output)
+                        val selection = batch.selection
+                        for (i in 0 until batch.selectedCount) {
+                            val index = selection[i]
+                            output[index] = !output[index]
+                        }
+                    }
                 }
             }
         }
@@ -104,60 +170,16 @@ private class PhysicalExpressionConverter : ExpressionVisitor {
         val leftExpression = e.lhs.convert()
         val rightExpression = e.rhs.convert()
         result = when (e.op) {
-            BinaryOp.ADD -> {
-                leftExpression as NumericPhysicalExpression
-                rightExpression as NumericPhysicalExpression
-                object : NumericPhysicalExpression {
-                    override fun evaluateAsNumeric(row: Row): Double {
-                        return leftExpression.evaluateAsNumeric(row) + rightExpression.evaluateAsNumeric(row)
-                    }
-                }
-            }
-            BinaryOp.SUBTRACT -> {
-                leftExpression as NumericPhysicalExpression
-                rightExpression as NumericPhysicalExpression
-                object : NumericPhysicalExpression {
-                    override fun evaluateAsNumeric(row: Row): Double {
-                        return leftExpression.evaluateAsNumeric(row) - rightExpression.evaluateAsNumeric(row)
-                    }
-                }
-            }
-            BinaryOp.MULTIPLY -> {
-                leftExpression as NumericPhysicalExpression
-                rightExpression as NumericPhysicalExpression
-                object : NumericPhysicalExpression {
-                    override fun evaluateAsNumeric(row: Row): Double {
-                        return leftExpression.evaluateAsNumeric(row) * rightExpression.evaluateAsNumeric(row)
-                    }
-                }
-            }
-            BinaryOp.DIVIDE -> {
-                leftExpression as NumericPhysicalExpression
-                rightExpression as NumericPhysicalExpression
-                object : NumericPhysicalExpression {
-                    override fun evaluateAsNumeric(row: Row): Double {
-                        return leftExpression.evaluateAsNumeric(row) / rightExpression.evaluateAsNumeric(row)
-                    }
-                }
-            }
-            BinaryOp.AND -> {
-                leftExpression as BooleanPhysicalExpression
-                rightExpression as BooleanPhysicalExpression
-                object : BooleanPhysicalExpression {
-                    override fun evaluateAsBoolean(row: Row): Boolean {
-                        return leftExpression.evaluateAsBoolean(row) && rightExpression.evaluateAsBoolean(row)
-                    }
-                }
-            }
-            BinaryOp.OR -> {
-                leftExpression as BooleanPhysicalExpression
-                rightExpression as BooleanPhysicalExpression
-                object : BooleanPhysicalExpression {
-                    override fun evaluateAsBoolean(row: Row): Boolean {
-                        return leftExpression.evaluateAsBoolean(row) || rightExpression.evaluateAsBoolean(row)
-                    }
-                }
-            }
+            BinaryOp.ADD, BinaryOp.SUBTRACT, BinaryOp.MULTIPLY, BinaryOp.DIVIDE -> NumericArithmeticExpression(
+                e.op, leftExpression as NumericPhysicalExpression, rightExpression as NumericPhysicalExpression
+            )
+            BinaryOp.GREATER, BinaryOp.GREATER_EQUAL, BinaryOp.SMALLER, BinaryOp.SMALLER_EQUAL ->
+                NumericComparisonExpression(
+                    e.op, leftExpression as NumericPhysicalExpression, rightExpression as NumericPhysicalExpression
+                )
+            BinaryOp.AND, BinaryOp.OR -> LogicalExpression(
+                e.op, leftExpression as BooleanPhysicalExpression, rightExpression as BooleanPhysicalExpression
+            )
             BinaryOp.EQUAL -> {
                 when (leftExpression) {
                     is BooleanPhysicalExpression -> {
@@ -168,14 +190,9 @@ private class PhysicalExpressionConverter : ExpressionVisitor {
                             }
                         }
                     }
-                    is NumericPhysicalExpression -> {
-                        rightExpression as NumericPhysicalExpression
-                        object : BooleanPhysicalExpression {
-                            override fun evaluateAsBoolean(row: Row): Boolean {
-                                return leftExpression.evaluateAsNumeric(row) == rightExpression.evaluateAsNumeric(row)
-                            }
-                        }
-                    }
+                    is NumericPhysicalExpression -> NumericComparisonExpression(
+                        e.op, leftExpression, rightExpression as NumericPhysicalExpression
+                    )
                     is StringPhysicalExpression -> {
                         rightExpression as StringPhysicalExpression
                         object : BooleanPhysicalExpression {
@@ -196,14 +213,9 @@ private class PhysicalExpressionConverter : ExpressionVisitor {
                             }
                         }
                     }
-                    is NumericPhysicalExpression -> {
-                        rightExpression as NumericPhysicalExpression
-                        object : BooleanPhysicalExpression {
-                            override fun evaluateAsBoolean(row: Row): Boolean {
-                                return leftExpression.evaluateAsNumeric(row) != rightExpression.evaluateAsNumeric(row)
-                            }
-                        }
-                    }
+                    is NumericPhysicalExpression -> NumericComparisonExpression(
+                        e.op, leftExpression, rightExpression as NumericPhysicalExpression
+                    )
                     is StringPhysicalExpression -> {
                         rightExpression as StringPhysicalExpression
                         object : BooleanPhysicalExpression {
@@ -238,42 +250,6 @@ private class PhysicalExpressionConverter : ExpressionVisitor {
                     }
                 }
             }
-            BinaryOp.GREATER -> {
-                leftExpression as NumericPhysicalExpression
-                rightExpression as NumericPhysicalExpression
-                object : BooleanPhysicalExpression {
-                    override fun evaluateAsBoolean(row: Row): Boolean {
-                        return leftExpression.evaluateAsNumeric(row) > rightExpression.evaluateAsNumeric(row)
-                    }
-                }
-            }
-            BinaryOp.GREATER_EQUAL -> {
-                leftExpression as NumericPhysicalExpression
-                rightExpression as NumericPhysicalExpression
-                object : BooleanPhysicalExpression {
-                    override fun evaluateAsBoolean(row: Row): Boolean {
-                        return leftExpression.evaluateAsNumeric(row) >= rightExpression.evaluateAsNumeric(row)
-                    }
-                }
-            }
-            BinaryOp.SMALLER -> {
-                leftExpression as NumericPhysicalExpression
-                rightExpression as NumericPhysicalExpression
-                object : BooleanPhysicalExpression {
-                    override fun evaluateAsBoolean(row: Row): Boolean {
-                        return leftExpression.evaluateAsNumeric(row) < rightExpression.evaluateAsNumeric(row)
-                    }
-                }
-            }
-            BinaryOp.SMALLER_EQUAL -> {
-                leftExpression as NumericPhysicalExpression
-                rightExpression as NumericPhysicalExpression
-                object : BooleanPhysicalExpression {
-                    override fun evaluateAsBoolean(row: Row): Boolean {
-                        return leftExpression.evaluateAsNumeric(row) <= rightExpression.evaluateAsNumeric(row)
-                    }
-                }
-            }
         }
     }
 
@@ -314,4 +290,127 @@ private class PhysicalExpressionConverter : ExpressionVisitor {
             else -> r == l
         }
     }
-}
\ No newline at end of file
+}
+// Binary expressions that are commonly evaluated over large numbers of rows, with vectorized batch implementations.
+// Intermediate results are stored in scratch arrays owned by the expression, so each physical expression must only be
+// evaluated by one thread at a time.
+
+private class NumericArithmeticExpression(
+    private val op: BinaryOp,
+    private val lhs: NumericPhysicalExpression,
+    private val rhs: NumericPhysicalExpression
+) : NumericPhysicalExpression {
+
+    private var rightValues = DoubleArray(0)
+
+    override fun evaluateAsNumeric(row: Row): Double {
+        val l = lhs.evaluateAsNumeric(row)
+        val r = rhs.evaluateAsNumeric(row)
+        return when (op) {
+            BinaryOp.ADD -> l + r
+            BinaryOp.SUBTRACT -> l - r
+            BinaryOp.MULTIPLY -> l * r
+            BinaryOp.DIVIDE -> l / r
+            else -> throw IllegalArgumentException("Unsupported arithmetic operator: $op")
+        }
+    }
+
+    override fun evaluateAsNumeric(batch: RowBatch, output: DoubleArray) {
+        if (rightValues.size < batch.capacity) rightValues = DoubleArray(batch.capacity)
+        val r = rightValues
+        lhs.evaluateAsNumeric(batch, output)
+        rhs.evaluateAsNumeric(batch, r)
+        val selection = batch.selection
+        val count = batch.selectedCount
+        when (op) {
+            BinaryOp.ADD -> for (i in 0 until count) selection[i].let { output[it] = output[it] + r[it] }
+            BinaryOp.SUBTRACT -> for (i in 0 until count) selection[i].let { output[it] = output[it] - r[it] }
+            BinaryOp.MULTIPLY -> for (i in 0 until count) selection[i].let { output[it] = output[it] * r[it] }
+            BinaryOp.DIVIDE -> for (i in 0 until count) selection[i].let { output[it] = output[it] / r[it] }
+            else -> throw IllegalArgumentException("Unsupported arithmetic operator: $op")
+        }
+    }
+
+}
+
+private class NumericComparisonExpression(
+    private val op: BinaryOp,
+    private val lhs: NumericPhysicalExpression,
+    private val rhs: NumericPhysicalExpression
+) : BooleanPhysicalExpression {
+
+    private var leftValues = DoubleArray(0)
+    private var rightValues = DoubleArray(0)
+
+    override fun evaluateAsBoolean(row: Row): Boolean {
+        val l = lhs.evaluateAsNumeric(row)
+        val r = rhs.evaluateAsNumeric(row)
+        return when (op) {
+            BinaryOp.EQUAL -> l == r
+            BinaryOp.NOT_EQUAL -> l != r
+            BinaryOp.GREATER -> l > r
+            BinaryOp.GREATER_EQUAL -> l >= r
+            BinaryOp.SMALLER -> l < r
+            BinaryOp.SMALLER_EQUAL -> l <= r
+            else -> throw IllegalArgumentException("Unsupported comparison operator: $op")
+        }
+    }
+
+    override fun evaluateAsBoolean(batch: RowBatch, output: BooleanArray) {
+        if (leftValues.size < batch.capacity) {
+            leftValues = DoubleArray(batch.capacity)
+            rightValues = DoubleArray(batch.capacity)
+        }
+        val l = leftValues
+        val r = rightValues
+        lhs.evaluateAsNumeric(batch, l)
+        rhs.evaluateAsNumeric(batch, r)
+        val selection = batch.selection
+        val count = batch.selectedCount
+        when (op) {
+            BinaryOp.EQUAL -> for (i in 0 until count) selection[i].let { output[it] = l[it] == r[it] }
+            BinaryOp.NOT_EQUAL -> for (i in 0 until count) selection[i].let { output[it] = l[it] != r[it] }
+            BinaryOp.GREATER -> for (i in 0 until count) selection[i].let { output[it] = l[it] > r[it] }
+            BinaryOp.GREATER_EQUAL -> for (i in 0 until count) selection[i].let { output[it] = l[it] >= r[it] }
+            BinaryOp.SMALLER -> for (i in 0 until count) selection[i].let { output[it] = l[it] < r[it] }
+            BinaryOp.SMALLER_EQUAL -> for (i in 0 until count) selection[i].let { output[it] = l[it] <= r[it] }
+            else -> throw IllegalArgumentException("Unsupported comparison operator: $op")
+        }
+    }
+
+}
+
+private class LogicalExpression(
+    private val op: BinaryOp,
+    private val lhs: BooleanPhysicalExpression,
+    private val rhs: BooleanPhysicalExpression
+) : BooleanPhysicalExpression {
+
+    private var savedSelection = IntArray(0)
+
+    init {
+        require(op == BinaryOp.AND || op == BinaryOp.OR) { "Unsupported logical operator: $op" }
+    }
+
+    override fun evaluateAsBoolean(row: Row): Boolean {
+        return if (op == BinaryOp.AND) {
+            lhs.evaluateAsBoolean(row) && rhs.evaluateAsBoolean(row)
+        } else {
+            lhs.evaluateAsBoolean(row) || rhs.evaluateAsBoolean(row)
+        }
+    }
+
+    override fun evaluateAsBoolean(batch: RowBatch, output: BooleanArray) {
+        if (savedSelection.size < batch.capacity) savedSelection = IntArray(batch.capacity)
+        lhs.evaluateAsBoolean(batch, output)
+        // Short-circuit as in row-based evaluation: only evaluate the right-hand side for rows where the left-hand side
+        // does not determine the result, and write its result directly to the output
+        val savedCount = batch.narrowSelection(output, op == BinaryOp.AND, savedSelection)
+        try {
+            if (batch.selectedCount > 0) rhs.evaluateAsBoolean(batch, output)
+        } finally {
+            batch.restoreSelection(savedSelection, savedCount)
+        }
+    }
+
+}
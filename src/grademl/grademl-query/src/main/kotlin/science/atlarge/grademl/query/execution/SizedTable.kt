@@ -0,0 +1,12 @@
+package science.atlarge.grademl.query.execution
+
+import science.atlarge.grademl.query.model.Table
+
+// Table that can estimate its size without being read, which the query planner uses to choose between operators
+interface SizedTable : Table {
+
+    val estimatedTimeSeriesCount: Long
+
+    val estimatedRowCount: Long
+
+}
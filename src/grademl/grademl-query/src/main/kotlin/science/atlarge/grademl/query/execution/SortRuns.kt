@@ -0,0 +1,254 @@
+package science.atlarge.grademl.query.execution
+
+import science.atlarge.grademl.query.model.*
+import java.io.*
+import java.nio.file.Files
+import java.nio.file.Path
+import java.util.*
+
+// Sorted runs of rows that are spilled to disk when the input of a sort does not fit in memory, and a k-way merge of
+// such runs. Every row is stored with the values of all columns, the ordinal of the input time series it belongs to,
+// and its ordinal in the input. Ties between rows with equal sort keys are broken on their input ordinal, so merging
+// runs produces rows in the same order as sorting all rows in memory.
+class SortRun(val file: Path, val rowCount: Long) {
+
+    // Deletes a run that will not be read (completely), e.g., because its query is closed early
+    fun delete() {
+        Files.deleteIfExists(file)
+    }
+
+}
+
+class SortRunWriter(
+    private val columnTypes: IntArray,
+    spillDirectory: Path?
+) : Closeable {
+
+    private val file = createRunFile(spillDirectory)
+    private val output = DataOutputStream(BufferedOutputStream(Files.newOutputStream(file), BUFFER_SIZE))
+    private var rowCount = 0L
+    private var isFinished = false
+
+    fun write(timeSeriesOrdinal: Int, rowOrdinal: Long, row: Row) {
+        output.writeInt(timeSeriesOrdinal)
+        output.writeLong(rowOrdinal)
+        for (c in columnTypes.indices) {
+            when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> output.writeBoolean(row.getBoolean(c))
+                IntTypes.TYPE_NUMERIC -> output.writeDouble(row.getNumeric(c))
+                IntTypes.TYPE_STRING -> {
+                    val bytes = row.getString(c).toByteArray(Charsets.UTF_8)
+                    output.writeInt(bytes.size)
+                    output.write(bytes)
+                }
+            }
+        }
+        rowCount++
+    }
+
+    // Completes the run and returns it for reading
+    fun finish(): SortRun {
+        isFinished = true
+        close()
+        return SortRun(file, rowCount)
+    }
+
+    // Closes the run, and deletes it if it was not completed
+    override fun close() {
+        output.close()
+        if (!isFinished) Files.deleteIfExists(file)
+    }
+
+    private fun createRunFile(spillDirectory: Path?): Path {
+        return if (spillDirectory != null) {
+            Files.createDirectories(spillDirectory)
+            Files.createTempFile(spillDirectory, "grademl-sort-", ".run")
+        } else {
+            Files.createTempFile("grademl-sort-", ".run")
+        }
+    }
+
+}
+
+// Reads the rows of a run one at a time, and deletes the run after reading its last row
+class SortRunReader(
+    private val run: SortRun,
+    override val schema: TableSchema,
+    private val columnTypes: IntArray
+) : Row, Closeable {
+
+    private val input = DataInputStream(BufferedInputStream(Files.newInputStream(run.file), BUFFER_SIZE))
+    private var rowsRead = 0L
+    private var isClosed = false
+
+    private val booleanValues = BooleanArray(columnTypes.size)
+    private val numericValues = DoubleArray(columnTypes.size)
+    private val stringValues = arrayOfNulls<String>(columnTypes.size)
+
+    var timeSeriesOrdinal = -1
+        private set
+    var rowOrdinal = -1L
+        private set
+
+    override fun getBoolean(columnIndex: Int) = booleanValues[columnIndex]
+    override fun getNumeric(columnIndex: Int) = numericValues[columnIndex]
+    override fun getString(columnIndex: Int) = stringValues[columnIndex]!!
+
+    fun next(): Boolean {
+        if (rowsRead == run.rowCount) {
+            close()
+            return false
+        }
+        timeSeriesOrdinal = input.readInt()
+        rowOrdinal = input.readLong()
+        for (c in columnTypes.indices) {
+            when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> booleanValues[c] = input.readBoolean()
+                IntTypes.TYPE_NUMERIC -> numericValues[c] = input.readDouble()
+                IntTypes.TYPE_STRING -> {
+                    val bytes = ByteArray(input.readInt())
+                    input.readFully(bytes)
+                    stringValues[c] = String(bytes, Charsets.UTF_8)
+                }
+            }
+        }
+        rowsRead++
+        return true
+    }
+
+    override fun close() {
+        if (isClosed) return
+        isClosed = true
+        input.close()
+        run.delete()
+    }
+
+}
+
+// Merges sorted runs into a single sorted sequence of rows, which is read as a sequence of output time series
+class SortRunMerger(
+    runs: List<SortRun>,
+    private val schema: TableSchema,
+    private val columnTypes: IntArray,
+    private val sortColumns: IntArray,
+    sortColumnsAscending: BooleanArray
+) : Closeable {
+
+    private val columnDirectionMultipliers = IntArray(sortColumns.size) { if (sortColumnsAscending[it]) 1 else -1 }
+
+    private val readers = runs.map { SortRunReader(it, schema, columnTypes) }
+    private val queue = PriorityQueue(maxOf(readers.size, 1), Comparator<SortRunReader> { left, right ->
+        for (i in sortColumns.indices) {
+            val c = sortColumns[i]
+            val result = when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> left.getBoolean(c).compareTo(right.getBoolean(c))
+                IntTypes.TYPE_NUMERIC -> left.getNumeric(c).compareTo(right.getNumeric(c))
+                IntTypes.TYPE_STRING -> left.getString(c).compareTo(right.getString(c))
+                else -> throw IllegalStateException()
+            }
+            if (result != 0) return@Comparator result * columnDirectionMultipliers[i]
+        }
+        left.rowOrdinal.compareTo(right.rowOrdinal)
+    })
+
+    // Sort key of the previous row, to find the boundaries between output time series
+    private val previousBooleanKeys = BooleanArray(sortColumns.size)
+    private val previousNumericKeys = DoubleArray(sortColumns.size)
+    private val previousStringKeys = arrayOfNulls<String>(sortColumns.size)
+
+    init {
+        for (reader in readers) {
+            if (reader.next()) queue.add(reader)
+        }
+    }
+
+    val hasRow: Boolean
+        get() = queue.isNotEmpty()
+
+    // Smallest remaining row
+    val currentRow: SortRunReader
+        get() = queue.peek() ?: throw NoSuchElementException("All runs have been merged")
+
+    // Output time series starting at the current row; its row iterator advances the merge, so the rows of each time
+    // series can only be read once
+    val currentTimeSeries: TimeSeries = object : TimeSeries {
+        override val schema: TableSchema
+            get() = this@SortRunMerger.schema
+
+        override fun getBoolean(columnIndex: Int) = currentRow.getBoolean(columnIndex)
+        override fun getNumeric(columnIndex: Int) = currentRow.getNumeric(columnIndex)
+        override fun getString(columnIndex: Int) = currentRow.getString(columnIndex)
+
+        override fun rowIterator(): RowIterator = MergedRowIterator()
+    }
+
+    // Advances to the next row and returns true iff it belongs to the same output time series as the previous row
+    fun next(): Boolean {
+        val reader = queue.poll() ?: return false
+        val previousTimeSeriesOrdinal = reader.timeSeriesOrdinal
+        for (i in sortColumns.indices) {
+            val c = sortColumns[i]
+            when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> previousBooleanKeys[i] = reader.getBoolean(c)
+                IntTypes.TYPE_NUMERIC -> previousNumericKeys[i] = reader.getNumeric(c)
+                IntTypes.TYPE_STRING -> previousStringKeys[i] = reader.getString(c)
+            }
+        }
+        if (reader.next()) queue.add(reader)
+        // Compare the new current row to the previous row
+        val current = queue.peek() ?: return false
+        if (current.timeSeriesOrdinal != previousTimeSeriesOrdinal) return false
+        for (i in sortColumns.indices) {
+            val c = sortColumns[i]
+            val isEqual = when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> previousBooleanKeys[i] == current.getBoolean(c)
+                IntTypes.TYPE_NUMERIC -> previousNumericKeys[i].compareTo(current.getNumeric(c)) == 0
+                IntTypes.TYPE_STRING -> previousStringKeys[i] == current.getString(c)
+                else -> throw IllegalStateException()
+            }
+            if (!isEqual) return false
+        }
+        return true
+    }
+
+    // Merges all rows into a single run
+    fun mergeInto(writer: SortRunWriter): SortRun {
+        writer.use {
+            while (hasRow) {
+                val row = currentRow
+                writer.write(row.timeSeriesOrdinal, row.rowOrdinal, row)
+                next()
+            }
+            return writer.finish()
+        }
+    }
+
+    // Stops the merge and deletes all runs
+    override fun close() {
+        queue.clear()
+        for (reader in readers) reader.close()
+    }
+
+    private inner class MergedRowIterator : AbstractRowIterator(schema) {
+        private var isFirst = true
+        private var isExhausted = false
+
+        override val currentRow: Row
+            get() = this@SortRunMerger.currentRow
+
+        override fun internalLoadNext(): Boolean {
+            if (isExhausted) return false
+            if (isFirst) {
+                isFirst = false
+                isExhausted = !hasRow
+            } else {
+                // Stop at the first row of the next time series
+                isExhausted = !next()
+            }
+            return !isExhausted
+        }
+    }
+
+}
+
+private const val BUFFER_SIZE = 1 shl 16
@@ -1,7 +1,27 @@
 package science.atlarge.grademl.query.execution
 
+import science.atlarge.grademl.core.util.MemoryBudget
 import science.atlarge.grademl.query.language.ColumnLiteral
+import java.nio.file.Path
 
 data class SortColumn(val column: ColumnLiteral, val ascending: Boolean)
 
-data class IndexedSortColumn(val columnIndex: Int, val ascending: Boolean)
\ No newline at end of file
+data class IndexedSortColumn(val columnIndex: Int, val ascending: Boolean)
+
+class SortSettings(
+    // Budget for rows buffered by a sort operator; larger inputs are sorted in runs that are spilled to disk and merged
+    val memoryBudgetBytes: Long = MemoryBudget.sortBytes,
+    // Directory for spilled runs, or null to use the system's temporary directory
+    val spillDirectory: Path? = null,
+    // Minimum number of rows for sorting in parallel
+    val parallelSortThreshold: Int = 1 shl 16
+) {
+    init {
+        require(memoryBudgetBytes > 0) { "Sort memory budget must be positive" }
+        require(parallelSortThreshold > 0) { "Parallel sort threshold must be positive" }
+    }
+
+    companion object {
+        val DEFAULT = SortSettings()
+    }
+}
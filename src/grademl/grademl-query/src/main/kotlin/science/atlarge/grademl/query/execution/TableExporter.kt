@@ -1,13 +1,34 @@
 package science.atlarge.grademl.query.execution
 
 import science.atlarge.grademl.query.execution.IntTypes.toInt
+import science.atlarge.grademl.query.model.RowBatch
+import science.atlarge.grademl.query.model.TableSchema
 import science.atlarge.grademl.query.model.TimeSeriesIterator
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
+import java.nio.channels.FileChannel
 import java.nio.file.Path
+import java.nio.file.StandardOpenOption
 
 object TableExporter {
 
+    // Output files with this extension are written in the columnar binary format instead of as TSV
+    const val COLUMNAR_FILE_EXTENSION = ".gmlc"
+
+    // Number of rows per chunk of a columnar file; large enough to amortize per-chunk overhead in readers, small enough
+    // to buffer
+    private const val COLUMNAR_CHUNK_ROWS = 1 shl 16
+
     fun export(outputPath: Path, data: TimeSeriesIterator, limit: Int? = null): Int {
-        val maxLines = limit ?: Int.MAX_VALUE
+        val maxRows = limit ?: Int.MAX_VALUE
+        return if (outputPath.fileName.toString().endsWith(COLUMNAR_FILE_EXTENSION, ignoreCase = true)) {
+            exportColumnar(outputPath, data, maxRows)
+        } else {
+            exportTsv(outputPath, data, maxRows)
+        }
+    }
+
+    private fun exportTsv(outputPath: Path, data: TimeSeriesIterator, maxLines: Int): Int {
         val columnTypes = data.schema.columns.map { it.type.toInt() }
         var rowsWritten = 0
         outputPath.toFile().printWriter().use { writer ->
@@ -17,37 +38,252 @@ object TableExporter {
                 writer.print(data.schema.columns[columnIndex].identifier)
             }
             writer.println()
-            // Write each row as a separate line
+            // Write each row as a separate line, reading rows in batches
+            val batch = RowBatch(data.schema)
             while (rowsWritten < maxLines && data.loadNext()) {
                 val rowIterator = data.currentTimeSeries.rowIterator()
-                while (rowsWritten < maxLines && rowIterator.loadNext()) {
-                    // Write the next row column-by-column
-                    val row = rowIterator.currentRow
-                    for (columnIndex in columnTypes.indices) {
-                        if (columnIndex != 0) writer.print('\t')
-                        when (columnTypes[columnIndex]) {
-                            IntTypes.TYPE_BOOLEAN -> {
-                                writer.print(if (row.getBoolean(columnIndex)) "TRUE" else "FALSE")
-                            }
-                            IntTypes.TYPE_NUMERIC -> {
-                                writer.print(row.getNumeric(columnIndex))
+                while (rowsWritten < maxLines && rowIterator.loadNextBatch(batch)) {
+                    for (i in 0 until minOf(batch.selectedCount, maxLines - rowsWritten)) {
+                        // Write the next row column-by-column
+                        val row = batch.selection[i]
+                        for (columnIndex in columnTypes.indices) {
+                            if (columnIndex != 0) writer.print('\t')
+                            when (columnTypes[columnIndex]) {
+                                IntTypes.TYPE_BOOLEAN -> {
+                                    writer.print(if (batch.booleanColumns[columnIndex][row]) "TRUE" else "FALSE")
+                                }
+                                IntTypes.TYPE_NUMERIC -> {
+                                    writer.print(batch.numericColumns[columnIndex][row])
+                                }
+                                IntTypes.TYPE_STRING -> {
+                                    writer.print('"')
+                                    writer.print(batch.stringColumns[columnIndex][row])
+                                    writer.print('"')
+                                }
+                                else -> throw IllegalArgumentException(
+                                    "Cannot export values of type ${data.schema.columns[columnIndex].type}"
+                                )
                             }
-                            IntTypes.TYPE_STRING -> {
-                                writer.print('"')
-                                writer.print(row.getString(columnIndex))
-                                writer.print('"')
-                            }
-                            else -> throw IllegalArgumentException(
-                                "Cannot export values of type ${data.schema.columns[columnIndex].type}"
-                            )
                         }
+                        writer.println()
+                        rowsWritten++
                     }
-                    writer.println()
-                    rowsWritten++
                 }
             }
         }
         return rowsWritten
     }
 
-}
\ No newline at end of file
+    // Tests use a smaller chunk size to write files with multiple chunks from few rows
+    internal fun exportColumnar(
+        outputPath: Path,
+        data: TimeSeriesIterator,
+        maxRows: Int,
+        chunkRows: Int = COLUMNAR_CHUNK_ROWS
+    ): Int {
+        var rowsWritten = 0
+        FileChannel.open(
+            outputPath, StandardOpenOption.CREATE, StandardOpenOption.WRITE, StandardOpenOption.TRUNCATE_EXISTING
+        ).use { channel ->
+            val writer = ColumnarFileWriter(channel, data.schema, chunkRows)
+            // Append rows in batches; the writer writes a chunk to the file whenever it has buffered enough rows
+            val batch = RowBatch(data.schema)
+            while (rowsWritten < maxRows && data.loadNext()) {
+                val rowIterator = data.currentTimeSeries.rowIterator()
+                while (rowsWritten < maxRows && rowIterator.loadNextBatch(batch)) {
+                    val rowCount = minOf(batch.selectedCount, maxRows - rowsWritten)
+                    writer.append(batch, rowCount)
+                    rowsWritten += rowCount
+                }
+            }
+            writer.finish()
+        }
+        return rowsWritten
+    }
+
+}
+
+// Writes a table in GradeML's columnar binary format, which is read by grademl-query/python/grademl_columnar.py.
+// All values are little-endian, and every section is padded to a multiple of 8 bytes, so each column block can be
+// memory-mapped as an aligned array:
+//   header: magic "GMLCOL01", number of columns (Int), 0 (Int), and per column: type (Byte, 0 = BOOLEAN,
+//           1 = NUMERIC, 2 = STRING), 1 if the column is a key column or 0 otherwise (Byte), length of the column's
+//           name (Short), and its UTF-8 encoded name
+//   chunk:  number of rows (Long), followed by a block of values for each column:
+//           BOOLEAN: one Byte per row (0 or 1)
+//           NUMERIC: one Double per row
+//           STRING:  the number of strings added to the column's dictionary by this chunk (Int), their total size
+//                    in bytes (Int), the end offset of each string (Int), and the UTF-8 encoded strings; followed by
+//                    one dictionary index per row (Int)
+//   footer: -1 (Long), total number of rows (Long)
+// Rows are buffered and written in chunks of up to chunkRows rows, so tables are exported without materializing them.
+private class ColumnarFileWriter(
+    private val channel: FileChannel,
+    schema: TableSchema,
+    private val chunkRows: Int
+) {
+
+    private val columnTypes = schema.columns.map { it.type.toInt() }.toIntArray()
+
+    // Values of the current chunk
+    private val booleanValues = Array(columnTypes.size) { c ->
+        if (columnTypes[c] == IntTypes.TYPE_BOOLEAN) ByteArray(chunkRows) else EMPTY_BYTE_ARRAY
+    }
+    private val numericValues = Array(columnTypes.size) { c ->
+        if (columnTypes[c] == IntTypes.TYPE_NUMERIC) DoubleArray(chunkRows) else EMPTY_DOUBLE_ARRAY
+    }
+    private val stringCodes = Array(columnTypes.size) { c ->
+        if (columnTypes[c] == IntTypes.TYPE_STRING) IntArray(chunkRows) else EMPTY_INT_ARRAY
+    }
+    private var bufferedRows = 0
+    private var totalRows = 0L
+
+    // Dictionaries of string columns, and the strings added to them since the last chunk was written
+    private val dictionaries = Array(columnTypes.size) { HashMap<String, Int>() }
+    private val newDictionaryEntries = Array(columnTypes.size) { mutableListOf<ByteArray>() }
+
+    private var buffer = ByteBuffer.allocate(1 shl 16).order(ByteOrder.LITTLE_ENDIAN)
+
+    init {
+        val columnNames = schema.columns.map { it.identifier.toByteArray(Charsets.UTF_8) }
+        require(columnNames.all { it.size <= 0xFFFF }) { "Column names must not exceed 65535 bytes" }
+        ensureCapacity(16 + columnNames.sumOf { 4 + it.size } + 8)
+        buffer.put(MAGIC)
+        buffer.putInt(columnTypes.size)
+        buffer.putInt(0)
+        for (c in columnTypes.indices) {
+            buffer.put(columnTypes[c].toByte())
+            buffer.put(if (schema.columns[c].isKey) TRUE_BYTE else FALSE_BYTE)
+            buffer.putShort(columnNames[c].size.toShort())
+            buffer.put(columnNames[c])
+        }
+        padBuffer()
+        flushBuffer()
+    }
+
+    fun append(batch: RowBatch, rowCount: Int) {
+        var rowsAppended = 0
+        while (rowsAppended < rowCount) {
+            // Copy as many rows as fit in the current chunk, column-by-column
+            val rowsToCopy = minOf(rowCount - rowsAppended, chunkRows - bufferedRows)
+            for (c in columnTypes.indices) {
+                when (columnTypes[c]) {
+                    IntTypes.TYPE_BOOLEAN -> {
+                        val source = batch.booleanColumns[c]
+                        val target = booleanValues[c]
+                        for (i in 0 until rowsToCopy) {
+                            val row = batch.selection[rowsAppended + i]
+                            target[bufferedRows + i] = if (source[row]) TRUE_BYTE else FALSE_BYTE
+                        }
+                    }
+                    IntTypes.TYPE_NUMERIC -> {
+                        val source = batch.numericColumns[c]
+                        val target = numericValues[c]
+                        for (i in 0 until rowsToCopy) {
+                            target[bufferedRows + i] = source[batch.selection[rowsAppended + i]]
+                        }
+                    }
+                    IntTypes.TYPE_STRING -> {
+                        val source = batch.stringColumns[c]
+                        val target = stringCodes[c]
+                        for (i in 0 until rowsToCopy) {
+                            target[bufferedRows + i] = dictionaryCode(c, source[batch.selection[rowsAppended + i]]!!)
+                        }
+                    }
+                }
+            }
+            bufferedRows += rowsToCopy
+            rowsAppended += rowsToCopy
+            if (bufferedRows == chunkRows) writeChunk()
+        }
+    }
+
+    fun finish() {
+        writeChunk()
+        ensureCapacity(16)
+        buffer.putLong(-1L)
+        buffer.putLong(totalRows)
+        flushBuffer()
+    }
+
+    private fun dictionaryCode(columnIndex: Int, value: String): Int {
+        val dictionary = dictionaries[columnIndex]
+        return dictionary.getOrPut(value) {
+            newDictionaryEntries[columnIndex].add(value.toByteArray(Charsets.UTF_8))
+            dictionary.size
+        }
+    }
+
+    private fun writeChunk() {
+        if (bufferedRows == 0) return
+        // Determine the size of the chunk
+        var chunkSize = 8
+        for (c in columnTypes.indices) {
+            chunkSize += when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> padded(bufferedRows)
+                IntTypes.TYPE_NUMERIC -> 8 * bufferedRows
+                else -> padded(8 + newDictionaryEntries[c].sumOf { 4 + it.size }) + padded(4 * bufferedRows)
+            }
+        }
+        ensureCapacity(chunkSize)
+        // Write the chunk's column blocks
+        buffer.putLong(bufferedRows.toLong())
+        for (c in columnTypes.indices) {
+            when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> {
+                    buffer.put(booleanValues[c], 0, bufferedRows)
+                    padBuffer()
+                }
+                IntTypes.TYPE_NUMERIC -> {
+                    buffer.asDoubleBuffer().put(numericValues[c], 0, bufferedRows)
+                    buffer.position(buffer.position() + 8 * bufferedRows)
+                }
+                IntTypes.TYPE_STRING -> {
+                    val newEntries = newDictionaryEntries[c]
+                    buffer.putInt(newEntries.size)
+                    buffer.putInt(newEntries.sumOf { it.size })
+                    var endOffset = 0
+                    for (entry in newEntries) {
+                        endOffset += entry.size
+                        buffer.putInt(endOffset)
+                    }
+                    for (entry in newEntries) buffer.put(entry)
+                    padBuffer()
+                    newEntries.clear()
+                    buffer.asIntBuffer().put(stringCodes[c], 0, bufferedRows)
+                    buffer.position(buffer.position() + 4 * bufferedRows)
+                    padBuffer()
+                }
+            }
+        }
+        flushBuffer()
+        totalRows += bufferedRows
+        bufferedRows = 0
+    }
+
+    private fun ensureCapacity(size: Int) {
+        if (buffer.capacity() < size) buffer = ByteBuffer.allocate(size).order(ByteOrder.LITTLE_ENDIAN)
+    }
+
+    private fun padBuffer() {
+        while (buffer.position() % 8 != 0) buffer.put(FALSE_BYTE)
+    }
+
+    private fun flushBuffer() {
+        buffer.flip()
+        while (buffer.hasRemaining()) channel.write(buffer)
+        buffer.clear()
+    }
+
+    companion object {
+        private val MAGIC = "GMLCOL01".toByteArray(Charsets.US_ASCII)
+        private const val TRUE_BYTE: Byte = 1
+        private const val FALSE_BYTE: Byte = 0
+        private val EMPTY_BYTE_ARRAY = ByteArray(0)
+        private val EMPTY_DOUBLE_ARRAY = DoubleArray(0)
+        private val EMPTY_INT_ARRAY = IntArray(0)
+
+        private fun padded(size: Int) = (size + 7) and 7.inv()
+    }
+
+}
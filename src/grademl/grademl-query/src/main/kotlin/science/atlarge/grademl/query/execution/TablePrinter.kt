@@ -1,11 +1,13 @@
 package science.atlarge.grademl.query.execution
 
 import science.atlarge.grademl.query.language.Type
+import science.atlarge.grademl.query.model.RowBatch
 import science.atlarge.grademl.query.model.TimeSeriesIterator
+import java.io.PrintStream
 
 object TablePrinter {
 
-    fun print(timeSeriesIterator: TimeSeriesIterator, limit: Int? = null) {
+    fun print(timeSeriesIterator: TimeSeriesIterator, limit: Int? = null, output: PrintStream = System.out) {
         val showFirst = limit ?: 100
         val showLast = if (limit == null) 100 else 0
         val maxLines = limit ?: Int.MAX_VALUE
@@ -14,30 +16,38 @@ object TablePrinter {
         var lineCount = 0
         var lineIndex = 0
         var timeSeriesCount = 0
+        val batch = RowBatch(timeSeriesIterator.schema)
         while (lineCount < maxLines && timeSeriesIterator.loadNext()) {
-            timeSeriesCount++
+            // Number only time series with rows, as joins may or may not produce pairs of time series without rows
+            var isNumbered = false
 
             val rowIter = timeSeriesIterator.currentTimeSeries.rowIterator()
-            while (lineCount < maxLines && rowIter.loadNext()) {
-                val row = rowIter.currentRow
-                lineCount++
-                if (lineIndex >= lines.size) continue
+            while (lineCount < maxLines && rowIter.loadNextBatch(batch)) {
+                if (!isNumbered && batch.selectedCount > 0) {
+                    isNumbered = true
+                    timeSeriesCount++
+                }
+                for (i in 0 until minOf(batch.selectedCount, maxLines - lineCount)) {
+                    val row = batch.selection[i]
+                    lineCount++
+                    if (lineIndex >= lines.size) continue
 
-                lines[lineIndex][0] = lineCount.toString()
-                lines[lineIndex][1] = timeSeriesCount.toString()
-                for (c in rowIter.schema.columns.withIndex()) {
-                    val value = when (c.value.type) {
-                        Type.UNDEFINED -> "UNDEFINED"
-                        Type.BOOLEAN -> row.getBoolean(c.index).toString()
-                        Type.NUMERIC -> row.getNumeric(c.index).toString()
-                        Type.STRING -> row.getString(c.index)
+                    lines[lineIndex][0] = lineCount.toString()
+                    lines[lineIndex][1] = timeSeriesCount.toString()
+                    for (c in rowIter.schema.columns.withIndex()) {
+                        val value = when (c.value.type) {
+                            Type.UNDEFINED -> "UNDEFINED"
+                            Type.BOOLEAN -> batch.booleanColumns[c.index][row].toString()
+                            Type.NUMERIC -> batch.numericColumns[c.index][row].toString()
+                            Type.STRING -> batch.stringColumns[c.index][row]!!
+                        }
+                        lines[lineIndex][c.index + 2] = value
                     }
-                    lines[lineIndex][c.index + 2] = value
-                }
 
-                lineIndex++
-                if (lineIndex == lines.size) {
-                    lineIndex = showFirst
+                    lineIndex++
+                    if (lineIndex == lines.size) {
+                        lineIndex = showFirst
+                    }
                 }
             }
         }
@@ -60,38 +70,38 @@ object TablePrinter {
             maxOf(header[c].length, maxValueWidth)
         }
 
-        println("-".repeat(columnWidths.sum() + 3 * header.size + 1))
+        output.println("-".repeat(columnWidths.sum() + 3 * header.size + 1))
         for (c in header.indices) {
-            print("| ${header[c].padEnd(columnWidths[c])} ")
+            output.print("| ${header[c].padEnd(columnWidths[c])} ")
         }
-        println("|")
+        output.println("|")
         if (startLines != null) {
-            println("-".repeat(columnWidths.sum() + 3 * header.size + 1))
+            output.println("-".repeat(columnWidths.sum() + 3 * header.size + 1))
             for (l in startLines) {
                 for (c in l.indices) {
-                    print("| ${l[c].padEnd(columnWidths[c])} ")
+                    output.print("| ${l[c].padEnd(columnWidths[c])} ")
                 }
-                println("|")
+                output.println("|")
             }
         }
 
         if (lineCount > lines.size) {
-            println("~".repeat(columnWidths.sum() + 3 * header.size + 1))
+            output.println("~".repeat(columnWidths.sum() + 3 * header.size + 1))
         } else if (lineCount > 0) {
-            println("-".repeat(columnWidths.sum() + 3 * header.size + 1))
+            output.println("-".repeat(columnWidths.sum() + 3 * header.size + 1))
         }
 
         if (endLines != null) {
             for (l in endLines) {
                 for (c in l.indices) {
-                    print("| ${l[c].padEnd(columnWidths[c])} ")
+                    output.print("| ${l[c].padEnd(columnWidths[c])} ")
                 }
-                println("|")
+                output.println("|")
             }
-            println("-".repeat(columnWidths.sum() + 3 * header.size + 1))
+            output.println("-".repeat(columnWidths.sum() + 3 * header.size + 1))
         }
 
-        println("Showing ${minOf(lineCount, lines.size)} of $lineCount rows.")
+        output.println("Showing ${minOf(lineCount, lines.size)} of $lineCount rows.")
     }
 
 }
\ No newline at end of file
@@ -0,0 +1,103 @@
+package science.atlarge.grademl.query.execution
+
+import it.unimi.dsi.fastutil.ints.IntArrayList
+import science.atlarge.grademl.query.execution.IntTypes.toInt
+import science.atlarge.grademl.query.model.TableSchema
+import science.atlarge.grademl.query.model.TimeSeries
+import science.atlarge.grademl.query.model.TimeSeriesIterator
+
+// Index over the right input of a temporal join. Time series are grouped by the values of their join columns, and the
+// time range covered by each time series is stored in an interval tree per group, so time series from the left input
+// are only matched with overlapping time series from the right input. Like the sort-merge join, the index assumes that
+// the rows of a time series are sorted by time and do not overlap, so the first row overlapping a given time is found
+// with a binary search. An index is not modified after it is built, so it can be shared between queries.
+class TemporalJoinIndex private constructor(
+    val cache: TimeSeriesCache,
+    private val groups: Map<List<Any>, TimeSeriesGroup>,
+    private val rowStartTimes: DoubleArray,
+    private val rowEndTimes: DoubleArray
+) {
+
+    fun rowStartTime(rowId: Int) = rowStartTimes[rowId]
+    fun rowEndTime(rowId: Int) = rowEndTimes[rowId]
+
+    // Appends the IDs of time series with the given join key that overlap [startTime, endTime) to the result, in order
+    // of their first row's start time
+    fun findOverlappingTimeSeries(joinKey: List<Any>, startTime: Double, endTime: Double, result: IntArrayList) {
+        val group = groups[joinKey] ?: return
+        val firstResultIndex = result.size
+        group.timeRanges.findOverlapping(startTime, endTime, result)
+        for (i in firstResultIndex until result.size) result.set(i, group.timeSeriesIds[result.getInt(i)])
+    }
+
+    // Returns the first row in [fromRowId, toRowId) that ends after the given time, or toRowId if there is none
+    fun findFirstRowEndingAfter(time: Double, fromRowId: Int, toRowId: Int): Int {
+        var low = fromRowId
+        var high = toRowId
+        while (low < high) {
+            val middle = (low + high) ushr 1
+            if (rowEndTimes[middle] <= time) low = middle + 1 else high = middle
+        }
+        return low
+    }
+
+    private class TimeSeriesGroup(val timeSeriesIds: IntArray, val timeRanges: IntervalIndex)
+
+    companion object {
+
+        fun build(input: TimeSeriesIterator, joinColumns: IntArray): TemporalJoinIndex {
+            val cache = TimeSeriesCache(input.schema)
+            while (input.loadNext()) cache.addTimeSeries(input.currentTimeSeries)
+            return build(cache, input.schema, joinColumns)
+        }
+
+        // Indexes time series that are cached already, e.g., in a view of a ConcreteTable, without copying them
+        fun build(cache: TimeSeriesCache, schema: TableSchema, joinColumns: IntArray): TemporalJoinIndex {
+            val startTimeColumn = schema.indexOfStartTimeColumn() ?: throw IllegalArgumentException(
+                "Right input to temporal join must have _start_time column"
+            )
+            val endTimeColumn = schema.indexOfEndTimeColumn() ?: throw IllegalArgumentException(
+                "Right input to temporal join must have _end_time column"
+            )
+            require(joinColumns.all { schema.columns[it].isKey }) { "Can only index a temporal join on key columns" }
+            val columnTypes = schema.columns.map { it.type.toInt() }.toIntArray()
+
+            // Extract the time range of every row
+            val rowStartTimes = DoubleArray(cache.numCachedRows) { cache.getNumeric(startTimeColumn, it) }
+            val rowEndTimes = DoubleArray(cache.numCachedRows) { cache.getNumeric(endTimeColumn, it) }
+
+            // Group all non-empty time series by their join key
+            val timeSeriesIdsPerKey = LinkedHashMap<List<Any>, IntArrayList>()
+            val timeSeries = cache.createTimeSeriesWrapper()
+            for (timeSeriesId in 0 until cache.numCachedTimeSeries) {
+                if (cache.rowCountOf(timeSeriesId) == 0) continue
+                timeSeries.timeSeriesId = timeSeriesId
+                val joinKey = joinKeyOf(timeSeries, joinColumns, columnTypes)
+                timeSeriesIdsPerKey.getOrPut(joinKey) { IntArrayList() }.add(timeSeriesId)
+            }
+
+            // Index the time range of each time series per group
+            val groups = timeSeriesIdsPerKey.mapValues { (_, timeSeriesIds) ->
+                val ids = timeSeriesIds.toIntArray()
+                val startTimes = DoubleArray(ids.size) { rowStartTimes[cache.firstRowIdOf(ids[it])] }
+                val endTimes = DoubleArray(ids.size) { rowEndTimes[cache.lastRowIdOf(ids[it])] }
+                TimeSeriesGroup(ids, IntervalIndex(startTimes, endTimes))
+            }
+            return TemporalJoinIndex(cache, groups, rowStartTimes, rowEndTimes)
+        }
+
+        // Combines the values of the join columns of a time series into a key to look up matching time series
+        fun joinKeyOf(timeSeries: TimeSeries, joinColumns: IntArray, columnTypes: IntArray): List<Any> {
+            return joinColumns.map { c ->
+                when (columnTypes[c]) {
+                    IntTypes.TYPE_BOOLEAN -> timeSeries.getBoolean(c)
+                    IntTypes.TYPE_NUMERIC -> timeSeries.getNumeric(c)
+                    IntTypes.TYPE_STRING -> timeSeries.getString(c)
+                    else -> throw IllegalArgumentException("Temporal join does not support type: ${columnTypes[c]}")
+                }
+            }
+        }
+
+    }
+
+}
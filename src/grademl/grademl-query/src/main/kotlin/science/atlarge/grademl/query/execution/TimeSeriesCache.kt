@@ -33,6 +33,9 @@ class TimeSeriesCache(
         if (columnType == IntTypes.TYPE_STRING) arrayOfNulls<String?>(INITIAL_CACHE_SIZE) else emptyArray()
     }.toTypedArray()
 
+    // Batch used to read rows into the cache
+    private val batch = RowBatch(schema)
+
     // Track how many rows are cached
     private var cachedRowCount = 0
     private var maxCachedRowCount = INITIAL_CACHE_SIZE
@@ -44,6 +47,32 @@ class TimeSeriesCache(
     private var cachedTimeSeriesCount = 0
     private var maxCachedTimeSeriesCount = INITIAL_CACHE_SIZE
 
+    // Creates a read-only view of time series stored in the layout of a cache, i.e., values of key columns per time
+    // series and values of other columns per row, without copying them. The view must not be modified.
+    internal constructor(
+        schema: TableSchema,
+        booleanValues: Array<BooleanArray>,
+        numericValues: Array<DoubleArray>,
+        stringValues: Array<Array<String?>>,
+        firstRowIds: IntArray,
+        rowCounts: IntArray
+    ) : this(schema) {
+        booleanValues.copyInto(cachedBooleanValues)
+        numericValues.copyInto(cachedNumericValues)
+        stringValues.copyInto(cachedStringValues)
+        cachedTimeSeriesCount = rowCounts.size
+        maxCachedTimeSeriesCount = rowCounts.size
+        cachedRowCount = rowCounts.sum()
+        maxCachedRowCount = cachedRowCount
+        firstRowIdPerTimeSeries = firstRowIds
+        rowsPerTimeSeries = rowCounts
+        timeSeriesIdPerRow = IntArray(cachedRowCount)
+        for (timeSeriesId in rowCounts.indices) {
+            val firstRowId = firstRowIds[timeSeriesId]
+            timeSeriesIdPerRow.fill(timeSeriesId, firstRowId, firstRowId + rowCounts[timeSeriesId])
+        }
+    }
+
     val numCachedTimeSeries: Int
         get() = cachedTimeSeriesCount
     val numCachedRows: Int
@@ -74,7 +103,13 @@ class TimeSeriesCache(
         else cachedStringValues[columnId][rowId]!!
     }
 
-    fun addTimeSeries(timeSeries: TimeSeries): Int {
+    // Adds a time series and its rows read from the given row iterator. Rows are read in batches until the iterator is
+    // exhausted or until the cache holds at least rowLimit rows, so a large time series can be added in parts.
+    fun addTimeSeries(
+        timeSeries: TimeSeries,
+        rowIterator: RowIterator = timeSeries.rowIterator(),
+        rowLimit: Int = Int.MAX_VALUE
+    ): Int {
         // Prepare the time series-level cache
         if (cachedTimeSeriesCount == maxCachedTimeSeriesCount) expandTimeSeriesCache()
         val timeSeriesId = cachedTimeSeriesCount
@@ -86,33 +121,39 @@ class TimeSeriesCache(
                 IntTypes.TYPE_STRING -> cachedStringValues[c][timeSeriesId] = timeSeries.getString(c)
             }
         }
-        // Add rows to the cache
-        val rowIterator = timeSeries.rowIterator()
+        // Add rows to the cache, one batch at a time
         var addedRowCount = 0
         var lCachedRowCount = cachedRowCount
-        var lMaxCachedRowCount = maxCachedRowCount
-        var lTimeSeriesIdPerRow = timeSeriesIdPerRow
-        while (rowIterator.loadNext()) {
-            val row = rowIterator.currentRow
+        while (lCachedRowCount < rowLimit && rowIterator.loadNextBatch(batch)) {
+            val batchRowCount = batch.selectedCount
+            val selection = batch.selection
             // Expand the row cache if needed
-            if (lCachedRowCount == lMaxCachedRowCount) {
-                expandRowCache()
-                lMaxCachedRowCount = maxCachedRowCount
-                lTimeSeriesIdPerRow = timeSeriesIdPerRow
-            }
+            while (lCachedRowCount + batchRowCount > maxCachedRowCount) expandRowCache()
             // Add row values to the cache
             for (c in valueColumns) {
                 when (columnTypes[c]) {
-                    IntTypes.TYPE_BOOLEAN -> cachedBooleanValues[c][lCachedRowCount] = row.getBoolean(c)
-                    IntTypes.TYPE_NUMERIC -> cachedNumericValues[c][lCachedRowCount] = row.getNumeric(c)
-                    IntTypes.TYPE_STRING -> cachedStringValues[c][lCachedRowCount] = row.getString(c)
+                    IntTypes.TYPE_BOOLEAN -> {
+                        val source = batch.booleanColumns[c]
+                        val destination = cachedBooleanValues[c]
+                        for (i in 0 until batchRowCount) destination[lCachedRowCount + i] = source[selection[i]]
+                    }
+                    IntTypes.TYPE_NUMERIC -> {
+                        val source = batch.numericColumns[c]
+                        val destination = cachedNumericValues[c]
+                        for (i in 0 until batchRowCount) destination[lCachedRowCount + i] = source[selection[i]]
+                    }
+                    IntTypes.TYPE_STRING -> {
+                        val source = batch.stringColumns[c]
+                        val destination = cachedStringValues[c]
+                        for (i in 0 until batchRowCount) destination[lCachedRowCount + i] = source[selection[i]]
+                    }
                 }
             }
             // Set time series ID
-            lTimeSeriesIdPerRow[lCachedRowCount] = timeSeriesId
+            timeSeriesIdPerRow.fill(timeSeriesId, lCachedRowCount, lCachedRowCount + batchRowCount)
             // Increment row counters
-            addedRowCount++
-            lCachedRowCount++
+            addedRowCount += batchRowCount
+            lCachedRowCount += batchRowCount
         }
 
         // Store updated counters
@@ -124,6 +165,41 @@ class TimeSeriesCache(
         return timeSeriesId
     }
 
+    // Copies the rows with the given IDs to a batch, e.g., to read rows in sorted order
+    fun copyRowsToBatch(rowIds: IntArray, fromIndex: Int, rowCount: Int, batch: RowBatch) {
+        require(rowCount <= batch.capacity) { "Cannot copy more rows than fit in the batch" }
+        for (c in columnTypes.indices) {
+            val isKey = isKeyColumn[c]
+            when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> {
+                    val source = cachedBooleanValues[c]
+                    val destination = batch.booleanColumns[c]
+                    for (i in 0 until rowCount) {
+                        val rowId = rowIds[fromIndex + i]
+                        destination[i] = source[if (isKey) timeSeriesIdPerRow[rowId] else rowId]
+                    }
+                }
+                IntTypes.TYPE_NUMERIC -> {
+                    val source = cachedNumericValues[c]
+                    val destination = batch.numericColumns[c]
+                    for (i in 0 until rowCount) {
+                        val rowId = rowIds[fromIndex + i]
+                        destination[i] = source[if (isKey) timeSeriesIdPerRow[rowId] else rowId]
+                    }
+                }
+                IntTypes.TYPE_STRING -> {
+                    val source = cachedStringValues[c]
+                    val destination = batch.stringColumns[c]
+                    for (i in 0 until rowCount) {
+                        val rowId = rowIds[fromIndex + i]
+                        destination[i] = source[if (isKey) timeSeriesIdPerRow[rowId] else rowId]
+                    }
+                }
+            }
+        }
+        batch.setSizeAndSelectAll(rowCount)
+    }
+
     fun createTimeSeriesWrapper(initialTimeSeriesId: Int = -1) = TimeSeriesWrapper().apply {
         timeSeriesId = initialTimeSeriesId
     }
@@ -189,7 +265,7 @@ class TimeSeriesCache(
     }
 
     private fun expandRowCache() {
-        val newSize = maxCachedRowCount * 2
+        val newSize = maxOf(maxCachedRowCount * 2, INITIAL_CACHE_SIZE)
 
         // Expand value column cache
         for (c in valueColumns) {
@@ -260,6 +336,34 @@ class TimeSeriesCache(
             rowWrapper.rowId = currentRowId
             return true
         }
+
+        override fun internalLoadNextBatch(batch: RowBatch) {
+            val rowCount = minOf(lastRowId - currentRowId, batch.capacity)
+            if (rowCount <= 0) return
+            // Copy ranges of value columns and repeat the values of key columns
+            val fromRowId = currentRowId + 1
+            val toRowId = fromRowId + rowCount
+            for (c in columnTypes.indices) {
+                val keyIndex = if (isKeyColumn[c]) timeSeriesId else -1
+                when (columnTypes[c]) {
+                    IntTypes.TYPE_BOOLEAN -> {
+                        if (keyIndex >= 0) batch.booleanColumns[c].fill(cachedBooleanValues[c][keyIndex], 0, rowCount)
+                        else cachedBooleanValues[c].copyInto(batch.booleanColumns[c], 0, fromRowId, toRowId)
+                    }
+                    IntTypes.TYPE_NUMERIC -> {
+                        if (keyIndex >= 0) batch.numericColumns[c].fill(cachedNumericValues[c][keyIndex], 0, rowCount)
+                        else cachedNumericValues[c].copyInto(batch.numericColumns[c], 0, fromRowId, toRowId)
+                    }
+                    IntTypes.TYPE_STRING -> {
+                        if (keyIndex >= 0) batch.stringColumns[c].fill(cachedStringValues[c][keyIndex], 0, rowCount)
+                        else cachedStringValues[c].copyInto(batch.stringColumns[c], 0, fromRowId, toRowId)
+                    }
+                }
+            }
+            currentRowId += rowCount
+            rowWrapper.rowId = currentRowId
+            batch.setSizeAndSelectAll(rowCount)
+        }
     }
 
     inner class RowWrapper : Row {
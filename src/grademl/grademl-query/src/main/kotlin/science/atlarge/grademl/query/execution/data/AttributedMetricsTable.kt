@@ -2,6 +2,7 @@ package science.atlarge.grademl.query.execution.data
 
 import science.atlarge.grademl.core.GradeMLJob
 import science.atlarge.grademl.core.attribution.AttributedResourceData
+import science.atlarge.grademl.core.attribution.ResourceAttributionResult
 import science.atlarge.grademl.core.models.ExecutionPhase
 import science.atlarge.grademl.core.models.Metric
 import science.atlarge.grademl.query.analysis.ASTAnalysis
@@ -169,9 +170,10 @@ class AttributedMetricsTable(
     }
 
     override fun timeSeriesIterator(): TimeSeriesIterator {
-        val selectedMetricPhasePairs = findSelectedMetricPhasePairs(
+        // Attribute metric-phase pairs in parallel, one chunk at a time to avoid computing results that are not read
+        val selectedMetricPhasePairChunks = findSelectedMetricPhasePairs(
             findSelectedMetrics(), findSelectedPhases()
-        ).iterator()
+        ).chunked(ATTRIBUTION_CHUNK_SIZE).iterator()
         val firstTimestampNs = gradeMLJob.unifiedExecutionModel.rootPhase.startTime
         return object : AbstractTimeSeriesIterator(this@AttributedMetricsTable.schema) {
             override val currentTimeSeries: TimeSeries
@@ -258,15 +260,57 @@ class AttributedMetricsTable(
                             capacityIterator.next()
                             return true
                         }
+
+                        override fun internalLoadNextBatch(batch: RowBatch) {
+                            // Fill the batch column by column, directly from the attributed metric's data
+                            val startTimes = batch.numericColumns[INDEX_START_TIME]
+                            val endTimes = batch.numericColumns[INDEX_END_TIME]
+                            val durations = batch.numericColumns[INDEX_DURATION]
+                            val utilizations = batch.numericColumns[INDEX_UTILIZATION]
+                            val usages = batch.numericColumns[INDEX_USAGE]
+                            val capacities = batch.numericColumns[INDEX_CAPACITY]
+                            var rowCount = 0
+                            while (rowCount < batch.capacity && usageIterator.hasNext) {
+                                usageIterator.next()
+                                capacityIterator.next()
+                                val usage = usageIterator.currentValue
+                                val capacity = capacityIterator.currentValue
+                                startTimes[rowCount] = (usageIterator.currentStartTime - firstTimestampNs) / 1e9
+                                endTimes[rowCount] = (usageIterator.currentEndTime - firstTimestampNs) / 1e9
+                                durations[rowCount] =
+                                    (usageIterator.currentEndTime - usageIterator.currentStartTime) / 1e9
+                                utilizations[rowCount] = if (capacity == 0.0) 0.0 else usage / capacity
+                                usages[rowCount] = usage
+                                capacities[rowCount] = capacity
+                                rowCount++
+                            }
+                            if (rowCount == 0) return
+                            batch.stringColumns[INDEX_METRIC_PATH].fill(metric.path.toString(), 0, rowCount)
+                            batch.stringColumns[INDEX_METRIC_TYPE].fill(metric.type.toString(), 0, rowCount)
+                            batch.stringColumns[INDEX_PHASE_PATH].fill(phase.path.toString(), 0, rowCount)
+                            batch.stringColumns[INDEX_PHASE_TYPE].fill(phase.type.toString(), 0, rowCount)
+                            batch.setSizeAndSelectAll(rowCount)
+                        }
                     }
                 }
             }
 
+            private var currentChunk = emptyList<Pair<Metric, ExecutionPhase>>()
+            private var currentChunkResults = emptyList<ResourceAttributionResult>()
+            private var nextIndexInChunk = 0
+
             override fun internalLoadNext(): Boolean {
-                while (selectedMetricPhasePairs.hasNext()) {
-                    val (metric, phase) = selectedMetricPhasePairs.next()
-                    // Get resource attribution result for this metric-phase pair
-                    val attributionResult = gradeMLJob.resourceAttribution.attributeMetricToPhase(metric, phase)
+                while (true) {
+                    // Get resource attribution results for the next chunk of metric-phase pairs if needed
+                    if (nextIndexInChunk == currentChunk.size) {
+                        if (!selectedMetricPhasePairChunks.hasNext()) return false
+                        currentChunk = selectedMetricPhasePairChunks.next()
+                        currentChunkResults = gradeMLJob.resourceAttribution.attributeAll(currentChunk)
+                        nextIndexInChunk = 0
+                    }
+                    val (metric, phase) = currentChunk[nextIndexInChunk]
+                    val attributionResult = currentChunkResults[nextIndexInChunk]
+                    nextIndexInChunk++
                     // Skip if the current metric is not attributed to the current phase
                     if (attributionResult !is AttributedResourceData) continue
                     // Return the next time series
@@ -275,12 +319,13 @@ class AttributedMetricsTable(
                     metricPhaseTimeSeries.attributedResourceData = attributionResult
                     return true
                 }
-                return false
             }
         }
     }
 
     companion object {
+        private const val ATTRIBUTION_CHUNK_SIZE = 1024
+
         const val INDEX_START_TIME = Columns.INDEX_START_TIME
         const val INDEX_END_TIME = Columns.INDEX_END_TIME
         const val INDEX_DURATION = Columns.INDEX_DURATION
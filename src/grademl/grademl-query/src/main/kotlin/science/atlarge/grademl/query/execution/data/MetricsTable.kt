@@ -4,15 +4,25 @@ import science.atlarge.grademl.core.GradeMLJob
 import science.atlarge.grademl.core.models.Metric
 import science.atlarge.grademl.query.execution.AbstractRowIterator
 import science.atlarge.grademl.query.execution.AbstractTimeSeriesIterator
+import science.atlarge.grademl.query.execution.SizedTable
 import science.atlarge.grademl.query.language.Type
 import science.atlarge.grademl.query.model.*
 
 class MetricsTable(
     private val gradeMLJob: GradeMLJob
-) : Table {
+) : SizedTable {
 
     override val schema = TableSchema(COLUMNS)
 
+    override val estimatedTimeSeriesCount: Long
+        get() = gradeMLJob.unifiedResourceModel.rootResource.metricsInTree.size.toLong()
+
+    // Count periods only for metrics whose data is loaded, to avoid loading data just to plan a query
+    override val estimatedRowCount: Long
+        get() = gradeMLJob.unifiedResourceModel.rootResource.metricsInTree.sumOf { metric ->
+            if (metric.data.isLoaded) metric.data.periodCount.toLong() else ESTIMATED_PERIODS_PER_UNLOADED_METRIC
+        }
+
     override fun timeSeriesIterator(): TimeSeriesIterator {
         val allMetrics = gradeMLJob.unifiedResourceModel.rootResource.metricsInTree.iterator()
         val firstTimestampNs = gradeMLJob.unifiedExecutionModel.rootPhase.startTime
@@ -94,6 +104,32 @@ class MetricsTable(
                             usageIterator.next()
                             return true
                         }
+
+                        override fun internalLoadNextBatch(batch: RowBatch) {
+                            // Fill the batch column by column, directly from the metric's data
+                            val startTimes = batch.numericColumns[INDEX_START_TIME]
+                            val endTimes = batch.numericColumns[INDEX_END_TIME]
+                            val durations = batch.numericColumns[INDEX_DURATION]
+                            val utilizations = batch.numericColumns[INDEX_UTILIZATION]
+                            val usages = batch.numericColumns[INDEX_USAGE]
+                            val capacity = metric.data.maxValue
+                            var rowCount = 0
+                            while (rowCount < batch.capacity && usageIterator.hasNext) {
+                                usageIterator.next()
+                                startTimes[rowCount] = (usageIterator.currentStartTime - firstTimestampNs) / 1e9
+                                endTimes[rowCount] = (usageIterator.currentEndTime - firstTimestampNs) / 1e9
+                                durations[rowCount] =
+                                    (usageIterator.currentEndTime - usageIterator.currentStartTime) / 1e9
+                                utilizations[rowCount] = usageIterator.currentValue / capacity
+                                usages[rowCount] = usageIterator.currentValue
+                                rowCount++
+                            }
+                            if (rowCount == 0) return
+                            batch.numericColumns[INDEX_CAPACITY].fill(capacity, 0, rowCount)
+                            batch.stringColumns[INDEX_PATH].fill(metric.path.toString(), 0, rowCount)
+                            batch.stringColumns[INDEX_TYPE].fill(metric.type.toString(), 0, rowCount)
+                            batch.setSizeAndSelectAll(rowCount)
+                        }
                     }
                 }
             }
@@ -109,6 +145,8 @@ class MetricsTable(
     }
 
     companion object {
+        private const val ESTIMATED_PERIODS_PER_UNLOADED_METRIC = 1000L
+
         const val INDEX_START_TIME = Columns.INDEX_START_TIME
         const val INDEX_END_TIME = Columns.INDEX_END_TIME
         const val INDEX_DURATION = Columns.INDEX_DURATION
@@ -4,15 +4,22 @@ import science.atlarge.grademl.core.GradeMLJob
 import science.atlarge.grademl.core.models.ExecutionPhase
 import science.atlarge.grademl.query.execution.AbstractRowIterator
 import science.atlarge.grademl.query.execution.AbstractTimeSeriesIterator
+import science.atlarge.grademl.query.execution.SizedTable
 import science.atlarge.grademl.query.language.Type
 import science.atlarge.grademl.query.model.*
 
 class PhasesTable(
     private val gradeMLJob: GradeMLJob
-) : Table {
+) : SizedTable {
 
     override val schema = TableSchema(COLUMNS)
 
+    // Every phase is a time series with a single row
+    override val estimatedTimeSeriesCount: Long
+        get() = gradeMLJob.unifiedExecutionModel.phases.size.toLong()
+    override val estimatedRowCount: Long
+        get() = estimatedTimeSeriesCount
+
     override fun timeSeriesIterator(): TimeSeriesIterator {
         val allPhases = gradeMLJob.unifiedExecutionModel.phases.iterator()
         val firstTimestampNs = gradeMLJob.unifiedExecutionModel.rootPhase.startTime
@@ -8,6 +8,7 @@ import science.atlarge.grademl.query.language.FunctionDefinition
 import science.atlarge.grademl.query.language.Type
 import science.atlarge.grademl.query.model.BuiltinFunctions
 import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.RowBatch
 
 object Average : AggregatingFunctionImplementation {
 
@@ -16,10 +17,12 @@ object Average : AggregatingFunctionImplementation {
     override fun newAggregator(
         argumentExpressions: List<PhysicalExpression>,
         argumentTypes: List<Type>
-    ) = object : Aggregator {
-        private val valueExpr = argumentExpressions[0] as NumericPhysicalExpression
+    ): Aggregator = AverageAggregator(argumentExpressions[0] as NumericPhysicalExpression)
+
+    private class AverageAggregator(private val valueExpr: NumericPhysicalExpression) : Aggregator {
         private var sumValues = 0.0
         private var count = 0L
+        private var values = DoubleArray(0)
         override fun reset() {
             sumValues = 0.0
             count = 0L
@@ -30,6 +33,20 @@ object Average : AggregatingFunctionImplementation {
             count++
         }
 
+        override fun addBatch(batch: RowBatch) {
+            if (values.size < batch.capacity) values = DoubleArray(batch.capacity)
+            valueExpr.evaluateAsNumeric(batch, values)
+            val selection = batch.selection
+            for (i in 0 until batch.selectedCount) sumValues += values[selection[i]]
+            count += batch.selectedCount
+        }
+
+        override fun merge(other: Aggregator) {
+            other as AverageAggregator
+            sumValues += other.sumValues
+            count += other.count
+        }
+
         override fun getNumericResult(): Double {
             return sumValues / count
         }
@@ -7,6 +7,7 @@ import science.atlarge.grademl.query.language.FunctionDefinition
 import science.atlarge.grademl.query.language.Type
 import science.atlarge.grademl.query.model.BuiltinFunctions
 import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.RowBatch
 
 object Count : AggregatingFunctionImplementation {
 
@@ -15,7 +16,9 @@ object Count : AggregatingFunctionImplementation {
     override fun newAggregator(
         argumentExpressions: List<PhysicalExpression>,
         argumentTypes: List<Type>
-    ) = object : Aggregator {
+    ): Aggregator = CountAggregator()
+
+    private class CountAggregator : Aggregator {
         private var count = 0
         override fun reset() {
             count = 0
@@ -25,6 +28,14 @@ object Count : AggregatingFunctionImplementation {
             count++
         }
 
+        override fun addBatch(batch: RowBatch) {
+            count += batch.selectedCount
+        }
+
+        override fun merge(other: Aggregator) {
+            count += (other as CountAggregator).count
+        }
+
         override fun getNumericResult(): Double {
             return count.toDouble()
         }
@@ -8,6 +8,7 @@ import science.atlarge.grademl.query.language.FunctionDefinition
 import science.atlarge.grademl.query.language.Type
 import science.atlarge.grademl.query.model.BuiltinFunctions
 import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.RowBatch
 
 object CountIf : AggregatingFunctionImplementation {
 
@@ -16,9 +17,11 @@ object CountIf : AggregatingFunctionImplementation {
     override fun newAggregator(
         argumentExpressions: List<PhysicalExpression>,
         argumentTypes: List<Type>
-    ) = object : Aggregator {
-        private val condition = argumentExpressions[0] as BooleanPhysicalExpression
+    ): Aggregator = CountIfAggregator(argumentExpressions[0] as BooleanPhysicalExpression)
+
+    private class CountIfAggregator(private val condition: BooleanPhysicalExpression) : Aggregator {
         private var count = 0
+        private var matches = BooleanArray(0)
         override fun reset() {
             count = 0
         }
@@ -27,6 +30,17 @@ object CountIf : AggregatingFunctionImplementation {
             if (condition.evaluateAsBoolean(row)) count++
         }
 
+        override fun addBatch(batch: RowBatch) {
+            if (matches.size < batch.capacity) matches = BooleanArray(batch.capacity)
+            condition.evaluateAsBoolean(batch, matches)
+            val selection = batch.selection
+            for (i in 0 until batch.selectedCount) if (matches[selection[i]]) count++
+        }
+
+        override fun merge(other: Aggregator) {
+            count += (other as CountIfAggregator).count
+        }
+
         override fun getNumericResult(): Double {
             return count.toDouble()
         }
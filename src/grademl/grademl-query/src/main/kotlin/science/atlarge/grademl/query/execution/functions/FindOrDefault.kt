@@ -59,6 +59,18 @@ object FindOrDefault : AggregatingFunctionImplementation {
             }
         }
 
+        override fun merge(other: Aggregator) {
+            other as BooleanFindOrDefault
+            // Keep a value found in earlier rows, or the default of the first row, over values of later rows
+            if (!valueFound && other.valueFound) {
+                value = other.value
+                valueFound = true
+            } else if (!valueFound && firstRow && !other.firstRow) {
+                value = other.value
+                firstRow = false
+            }
+        }
+
         override fun getBooleanResult(): Boolean {
             return value
         }
@@ -89,6 +101,18 @@ object FindOrDefault : AggregatingFunctionImplementation {
             }
         }
 
+        override fun merge(other: Aggregator) {
+            other as NumericFindOrDefault
+            // Keep a value found in earlier rows, or the default of the first row, over values of later rows
+            if (!valueFound && other.valueFound) {
+                value = other.value
+                valueFound = true
+            } else if (!valueFound && firstRow && !other.firstRow) {
+                value = other.value
+                firstRow = false
+            }
+        }
+
         override fun getNumericResult(): Double {
             return value
         }
@@ -119,6 +143,18 @@ object FindOrDefault : AggregatingFunctionImplementation {
             }
         }
 
+        override fun merge(other: Aggregator) {
+            other as StringFindOrDefault
+            // Keep a value found in earlier rows, or the default of the first row, over values of later rows
+            if (!valueFound && other.valueFound) {
+                value = other.value
+                valueFound = true
+            } else if (!valueFound && firstRow && !other.firstRow) {
+                value = other.value
+                firstRow = false
+            }
+        }
+
         override fun getStringResult(): String {
             return value!!
         }
@@ -5,6 +5,7 @@ import science.atlarge.grademl.query.language.FunctionDefinition
 import science.atlarge.grademl.query.language.Type
 import science.atlarge.grademl.query.model.BuiltinFunctions
 import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.RowBatch
 
 object Max : AggregatingFunctionImplementation {
 
@@ -32,6 +33,10 @@ object Max : AggregatingFunctionImplementation {
             if (!maxValue) maxValue = expr.evaluateAsBoolean(row)
         }
 
+        override fun merge(other: Aggregator) {
+            if (!maxValue) maxValue = (other as BooleanMax).maxValue
+        }
+
         override fun getBooleanResult(): Boolean {
             return maxValue
         }
@@ -39,6 +44,7 @@ object Max : AggregatingFunctionImplementation {
 
     private class NumericMax(private val expr: NumericPhysicalExpression) : Aggregator {
         private var maxValue = Double.NEGATIVE_INFINITY
+        private var values = DoubleArray(0)
         override fun reset() {
             maxValue = Double.NEGATIVE_INFINITY
         }
@@ -47,6 +53,17 @@ object Max : AggregatingFunctionImplementation {
             maxValue = maxOf(maxValue, expr.evaluateAsNumeric(row))
         }
 
+        override fun addBatch(batch: RowBatch) {
+            if (values.size < batch.capacity) values = DoubleArray(batch.capacity)
+            expr.evaluateAsNumeric(batch, values)
+            val selection = batch.selection
+            for (i in 0 until batch.selectedCount) maxValue = maxOf(maxValue, values[selection[i]])
+        }
+
+        override fun merge(other: Aggregator) {
+            maxValue = maxOf(maxValue, (other as NumericMax).maxValue)
+        }
+
         override fun getNumericResult(): Double {
             return maxValue
         }
@@ -63,6 +80,11 @@ object Max : AggregatingFunctionImplementation {
             maxValue = if (maxValue == null) valueOfRow else maxOf(maxValue!!, valueOfRow)
         }
 
+        override fun merge(other: Aggregator) {
+            val otherValue = (other as StringMax).maxValue ?: return
+            maxValue = if (maxValue == null) otherValue else maxOf(maxValue!!, otherValue)
+        }
+
         override fun getStringResult(): String {
             return maxValue!!
         }
@@ -5,6 +5,7 @@ import science.atlarge.grademl.query.language.FunctionDefinition
 import science.atlarge.grademl.query.language.Type
 import science.atlarge.grademl.query.model.BuiltinFunctions
 import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.RowBatch
 
 object Min : AggregatingFunctionImplementation {
 
@@ -32,6 +33,10 @@ object Min : AggregatingFunctionImplementation {
             if (minValue) minValue = expr.evaluateAsBoolean(row)
         }
 
+        override fun merge(other: Aggregator) {
+            if (minValue) minValue = (other as BooleanMin).minValue
+        }
+
         override fun getBooleanResult(): Boolean {
             return minValue
         }
@@ -39,6 +44,7 @@ object Min : AggregatingFunctionImplementation {
 
     private class NumericMin(private val expr: NumericPhysicalExpression) : Aggregator {
         private var minValue = Double.POSITIVE_INFINITY
+        private var values = DoubleArray(0)
         override fun reset() {
             minValue = Double.POSITIVE_INFINITY
         }
@@ -47,6 +53,17 @@ object Min : AggregatingFunctionImplementation {
             minValue = minOf(minValue, expr.evaluateAsNumeric(row))
         }
 
+        override fun addBatch(batch: RowBatch) {
+            if (values.size < batch.capacity) values = DoubleArray(batch.capacity)
+            expr.evaluateAsNumeric(batch, values)
+            val selection = batch.selection
+            for (i in 0 until batch.selectedCount) minValue = minOf(minValue, values[selection[i]])
+        }
+
+        override fun merge(other: Aggregator) {
+            minValue = minOf(minValue, (other as NumericMin).minValue)
+        }
+
         override fun getNumericResult(): Double {
             return minValue
         }
@@ -63,6 +80,11 @@ object Min : AggregatingFunctionImplementation {
             minValue = if (minValue == null) valueOfRow else minOf(minValue!!, valueOfRow)
         }
 
+        override fun merge(other: Aggregator) {
+            val otherValue = (other as StringMin).minValue ?: return
+            minValue = if (minValue == null) otherValue else minOf(minValue!!, otherValue)
+        }
+
         override fun getStringResult(): String {
             return minValue!!
         }
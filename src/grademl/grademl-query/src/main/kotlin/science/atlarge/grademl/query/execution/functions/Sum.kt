@@ -8,6 +8,7 @@ import science.atlarge.grademl.query.language.FunctionDefinition
 import science.atlarge.grademl.query.language.Type
 import science.atlarge.grademl.query.model.BuiltinFunctions
 import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.RowBatch
 
 object Sum : AggregatingFunctionImplementation {
 
@@ -16,9 +17,11 @@ object Sum : AggregatingFunctionImplementation {
     override fun newAggregator(
         argumentExpressions: List<PhysicalExpression>,
         argumentTypes: List<Type>
-    ) = object : Aggregator {
-        private val expr = argumentExpressions[0] as NumericPhysicalExpression
+    ): Aggregator = SumAggregator(argumentExpressions[0] as NumericPhysicalExpression)
+
+    private class SumAggregator(private val expr: NumericPhysicalExpression) : Aggregator {
         private var sum = 0.0
+        private var values = DoubleArray(0)
         override fun reset() {
             sum = 0.0
         }
@@ -27,6 +30,17 @@ object Sum : AggregatingFunctionImplementation {
             sum += expr.evaluateAsNumeric(row)
         }
 
+        override fun addBatch(batch: RowBatch) {
+            if (values.size < batch.capacity) values = DoubleArray(batch.capacity)
+            expr.evaluateAsNumeric(batch, values)
+            val selection = batch.selection
+            for (i in 0 until batch.selectedCount) sum += values[selection[i]]
+        }
+
+        override fun merge(other: Aggregator) {
+            sum += (other as SumAggregator).sum
+        }
+
         override fun getNumericResult(): Double {
             return sum
         }
@@ -8,6 +8,7 @@ import science.atlarge.grademl.query.language.FunctionDefinition
 import science.atlarge.grademl.query.language.Type
 import science.atlarge.grademl.query.model.BuiltinFunctions
 import science.atlarge.grademl.query.model.Row
+import science.atlarge.grademl.query.model.RowBatch
 
 object WeightedAverage : AggregatingFunctionImplementation {
 
@@ -16,11 +17,19 @@ object WeightedAverage : AggregatingFunctionImplementation {
     override fun newAggregator(
         argumentExpressions: List<PhysicalExpression>,
         argumentTypes: List<Type>
-    ) = object : Aggregator {
-        private val valueExpr = argumentExpressions[0] as NumericPhysicalExpression
-        private val weightExpr = argumentExpressions[1] as NumericPhysicalExpression
+    ): Aggregator = WeightedAverageAggregator(
+        argumentExpressions[0] as NumericPhysicalExpression,
+        argumentExpressions[1] as NumericPhysicalExpression
+    )
+
+    private class WeightedAverageAggregator(
+        private val valueExpr: NumericPhysicalExpression,
+        private val weightExpr: NumericPhysicalExpression
+    ) : Aggregator {
         private var sumWeightedValues = 0.0
         private var sumWeights = 0.0
+        private var values = DoubleArray(0)
+        private var weights = DoubleArray(0)
         override fun reset() {
             sumWeightedValues = 0.0
             sumWeights = 0.0
@@ -33,6 +42,27 @@ object WeightedAverage : AggregatingFunctionImplementation {
             sumWeights += weight
         }
 
+        override fun addBatch(batch: RowBatch) {
+            if (values.size < batch.capacity) {
+                values = DoubleArray(batch.capacity)
+                weights = DoubleArray(batch.capacity)
+            }
+            valueExpr.evaluateAsNumeric(batch, values)
+            weightExpr.evaluateAsNumeric(batch, weights)
+            val selection = batch.selection
+            for (i in 0 until batch.selectedCount) {
+                val index = selection[i]
+                sumWeightedValues += values[index] * weights[index]
+                sumWeights += weights[index]
+            }
+        }
+
+        override fun merge(other: Aggregator) {
+            other as WeightedAverageAggregator
+            sumWeightedValues += other.sumWeightedValues
+            sumWeights += other.sumWeights
+        }
+
         override fun getNumericResult(): Double {
             return sumWeightedValues / sumWeights
         }
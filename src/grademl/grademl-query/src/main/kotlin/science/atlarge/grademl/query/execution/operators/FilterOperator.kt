@@ -3,6 +3,7 @@ package science.atlarge.grademl.query.execution.operators
 import science.atlarge.grademl.query.execution.AccountingRowIterator
 import science.atlarge.grademl.query.execution.AccountingTimeSeriesIterator
 import science.atlarge.grademl.query.execution.BooleanPhysicalExpression
+import science.atlarge.grademl.query.model.RowBatch
 import science.atlarge.grademl.query.model.RowIterator
 import science.atlarge.grademl.query.model.TableSchema
 import science.atlarge.grademl.query.model.TimeSeriesIterator
@@ -60,6 +61,8 @@ private class FilterTimeSeriesIterator(
         return false
     }
 
+    override fun close() = input.close()
+
 }
 
 private class FilterRowIterator(
@@ -69,6 +72,8 @@ private class FilterRowIterator(
 
     lateinit var input: RowIterator
 
+    private var matchesRowCondition = BooleanArray(0)
+
     override fun getBoolean(columnIndex: Int) = input.currentRow.getBoolean(columnIndex)
     override fun getNumeric(columnIndex: Int) = input.currentRow.getNumeric(columnIndex)
     override fun getString(columnIndex: Int) = input.currentRow.getString(columnIndex)
@@ -81,4 +86,14 @@ private class FilterRowIterator(
         return false
     }
 
+    override fun internalLoadNextBatch(batch: RowBatch) {
+        if (matchesRowCondition.size < batch.capacity) matchesRowCondition = BooleanArray(batch.capacity)
+        // Filter batches of input rows by deselecting non-matching rows, until a batch has at least one matching row
+        while (input.loadNextBatch(batch)) {
+            rowCondition.evaluateAsBoolean(batch, matchesRowCondition)
+            batch.retainSelected(matchesRowCondition)
+            if (batch.selectedCount > 0) return
+        }
+    }
+
 }
\ No newline at end of file
@@ -0,0 +1,426 @@
+package science.atlarge.grademl.query.execution.operators
+
+import science.atlarge.grademl.query.execution.*
+import science.atlarge.grademl.query.execution.IntTypes.toInt
+import science.atlarge.grademl.query.language.Expression
+import science.atlarge.grademl.query.language.FunctionDefinition
+import science.atlarge.grademl.query.language.Type
+import science.atlarge.grademl.query.model.*
+import java.util.concurrent.Callable
+import java.util.concurrent.ForkJoinTask
+
+// Aggregation that finds the group of every input row in a hash table, so its input does not need to be sorted by the
+// group-by columns. Large inputs are split in chunks that are aggregated into partial hash tables in parallel, which
+// are merged in input order. If the groups do not fit in the memory budget, rows of groups that are not in memory yet
+// are spilled to disk in partitions by hash, and each partition is aggregated after the groups in memory are produced.
+// Groups are produced in order of their first row, not in order of their group-by column values.
+class HashAggregateOperator(
+    private val input: QueryOperator,
+    override val schema: TableSchema,
+    groupByColumns: List<Int>,
+    aggregateFunctions: List<FunctionDefinition>,
+    private val aggregateFunctionTypes: List<Type>,
+    private val aggregateFunctionArguments: List<List<Expression>>,
+    private val aggregateColumns: List<Column>,
+    private val projections: List<PhysicalExpression>,
+    private val aggregationSettings: AggregationSettings = AggregationSettings.DEFAULT
+) : AccountingQueryOperator() {
+
+    private val groupByColumns = groupByColumns.toIntArray()
+
+    private val aggregateFunctionImplementations = aggregateFunctions.map { functionDefinition ->
+        val implementation = BuiltinFunctionImplementations.from(functionDefinition)
+        implementation as? AggregatingFunctionImplementation ?: throw IllegalStateException()
+    }
+    private val aggregateFunctionArgumentTypes = aggregateFunctionArguments.map { it.map(Expression::type) }
+
+    override fun createTimeSeriesIterator(): AccountingTimeSeriesIterator<*> = HashAggregateTimeSeriesIterator(
+        input = input.execute(),
+        schema = schema,
+        groupByColumns = groupByColumns,
+        newAggregatorFactory = ::newAggregatorFactory,
+        aggregatorTypes = aggregateFunctionTypes.map { it.toInt() }.toIntArray(),
+        aggregateColumns = aggregateColumns,
+        projections = projections.toTypedArray(),
+        settings = aggregationSettings
+    )
+
+    // Returns a function that creates one aggregator per aggregate function. Argument expressions are converted for
+    // every factory, because a physical expression must only be evaluated by one thread at a time.
+    private fun newAggregatorFactory(): () -> Array<Aggregator> {
+        val arguments = aggregateFunctionArguments.map { it.map(Expression::toPhysicalExpression) }
+        return {
+            Array(aggregateFunctionImplementations.size) { i ->
+                aggregateFunctionImplementations[i].newAggregator(arguments[i], aggregateFunctionArgumentTypes[i])
+            }
+        }
+    }
+
+}
+
+private class HashAggregateTimeSeriesIterator(
+    private val input: TimeSeriesIterator,
+    schema: TableSchema,
+    private val groupByColumns: IntArray,
+    private val newAggregatorFactory: () -> () -> Array<Aggregator>,
+    private val aggregatorTypes: IntArray,
+    aggregateColumns: List<Column>,
+    projections: Array<PhysicalExpression>,
+    private val settings: AggregationSettings
+) : AccountingTimeSeriesIterator<HashAggregateRowIterator>(schema) {
+
+    // Input types
+    private val inputSchema = input.schema
+    private val inputColumnTypes = inputSchema.columns.map { it.type.toInt() }.toIntArray()
+    private val startTimeColumn = inputSchema.indexOfStartTimeColumn() ?: throw IllegalArgumentException(
+        "Input to HashAggregateOperator must have _start_time column"
+    )
+    private val endTimeColumn = inputSchema.indexOfEndTimeColumn() ?: throw IllegalArgumentException(
+        "Input to HashAggregateOperator must have _end_time column"
+    )
+
+    // Rows of a time series are in the same group if all group-by columns are keys of the input
+    private val isGroupedByKeys = groupByColumns.all { inputSchema.columns[it].isKey }
+
+    // Compute and cache column counts
+    private val inputColumnCount = inputSchema.columns.size
+    private val addedColumnCount = aggregatorTypes.size
+    private val cacheColumnCount = inputColumnCount + addedColumnCount
+
+    // Cast projections to specific types
+    private val booleanProjections = Array(projections.size) { projections[it] as? BooleanPhysicalExpression }
+    private val numericProjections = Array(projections.size) { projections[it] as? NumericPhysicalExpression }
+    private val stringProjections = Array(projections.size) { projections[it] as? StringPhysicalExpression }
+
+    // Store values of first row in group and of completed aggregations for final projections
+    private val rowBooleanValues = BooleanArray(cacheColumnCount)
+    private val rowNumericValues = DoubleArray(cacheColumnCount)
+    private val rowStringValues = arrayOfNulls<String?>(cacheColumnCount)
+
+    private val aggregatedRow = object : Row {
+        override val schema = TableSchema(inputSchema.columns + aggregateColumns)
+
+        override fun getBoolean(columnIndex: Int) = rowBooleanValues[columnIndex]
+        override fun getNumeric(columnIndex: Int) = rowNumericValues[columnIndex]
+        override fun getString(columnIndex: Int) = rowStringValues[columnIndex]!!
+    }
+
+    // Create aggregators used by the thread reading the input
+    private val newAggregators = newAggregatorFactory()
+
+    // Groups of the input or of a spilled partition that are being produced, and partitions to aggregate afterwards
+    private var groups: AggregationHashTable? = null
+    private var nextGroupId = 0
+    private val spilledPartitions = ArrayDeque<SpilledPartition>()
+    private var isInputAggregated = false
+
+    // Time series of the input with rows that have not been added to a chunk yet
+    private var remainingInputRows: RowIterator? = null
+    private var isInputExhausted = false
+
+    override fun getBoolean(columnIndex: Int) = booleanProjections[columnIndex]!!.evaluateAsBoolean(aggregatedRow)
+    override fun getNumeric(columnIndex: Int) = numericProjections[columnIndex]!!.evaluateAsNumeric(aggregatedRow)
+    override fun getString(columnIndex: Int) = stringProjections[columnIndex]!!.evaluateAsString(aggregatedRow)
+
+    override fun createRowIterator() = HashAggregateRowIterator(
+        schema,
+        booleanProjections,
+        numericProjections,
+        stringProjections
+    )
+
+    override fun resetRowIteratorWithCurrentTimeSeries(rowIterator: HashAggregateRowIterator) {
+        rowIterator.reset(aggregatedRow)
+    }
+
+    override fun internalLoadNext(): Boolean {
+        while (true) {
+            // Produce the next group in memory
+            val table = groups
+            if (table != null && nextGroupId < table.groupCount) {
+                loadGroup(table, nextGroupId++)
+                return true
+            }
+            // Aggregate the input first, and then every spilled partition
+            groups = null
+            groups = when {
+                !isInputAggregated -> {
+                    isInputAggregated = true
+                    aggregateInput()
+                }
+                spilledPartitions.isNotEmpty() -> aggregatePartition(spilledPartitions.removeFirst())
+                else -> return false
+            }
+            nextGroupId = 0
+        }
+    }
+
+    override fun close() {
+        // Delete the partitions that have not been aggregated yet
+        for (partition in spilledPartitions) partition.run.delete()
+        spilledPartitions.clear()
+        groups = null
+        input.close()
+    }
+
+    private fun loadGroup(table: AggregationHashTable, groupId: Int) {
+        // Cache the values of the first row of the group
+        for (c in 0 until inputColumnCount) {
+            when (inputColumnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> rowBooleanValues[c] = table.getBoolean(c, groupId)
+                IntTypes.TYPE_NUMERIC -> rowNumericValues[c] = table.getNumeric(c, groupId)
+                IntTypes.TYPE_STRING -> rowStringValues[c] = table.getString(c, groupId)
+            }
+        }
+        // Cache the result of each aggregation
+        val aggregators = table.aggregatorsOf(groupId)
+        for (aggregatorIndex in aggregators.indices) {
+            val aggregator = aggregators[aggregatorIndex]
+            val columnIndex = aggregatorIndex + inputColumnCount
+            when (aggregatorTypes[aggregatorIndex]) {
+                IntTypes.TYPE_BOOLEAN -> rowBooleanValues[columnIndex] = aggregator.getBooleanResult()
+                IntTypes.TYPE_NUMERIC -> rowNumericValues[columnIndex] = aggregator.getNumericResult()
+                IntTypes.TYPE_STRING -> rowStringValues[columnIndex] = aggregator.getStringResult()
+            }
+        }
+    }
+
+    private fun aggregateInput(): AggregationHashTable {
+        val table = newTable(0, newAggregators)
+        val spiller = PartitionSpiller(0)
+        val chunkAggregator = ChunkAggregator(table, newAggregators, spiller)
+        // Aggregate chunks in parallel until the groups no longer fit in memory, and on this thread afterwards
+        val parallelism = settings.aggregationParallelism
+        val partialAggregations = ArrayDeque<Pair<TimeSeriesCache, ForkJoinTask<AggregationHashTable>>>()
+        var aggregateInParallel = parallelism > 1
+        // Merges the oldest partial aggregation while the groups fit in memory. Once they no longer fit, the chunk of
+        // the partial aggregation is aggregated on this thread instead, so rows of new groups are spilled.
+        fun completeOldestPartialAggregation() {
+            val (chunk, partialAggregation) = partialAggregations.removeFirst()
+            if (table.estimatedSizeBytes < settings.memoryBudgetBytes) {
+                table.mergeFrom(partialAggregation.join())
+            } else {
+                partialAggregation.cancel(false)
+                partialAggregation.quietlyJoin()
+                chunkAggregator.aggregate(chunk)
+            }
+        }
+        while (true) {
+            val chunk = readChunk() ?: break
+            // Aggregate an input that consists of a single chunk on this thread
+            if (aggregateInParallel && (partialAggregations.isNotEmpty() || !isInputExhausted)) {
+                val newPartialAggregators = newAggregatorFactory()
+                partialAggregations.addLast(chunk to settings.aggregationPool.submit(Callable {
+                    aggregatePartial(chunk, newPartialAggregators)
+                }))
+                if (partialAggregations.size < parallelism) continue
+                // Complete the oldest partial aggregation to limit the number of chunks in memory
+                completeOldestPartialAggregation()
+                if (table.estimatedSizeBytes >= settings.memoryBudgetBytes) {
+                    while (partialAggregations.isNotEmpty()) completeOldestPartialAggregation()
+                    aggregateInParallel = false
+                }
+            } else {
+                chunkAggregator.aggregate(chunk)
+            }
+        }
+        while (partialAggregations.isNotEmpty()) completeOldestPartialAggregation()
+        spilledPartitions.addAll(0, spiller.finish())
+        return table
+    }
+
+    private fun aggregatePartial(
+        chunk: TimeSeriesCache,
+        newPartialAggregators: () -> Array<Aggregator>
+    ): AggregationHashTable {
+        val table = newTable(0, newPartialAggregators)
+        ChunkAggregator(table, newPartialAggregators, null).aggregate(chunk)
+        return table
+    }
+
+    private fun aggregatePartition(partition: SpilledPartition): AggregationHashTable {
+        // Aggregate the rows of the partition with a different hash function, so they can be split further if needed
+        val table = newTable(partition.level, newAggregators)
+        val spiller = PartitionSpiller(partition.level)
+        val chunkAggregator = ChunkAggregator(table, newAggregators, spiller)
+        SortRunReader(partition.run, inputSchema, inputColumnTypes).use { reader ->
+            while (reader.next()) chunkAggregator.aggregateRow(reader)
+        }
+        spilledPartitions.addAll(0, spiller.finish())
+        return table
+    }
+
+    // Reads input rows into a new cache until it contains a chunk of rows, or returns null if the input is exhausted
+    private fun readChunk(): TimeSeriesCache? {
+        if (isInputExhausted) return null
+        val chunk = TimeSeriesCache(inputSchema)
+        val chunkSize = settings.parallelAggregationChunkSize
+        while (chunk.numCachedRows < chunkSize) {
+            // Continue with the rows of the last time series, or read the next time series
+            val rowIterator = remainingInputRows ?: if (input.loadNext()) {
+                input.currentTimeSeries.rowIterator()
+            } else {
+                isInputExhausted = true
+                break
+            }
+            chunk.addTimeSeries(input.currentTimeSeries, rowIterator, chunkSize)
+            // A time series may have rows left if the chunk is full
+            remainingInputRows = if (chunk.numCachedRows >= chunkSize) rowIterator else null
+        }
+        return if (chunk.numCachedTimeSeries > 0) chunk else null
+    }
+
+    private fun newTable(level: Int, newAggregators: () -> Array<Aggregator>) = AggregationHashTable(
+        inputSchema, groupByColumns, level, aggregatorTypes.size, newAggregators
+    )
+
+    // Aggregates rows into a table of groups. Groups are found per time series if all group-by columns are keys, and
+    // per row otherwise. If a spiller is given, rows of new groups are spilled when the table is over budget.
+    private inner class ChunkAggregator(
+        private val table: AggregationHashTable,
+        newAggregators: () -> Array<Aggregator>,
+        private val spiller: PartitionSpiller?
+    ) {
+
+        // Aggregators to aggregate the rows of one time series in batches before merging them into its group
+        private val timeSeriesAggregators = newAggregators()
+        private val batch = RowBatch(inputSchema)
+
+        fun aggregate(chunk: TimeSeriesCache) {
+            val row = chunk.createRowWrapper()
+            val rowIterator = chunk.createRowIterator()
+            for (timeSeriesId in 0 until chunk.numCachedTimeSeries) {
+                val firstRowId = chunk.firstRowIdOf(timeSeriesId)
+                val endRowId = firstRowId + chunk.rowCountOf(timeSeriesId)
+                if (!isGroupedByKeys) {
+                    for (rowId in firstRowId until endRowId) {
+                        row.rowId = rowId
+                        aggregateRow(row)
+                    }
+                    continue
+                }
+                if (firstRowId == endRowId) continue
+                // Find the group of the time series using its first row
+                row.rowId = firstRowId
+                val hash = table.hashOf(row)
+                var groupId = table.findGroup(row, hash)
+                if (groupId < 0) {
+                    if (spiller != null && spiller.shouldSpill(table)) {
+                        for (rowId in firstRowId until endRowId) {
+                            row.rowId = rowId
+                            spiller.spill(row, hash)
+                        }
+                        continue
+                    }
+                    groupId = table.addGroup(row, hash)
+                }
+                aggregateTimeSeries(rowIterator, timeSeriesId, groupId)
+            }
+        }
+
+        fun aggregateRow(row: Row) {
+            val hash = table.hashOf(row)
+            var groupId = table.findGroup(row, hash)
+            if (groupId < 0) {
+                if (spiller != null && spiller.shouldSpill(table)) {
+                    spiller.spill(row, hash)
+                    return
+                }
+                groupId = table.addGroup(row, hash)
+            }
+            for (aggregator in table.aggregatorsOf(groupId)) aggregator.addRow(row)
+            table.addTimeRange(groupId, row.getNumeric(startTimeColumn), row.getNumeric(endTimeColumn))
+        }
+
+        private fun aggregateTimeSeries(
+            rowIterator: TimeSeriesCache.CachedRowIterator,
+            timeSeriesId: Int,
+            groupId: Int
+        ) {
+            for (aggregator in timeSeriesAggregators) aggregator.reset()
+            var minStartTime = Double.POSITIVE_INFINITY
+            var maxEndTime = Double.NEGATIVE_INFINITY
+            rowIterator.reset(timeSeriesId)
+            while (rowIterator.loadNextBatch(batch)) {
+                for (aggregator in timeSeriesAggregators) aggregator.addBatch(batch)
+                // Find the minimum start and maximum end time over all rows
+                val startTimes = batch.numericColumns[startTimeColumn]
+                val endTimes = batch.numericColumns[endTimeColumn]
+                val selection = batch.selection
+                for (i in 0 until batch.selectedCount) {
+                    val index = selection[i]
+                    minStartTime = minOf(minStartTime, startTimes[index])
+                    maxEndTime = maxOf(maxEndTime, endTimes[index])
+                }
+            }
+            val groupAggregators = table.aggregatorsOf(groupId)
+            for (i in groupAggregators.indices) groupAggregators[i].merge(timeSeriesAggregators[i])
+            table.addTimeRange(groupId, minStartTime, maxEndTime)
+        }
+
+    }
+
+    // Writes rows to one of several partitions on disk, selected by bits of the hash of their group that are not used
+    // to select slots in a hash table
+    private inner class PartitionSpiller(private val level: Int) {
+
+        private val writers = arrayOfNulls<SortRunWriter>(PARTITION_COUNT)
+        private var spilledRowCount = 0L
+
+        // Rows are spilled while the table is over budget, unless partitions have been split too many times already
+        fun shouldSpill(table: AggregationHashTable): Boolean {
+            return level < MAX_SPILL_LEVEL && table.estimatedSizeBytes >= settings.memoryBudgetBytes
+        }
+
+        fun spill(row: Row, hash: Int) {
+            val partition = hash ushr (Int.SIZE_BITS - PARTITION_BITS)
+            val writer = writers[partition] ?: SortRunWriter(inputColumnTypes, settings.spillDirectory).also {
+                writers[partition] = it
+            }
+            writer.write(0, spilledRowCount++, row)
+        }
+
+        // Completes all partitions and returns them for aggregation
+        fun finish(): List<SpilledPartition> {
+            return writers.filterNotNull().map { SpilledPartition(it.finish(), level + 1) }
+        }
+
+    }
+
+    companion object {
+        private const val PARTITION_BITS = 4
+        private const val PARTITION_COUNT = 1 shl PARTITION_BITS
+        private const val MAX_SPILL_LEVEL = 4
+    }
+
+}
+
+// Rows spilled by a hash aggregation, stored in the format of sorted runs, and the number of times they were spilled
+private class SpilledPartition(val run: SortRun, val level: Int)
+
+private class HashAggregateRowIterator(
+    schema: TableSchema,
+    private val booleanProjections: Array<BooleanPhysicalExpression?>,
+    private val numericProjections: Array<NumericPhysicalExpression?>,
+    private val stringProjections: Array<StringPhysicalExpression?>
+) : AccountingRowIterator(schema) {
+
+    private lateinit var aggregatedRow: Row
+    private var isValid = true
+
+    fun reset(aggregatedRow: Row) {
+        this.aggregatedRow = aggregatedRow
+        this.isValid = true
+    }
+
+    override fun getBoolean(columnIndex: Int) = booleanProjections[columnIndex]!!.evaluateAsBoolean(aggregatedRow)
+    override fun getNumeric(columnIndex: Int) = numericProjections[columnIndex]!!.evaluateAsNumeric(aggregatedRow)
+    override fun getString(columnIndex: Int) = stringProjections[columnIndex]!!.evaluateAsString(aggregatedRow)
+
+    override fun internalLoadNext(): Boolean {
+        if (!isValid) return false
+        isValid = false
+        return true
+    }
+
+}
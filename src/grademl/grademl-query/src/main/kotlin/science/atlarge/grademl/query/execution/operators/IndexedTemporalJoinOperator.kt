@@ -0,0 +1,261 @@
+package science.atlarge.grademl.query.execution.operators
+
+import it.unimi.dsi.fastutil.ints.IntArrayList
+import science.atlarge.grademl.query.execution.*
+import science.atlarge.grademl.query.execution.IntTypes.toInt
+import science.atlarge.grademl.query.model.*
+
+// Temporal join that looks up matching time series and rows of the right input in a TemporalJoinIndex instead of
+// merging sorted inputs. The left input is read one time series at a time and does not need to be sorted. The index is
+// requested once per execution, so it can be built from the right input or reused from a cached table. Join columns
+// of the right input are part of the index, so only the left join columns are given here, and selected right columns
+// are indices in the schema of the index. The joined time series contain the same rows as those of a sort-merge join,
+// but are produced in the order of the left input, and pairs of time series that do not overlap in time are skipped
+// instead of being produced without rows. Queries that need a specific order sort the output of a join instead.
+class IndexedTemporalJoinOperator(
+    private val leftInput: QueryOperator,
+    private val rightIndex: () -> TemporalJoinIndex,
+    override val schema: TableSchema,
+    leftJoinColumns: List<Int>,
+    leftSelectedColumns: List<Column>,
+    rightSelectedColumns: List<Int>
+) : AccountingQueryOperator() {
+
+    private val leftJoinColumnIndices = leftJoinColumns.toIntArray()
+    private val leftSelectedColumnIds = leftSelectedColumns.map { column -> leftInput.schema.indexOfColumn(column)!! }
+    private val leftStartTimeColumnId = leftInput.schema.indexOfStartTimeColumn() ?: throw IllegalArgumentException(
+        "Left input to temporal join must have _start_time column"
+    )
+    private val leftEndTimeColumnId = leftInput.schema.indexOfEndTimeColumn() ?: throw IllegalArgumentException(
+        "Left input to temporal join must have _end_time column"
+    )
+    private val rightSelectedColumnIds = rightSelectedColumns.toIntArray()
+
+    init {
+        // Sanity check output schema
+        require(schema.indexOfStartTimeColumn() == 0) { "Temporal join must produce _start_time column" }
+        require(schema.indexOfEndTimeColumn() == 1) { "Temporal join must produce _end_time column" }
+        require(schema.indexOfDurationColumn() == 2) { "Temporal join must produce _duration column" }
+    }
+
+    override fun createTimeSeriesIterator(): AccountingTimeSeriesIterator<*> = IndexedTemporalJoinTimeSeriesIterator(
+        schema = schema,
+        leftInput = leftInput.execute(),
+        rightIndex = rightIndex(),
+        leftJoinColumnIndices = leftJoinColumnIndices,
+        leftColumnMap = leftSelectedColumnIds.toIntArray(),
+        leftStartColumn = leftStartTimeColumnId,
+        leftEndColumn = leftEndTimeColumnId,
+        rightColumnMap = rightSelectedColumnIds
+    )
+
+}
+
+private class IndexedTemporalJoinTimeSeriesIterator(
+    schema: TableSchema,
+    private val leftInput: TimeSeriesIterator,
+    private val rightIndex: TemporalJoinIndex,
+    private val leftJoinColumnIndices: IntArray,
+    private val leftColumnMap: IntArray,
+    private val leftStartColumn: Int,
+    private val leftEndColumn: Int,
+    private val rightColumnMap: IntArray
+) : AccountingTimeSeriesIterator<IndexedTemporalJoinRowIterator>(schema) {
+
+    private val leftColumnTypes = leftInput.schema.columns.map { it.type.toInt() }.toIntArray()
+
+    // Cache the current time series from the left input, and the right time series that overlap it
+    private val leftTimeSeriesCache = TimeSeriesCache(leftInput.schema)
+    private val leftTimeSeries = leftTimeSeriesCache.createTimeSeriesWrapper(0)
+    private val rightTimeSeries = rightIndex.cache.createTimeSeriesWrapper()
+    private val matchingRightTimeSeries = IntArrayList()
+    private var nextMatchIndex = 0
+
+    // Pre-compute column offsets for left and right input
+    private val leftColumnOffset = Columns.INDEX_NOT_RESERVED
+    private val rightColumnOffset = leftColumnOffset + leftColumnMap.size
+
+    override fun getBoolean(columnIndex: Int): Boolean {
+        return when {
+            columnIndex >= rightColumnOffset ->
+                rightTimeSeries.getBoolean(rightColumnMap[columnIndex - rightColumnOffset])
+            columnIndex >= leftColumnOffset ->
+                leftTimeSeries.getBoolean(leftColumnMap[columnIndex - leftColumnOffset])
+            else -> throw IllegalArgumentException("Column $columnIndex does not exist or is not a key column")
+        }
+    }
+
+    override fun getNumeric(columnIndex: Int): Double {
+        return when {
+            columnIndex >= rightColumnOffset ->
+                rightTimeSeries.getNumeric(rightColumnMap[columnIndex - rightColumnOffset])
+            columnIndex >= leftColumnOffset ->
+                leftTimeSeries.getNumeric(leftColumnMap[columnIndex - leftColumnOffset])
+            else -> throw IllegalArgumentException("Column $columnIndex does not exist or is not a key column")
+        }
+    }
+
+    override fun getString(columnIndex: Int): String {
+        return when {
+            columnIndex >= rightColumnOffset ->
+                rightTimeSeries.getString(rightColumnMap[columnIndex - rightColumnOffset])
+            columnIndex >= leftColumnOffset ->
+                leftTimeSeries.getString(leftColumnMap[columnIndex - leftColumnOffset])
+            else -> throw IllegalArgumentException("Column $columnIndex does not exist or is not a key column")
+        }
+    }
+
+    override fun createRowIterator() = IndexedTemporalJoinRowIterator(
+        schema = schema,
+        leftCache = leftTimeSeriesCache,
+        leftColumnMap = leftColumnMap,
+        leftStartColumn = leftStartColumn,
+        leftEndColumn = leftEndColumn,
+        leftColumnOffset = leftColumnOffset,
+        rightIndex = rightIndex,
+        rightColumnMap = rightColumnMap,
+        rightColumnOffset = rightColumnOffset
+    )
+
+    override fun resetRowIteratorWithCurrentTimeSeries(rowIterator: IndexedTemporalJoinRowIterator) {
+        rowIterator.reset(rightTimeSeries.timeSeriesId)
+    }
+
+    override fun internalLoadNext(): Boolean {
+        // Read left time series until one overlaps with any right time series
+        while (nextMatchIndex >= matchingRightTimeSeries.size) {
+            if (!loadNextLeftTimeSeries()) {
+                leftTimeSeriesCache.finalize()
+                return false
+            }
+        }
+        // Join the cached left time series with the next matching right time series
+        rightTimeSeries.timeSeriesId = matchingRightTimeSeries.getInt(nextMatchIndex++)
+        return true
+    }
+
+    private fun loadNextLeftTimeSeries(): Boolean {
+        leftTimeSeriesCache.clear()
+        matchingRightTimeSeries.clear()
+        nextMatchIndex = 0
+        if (!leftInput.loadNext()) return false
+        val timeSeries = leftInput.currentTimeSeries
+        val joinKey = TemporalJoinIndex.joinKeyOf(timeSeries, leftJoinColumnIndices, leftColumnTypes)
+        leftTimeSeriesCache.addTimeSeries(timeSeries)
+        // Find the right time series that overlap the time range covered by the left time series
+        if (!leftTimeSeriesCache.isEmpty) {
+            rightIndex.findOverlappingTimeSeries(
+                joinKey,
+                leftTimeSeriesCache.getNumeric(leftStartColumn, 0),
+                leftTimeSeriesCache.getNumeric(leftEndColumn, leftTimeSeriesCache.numCachedRows - 1),
+                matchingRightTimeSeries
+            )
+        }
+        return true
+    }
+
+    override fun close() = leftInput.close()
+
+}
+
+private class IndexedTemporalJoinRowIterator(
+    schema: TableSchema,
+    private val leftCache: TimeSeriesCache,
+    private val leftColumnMap: IntArray,
+    private val leftStartColumn: Int,
+    private val leftEndColumn: Int,
+    private val leftColumnOffset: Int,
+    private val rightIndex: TemporalJoinIndex,
+    private val rightColumnMap: IntArray,
+    private val rightColumnOffset: Int
+) : AccountingRowIterator(schema) {
+
+    private val rightCache = rightIndex.cache
+
+    private var leftRowId = -1
+    private var endLeftRowId = 0
+    private var rightRowId = -1
+    private var endRightRowId = 0
+    // Rows of the right time series that end before the start of the current left row cannot match later left rows
+    private var firstCandidateRightRowId = 0
+
+    private var leftStart: Double = 0.0
+    private var leftEnd: Double = 0.0
+    private var rightStart: Double = 0.0
+    private var rightEnd: Double = 0.0
+
+    fun reset(rightTimeSeriesId: Int) {
+        this.leftRowId = -1
+        this.endLeftRowId = leftCache.numCachedRows
+        this.rightRowId = -1
+        this.firstCandidateRightRowId = rightCache.firstRowIdOf(rightTimeSeriesId)
+        this.endRightRowId = firstCandidateRightRowId + rightCache.rowCountOf(rightTimeSeriesId)
+    }
+
+    override fun getBoolean(columnIndex: Int): Boolean {
+        return when {
+            columnIndex >= rightColumnOffset ->
+                rightCache.getBoolean(rightColumnMap[columnIndex - rightColumnOffset], rightRowId)
+            columnIndex >= leftColumnOffset ->
+                leftCache.getBoolean(leftColumnMap[columnIndex - leftColumnOffset], leftRowId)
+            else -> throw IllegalArgumentException("Column $columnIndex does not exist or is not a BOOLEAN column")
+        }
+    }
+
+    override fun getNumeric(columnIndex: Int): Double {
+        return when {
+            columnIndex == 0 -> maxOf(leftStart, rightStart)
+            columnIndex == 1 -> minOf(leftEnd, rightEnd)
+            columnIndex == 2 -> minOf(leftEnd, rightEnd) - maxOf(leftStart, rightStart)
+            columnIndex >= rightColumnOffset ->
+                rightCache.getNumeric(rightColumnMap[columnIndex - rightColumnOffset], rightRowId)
+            columnIndex >= leftColumnOffset ->
+                leftCache.getNumeric(leftColumnMap[columnIndex - leftColumnOffset], leftRowId)
+            else -> throw IllegalArgumentException("Column $columnIndex does not exist or is not a NUMERIC column")
+        }
+    }
+
+    override fun getString(columnIndex: Int): String {
+        return when {
+            columnIndex >= rightColumnOffset ->
+                rightCache.getString(rightColumnMap[columnIndex - rightColumnOffset], rightRowId)
+            columnIndex >= leftColumnOffset ->
+                leftCache.getString(leftColumnMap[columnIndex - leftColumnOffset], leftRowId)
+            else -> throw IllegalArgumentException("Column $columnIndex does not exist or is not a STRING column")
+        }
+    }
+
+    override fun internalLoadNext(): Boolean {
+        // Pair the current left row with the next right row, if it also overlaps
+        if (rightRowId >= 0 && rightRowId + 1 < endRightRowId && rightIndex.rowStartTime(rightRowId + 1) < leftEnd) {
+            setRightRow(rightRowId + 1)
+            return true
+        }
+        // Otherwise, find the next left row that overlaps any right row
+        while (leftRowId + 1 < endLeftRowId) {
+            leftRowId++
+            leftStart = leftCache.getNumeric(leftStartColumn, leftRowId)
+            leftEnd = leftCache.getNumeric(leftEndColumn, leftRowId)
+            // Right rows are sorted by time, so the first right row that ends after the left row starts is the only
+            // candidate for the first overlapping row
+            firstCandidateRightRowId = rightIndex.findFirstRowEndingAfter(
+                leftStart, firstCandidateRightRowId, endRightRowId
+            )
+            if (firstCandidateRightRowId < endRightRowId &&
+                rightIndex.rowStartTime(firstCandidateRightRowId) < leftEnd
+            ) {
+                setRightRow(firstCandidateRightRowId)
+                return true
+            }
+        }
+        rightRowId = -1
+        return false
+    }
+
+    private fun setRightRow(rowId: Int) {
+        rightRowId = rowId
+        rightStart = rightIndex.rowStartTime(rowId)
+        rightEnd = rightIndex.rowEndTime(rowId)
+    }
+
+}
@@ -46,6 +46,8 @@ private class IntervalMergingTimeSeriesIterator(
 
     override fun internalLoadNext() = input.loadNext()
 
+    override fun close() = input.close()
+
 }
 
 private class IntervalMergingRowIterator(
@@ -2,6 +2,7 @@ package science.atlarge.grademl.query.execution.operators
 
 import science.atlarge.grademl.query.execution.AccountingRowIterator
 import science.atlarge.grademl.query.execution.AccountingTimeSeriesIterator
+import science.atlarge.grademl.query.model.RowBatch
 import science.atlarge.grademl.query.model.RowIterator
 import science.atlarge.grademl.query.model.Table
 import science.atlarge.grademl.query.model.TableSchema
@@ -35,6 +36,8 @@ private class LinearTableScanTimeSeriesIterator(
 
     override fun internalLoadNext() = input.loadNext()
 
+    override fun close() = input.close()
+
 }
 
 private class LinearTableScanRowIterator(schema: TableSchema) : AccountingRowIterator(schema) {
@@ -51,4 +54,8 @@ private class LinearTableScanRowIterator(schema: TableSchema) : AccountingRowIte
 
     override fun internalLoadNext() = input.loadNext()
 
+    override fun internalLoadNextBatch(batch: RowBatch) {
+        input.loadNextBatch(batch)
+    }
+
 }
\ No newline at end of file
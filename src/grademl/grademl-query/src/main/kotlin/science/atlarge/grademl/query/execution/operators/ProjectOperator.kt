@@ -1,6 +1,7 @@
 package science.atlarge.grademl.query.execution.operators
 
 import science.atlarge.grademl.query.execution.*
+import science.atlarge.grademl.query.model.RowBatch
 import science.atlarge.grademl.query.model.RowIterator
 import science.atlarge.grademl.query.model.TableSchema
 import science.atlarge.grademl.query.model.TimeSeriesIterator
@@ -50,6 +51,8 @@ private class ProjectTimeSeriesIterator(
 
     override fun internalLoadNext() = input.loadNext()
 
+    override fun close() = input.close()
+
 }
 
 private class ProjectRowIterator(
@@ -61,6 +64,8 @@ private class ProjectRowIterator(
 
     lateinit var input: RowIterator
 
+    private var inputBatch: RowBatch? = null
+
     override fun getBoolean(columnIndex: Int) =
         booleanColumnExpressions[columnIndex]!!.evaluateAsBoolean(input.currentRow)
 
@@ -72,4 +77,20 @@ private class ProjectRowIterator(
 
     override fun internalLoadNext() = input.loadNext()
 
+    override fun internalLoadNextBatch(batch: RowBatch) {
+        var inputRows = inputBatch
+        if (inputRows == null || inputRows.capacity != batch.capacity) {
+            inputRows = RowBatch(input.schema, batch.capacity)
+            inputBatch = inputRows
+        }
+        if (!input.loadNextBatch(inputRows)) return
+        // Evaluate each column expression over the selected input rows, keeping rows at the same indices
+        for (c in booleanColumnExpressions.indices) {
+            booleanColumnExpressions[c]?.evaluateAsBoolean(inputRows, batch.booleanColumns[c])
+            numericColumnExpressions[c]?.evaluateAsNumeric(inputRows, batch.numericColumns[c])
+            stringColumnExpressions[c]?.evaluateAsString(inputRows, batch.stringColumns[c])
+        }
+        batch.setSizeAndSelection(inputRows.size, inputRows)
+    }
+
 }
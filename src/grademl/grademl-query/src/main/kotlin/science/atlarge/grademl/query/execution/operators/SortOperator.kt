@@ -2,127 +2,35 @@ package science.atlarge.grademl.query.execution.operators
 
 import science.atlarge.grademl.query.execution.*
 import science.atlarge.grademl.query.execution.IntTypes.toInt
+import science.atlarge.grademl.query.model.RowBatch
 import science.atlarge.grademl.query.model.TableSchema
+import science.atlarge.grademl.query.model.TimeSeries
 import science.atlarge.grademl.query.model.TimeSeriesIterator
 
 class SortOperator(
     private val input: QueryOperator,
     override val schema: TableSchema,
     private val preSortedColumns: List<Int>,
-    private val remainingSortColumns: List<IndexedSortColumn>
+    private val remainingSortColumns: List<IndexedSortColumn>,
+    private val sortSettings: SortSettings = SortSettings.DEFAULT
 ) : AccountingQueryOperator() {
 
     override fun createTimeSeriesIterator(): AccountingTimeSeriesIterator<*> = SortTimeSeriesIterator(
         input.execute(),
         preSortedColumns.toIntArray(),
         remainingSortColumns.map { it.columnIndex }.toIntArray(),
-        remainingSortColumns.map { it.ascending }.toBooleanArray()
+        remainingSortColumns.map { it.ascending }.toBooleanArray(),
+        sortSettings
     )
 
 }
 
-private fun sort(sortInput: SortInput): SortResult {
-    // Create a comparator for row groups
-    val rowGroupComparator = object : Comparator<Int> {
-        private val columns = sortInput.remainingSortColumns
-        private val localColumnTypes = sortInput.columnTypes
-        private val columnDirectionMultipliers = IntArray(sortInput.remainingSortColumnsAscending.size) {
-            if (sortInput.remainingSortColumnsAscending[it]) 1 else -1
-        }
-
-        private val inputCache = sortInput.inputCache
-
-        override fun compare(leftIndex: Int, rightIndex: Int): Int {
-            columns.forEachIndexed { index, columnIndex ->
-                val result = when (localColumnTypes[columnIndex]) {
-                    IntTypes.TYPE_BOOLEAN -> inputCache.getBoolean(columnIndex, leftIndex)
-                        .compareTo(inputCache.getBoolean(columnIndex, rightIndex))
-                    IntTypes.TYPE_NUMERIC -> inputCache.getNumeric(columnIndex, leftIndex)
-                        .compareTo(inputCache.getNumeric(columnIndex, rightIndex))
-                    IntTypes.TYPE_STRING -> inputCache.getString(columnIndex, leftIndex)
-                        .compareTo(inputCache.getString(columnIndex, rightIndex))
-                    else -> throw IllegalStateException()
-                }
-                if (result != 0) return result * columnDirectionMultipliers[index]
-            }
-            return 0
-        }
-    }
-    val rowComparator = Comparator<Int> { leftIndex, rightIndex ->
-        val groupComparison = rowGroupComparator.compare(leftIndex, rightIndex)
-        if (groupComparison != 0) groupComparison else leftIndex.compareTo(rightIndex)
-    }
-    // Sort the rows in the cache
-    val newRowOrder = (0 until sortInput.inputCache.numCachedRows).toMutableList()
-    newRowOrder.sortWith(rowComparator)
-    // Return the result
-    return SortResult(
-        sortInput.inputCache,
-        newRowOrder.toIntArray(),
-        areInputRowsInSameGroup = { l, r -> rowGroupComparator.compare(l, r) == 0 }
-    )
-}
-
-private class SortInput(
-    val inputCache: TimeSeriesCache,
-    val columnTypes: IntArray,
-    val remainingSortColumns: IntArray,
-    val remainingSortColumnsAscending: BooleanArray
-)
-
-private class SortResult(
-    private val inputCache: TimeSeriesCache,
-    private val reorderedInputRows: IntArray,
-    private val areInputRowsInSameGroup: (Int, Int) -> Boolean
-) {
-
-    private val timeSeriesIds = IntArray(reorderedInputRows.size)
-    private var lastComputedTimeSeriesOffset = 0
-
-    init {
-        timeSeriesIds[0] = 1
-    }
-
-    fun inputRowAt(outputRowId: Int) = reorderedInputRows[outputRowId]
-
-    fun findFirstRowOfNextTimeSeries(fromRowId: Int): Int? {
-        var currentRowId = fromRowId + 1
-        while (currentRowId < timeSeriesIds.size) {
-            if (!isRowInSameTimeSeriesAsPreviousRow(currentRowId)) return currentRowId
-            currentRowId++
-        }
-        return null
-    }
-
-    fun isRowInSameTimeSeriesAsPreviousRow(rowId: Int): Boolean {
-        require(rowId > 0 && rowId < timeSeriesIds.size)
-        // Fill the time series ID cache
-        computeTimeSeriesIdsUntil(rowId)
-        // Check the time series ID cache
-        return timeSeriesIds[rowId] == timeSeriesIds[rowId - 1]
-    }
-
-    private fun computeTimeSeriesIdsUntil(targetRowId: Int) {
-        for (currentOutRow in (lastComputedTimeSeriesOffset + 1)..targetRowId) {
-            val currentInRow = reorderedInputRows[currentOutRow]
-            val lastInRow = reorderedInputRows[currentOutRow - 1]
-            // Check if both rows are in the same input time series and in the same sorted group
-            val inSameTimeSeries =
-                (inputCache.timeSeriesIdOf(lastInRow) == inputCache.timeSeriesIdOf(currentInRow)) &&
-                        areInputRowsInSameGroup(lastInRow, currentInRow)
-            if (inSameTimeSeries) timeSeriesIds[currentOutRow] = timeSeriesIds[currentOutRow - 1]
-            else timeSeriesIds[currentOutRow] = timeSeriesIds[currentOutRow - 1] + 1
-        }
-        lastComputedTimeSeriesOffset = maxOf(lastComputedTimeSeriesOffset, targetRowId)
-    }
-
-}
-
 private class SortTimeSeriesIterator(
     private val input: TimeSeriesIterator,
     private val preSortedColumns: IntArray,
     private val remainingSortColumns: IntArray,
-    private val remainingSortColumnsAscending: BooleanArray
+    private val remainingSortColumnsAscending: BooleanArray,
+    private val sortSettings: SortSettings
 ) : AccountingTimeSeriesIterator<SortRowIterator>(input.schema) {
 
     // Store time series and rows for sorting
@@ -131,109 +39,242 @@ private class SortTimeSeriesIterator(
     // Pre-compute column types needed for sorting
     private val columnTypes = schema.columns.map { it.type.toInt() }.toIntArray()
 
-    // Track the result of the sorting operation
-    private var sortResult: SortResult? = null
-    private var firstOutRowOfTimeSeries = -1
-    private var firstInRowOfTimeSeries = -1
+    private val sorter = CachedRowSorter(
+        columnTypes, remainingSortColumns, remainingSortColumnsAscending, sortSettings.parallelSortThreshold
+    )
+
+    // Limit the number of rows buffered in memory based on the estimated size of a row: the values of non-key columns,
+    // its time series ID, its position in the sorted order and merge buffer, and a key per sort column
+    private val maxRowsInMemory = run {
+        val valueBytesPerRow = schema.columns.indices.filter { !schema.columns[it].isKey }.sumOf { c ->
+            if (columnTypes[c] == IntTypes.TYPE_BOOLEAN) 1L else 8L
+        }
+        val bytesPerRow = valueBytesPerRow + 12L + 8L * remainingSortColumns.size
+        (sortSettings.memoryBudgetBytes / bytesPerRow).coerceIn(MIN_ROWS_PER_RUN, MAX_ROWS_PER_RUN).toInt()
+    }
+
+    // Values of pre-sorted columns shared by the current group of input time series
+    private val groupBooleanValues = BooleanArray(columnTypes.size)
+    private val groupNumericValues = DoubleArray(columnTypes.size)
+    private val groupStringValues = arrayOfNulls<String>(columnTypes.size)
+
+    // Sorted rows of the current group if the group fits in memory, or a merge of sorted runs otherwise. Merged rows
+    // are read into a separate cache one output time series at a time.
+    private var sortedRows: SortedRows? = null
+    private var runMerger: SortRunMerger? = null
+    private val mergedTimeSeriesCache = TimeSeriesCache(schema)
+    private var identityRowOrder = IntArray(0)
+
+    // Track the current output time series as a range of positions in the row order of a cache
+    private var outputCache = inputCache
+    private var outputRowOrder = IntArray(0)
+    private var firstOutRowOfTimeSeries = 0
+    private var endOutRowOfTimeSeries = 0
 
-    override fun getBoolean(columnIndex: Int) = inputCache.getBoolean(columnIndex, firstInRowOfTimeSeries)
-    override fun getNumeric(columnIndex: Int) = inputCache.getNumeric(columnIndex, firstInRowOfTimeSeries)
-    override fun getString(columnIndex: Int) = inputCache.getString(columnIndex, firstInRowOfTimeSeries)
+    private val firstInRowOfTimeSeries: Int
+        get() = outputRowOrder[firstOutRowOfTimeSeries]
 
-    override fun createRowIterator() = SortRowIterator(schema, inputCache)
+    override fun getBoolean(columnIndex: Int) = outputCache.getBoolean(columnIndex, firstInRowOfTimeSeries)
+    override fun getNumeric(columnIndex: Int) = outputCache.getNumeric(columnIndex, firstInRowOfTimeSeries)
+    override fun getString(columnIndex: Int) = outputCache.getString(columnIndex, firstInRowOfTimeSeries)
+
+    override fun createRowIterator() = SortRowIterator(schema)
 
     override fun resetRowIteratorWithCurrentTimeSeries(rowIterator: SortRowIterator) {
-        rowIterator.reset(sortResult!!, firstOutRowOfTimeSeries)
+        rowIterator.reset(outputCache, outputRowOrder, firstOutRowOfTimeSeries, endOutRowOfTimeSeries)
     }
 
     override fun internalLoadNext(): Boolean {
-        // Check if there are rows in the cache to create a new time series from
-        if (sortResult != null) {
-            val firstRow = sortResult!!.findFirstRowOfNextTimeSeries(firstOutRowOfTimeSeries)
-            if (firstRow != null) {
-                firstOutRowOfTimeSeries = firstRow
-                firstInRowOfTimeSeries = sortResult!!.inputRowAt(firstOutRowOfTimeSeries)
-                return true
+        while (true) {
+            // Check if the current group has more time series
+            if (loadNextSortedTimeSeries() || loadNextMergedTimeSeries()) return true
+            // If not, sort the next group of input time series
+            if (!sortNextGroup()) {
+                // Clean up the caches if there are no more time series to process
+                inputCache.finalize()
+                mergedTimeSeriesCache.finalize()
+                return false
             }
         }
+    }
+
+    override fun close() {
+        // Delete the runs of a group that has not been read completely
+        runMerger?.close()
+        runMerger = null
+        input.close()
+    }
+
+    private fun loadNextSortedTimeSeries(): Boolean {
+        val rows = sortedRows ?: return false
+        if (endOutRowOfTimeSeries >= rows.rowCount) {
+            sortedRows = null
+            return false
+        }
+        // Find the range of rows in the next time series
+        firstOutRowOfTimeSeries = endOutRowOfTimeSeries
+        endOutRowOfTimeSeries++
+        while (endOutRowOfTimeSeries < rows.rowCount && rows.isInSameTimeSeriesAsPreviousRow(endOutRowOfTimeSeries)) {
+            endOutRowOfTimeSeries++
+        }
+        outputCache = inputCache
+        outputRowOrder = rows.rowOrder
+        return true
+    }
+
+    private fun loadNextMergedTimeSeries(): Boolean {
+        val merger = runMerger ?: return false
+        if (!merger.hasRow) {
+            merger.close()
+            runMerger = null
+            return false
+        }
+        // Read the rows of the next time series from the merged runs
+        mergedTimeSeriesCache.clear()
+        mergedTimeSeriesCache.addTimeSeries(merger.currentTimeSeries)
+        val rowCount = mergedTimeSeriesCache.numCachedRows
+        if (identityRowOrder.size < rowCount) {
+            identityRowOrder = IntArray(maxOf(rowCount, identityRowOrder.size * 2)) { it }
+        }
+        outputCache = mergedTimeSeriesCache
+        outputRowOrder = identityRowOrder
+        firstOutRowOfTimeSeries = 0
+        endOutRowOfTimeSeries = rowCount
+        return true
+    }
+
+    private fun sortNextGroup(): Boolean {
         // Reset the row cache
         inputCache.clear()
         // Check if there are more time series to process
-        if (!input.loadNext()) {
-            // If not, clean up the cache and return
-            inputCache.finalize()
-            return false
-        } else {
-            input.pushBack()
-        }
-        // Add the next group of time series to the cache
-        TimeSeriesCacheUtil.addTimeSeriesGroupToCache(input, inputCache) { left, right ->
-            preSortedColumns.all { c ->
-                when (columnTypes[c]) {
-                    IntTypes.TYPE_BOOLEAN -> left.getBoolean(c) == right.getBoolean(c)
-                    IntTypes.TYPE_NUMERIC -> left.getNumeric(c) == right.getNumeric(c)
-                    IntTypes.TYPE_STRING -> left.getString(c) == right.getString(c)
-                    else -> throw IllegalArgumentException("Sort does not support type: ${schema.columns[c].type}")
-                }
+        if (!input.loadNext()) return false
+        setGroup(input.currentTimeSeries)
+        // Add the next group of time series to the cache, spilling sorted runs to disk when the cache is full
+        val runs = mutableListOf<SortRun>()
+        var firstTimeSeriesOrdinalInCache = 0
+        var firstRowOrdinalInCache = 0L
+        do {
+            val timeSeries = input.currentTimeSeries
+            if (!isInGroup(timeSeries)) {
+                input.pushBack()
+                break
             }
+            val rowIterator = timeSeries.rowIterator()
+            while (true) {
+                inputCache.addTimeSeries(timeSeries, rowIterator, maxRowsInMemory)
+                if (inputCache.numCachedRows < maxRowsInMemory) break
+                runs.add(spillSortedRun(firstTimeSeriesOrdinalInCache, firstRowOrdinalInCache))
+                // Continue with the remaining rows of the last time series, which keeps its ordinal
+                firstTimeSeriesOrdinalInCache += inputCache.numCachedTimeSeries - 1
+                firstRowOrdinalInCache += inputCache.numCachedRows
+                inputCache.clear()
+            }
+        } while (input.loadNext())
+
+        if (runs.isEmpty()) {
+            // Sort the rows in the cache
+            sortedRows = sorter.sort(inputCache)
+        } else {
+            // Spill the remaining rows and merge all runs
+            if (!inputCache.isEmpty) runs.add(spillSortedRun(firstTimeSeriesOrdinalInCache, firstRowOrdinalInCache))
+            inputCache.clear()
+            runMerger = createRunMerger(runs)
         }
-        // Sort the rows in the cache
-        val sortInput = SortInput(inputCache, columnTypes, remainingSortColumns, remainingSortColumnsAscending)
-        sortResult = sort(sortInput)
-        // Return the first time series in the sorted result
         firstOutRowOfTimeSeries = 0
-        firstInRowOfTimeSeries = sortResult!!.inputRowAt(firstOutRowOfTimeSeries)
+        endOutRowOfTimeSeries = 0
         return true
     }
 
+    private fun spillSortedRun(firstTimeSeriesOrdinal: Int, firstRowOrdinal: Long): SortRun {
+        val rows = sorter.sort(inputCache)
+        val row = inputCache.createRowWrapper()
+        SortRunWriter(columnTypes, sortSettings.spillDirectory).use { writer ->
+            for (rowId in rows.rowOrder) {
+                row.rowId = rowId
+                writer.write(firstTimeSeriesOrdinal + inputCache.timeSeriesIdOf(rowId), firstRowOrdinal + rowId, row)
+            }
+            return writer.finish()
+        }
+    }
+
+    private fun createRunMerger(runs: List<SortRun>): SortRunMerger {
+        // Limit the number of runs read at once by merging runs into larger runs first
+        val remainingRuns = ArrayDeque(runs)
+        while (remainingRuns.size > MAX_MERGED_RUNS) {
+            val runsToMerge = List(MAX_MERGED_RUNS) { remainingRuns.removeFirst() }
+            val merger = newRunMerger(runsToMerge)
+            remainingRuns.addLast(merger.mergeInto(SortRunWriter(columnTypes, sortSettings.spillDirectory)))
+        }
+        return newRunMerger(remainingRuns.toList())
+    }
+
+    private fun newRunMerger(runs: List<SortRun>) = SortRunMerger(
+        runs, schema, columnTypes, remainingSortColumns, remainingSortColumnsAscending
+    )
+
+    private fun setGroup(timeSeries: TimeSeries) {
+        for (c in preSortedColumns) {
+            when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> groupBooleanValues[c] = timeSeries.getBoolean(c)
+                IntTypes.TYPE_NUMERIC -> groupNumericValues[c] = timeSeries.getNumeric(c)
+                IntTypes.TYPE_STRING -> groupStringValues[c] = timeSeries.getString(c)
+            }
+        }
+    }
+
+    private fun isInGroup(timeSeries: TimeSeries): Boolean {
+        return preSortedColumns.all { c ->
+            when (columnTypes[c]) {
+                IntTypes.TYPE_BOOLEAN -> groupBooleanValues[c] == timeSeries.getBoolean(c)
+                IntTypes.TYPE_NUMERIC -> groupNumericValues[c] == timeSeries.getNumeric(c)
+                IntTypes.TYPE_STRING -> groupStringValues[c] == timeSeries.getString(c)
+                else -> throw IllegalArgumentException("Sort does not support type: ${schema.columns[c].type}")
+            }
+        }
+    }
+
+    companion object {
+        private const val MIN_ROWS_PER_RUN = 16L
+        private const val MAX_ROWS_PER_RUN = 1L shl 28
+        private const val MAX_MERGED_RUNS = 64
+    }
+
 }
 
 private class SortRowIterator(
-    schema: TableSchema,
-    private val inputCache: TimeSeriesCache
+    schema: TableSchema
 ) : AccountingRowIterator(schema) {
 
-    private lateinit var sortResult: SortResult
-    private var firstOutRowId = -1
-    private var isFirst = false
-    private var isValid = false
-    private var currentOutRowId = -1
+    private var cache: TimeSeriesCache? = null
+    private var rowOrder = IntArray(0)
+    private var nextOutRowId = 0
+    private var endOutRowId = 0
     private var currentInRowId = -1
 
-    fun reset(sortResult: SortResult, firstOutRowId: Int) {
-        this.sortResult = sortResult
-        this.firstOutRowId = firstOutRowId
-        this.isFirst = true
-        this.isValid = true
+    fun reset(cache: TimeSeriesCache, rowOrder: IntArray, firstOutRowId: Int, endOutRowId: Int) {
+        this.cache = cache
+        this.rowOrder = rowOrder
+        this.nextOutRowId = firstOutRowId
+        this.endOutRowId = endOutRowId
+        this.currentInRowId = -1
     }
 
-    override fun getBoolean(columnIndex: Int) = inputCache.getBoolean(columnIndex, currentInRowId)
-    override fun getNumeric(columnIndex: Int) = inputCache.getNumeric(columnIndex, currentInRowId)
-    override fun getString(columnIndex: Int) = inputCache.getString(columnIndex, currentInRowId)
+    override fun getBoolean(columnIndex: Int) = cache!!.getBoolean(columnIndex, currentInRowId)
+    override fun getNumeric(columnIndex: Int) = cache!!.getNumeric(columnIndex, currentInRowId)
+    override fun getString(columnIndex: Int) = cache!!.getString(columnIndex, currentInRowId)
 
     override fun internalLoadNext(): Boolean {
-        if (!isValid) return false
-        // The first row is always valid
-        if (isFirst) {
-            currentOutRowId = firstOutRowId
-            currentInRowId = sortResult.inputRowAt(currentOutRowId)
-            isFirst = false
-            return true
-        }
-        // Check if there is a next row
-        if (currentOutRowId + 1 >= inputCache.numCachedRows) {
-            isValid = false
-            return false
-        }
-        // Check if the next row is in the same time series
-        currentOutRowId++
-        if (!sortResult.isRowInSameTimeSeriesAsPreviousRow(currentOutRowId)) {
-            isValid = false
-            return false
-        }
-        // Return the next row
-        currentInRowId = sortResult.inputRowAt(currentOutRowId)
+        if (nextOutRowId >= endOutRowId) return false
+        currentInRowId = rowOrder[nextOutRowId++]
         return true
     }
 
-}
\ No newline at end of file
+    override fun internalLoadNextBatch(batch: RowBatch) {
+        val rowCount = minOf(endOutRowId - nextOutRowId, batch.capacity)
+        if (rowCount <= 0) return
+        cache!!.copyRowsToBatch(rowOrder, nextOutRowId, rowCount, batch)
+        nextOutRowId += rowCount
+        currentInRowId = rowOrder[nextOutRowId - 1]
+    }
+
+}
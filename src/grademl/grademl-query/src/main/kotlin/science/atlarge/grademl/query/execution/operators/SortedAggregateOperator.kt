@@ -77,6 +77,9 @@ private class SortedAggregateTimeSeriesIterator(
     private val rowNumericValues = DoubleArray(cacheColumnCount)
     private val rowStringValues = arrayOfNulls<String?>(cacheColumnCount)
 
+    // Batch of input rows to aggregate
+    private val inputBatch = RowBatch(input.schema)
+
     private val aggregatedRow = object : Row {
         override val schema = TableSchema(input.schema.columns + aggregateColumns)
 
@@ -151,19 +154,27 @@ private class SortedAggregateTimeSeriesIterator(
     private fun aggregateRowsInTimeSeries(peekedRowIterator: RowIterator?) {
         // Iterate over rows in time series
         val rows = peekedRowIterator ?: input.currentTimeSeries.rowIterator()
-        var inputRowValid = peekedRowIterator != null
         var minStartTime = rowNumericValues[startTimeColumn]
         var maxEndTime = rowNumericValues[endTimeColumn]
-        while (inputRowValid || rows.loadNext()) {
+        if (peekedRowIterator != null) {
+            // Add the first row of the group, which has already been loaded, to each aggregator
             val row = rows.currentRow
-            inputRowValid = false
-            // Add the next row to each aggregator
             for (a in aggregators) a.addRow(row)
+            minStartTime = minOf(minStartTime, row.getNumeric(startTimeColumn))
+            maxEndTime = maxOf(maxEndTime, row.getNumeric(endTimeColumn))
+        }
+        // Add the remaining rows to each aggregator in batches
+        while (rows.loadNextBatch(inputBatch)) {
+            for (a in aggregators) a.addBatch(inputBatch)
             // Find the minimum start and maximum end time over all rows
-            val startTime = row.getNumeric(startTimeColumn)
-            val endTime = row.getNumeric(endTimeColumn)
-            minStartTime = minOf(minStartTime, startTime)
-            maxEndTime = maxOf(maxEndTime, endTime)
+            val startTimes = inputBatch.numericColumns[startTimeColumn]
+            val endTimes = inputBatch.numericColumns[endTimeColumn]
+            val selection = inputBatch.selection
+            for (i in 0 until inputBatch.selectedCount) {
+                val index = selection[i]
+                minStartTime = minOf(minStartTime, startTimes[index])
+                maxEndTime = maxOf(maxEndTime, endTimes[index])
+            }
         }
         // Update the cached minimum start and maximum end time columns
         rowNumericValues[startTimeColumn] = minStartTime
@@ -184,6 +195,8 @@ private class SortedAggregateTimeSeriesIterator(
         return true
     }
 
+    override fun close() = input.close()
+
 }
 
 private class SortedAggregateRowIterator(
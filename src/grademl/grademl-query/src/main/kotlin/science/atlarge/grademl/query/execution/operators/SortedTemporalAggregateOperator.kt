@@ -221,6 +221,8 @@ private class TemporalGroupingComputation(
         if (!changePointQueue.isEmpty) nextChangePoint[changePointQueue.firstInt()]
         else Double.POSITIVE_INFINITY
 
+    override fun close() = input.close()
+
 }
 
 private class SortedTemporalAggregateRowIterator(
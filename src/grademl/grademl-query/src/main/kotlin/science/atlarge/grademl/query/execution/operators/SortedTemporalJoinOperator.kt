@@ -288,6 +288,11 @@ private class TemporalJoinTimeSeriesIterator(
         }
     }
 
+    override fun close() {
+        leftInput.close()
+        rightInput.close()
+    }
+
 }
 
 private class SortedTemporalJoinRowIterator(
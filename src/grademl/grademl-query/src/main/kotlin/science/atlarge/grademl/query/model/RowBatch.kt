@@ -0,0 +1,155 @@
+package science.atlarge.grademl.query.model
+
+import science.atlarge.grademl.query.language.Type
+
+/**
+ * Fixed-size batch of rows stored column by column, used to exchange rows between operators without per-row virtual
+ * calls. Only the array matching a column's type is allocated. Rows with indices in [0, [size]) are loaded, and the
+ * selection vector lists (in increasing order) the indices of rows that are part of the batch, e.g., after filtering.
+ * Expressions evaluated over a batch only read and write the selected rows.
+ */
+class RowBatch(val schema: TableSchema, val capacity: Int = DEFAULT_CAPACITY) {
+
+    val booleanColumns = Array(schema.columns.size) { c ->
+        if (schema.columns[c].type == Type.BOOLEAN) BooleanArray(capacity) else EMPTY_BOOLEAN_ARRAY
+    }
+    val numericColumns = Array(schema.columns.size) { c ->
+        if (schema.columns[c].type == Type.NUMERIC) DoubleArray(capacity) else EMPTY_DOUBLE_ARRAY
+    }
+    val stringColumns = Array(schema.columns.size) { c ->
+        if (schema.columns[c].type == Type.STRING) arrayOfNulls<String>(capacity) else EMPTY_STRING_ARRAY
+    }
+
+    var size = 0
+        private set
+    val selection = IntArray(capacity)
+    var selectedCount = 0
+        private set
+
+    val isFull: Boolean
+        get() = size == capacity
+
+    private val columnTypes = schema.columns.map { it.type }.toTypedArray()
+
+    fun clear() {
+        size = 0
+        selectedCount = 0
+    }
+
+    /**
+     * Marks the first [rowCount] rows as loaded and selects all of them, after their values have been written
+     * directly to the column arrays.
+     */
+    fun setSizeAndSelectAll(rowCount: Int) {
+        require(rowCount in 0..capacity) { "Batch size must be between 0 and the capacity of the batch" }
+        size = rowCount
+        for (i in 0 until rowCount) selection[i] = i
+        selectedCount = rowCount
+    }
+
+    /**
+     * Marks the first [rowCount] rows as loaded and selects the same rows as [other], e.g., after computing this
+     * batch's columns from the rows of [other].
+     */
+    fun setSizeAndSelection(rowCount: Int, other: RowBatch) {
+        require(rowCount in 0..capacity) { "Batch size must be between 0 and the capacity of the batch" }
+        size = rowCount
+        other.selection.copyInto(selection, 0, 0, other.selectedCount)
+        selectedCount = other.selectedCount
+    }
+
+    /** Copies the values of [row] into the next row of the batch and selects it. */
+    fun appendRow(row: Row) {
+        check(!isFull) { "Cannot append a row to a full batch" }
+        val index = size++
+        for (c in columnTypes.indices) {
+            when (columnTypes[c]) {
+                Type.BOOLEAN -> booleanColumns[c][index] = row.getBoolean(c)
+                Type.NUMERIC -> numericColumns[c][index] = row.getNumeric(c)
+                Type.STRING -> stringColumns[c][index] = row.getString(c)
+                Type.UNDEFINED -> {}
+            }
+        }
+        selection[selectedCount++] = index
+    }
+
+    /** Deselects every selected row for which [mask] is false. */
+    fun retainSelected(mask: BooleanArray) {
+        var retained = 0
+        for (i in 0 until selectedCount) {
+            val index = selection[i]
+            if (mask[index]) selection[retained++] = index
+        }
+        selectedCount = retained
+    }
+
+    /**
+     * Deselects every selected row for which [mask] differs from [keepIf], after saving the current selection to
+     * [savedSelection]. Returns the number of saved rows, to pass to [restoreSelection].
+     */
+    fun narrowSelection(mask: BooleanArray, keepIf: Boolean, savedSelection: IntArray): Int {
+        val savedCount = selectedCount
+        selection.copyInto(savedSelection, 0, 0, savedCount)
+        var retained = 0
+        for (i in 0 until savedCount) {
+            val index = savedSelection[i]
+            if (mask[index] == keepIf) selection[retained++] = index
+        }
+        selectedCount = retained
+        return savedCount
+    }
+
+    fun restoreSelection(savedSelection: IntArray, savedCount: Int) {
+        savedSelection.copyInto(selection, 0, 0, savedCount)
+        selectedCount = savedCount
+    }
+
+    // Helpers for evaluating expressions over the selected rows of a batch
+
+    fun fill(output: BooleanArray, value: Boolean) {
+        for (i in 0 until selectedCount) output[selection[i]] = value
+    }
+
+    fun fill(output: DoubleArray, value: Double) {
+        for (i in 0 until selectedCount) output[selection[i]] = value
+    }
+
+    fun fill(output: Array<String?>, value: String) {
+        for (i in 0 until selectedCount) output[selection[i]] = value
+    }
+
+    fun copySelected(source: BooleanArray, output: BooleanArray) {
+        for (i in 0 until selectedCount) selection[i].let { output[it] = source[it] }
+    }
+
+    fun copySelected(source: DoubleArray, output: DoubleArray) {
+        for (i in 0 until selectedCount) selection[i].let { output[it] = source[it] }
+    }
+
+    fun copySelected(source: Array<String?>, output: Array<String?>) {
+        for (i in 0 until selectedCount) selection[i].let { output[it] = source[it] }
+    }
+
+    /** Creates a [Row] view of a row in this batch, which can be moved to other rows by setting its index. */
+    fun rowView(): RowView = RowView()
+
+    inner class RowView : Row {
+        var index = 0
+
+        override val schema: TableSchema
+            get() = this@RowBatch.schema
+
+        override fun getBoolean(columnIndex: Int) = booleanColumns[columnIndex][index]
+        override fun getNumeric(columnIndex: Int) = numericColumns[columnIndex][index]
+        override fun getString(columnIndex: Int) = stringColumns[columnIndex][index]!!
+    }
+
+    companion object {
+        const val DEFAULT_CAPACITY = 1024
+
+        private val EMPTY_BOOLEAN_ARRAY = BooleanArray(0)
+        private val EMPTY_DOUBLE_ARRAY = DoubleArray(0)
+        private val EMPTY_STRING_ARRAY = arrayOfNulls<String>(0)
+    }
+
+}
@@ -22,4 +22,19 @@ interface RowIterator {
      */
     fun pushBack(): Boolean
 
+    /**
+     * Reads the next rows into [batch], replacing its contents. Returns true iff at least one selected row is loaded.
+     * A batch starts at the row following the last row read through [loadNext], or at a pushed back row. After
+     * calling [loadNextBatch], accessing [currentRow] or calling [pushBack] before the next call to [loadNext] is
+     * undefined behavior.
+     *
+     * The default implementation copies rows one at a time; iterators that can produce rows column by column, or that
+     * can evaluate their operation over a whole batch, should override it.
+     */
+    fun loadNextBatch(batch: RowBatch): Boolean {
+        batch.clear()
+        while (!batch.isFull && loadNext()) batch.appendRow(currentRow)
+        return batch.selectedCount > 0
+    }
+
 }
\ No newline at end of file
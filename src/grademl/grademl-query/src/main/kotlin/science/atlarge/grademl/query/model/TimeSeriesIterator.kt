@@ -1,6 +1,8 @@
 package science.atlarge.grademl.query.model
 
-interface TimeSeriesIterator {
+import java.io.Closeable
+
+interface TimeSeriesIterator : Closeable {
 
     val schema: TableSchema
 
@@ -23,4 +25,10 @@ interface TimeSeriesIterator {
      */
     fun pushBack(): Boolean
 
+    /**
+     * Releases the resources held by this iterator and its inputs, e.g., rows spilled to disk. Must be called if the
+     * iterator is not read to completion (e.g., because of a LIMIT), and has no effect otherwise.
+     */
+    override fun close() {}
+
 }
\ No newline at end of file
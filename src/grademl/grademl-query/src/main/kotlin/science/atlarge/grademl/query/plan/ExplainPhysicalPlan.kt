@@ -66,6 +66,95 @@ object ExplainPhysicalPlan {
             recurse(filterPlan.input, true)
         }
 
+        override fun visit(hashAggregatePlan: HashAggregatePlan) {
+            // Append one line with top-level description
+            stringBuilder.indentSummary()
+                .append("HashAggregate[")
+                .append(hashAggregatePlan.nodeId)
+                .append("] - ")
+            var isFirst = true
+            if (hashAggregatePlan.groupByColumns.isNotEmpty()) {
+                stringBuilder.append("Group by: [")
+                for (g in hashAggregatePlan.groupByColumns) {
+                    if (!isFirst) stringBuilder.append(", ")
+                    stringBuilder.append(g)
+                        .append('#')
+                        .append(hashAggregatePlan.input.schema.indexOfColumn(g)!!)
+                    isFirst = false
+                }
+                stringBuilder.append("] - ")
+            }
+            stringBuilder.append("Columns: [")
+            isFirst = true
+            for (c in hashAggregatePlan.schema.columns.withIndex()) {
+                if (!isFirst) stringBuilder.append(", ")
+                stringBuilder.append(c.value.identifier)
+                    .append('#')
+                    .append(c.index)
+                isFirst = false
+            }
+            stringBuilder.append(']')
+                .appendLine()
+            // Append one line per projection expression
+            for (i in hashAggregatePlan.schema.columns.indices) {
+                val columnName = hashAggregatePlan.schema.columns[i].identifier
+                val columnExpr = hashAggregatePlan.columnExpressions[i]
+                // Skip trivial column expressions
+                val isTrivial = columnExpr is ColumnLiteral && columnExpr.columnPath == columnName &&
+                        columnExpr.columnIndex == i
+                if (isTrivial) continue
+                stringBuilder.indentDetail(true)
+                    .append("Column ")
+                    .append(columnName)
+                    .append('#')
+                    .append(i)
+                    .append(" = ")
+                    .append(columnExpr.prettyPrintWithFormat())
+                    .appendLine()
+            }
+            // Explain input node
+            recurse(hashAggregatePlan.input, true)
+        }
+
+        override fun visit(indexedTemporalJoinPlan: IndexedTemporalJoinPlan) {
+            // Append one line with top-level description
+            stringBuilder.indentSummary()
+                .append("IndexedTemporalJoin[")
+                .append(indexedTemporalJoinPlan.nodeId)
+                .append("] - Columns: [")
+            var isFirst = true
+            for (c in indexedTemporalJoinPlan.schema.columns.withIndex()) {
+                if (!isFirst) stringBuilder.append(", ")
+                stringBuilder.append(c.value.identifier)
+                    .append('#')
+                    .append(c.index)
+                isFirst = false
+            }
+            stringBuilder.append(']')
+                .appendLine()
+            // Append one line per join condition
+            isFirst = true
+            for (j in indexedTemporalJoinPlan.leftJoinColumns.indices) {
+                stringBuilder.indentDetail(true)
+                if (isFirst) stringBuilder.append("On: ")
+                else stringBuilder.append("    ")
+                stringBuilder.append(indexedTemporalJoinPlan.leftJoinColumns[j].column.prettyPrintWithFormat())
+                    .append(" = ")
+                    .append(indexedTemporalJoinPlan.rightJoinColumns[j].column.prettyPrintWithFormat())
+                    .appendLine()
+                isFirst = false
+            }
+            // Append one line if the index of a cached table is reused
+            if (indexedTemporalJoinPlan.cachedRightTable != null) {
+                stringBuilder.indentDetail(true)
+                    .append("Index: cached with right input table")
+                    .appendLine()
+            }
+            // Explain input nodes
+            recurse(indexedTemporalJoinPlan.rightInput, false)
+            recurse(indexedTemporalJoinPlan.leftInput, true)
+        }
+
         override fun visit(intervalMergingPlan: IntervalMergingPlan) {
             // Append one line with top-level description
             stringBuilder.indentSummary()
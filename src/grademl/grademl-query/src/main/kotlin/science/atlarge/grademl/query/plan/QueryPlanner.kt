@@ -256,11 +256,20 @@ object QueryPlanner {
         InsertIntervalMergingOptimization
     )
 
+    // Strategies applied once after the default strategies, to select operators that other strategies do not rewrite
+    private val finalOptimizationStrategies = listOf(
+        // Replace aggregations over sorted inputs by hash aggregations where the input is not sorted yet
+        SelectAggregateStrategyOptimization,
+        // Replace sort-merge joins by index joins where an index join is estimated to be cheaper
+        SelectJoinStrategyOptimization
+    )
+
     private const val MAX_OPTIMIZATION_ITERATIONS = 100
 
     fun optimizePhysicalPlan(
         physicalQueryPlan: PhysicalQueryPlan,
-        optimizationStrategies: List<OptimizationStrategy> = defaultOptimizationStrategies
+        optimizationStrategies: List<OptimizationStrategy> = defaultOptimizationStrategies,
+        finalStrategies: List<OptimizationStrategy> = finalOptimizationStrategies
     ): PhysicalQueryPlan {
         var optimizedPlan = physicalQueryPlan
         var previousOptimizedPlan: PhysicalQueryPlan
@@ -271,8 +280,12 @@ object QueryPlanner {
                 optimizedPlan = s.optimizeOrReturn(optimizedPlan)
             }
             iterationsCompleted++
-            if (iterationsCompleted == MAX_OPTIMIZATION_ITERATIONS) return optimizedPlan
-        } while (!optimizedPlan.isEquivalent(previousOptimizedPlan))
+        } while (
+            iterationsCompleted < MAX_OPTIMIZATION_ITERATIONS && !optimizedPlan.isEquivalent(previousOptimizedPlan)
+        )
+        for (s in finalStrategies) {
+            optimizedPlan = s.optimizeOrReturn(optimizedPlan)
+        }
         return optimizedPlan
     }
 
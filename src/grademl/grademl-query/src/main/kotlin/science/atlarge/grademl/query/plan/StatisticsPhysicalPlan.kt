@@ -95,6 +95,64 @@ object StatisticsPhysicalPlan {
             recurse(filterPlan.input, true)
         }
 
+        override fun visit(hashAggregatePlan: HashAggregatePlan) {
+            // Append one line with top-level description
+            stringBuilder.indentSummary()
+                .append("HashAggregate[")
+                .append(hashAggregatePlan.nodeId)
+                .append("] - ")
+            var isFirst = true
+            if (hashAggregatePlan.groupByColumns.isNotEmpty()) {
+                stringBuilder.append("Group by: [")
+                for (g in hashAggregatePlan.groupByColumns) {
+                    if (!isFirst) stringBuilder.append(", ")
+                    stringBuilder.append(g)
+                        .append('#')
+                        .append(hashAggregatePlan.input.schema.indexOfColumn(g)!!)
+                    isFirst = false
+                }
+                stringBuilder.append("] - ")
+            }
+            stringBuilder.append("Columns: [")
+            isFirst = true
+            for (c in hashAggregatePlan.schema.columns.withIndex()) {
+                if (!isFirst) stringBuilder.append(", ")
+                stringBuilder.append(c.value.identifier)
+                    .append('#')
+                    .append(c.index)
+                isFirst = false
+            }
+            stringBuilder.append(']')
+                .appendLine()
+            // Append lines with execution statistics
+            appendStatistics(hashAggregatePlan.collectLastExecutionStatisticsPerOperator(), true)
+            // Explain input node
+            recurse(hashAggregatePlan.input, true)
+        }
+
+        override fun visit(indexedTemporalJoinPlan: IndexedTemporalJoinPlan) {
+            // Append one line with top-level description
+            stringBuilder.indentSummary()
+                .append("IndexedTemporalJoin[")
+                .append(indexedTemporalJoinPlan.nodeId)
+                .append("] - Columns: [")
+            var isFirst = true
+            for (c in indexedTemporalJoinPlan.schema.columns.withIndex()) {
+                if (!isFirst) stringBuilder.append(", ")
+                stringBuilder.append(c.value.identifier)
+                    .append('#')
+                    .append(c.index)
+                isFirst = false
+            }
+            stringBuilder.append(']')
+                .appendLine()
+            // Append lines with execution statistics
+            appendStatistics(indexedTemporalJoinPlan.collectLastExecutionStatisticsPerOperator(), true)
+            // Explain input nodes
+            recurse(indexedTemporalJoinPlan.rightInput, false)
+            recurse(indexedTemporalJoinPlan.leftInput, true)
+        }
+
         override fun visit(intervalMergingPlan: IntervalMergingPlan) {
             // Append one line with top-level description
             stringBuilder.indentSummary()
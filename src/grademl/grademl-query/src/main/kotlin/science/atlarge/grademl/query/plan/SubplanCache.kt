@@ -0,0 +1,203 @@
+package science.atlarge.grademl.query.plan
+
+import science.atlarge.grademl.core.util.MemoryBudget
+import science.atlarge.grademl.query.execution.ConcreteTable
+import science.atlarge.grademl.query.model.Table
+import science.atlarge.grademl.query.plan.physical.*
+
+// Cache of the results of subplans that are executed repeatedly, e.g., joins of phases and metrics that are derived
+// again by every query over the same virtual table. Subplans are identified by a fingerprint of their structure and the
+// tables they scan, so a subplan that scans a table that has since been replaced never matches a cached result. A
+// subplan is materialized into a ConcreteTable when it is planned for the reuseThreshold-th time, if it joins, sorts,
+// or aggregates its input. Materialization stops as soon as a result exceeds the memory budget, and the subplan is
+// then executed as usual. Cached results are kept within the budget; the least recently used results are evicted
+// first.
+class SubplanCache(
+    private val byteBudget: Long = MemoryBudget.subplanCacheBytes,
+    private val reuseThreshold: Int = 2
+) {
+
+    // Cached results in order of last use, their total size, and the number of times each subplan has been planned
+    private val cachedResults = LinkedHashMap<SubplanFingerprint, ConcreteTable>(16, 0.75f, true)
+    private var cachedBytes = 0L
+    private val useCounts = object : LinkedHashMap<SubplanFingerprint, Int>(16, 0.75f, true) {
+        override fun removeEldestEntry(eldest: MutableMap.MutableEntry<SubplanFingerprint, Int>?): Boolean {
+            return size > MAX_TRACKED_SUBPLANS
+        }
+    }
+    // Subplans whose results exceeded the budget, which are not materialized again
+    private val oversizedSubplans = object : LinkedHashMap<SubplanFingerprint, Unit>(16, 0.75f, true) {
+        override fun removeEldestEntry(eldest: MutableMap.MutableEntry<SubplanFingerprint, Unit>?): Boolean {
+            return size > MAX_TRACKED_SUBPLANS
+        }
+    }
+    // Subplans that are being materialized by another thread
+    private val pendingResults = mutableSetOf<SubplanFingerprint>()
+    private var nextResultId = 1
+
+    init {
+        require(byteBudget >= 0) { "Cache budget must be non-negative" }
+        require(reuseThreshold >= 1) { "Reuse threshold must be at least 1" }
+    }
+
+    // Replaces the largest subplans of a query plan that have a cached result by scans of their result, and
+    // materializes subplans that are planned often enough. The root of a query with a LIMIT is not materialized,
+    // because the query reads only part of its result.
+    fun rewrite(physicalQueryPlan: PhysicalQueryPlan, hasLimit: Boolean = false): PhysicalQueryPlan {
+        val planToKeep = if (hasLimit) physicalQueryPlan else null
+        return physicalQueryPlan.accept(Rewriter(planToKeep)) ?: physicalQueryPlan
+    }
+
+    // Drops cached results of subplans that scan the given table, e.g., when the table is deleted
+    @Synchronized
+    fun invalidate(table: Table) {
+        val iterator = cachedResults.entries.iterator()
+        while (iterator.hasNext()) {
+            val (fingerprint, result) = iterator.next()
+            if (fingerprint.tables.none { it === table }) continue
+            iterator.remove()
+            cachedBytes -= result.estimatedSizeBytes
+        }
+        useCounts.keys.removeIf { fingerprint -> fingerprint.tables.any { it === table } }
+        oversizedSubplans.keys.removeIf { fingerprint -> fingerprint.tables.any { it === table } }
+    }
+
+    private fun cachedResultOf(plan: PhysicalQueryPlan, canMaterialize: Boolean): PhysicalQueryPlan? {
+        if (!isExpensive(plan) || !isDeterministic(plan)) return null
+        val fingerprint = SubplanFingerprint(plan)
+        val shouldMaterialize = synchronized(this) {
+            cachedResults[fingerprint]?.let { return scanOf(it) }
+            if (!canMaterialize || fingerprint in oversizedSubplans) return null
+            val useCount = (useCounts[fingerprint] ?: 0) + 1
+            useCounts[fingerprint] = useCount
+            useCount >= reuseThreshold && pendingResults.add(fingerprint)
+        }
+        if (!shouldMaterialize) return null
+        // Materialize the subplan without holding the lock, so other queries can be planned concurrently
+        try {
+            val result = plan.toQueryOperator().execute().use { ConcreteTable.fromWithinBudget(it, byteBudget) }
+            insert(fingerprint, result)
+            return result?.let { scanOf(it) }
+        } finally {
+            synchronized(this) { pendingResults.remove(fingerprint) }
+        }
+    }
+
+    @Synchronized
+    private fun insert(fingerprint: SubplanFingerprint, result: ConcreteTable?) {
+        useCounts.remove(fingerprint)
+        // Results that exceed the budget by themselves are not materialized
+        if (result == null) {
+            oversizedSubplans[fingerprint] = Unit
+            return
+        }
+        val size = result.estimatedSizeBytes
+        cachedResults[fingerprint] = result
+        cachedBytes += size
+        // Evict the least recently used results until the cache is within budget
+        val iterator = cachedResults.values.iterator()
+        while (cachedBytes > byteBudget && iterator.hasNext()) {
+            cachedBytes -= iterator.next().estimatedSizeBytes
+            iterator.remove()
+        }
+    }
+
+    private fun scanOf(result: ConcreteTable): PhysicalQueryPlan {
+        val tableName = synchronized(this) { "__cached_subplan_${nextResultId++}" }
+        return PhysicalQueryPlanBuilder.linearScan(result, tableName)
+    }
+
+    // Caches only subplans that do more work than reading a table, i.e., that contain a join, a sort, or an aggregation
+    private fun isExpensive(plan: PhysicalQueryPlan): Boolean {
+        return when (plan) {
+            is LinearTableScanPlan -> false
+            is FilterPlan, is IntervalMergingPlan, is ProjectPlan -> plan.children.any { isExpensive(it) }
+            else -> true
+        }
+    }
+
+    private fun isDeterministic(plan: PhysicalQueryPlan): Boolean {
+        val expressions = when (plan) {
+            is FilterPlan -> listOf(plan.filterCondition)
+            is HashAggregatePlan -> plan.columnExpressions
+            is LinearTableScanPlan -> listOfNotNull(plan.filterCondition)
+            is ProjectPlan -> plan.columnExpressions
+            is SortedAggregatePlan -> plan.columnExpressions
+            is SortedTemporalAggregatePlan -> plan.columnExpressions
+            else -> emptyList()
+        }
+        return expressions.all { it.isDeterministic } && plan.children.all { isDeterministic(it) }
+    }
+
+    // Rewrites the plan top-down, so the largest subplan with a cached result is replaced
+    private inner class Rewriter(private val planToKeep: PhysicalQueryPlan?) : PhysicalQueryPlanRewriter {
+        private fun replacementOf(plan: PhysicalQueryPlan) = cachedResultOf(plan, plan !== planToKeep)
+
+        override fun visit(filterPlan: FilterPlan): PhysicalQueryPlan? =
+            replacementOf(filterPlan) ?: super.visit(filterPlan)
+
+        override fun visit(hashAggregatePlan: HashAggregatePlan): PhysicalQueryPlan? =
+            replacementOf(hashAggregatePlan) ?: super.visit(hashAggregatePlan)
+
+        override fun visit(indexedTemporalJoinPlan: IndexedTemporalJoinPlan): PhysicalQueryPlan? =
+            replacementOf(indexedTemporalJoinPlan) ?: super.visit(indexedTemporalJoinPlan)
+
+        override fun visit(intervalMergingPlan: IntervalMergingPlan): PhysicalQueryPlan? =
+            replacementOf(intervalMergingPlan) ?: super.visit(intervalMergingPlan)
+
+        override fun visit(projectPlan: ProjectPlan): PhysicalQueryPlan? =
+            replacementOf(projectPlan) ?: super.visit(projectPlan)
+
+        override fun visit(sortedAggregatePlan: SortedAggregatePlan): PhysicalQueryPlan? =
+            replacementOf(sortedAggregatePlan) ?: super.visit(sortedAggregatePlan)
+
+        override fun visit(sortedTemporalAggregatePlan: SortedTemporalAggregatePlan): PhysicalQueryPlan? =
+            replacementOf(sortedTemporalAggregatePlan) ?: super.visit(sortedTemporalAggregatePlan)
+
+        override fun visit(sortedTemporalJoinPlan: SortedTemporalJoinPlan): PhysicalQueryPlan? =
+            replacementOf(sortedTemporalJoinPlan) ?: super.visit(sortedTemporalJoinPlan)
+
+        override fun visit(sortPlan: SortPlan): PhysicalQueryPlan? =
+            replacementOf(sortPlan) ?: super.visit(sortPlan)
+    }
+
+    // Identifies a subplan by its structure, using the plans' own equivalence, and by the identity of the tables it
+    // scans, because tables with the same name may have different contents over time
+    private class SubplanFingerprint(val plan: PhysicalQueryPlan) {
+
+        val tables: List<Table> = scannedTables(plan)
+        private val hash = structuralHash(plan)
+
+        override fun equals(other: Any?): Boolean {
+            if (this === other) return true
+            if (other !is SubplanFingerprint || hash != other.hash) return false
+            if (tables.size != other.tables.size || tables.indices.any { tables[it] !== other.tables[it] }) {
+                return false
+            }
+            return plan.isEquivalent(other.plan)
+        }
+
+        override fun hashCode() = hash
+
+        companion object {
+            private fun scannedTables(plan: PhysicalQueryPlan): List<Table> {
+                if (plan is LinearTableScanPlan) return listOf(plan.table)
+                return plan.children.flatMap { scannedTables(it) }
+            }
+
+            private fun structuralHash(plan: PhysicalQueryPlan): Int {
+                var hash = plan.javaClass.name.hashCode()
+                hash = 31 * hash + plan.schema.columns.hashCode()
+                if (plan is LinearTableScanPlan) hash = 31 * hash + plan.tableName.hashCode()
+                for (child in plan.children) hash = 31 * hash + structuralHash(child)
+                return hash
+            }
+        }
+
+    }
+
+    companion object {
+        private const val MAX_TRACKED_SUBPLANS = 1024
+    }
+
+}
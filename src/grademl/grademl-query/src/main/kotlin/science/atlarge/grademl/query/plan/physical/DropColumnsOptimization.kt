@@ -2,6 +2,7 @@ package science.atlarge.grademl.query.plan.physical
 
 import science.atlarge.grademl.query.analysis.ASTAnalysis
 import science.atlarge.grademl.query.analysis.ASTUtils
+import science.atlarge.grademl.query.execution.SortColumn
 import science.atlarge.grademl.query.language.ColumnLiteral
 import science.atlarge.grademl.query.language.NamedExpression
 import science.atlarge.grademl.query.model.Columns
@@ -89,21 +90,39 @@ private class DropColumnsRewriter(
     }
 
     override fun visit(sortedAggregatePlan: SortedAggregatePlan): PhysicalQueryPlan? {
+        return rewriteAggregate(
+            sortedAggregatePlan.input,
+            sortedAggregatePlan.groupByColumns,
+            sortedAggregatePlan.namedColumnExpressions,
+            PhysicalQueryPlanBuilder::sortedAggregate
+        )
+    }
+
+    override fun visit(hashAggregatePlan: HashAggregatePlan): PhysicalQueryPlan? {
+        return rewriteAggregate(
+            hashAggregatePlan.input,
+            hashAggregatePlan.groupByColumns,
+            hashAggregatePlan.namedColumnExpressions,
+            PhysicalQueryPlanBuilder::hashAggregate
+        )
+    }
+
+    private fun rewriteAggregate(
+        input: PhysicalQueryPlan,
+        groupByColumns: List<String>,
+        namedColumnExpressions: List<NamedExpression>,
+        createAggregate: (PhysicalQueryPlan, List<String>, List<NamedExpression>) -> PhysicalQueryPlan
+    ): PhysicalQueryPlan? {
         // Determine which aggregation/projection expressions to keep and which input columns they need
-        val requiredAggregations = sortedAggregatePlan.namedColumnExpressions.filter { it.name in requiredColumns }
+        val requiredAggregations = namedColumnExpressions.filter { it.name in requiredColumns }
         val requiredInputs = setOf(Columns.START_TIME.identifier, Columns.END_TIME.identifier) +
-                sortedAggregatePlan.groupByColumns +
+                groupByColumns +
                 requiredAggregations.flatMap { ASTUtils.findColumnLiterals(it.expr) }.map { it.columnPath }
         // Rewrite the input to drop any columns not required for this aggregation
-        val rewrittenInput = sortedAggregatePlan.input.recurse(requiredInputs)
+        val rewrittenInput = input.recurse(requiredInputs)
         // Don't rewrite this aggregation if the input hasn't changed and no output columns can be dropped
-        if (rewrittenInput == null && requiredAggregations.size == sortedAggregatePlan.namedColumnExpressions.size)
-            return null
-        return PhysicalQueryPlanBuilder.sortedAggregate(
-            rewrittenInput ?: sortedAggregatePlan.input,
-            sortedAggregatePlan.groupByColumns,
-            requiredAggregations
-        )
+        if (rewrittenInput == null && requiredAggregations.size == namedColumnExpressions.size) return null
+        return createAggregate(rewrittenInput ?: input, groupByColumns, requiredAggregations)
     }
 
     override fun visit(sortedTemporalAggregatePlan: SortedTemporalAggregatePlan): PhysicalQueryPlan? {
@@ -126,37 +145,71 @@ private class DropColumnsRewriter(
     }
 
     override fun visit(sortedTemporalJoinPlan: SortedTemporalJoinPlan): PhysicalQueryPlan? {
+        return rewriteTemporalJoin(
+            sortedTemporalJoinPlan.leftInput,
+            sortedTemporalJoinPlan.rightInput,
+            sortedTemporalJoinPlan.leftJoinColumns,
+            sortedTemporalJoinPlan.rightJoinColumns,
+            sortedTemporalJoinPlan.leftDropColumns,
+            sortedTemporalJoinPlan.rightDropColumns,
+            PhysicalQueryPlanBuilder::sortedTemporalJoin
+        )
+    }
+
+    override fun visit(indexedTemporalJoinPlan: IndexedTemporalJoinPlan): PhysicalQueryPlan? {
+        return rewriteTemporalJoin(
+            indexedTemporalJoinPlan.leftInput,
+            indexedTemporalJoinPlan.rightInput,
+            indexedTemporalJoinPlan.leftJoinColumns,
+            indexedTemporalJoinPlan.rightJoinColumns,
+            indexedTemporalJoinPlan.leftDropColumns,
+            indexedTemporalJoinPlan.rightDropColumns,
+            PhysicalQueryPlanBuilder::indexedTemporalJoin
+        )
+    }
+
+    private fun rewriteTemporalJoin(
+        leftInput: PhysicalQueryPlan,
+        rightInput: PhysicalQueryPlan,
+        leftJoinColumns: List<SortColumn>,
+        rightJoinColumns: List<SortColumn>,
+        leftDropColumns: Set<String>,
+        rightDropColumns: Set<String>,
+        createJoin: (
+            PhysicalQueryPlan, PhysicalQueryPlan, List<SortColumn>, List<SortColumn>, Set<String>, Set<String>
+        ) -> PhysicalQueryPlan
+    ): PhysicalQueryPlan? {
         // Determine which inputs are needed from the left and right input tables
         val requiredInputs = setOf(Columns.START_TIME.identifier, Columns.END_TIME.identifier) + requiredColumns
-        val leftJoinColumns = sortedTemporalJoinPlan.leftJoinColumns.map { it.column.columnPath }.toSet()
-        val requiredLeftInputs = sortedTemporalJoinPlan.leftInput.schema.columns
+        val leftJoinColumnNames = leftJoinColumns.map { it.column.columnPath }.toSet()
+        val requiredLeftInputs = leftInput.schema.columns
             .filter { column ->
-                column.identifier in requiredInputs || column.identifier in leftJoinColumns
+                column.identifier in requiredInputs || column.identifier in leftJoinColumnNames
             }
             .map { it.identifier }
             .toSet()
-        val rightJoinColumns = sortedTemporalJoinPlan.rightJoinColumns.map { it.column.columnPath }.toSet()
-        val requiredRightInputs = sortedTemporalJoinPlan.rightInput.schema.columns
+        val rightJoinColumnNames = rightJoinColumns.map { it.column.columnPath }.toSet()
+        val requiredRightInputs = rightInput.schema.columns
             .filter { column ->
-                column.identifier in requiredInputs || column.identifier in rightJoinColumns
+                column.identifier in requiredInputs || column.identifier in rightJoinColumnNames
             }
             .map { it.identifier }
             .toSet()
         // Rewrite both inputs
-        val rewrittenLeftInput = sortedTemporalJoinPlan.leftInput.recurseAndDropColumns(requiredLeftInputs)
-        val rewrittenRightInput = sortedTemporalJoinPlan.rightInput.recurseAndDropColumns(requiredRightInputs)
+        val rewrittenLeftInput = leftInput.recurseAndDropColumns(requiredLeftInputs)
+        val rewrittenRightInput = rightInput.recurseAndDropColumns(requiredRightInputs)
         // Determine which join inputs can be dropped after the join
-        val leftColumnsToDrop = leftJoinColumns - requiredInputs
-        val rightColumnsToDrop = rightJoinColumns - requiredInputs
+        val leftColumnsToDrop = leftJoinColumnNames - requiredInputs
+        val rightColumnsToDrop = rightJoinColumnNames - requiredInputs
         // If either input is rewritten, create a new join
         if (rewrittenLeftInput == null && rewrittenRightInput == null) return null
-        return PhysicalQueryPlanBuilder.sortedTemporalJoin(
-            rewrittenLeftInput ?: sortedTemporalJoinPlan.leftInput,
-            rewrittenRightInput ?: sortedTemporalJoinPlan.rightInput,
-            sortedTemporalJoinPlan.leftJoinColumns,
-            sortedTemporalJoinPlan.rightJoinColumns,
-            leftColumnsToDrop + sortedTemporalJoinPlan.leftDropColumns,
-            rightColumnsToDrop + sortedTemporalJoinPlan.rightDropColumns
+        return createJoin(
+            rewrittenLeftInput ?: leftInput,
+            rewrittenRightInput ?: rightInput,
+            leftJoinColumns,
+            rightJoinColumns,
+            leftColumnsToDrop + leftDropColumns,
+            rightColumnsToDrop + rightDropColumns
         )
     }
 
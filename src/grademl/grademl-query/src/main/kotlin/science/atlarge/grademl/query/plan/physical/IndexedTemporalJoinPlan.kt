@@ -0,0 +1,135 @@
+package science.atlarge.grademl.query.plan.physical
+
+import science.atlarge.grademl.query.analysis.ASTAnalysis
+import science.atlarge.grademl.query.execution.ConcreteTable
+import science.atlarge.grademl.query.execution.QueryExecutionStatistics
+import science.atlarge.grademl.query.execution.SortColumn
+import science.atlarge.grademl.query.execution.TemporalJoinIndex
+import science.atlarge.grademl.query.execution.operators.IndexedTemporalJoinOperator
+import science.atlarge.grademl.query.execution.operators.QueryOperator
+import science.atlarge.grademl.query.language.ColumnLiteral
+import science.atlarge.grademl.query.model.Columns
+import science.atlarge.grademl.query.model.TableSchema
+
+class IndexedTemporalJoinPlan(
+    override val nodeId: Int,
+    val leftInput: PhysicalQueryPlan,
+    val rightInput: PhysicalQueryPlan,
+    leftJoinColumns: List<SortColumn>,
+    rightJoinColumns: List<SortColumn>,
+    leftDropColumns: Set<String>,
+    rightDropColumns: Set<String>
+) : PhysicalQueryPlan {
+
+    // Join columns are stored as sort columns to match SortedTemporalJoinPlan, but the inputs need not be sorted
+    val leftJoinColumns = leftJoinColumns.map {
+        SortColumn(ASTAnalysis.analyzeExpression(it.column, leftInput.schema.columns) as ColumnLiteral, it.ascending)
+    }
+    val rightJoinColumns = rightJoinColumns.map {
+        SortColumn(ASTAnalysis.analyzeExpression(it.column, rightInput.schema.columns) as ColumnLiteral, it.ascending)
+    }
+
+    val leftDropColumns = leftDropColumns.filter {
+        it != Columns.START_TIME.identifier && it != Columns.END_TIME.identifier && leftInput.schema.column(it) != null
+    }.toSet()
+    val rightDropColumns = rightDropColumns.filter {
+        it != Columns.START_TIME.identifier && it != Columns.END_TIME.identifier && rightInput.schema.column(it) != null
+    }.toSet()
+
+    private val leftOutputColumns = leftInput.schema.columns.filter {
+        !it.isReserved && it.identifier !in leftDropColumns
+    }
+    private val rightOutputColumns = rightInput.schema.columns.filter {
+        !it.isReserved && it.identifier !in rightDropColumns
+    }
+
+    override val schema = TableSchema(
+        Columns.RESERVED_COLUMNS + leftOutputColumns + rightOutputColumns
+    )
+
+    override val children: List<PhysicalQueryPlan>
+        get() = listOf(leftInput, rightInput)
+
+    // Cached table that the right input reads without modification, if any, and the index of each column of the right
+    // input in that table
+    val cachedRightTable: Pair<ConcreteTable, List<Int>>? = findCachedTable(rightInput)
+
+    init {
+        require(this.rightJoinColumns.size == this.leftJoinColumns.size) {
+            "Must have the same number of left and right join columns"
+        }
+        this.rightJoinColumns.forEachIndexed { i, rc ->
+            require(rc.column.type == this.leftJoinColumns[i].column.type) { "Join columns must have the same type" }
+        }
+    }
+
+    override fun toQueryOperator(): QueryOperator {
+        // Always create the right input's operator, so execution statistics can be collected for every plan node
+        val rightOperator = rightInput.toQueryOperator()
+        val rightJoinColumnIds = rightJoinColumns.map { it.column.columnIndex }
+        val rightSelectedColumnIds = rightOutputColumns.map { rightInput.schema.indexOfColumn(it)!! }
+        lastOperator = if (cachedRightTable != null) {
+            // Reuse the cached table's index, which refers to columns of the table instead of the right input
+            val (table, columnMap) = cachedRightTable
+            val tableJoinColumnIds = rightJoinColumnIds.map { columnMap[it] }
+            IndexedTemporalJoinOperator(
+                leftInput.toQueryOperator(),
+                { table.temporalJoinIndex(tableJoinColumnIds) },
+                schema,
+                leftJoinColumns.map { it.column.columnIndex },
+                leftOutputColumns,
+                rightSelectedColumnIds.map { columnMap[it] }
+            )
+        } else {
+            IndexedTemporalJoinOperator(
+                leftInput.toQueryOperator(),
+                { TemporalJoinIndex.build(rightOperator.execute(), rightJoinColumnIds.toIntArray()) },
+                schema,
+                leftJoinColumns.map { it.column.columnIndex },
+                leftOutputColumns,
+                rightSelectedColumnIds
+            )
+        }
+        return lastOperator
+    }
+
+    private lateinit var lastOperator: IndexedTemporalJoinOperator
+
+    override fun collectLastExecutionStatisticsPerOperator(): Map<String, QueryExecutionStatistics> {
+        return mapOf("IndexedTemporalJoinOperator" to lastOperator.collectExecutionStatistics())
+    }
+
+    override fun <T> accept(visitor: PhysicalQueryPlanVisitor<T>): T {
+        return visitor.visit(this)
+    }
+
+    override fun isEquivalent(other: PhysicalQueryPlan): Boolean {
+        if (other !is IndexedTemporalJoinPlan) return false
+        if (leftJoinColumns != other.leftJoinColumns) return false
+        if (rightJoinColumns != other.rightJoinColumns) return false
+        if (leftDropColumns != other.leftDropColumns) return false
+        if (rightDropColumns != other.rightDropColumns) return false
+        return leftInput.isEquivalent(other.leftInput) && rightInput.isEquivalent(other.rightInput)
+    }
+
+    companion object {
+
+        // Finds a ConcreteTable that is scanned without a filter and at most renamed or reordered by projections
+        fun findCachedTable(plan: PhysicalQueryPlan): Pair<ConcreteTable, List<Int>>? {
+            return when (plan) {
+                is LinearTableScanPlan -> {
+                    if (plan.table !is ConcreteTable || plan.filterCondition != null) null
+                    else plan.table to plan.schema.columns.indices.toList()
+                }
+                is ProjectPlan -> {
+                    if (plan.columnExpressions.any { it !is ColumnLiteral }) return null
+                    val (table, inputColumnMap) = findCachedTable(plan.input) ?: return null
+                    table to plan.columnExpressions.map { inputColumnMap[(it as ColumnLiteral).columnIndex] }
+                }
+                else -> null
+            }
+        }
+
+    }
+
+}
@@ -34,6 +34,15 @@ object PhysicalQueryPlanBuilder {
         return ProjectPlan(nodeId, input, columnExpressions)
     }
 
+    fun hashAggregate(
+        input: PhysicalQueryPlan,
+        groupByColumns: List<String>,
+        columnExpressions: List<NamedExpression>
+    ): PhysicalQueryPlan {
+        val nodeId = nextNodeId++
+        return HashAggregatePlan(nodeId, input, groupByColumns, columnExpressions)
+    }
+
     fun sortedAggregate(
         input: PhysicalQueryPlan,
         groupByColumns: List<String>,
@@ -66,6 +75,20 @@ object PhysicalQueryPlanBuilder {
         )
     }
 
+    fun indexedTemporalJoin(
+        leftInput: PhysicalQueryPlan,
+        rightInput: PhysicalQueryPlan,
+        leftJoinColumns: List<SortColumn>,
+        rightJoinColumns: List<SortColumn>,
+        leftDropColumns: Set<String>,
+        rightDropColumns: Set<String>
+    ): PhysicalQueryPlan {
+        val nodeId = nextNodeId++
+        return IndexedTemporalJoinPlan(
+            nodeId, leftInput, rightInput, leftJoinColumns, rightJoinColumns, leftDropColumns, rightDropColumns
+        )
+    }
+
     fun sort(input: PhysicalQueryPlan, sortByColumns: List<SortColumn>): PhysicalQueryPlan {
         val nodeId = nextNodeId++
         return SortPlan(nodeId, input, sortByColumns)
@@ -7,6 +7,29 @@ interface PhysicalQueryPlanRewriter : PhysicalQueryPlanVisitor<PhysicalQueryPlan
         return PhysicalQueryPlanBuilder.filter(inputRewritten, filterPlan.filterCondition)
     }
 
+    override fun visit(hashAggregatePlan: HashAggregatePlan): PhysicalQueryPlan? {
+        val inputRewritten = hashAggregatePlan.input.accept(this) ?: return null
+        return PhysicalQueryPlanBuilder.hashAggregate(
+            inputRewritten,
+            hashAggregatePlan.groupByColumns,
+            hashAggregatePlan.namedColumnExpressions
+        )
+    }
+
+    override fun visit(indexedTemporalJoinPlan: IndexedTemporalJoinPlan): PhysicalQueryPlan? {
+        val leftRewritten = indexedTemporalJoinPlan.leftInput.accept(this)
+        val rightRewritten = indexedTemporalJoinPlan.rightInput.accept(this)
+        if (leftRewritten == null && rightRewritten == null) return null
+        return PhysicalQueryPlanBuilder.indexedTemporalJoin(
+            leftRewritten ?: indexedTemporalJoinPlan.leftInput,
+            rightRewritten ?: indexedTemporalJoinPlan.rightInput,
+            indexedTemporalJoinPlan.leftJoinColumns,
+            indexedTemporalJoinPlan.rightJoinColumns,
+            indexedTemporalJoinPlan.leftDropColumns,
+            indexedTemporalJoinPlan.rightDropColumns
+        )
+    }
+
     override fun visit(intervalMergingPlan: IntervalMergingPlan): PhysicalQueryPlan? {
         val inputRewritten = intervalMergingPlan.input.accept(this) ?: return null
         return PhysicalQueryPlanBuilder.intervalMerging(inputRewritten)
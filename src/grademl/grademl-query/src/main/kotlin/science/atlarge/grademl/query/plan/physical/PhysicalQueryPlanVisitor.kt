@@ -3,6 +3,8 @@ package science.atlarge.grademl.query.plan.physical
 interface PhysicalQueryPlanVisitor<out T> {
 
     fun visit(filterPlan: FilterPlan): T
+    fun visit(hashAggregatePlan: HashAggregatePlan): T
+    fun visit(indexedTemporalJoinPlan: IndexedTemporalJoinPlan): T
     fun visit(intervalMergingPlan: IntervalMergingPlan): T
     fun visit(linearTableScanPlan: LinearTableScanPlan): T
     fun visit(projectPlan: ProjectPlan): T
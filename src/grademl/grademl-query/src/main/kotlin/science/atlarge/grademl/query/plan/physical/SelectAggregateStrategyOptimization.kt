@@ -0,0 +1,43 @@
+package science.atlarge.grademl.query.plan.physical
+
+// Replaces sort-based aggregations by hash aggregations if the input of an aggregation is not sorted by its group-by
+// columns yet. A sorted aggregation needs a sort of all input rows by the group-by columns, whereas a hash aggregation
+// reads its input once and keeps a single entry per group in memory. If the input is already sorted by the group-by
+// columns, the sort in front of the aggregation is dropped instead.
+object SelectAggregateStrategyOptimization : OptimizationStrategy, PhysicalQueryPlanRewriter {
+
+    override fun optimize(physicalQueryPlan: PhysicalQueryPlan): PhysicalQueryPlan? {
+        return physicalQueryPlan.accept(this)
+    }
+
+    override fun visit(sortedAggregatePlan: SortedAggregatePlan): PhysicalQueryPlan? {
+        val rewrittenAggregate = super.visit(sortedAggregatePlan) as SortedAggregatePlan?
+        val aggregate = rewrittenAggregate ?: sortedAggregatePlan
+        // Only replace sorts that were added for the aggregation, i.e., sorts by exactly the group-by columns
+        val sort = aggregate.input as? SortPlan ?: return rewrittenAggregate
+        val groupByColumns = aggregate.groupByColumns.toSet()
+        if (groupByColumns.isEmpty() || sort.sortByColumns.map { it.column.columnPath }.toSet() != groupByColumns) {
+            return rewrittenAggregate
+        }
+        return if (isSortedBy(sort.input, groupByColumns)) {
+            PhysicalQueryPlanBuilder.sortedAggregate(
+                sort.input, aggregate.groupByColumns, aggregate.namedColumnExpressions
+            )
+        } else {
+            PhysicalQueryPlanBuilder.hashAggregate(
+                sort.input, aggregate.groupByColumns, aggregate.namedColumnExpressions
+            )
+        }
+    }
+
+    // Determines if a plan produces time series sorted by the given columns, which are all keys of its output
+    private fun isSortedBy(plan: PhysicalQueryPlan, columns: Set<String>): Boolean {
+        return when (plan) {
+            is SortPlan -> plan.sortByColumns.take(columns.size).map { it.column.columnPath }.toSet() == columns
+            is FilterPlan -> isSortedBy(plan.input, columns)
+            is IntervalMergingPlan -> isSortedBy(plan.input, columns)
+            else -> false
+        }
+    }
+
+}
@@ -0,0 +1,116 @@
+package science.atlarge.grademl.query.plan.physical
+
+import science.atlarge.grademl.query.execution.SizedTable
+import kotlin.math.log2
+
+// Replaces sort-merge temporal joins by index joins if the estimated cost of an index join is lower. A sort-merge join
+// compares every row of every pair of joined time series, whereas an index join builds an index over its right input
+// and looks up the rows overlapping every left row, which is much cheaper if the left time series have few rows, e.g.,
+// when joining phases with metrics. Sizes of inputs are estimated from tables that implement SizedTable; if the size
+// of either input is unknown, the sort-merge join is kept. The order of the time series produced by a temporal join is
+// unspecified (i.e., only ORDER BY determines which rows are selected by a LIMIT), so both joins are interchangeable.
+object SelectJoinStrategyOptimization : OptimizationStrategy, PhysicalQueryPlanRewriter {
+
+    // Relative cost of operations compared to reading a row while merging two time series
+    private const val INDEX_BUILD_COST_PER_ROW = 4.0
+    private const val JOINED_TIME_SERIES_COST = 16.0
+    private const val FILTER_SELECTIVITY = 0.5
+
+    // Largest right input to index, to bound the memory used by an index
+    private val MAX_INDEXED_ROWS = (1L shl 28).toDouble()
+
+    override fun optimize(physicalQueryPlan: PhysicalQueryPlan): PhysicalQueryPlan? {
+        return physicalQueryPlan.accept(this)
+    }
+
+    override fun visit(sortedTemporalJoinPlan: SortedTemporalJoinPlan): PhysicalQueryPlan? {
+        val rewrittenJoin = super.visit(sortedTemporalJoinPlan) as SortedTemporalJoinPlan?
+        val join = rewrittenJoin ?: sortedTemporalJoinPlan
+        if (!isIndexJoinCheaper(join)) return rewrittenJoin
+        return PhysicalQueryPlanBuilder.indexedTemporalJoin(
+            dropSortOfJoinInput(join.leftInput),
+            dropSortOfJoinInput(join.rightInput),
+            join.leftJoinColumns,
+            join.rightJoinColumns,
+            join.leftDropColumns,
+            join.rightDropColumns
+        )
+    }
+
+    // An index join does not need sorted inputs, but a sort that turns value columns into keys changes which rows
+    // belong to a time series and must be kept
+    private fun dropSortOfJoinInput(input: PhysicalQueryPlan): PhysicalQueryPlan {
+        if (input !is SortPlan) return input
+        val sortsOnlyKeyColumns = input.sortByColumns.all { input.input.schema.column(it.column.columnPath)!!.isKey }
+        return if (sortsOnlyKeyColumns) input.input else input
+    }
+
+    private fun isIndexJoinCheaper(join: SortedTemporalJoinPlan): Boolean {
+        val left = estimateSize(join.leftInput) ?: return false
+        val right = estimateSize(join.rightInput) ?: return false
+        if (right.rowCount > MAX_INDEXED_ROWS) return false
+        val joinedTimeSeries = estimateJoinedTimeSeries(left, right, join.leftJoinColumns.isNotEmpty())
+
+        // Both joins pay for sorts that cannot be dropped, so only sorts that can be dropped are counted
+        val sortMergeCost = sortCost(join.leftInput, left) + sortCost(join.rightInput, right) +
+                joinedTimeSeries * (left.rowsPerTimeSeries + right.rowsPerTimeSeries + JOINED_TIME_SERIES_COST)
+        // Assume that all time series overlap, and that rows of the right input are found with a binary search
+        val indexBuildCost = if (IndexedTemporalJoinPlan.findCachedTable(join.rightInput) != null) 0.0
+        else right.rowCount * INDEX_BUILD_COST_PER_ROW
+        val rowLookupCost = left.rowsPerTimeSeries * (log2(right.rowsPerTimeSeries + 1.0) + 1.0)
+        val indexCost = indexBuildCost + left.rowCount + left.timeSeriesCount * log2(right.timeSeriesCount + 1.0) +
+                joinedTimeSeries * (rowLookupCost + JOINED_TIME_SERIES_COST)
+        return indexCost < sortMergeCost
+    }
+
+    private fun sortCost(input: PhysicalQueryPlan, size: PlanSize): Double {
+        if (dropSortOfJoinInput(input) === input) return 0.0
+        return size.rowCount * log2(size.rowCount + 1.0)
+    }
+
+    // Without join columns every pair of time series is joined; with join columns, assume that every time series of
+    // the larger input matches one time series of the smaller input
+    private fun estimateJoinedTimeSeries(left: PlanSize, right: PlanSize, hasJoinColumns: Boolean): Double {
+        return if (hasJoinColumns) maxOf(left.timeSeriesCount, right.timeSeriesCount)
+        else left.timeSeriesCount * right.timeSeriesCount
+    }
+
+    private fun estimateSize(plan: PhysicalQueryPlan): PlanSize? {
+        return when (plan) {
+            is LinearTableScanPlan -> {
+                val table = plan.table as? SizedTable ?: return null
+                val size = PlanSize(table.estimatedTimeSeriesCount.toDouble(), table.estimatedRowCount.toDouble())
+                if (plan.filterCondition != null) size.filtered() else size
+            }
+            is FilterPlan -> estimateSize(plan.input)?.filtered()
+            is HashAggregatePlan -> estimateSize(plan.input)?.let { PlanSize(it.timeSeriesCount, it.timeSeriesCount) }
+            is IntervalMergingPlan -> estimateSize(plan.input)
+            is ProjectPlan -> estimateSize(plan.input)
+            is SortPlan -> estimateSize(plan.input)
+            is SortedAggregatePlan -> estimateSize(plan.input)?.let { PlanSize(it.timeSeriesCount, it.timeSeriesCount) }
+            is SortedTemporalAggregatePlan -> estimateSize(plan.input)
+            is SortedTemporalJoinPlan -> estimateJoinSize(plan.leftInput, plan.rightInput, plan.leftJoinColumns.size)
+            is IndexedTemporalJoinPlan -> estimateJoinSize(plan.leftInput, plan.rightInput, plan.leftJoinColumns.size)
+            else -> null
+        }
+    }
+
+    private fun estimateJoinSize(
+        leftInput: PhysicalQueryPlan,
+        rightInput: PhysicalQueryPlan,
+        joinColumnCount: Int
+    ): PlanSize? {
+        val left = estimateSize(leftInput) ?: return null
+        val right = estimateSize(rightInput) ?: return null
+        val timeSeriesCount = estimateJoinedTimeSeries(left, right, joinColumnCount > 0)
+        return PlanSize(timeSeriesCount, timeSeriesCount * (left.rowsPerTimeSeries + right.rowsPerTimeSeries))
+    }
+
+    private class PlanSize(val timeSeriesCount: Double, val rowCount: Double) {
+        val rowsPerTimeSeries: Double
+            get() = rowCount / maxOf(timeSeriesCount, 1.0)
+
+        fun filtered() = PlanSize(timeSeriesCount, rowCount * FILTER_SELECTIVITY)
+    }
+
+}
@@ -90,7 +90,7 @@ class SortedTemporalAggregatePlan(
     }
 
     override fun isEquivalent(other: PhysicalQueryPlan): Boolean {
-        if (other !is SortedAggregatePlan) return false
+        if (other !is SortedTemporalAggregatePlan) return false
         if (groupByColumns != other.groupByColumns) return false
         if (columnExpressions.size != other.columnExpressions.size) return false
         if (columnExpressions.indices.any {
@@ -0,0 +1,128 @@
+package science.atlarge.grademl.query.execution
+
+import science.atlarge.grademl.query.execution.operators.FilterOperator
+import science.atlarge.grademl.query.execution.operators.LinearTableScanOperator
+import science.atlarge.grademl.query.execution.operators.ProjectOperator
+import science.atlarge.grademl.query.execution.util.ConcreteRow
+import science.atlarge.grademl.query.execution.util.toConcreteRow
+import science.atlarge.grademl.query.execution.util.toConcreteRows
+import science.atlarge.grademl.query.execution.util.toRow
+import science.atlarge.grademl.query.execution.util.toTimeSeriesIterator
+import science.atlarge.grademl.query.language.*
+import science.atlarge.grademl.query.model.*
+import kotlin.test.Test
+import kotlin.test.assertEquals
+
+class BatchExecutionTests {
+
+    private val schema = DataGenerator.schema
+    private val generatedRows = DataGenerator.generate(0.37, listOf(1, 1500, 3000, 7, 2049))
+    private val inputData = generatedRows.groupBy { it.originalTimeSeriesId }.values.map { timeSeries ->
+        timeSeries.map { it.asQueryEngineRow().toConcreteRow() }
+    }
+
+    private val inputTable = object : Table {
+        override val schema = DataGenerator.schema
+        override fun timeSeriesIterator() = inputData.toTimeSeriesIterator(schema)
+    }
+
+    @Test
+    fun testFilterProducesSameRowsInBatches() {
+        // (v1 > 4 AND v3) OR NOT (v4 < 3)
+        val condition = binary(
+            binary(binary(column("v1"), numeric(4.0), BinaryOp.GREATER), column("v3"), BinaryOp.AND),
+            UnaryExpression(binary(column("v4"), numeric(3.0), BinaryOp.SMALLER), UnaryOp.NOT).also {
+                it.type = Type.BOOLEAN
+            },
+            BinaryOp.OR
+        )
+        val filter = FilterOperator(
+            LinearTableScanOperator(inputTable),
+            BooleanPhysicalExpression.ALWAYS_TRUE,
+            condition.toPhysicalExpression() as BooleanPhysicalExpression
+        )
+
+        val expectedRows = generatedRows.filter { (it.v1 > 4.0 && it.v3) || !(it.v4 < 3.0) }
+        val rowsReadOneByOne = filter.execute().toConcreteRows()
+        val rowsReadInBatches = filter.execute().toConcreteRowsInBatches()
+        assertEquals(expectedRows, rowsReadOneByOne.flatten().map { GeneratedRow.fromQueryEngineRow(it.toRow(schema)) })
+        assertEquals(rowsReadOneByOne, rowsReadInBatches)
+    }
+
+    @Test
+    fun testProjectProducesSameRowsInBatches() {
+        val projectedSchema = TableSchema(
+            Columns.RESERVED_COLUMNS + listOf(
+                Column("a", Type.NUMERIC, false),
+                Column("b", Type.BOOLEAN, false),
+                Column("c", Type.STRING, true)
+            )
+        )
+        val columnExpressions = listOf(
+            column("_start_time"),
+            column("_end_time"),
+            column("_duration"),
+            binary(binary(column("v1"), column("v4"), BinaryOp.MULTIPLY), numeric(1.5), BinaryOp.SUBTRACT),
+            binary(column("v1"), column("v4"), BinaryOp.SMALLER_EQUAL),
+            column("k2")
+        ).map { it.toPhysicalExpression() }
+        val project = ProjectOperator(
+            FilterOperator(
+                LinearTableScanOperator(inputTable),
+                BooleanPhysicalExpression.ALWAYS_TRUE,
+                (binary(column("v3"), BooleanLiteral(true).also { it.type = Type.BOOLEAN }, BinaryOp.EQUAL)
+                    .toPhysicalExpression() as BooleanPhysicalExpression)
+            ),
+            projectedSchema,
+            columnExpressions
+        )
+
+        val expectedValues = generatedRows.filter { it.v3 }.map { it.v1 * it.v4 - 1.5 to (it.v1 <= it.v4) }
+        val rowsReadOneByOne = project.execute().toConcreteRows()
+        val rowsReadInBatches = project.execute().toConcreteRowsInBatches()
+        assertEquals(expectedValues, rowsReadOneByOne.flatten().map { it.numeric(3) to it.boolean(4) })
+        assertEquals(rowsReadOneByOne, rowsReadInBatches)
+    }
+
+    @Test
+    fun testConcreteTableStoresEveryRow() {
+        val concreteTable = ConcreteTable.from(inputTable.timeSeriesIterator())
+        assertEquals(inputData.size, concreteTable.timeSeriesCount)
+        assertEquals(generatedRows.size, concreteTable.rowCount)
+        assertEquals(inputData, concreteTable.timeSeriesIterator().toConcreteRows())
+        assertEquals(inputData, concreteTable.timeSeriesIterator().toConcreteRowsInBatches())
+    }
+
+    private fun column(name: String) = ColumnLiteral(name).also {
+        it.columnIndex = schema.indexOfColumn(name)!!
+        it.type = schema.column(name)!!.type
+    }
+
+    private fun numeric(value: Double) = NumericLiteral(value).also { it.type = Type.NUMERIC }
+
+    private fun binary(lhs: Expression, rhs: Expression, op: BinaryOp) = BinaryExpression(lhs, rhs, op).also {
+        it.type = when (op) {
+            BinaryOp.ADD, BinaryOp.SUBTRACT, BinaryOp.MULTIPLY, BinaryOp.DIVIDE -> Type.NUMERIC
+            else -> Type.BOOLEAN
+        }
+    }
+
+    private fun TimeSeriesIterator.toConcreteRowsInBatches(): List<List<ConcreteRow>> {
+        val result = mutableListOf<List<ConcreteRow>>()
+        val batch = RowBatch(schema, 100)
+        val row = batch.rowView()
+        while (loadNext()) {
+            val iterator = currentTimeSeries.rowIterator()
+            val rows = mutableListOf<ConcreteRow>()
+            while (iterator.loadNextBatch(batch)) {
+                for (i in 0 until batch.selectedCount) {
+                    row.index = batch.selection[i]
+                    rows.add(row.toConcreteRow())
+                }
+            }
+            result.add(rows)
+        }
+        return result
+    }
+
+}
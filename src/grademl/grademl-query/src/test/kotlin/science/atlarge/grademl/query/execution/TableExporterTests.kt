@@ -0,0 +1,64 @@
+package science.atlarge.grademl.query.execution
+
+import science.atlarge.grademl.query.execution.util.ConcreteRowBuilder
+import science.atlarge.grademl.query.execution.util.toTimeSeriesIterator
+import java.nio.ByteBuffer
+import java.nio.ByteOrder
+import java.nio.file.Files
+import java.nio.file.Path
+import kotlin.test.Test
+import kotlin.test.assertContentEquals
+import kotlin.test.assertEquals
+
+class TableExporterTests {
+
+    // Ten rows in three time series, with a non-ASCII key and a string dictionary that grows in every chunk
+    private val table = ConcreteRowBuilder.build {
+        timeSeries(0, 0, 0, 0, 1, 1, 1, 2, 2, 2)
+        stringKeyColumn(
+            "phase", "load", "load", "load", "load", "évaluer", "évaluer", "évaluer", "train", "train", "train"
+        )
+        numericValueColumn("utilization", 0.0, 0.5, -1.25, 1e300, 2.0, 3.75, 42.0, 0.125, 1e-3, 7.0)
+        booleanValueColumn("active", true, false, false, true, true, true, false, false, true, false)
+        stringValueColumn("label", "a", "b", "a", "c", "b", "d", "d", "a", "e", "c")
+    }
+
+    private fun withOutputFile(test: (Path) -> Unit) {
+        val directory = Files.createTempDirectory("table-exporter-test")
+        try {
+            test(directory.resolve("output${TableExporter.COLUMNAR_FILE_EXTENSION}"))
+        } finally {
+            directory.toFile().deleteRecursively()
+        }
+    }
+
+    @Test
+    fun testColumnarExportMatchesReferenceFile() {
+        // The reference file is also read by the tests of grademl-query/python/grademl_columnar.py
+        val expected = javaClass.getResourceAsStream("table-export.gmlc")!!.use { it.readBytes() }
+        withOutputFile { outputPath ->
+            val (schema, rows) = table
+            val rowsWritten = TableExporter.exportColumnar(
+                outputPath, rows.toTimeSeriesIterator(schema), Int.MAX_VALUE, chunkRows = 4
+            )
+            assertEquals(10, rowsWritten)
+            assertContentEquals(expected, Files.readAllBytes(outputPath))
+        }
+    }
+
+    @Test
+    fun testColumnarExportStopsAtLimit() {
+        withOutputFile { outputPath ->
+            val (schema, rows) = table
+            assertEquals(6, TableExporter.export(outputPath, rows.toTimeSeriesIterator(schema), limit = 6))
+            // Read the row counts of the chunks (one, with the default chunk size) and the total from the footer
+            val buffer = ByteBuffer.wrap(Files.readAllBytes(outputPath)).order(ByteOrder.LITTLE_ENDIAN)
+            val headerSize = 16 + listOf("phase", "utilization", "active", "label").sumOf { 4 + it.length }
+            val chunkStart = (headerSize + 7) and 7.inv()
+            assertEquals(6L, buffer.getLong(chunkStart))
+            assertEquals(-1L, buffer.getLong(buffer.limit() - 16))
+            assertEquals(6L, buffer.getLong(buffer.limit() - 8))
+        }
+    }
+
+}
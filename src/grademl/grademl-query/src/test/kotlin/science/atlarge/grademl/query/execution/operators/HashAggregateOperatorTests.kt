@@ -0,0 +1,172 @@
+package science.atlarge.grademl.query.execution.operators
+
+import org.junit.jupiter.api.BeforeAll
+import science.atlarge.grademl.query.analysis.ASTAnalysis
+import science.atlarge.grademl.query.analysis.ASTUtils
+import science.atlarge.grademl.query.analysis.AggregateFunctionDecomposition
+import science.atlarge.grademl.query.execution.AggregationSettings
+import science.atlarge.grademl.query.execution.DataGenerator
+import science.atlarge.grademl.query.execution.DataUtils.toTimeSeriesIterator
+import science.atlarge.grademl.query.execution.GeneratedRow
+import science.atlarge.grademl.query.execution.IndexedSortColumn
+import science.atlarge.grademl.query.execution.toPhysicalExpression
+import science.atlarge.grademl.query.execution.util.toConcreteRows
+import science.atlarge.grademl.query.language.ColumnLiteral
+import science.atlarge.grademl.query.language.Expression
+import science.atlarge.grademl.query.language.FunctionCallExpression
+import science.atlarge.grademl.query.model.Column
+import science.atlarge.grademl.query.model.Columns
+import science.atlarge.grademl.query.model.Table
+import science.atlarge.grademl.query.model.TableSchema
+import java.nio.file.Files
+import kotlin.test.Test
+import kotlin.test.assertEquals
+import kotlin.test.assertTrue
+
+class HashAggregateOperatorTests {
+
+    companion object {
+        private var inputData: List<List<GeneratedRow>> = emptyList()
+
+        @JvmStatic
+        @BeforeAll
+        fun generateInputData() {
+            // Generate values from a zero seed, so all aggregates are exact regardless of the order of rows
+            inputData = DataGenerator.generate(0.0, 20, 10)
+                .groupBy(GeneratedRow::originalTimeSeriesId)
+                .map { it.value }
+                .shuffled()
+        }
+    }
+
+    @Test
+    fun testGroupByKeyColumn() {
+        assertSameResultAsSortedAggregate(listOf("k1"))
+    }
+
+    @Test
+    fun testGroupByKeyColumns() {
+        assertSameResultAsSortedAggregate(listOf("k2", "k1"))
+    }
+
+    @Test
+    fun testGroupByValueColumn() {
+        assertSameResultAsSortedAggregate(listOf("v3"))
+    }
+
+    @Test
+    fun testGroupByMixedColumns() {
+        assertSameResultAsSortedAggregate(listOf("v1", "k2"))
+    }
+
+    @Test
+    fun testAggregateInParallel() {
+        val settings = AggregationSettings(parallelAggregationChunkSize = 7, aggregationParallelism = 3)
+        assertSameResultAsSortedAggregate(listOf("k1"), settings)
+        assertSameResultAsSortedAggregate(listOf("v2", "k1"), settings)
+        val serialSettings = AggregationSettings(parallelAggregationChunkSize = 7, aggregationParallelism = 1)
+        assertSameResultAsSortedAggregate(listOf("v2", "k1"), serialSettings)
+    }
+
+    @Test
+    fun testAggregateSpilledPartitions() {
+        // Aggregate with a minimal memory budget, so almost every group is spilled and partitioned multiple times
+        val spillDirectory = Files.createTempDirectory("hash-aggregate-operator-test")
+        try {
+            val settings = AggregationSettings(memoryBudgetBytes = 1, spillDirectory = spillDirectory)
+            assertSameResultAsSortedAggregate(listOf("k2"), settings)
+            assertSameResultAsSortedAggregate(listOf("v1", "v3"), settings)
+            // Chunks that are still queued for merging once the budget is exceeded are spilled as well
+            val parallelSettings = AggregationSettings(
+                memoryBudgetBytes = 1,
+                spillDirectory = spillDirectory,
+                parallelAggregationChunkSize = 16,
+                aggregationParallelism = 4
+            )
+            assertSameResultAsSortedAggregate(listOf("v2"), parallelSettings)
+            assertSameResultAsSortedAggregate(listOf("k1", "v3"), parallelSettings)
+            assertTrue(Files.list(spillDirectory).use { it.count() } == 0L, "Spilled partitions were not deleted")
+        } finally {
+            spillDirectory.toFile().deleteRecursively()
+        }
+    }
+
+    // A hash aggregation produces groups in order of their first row, so results are compared as sets of rows
+    private fun assertSameResultAsSortedAggregate(
+        groupByColumns: List<String>,
+        aggregationSettings: AggregationSettings = AggregationSettings.DEFAULT
+    ) {
+        val inputSchema = DataGenerator.schema
+        val groupByColumnIndices = groupByColumns.map { inputSchema.indexOfColumn(it)!! }
+        val expressions = (listOf(Columns.START_TIME.identifier, Columns.END_TIME.identifier) + groupByColumns)
+            .map<String, Expression> { ColumnLiteral(it) } + listOf(
+            FunctionCallExpression("COUNT", listOf(ColumnLiteral("v1"))),
+            FunctionCallExpression("SUM", listOf(ColumnLiteral("v4"))),
+            FunctionCallExpression("AVG", listOf(ColumnLiteral("v1"))),
+            FunctionCallExpression("MIN", listOf(ColumnLiteral("v2"))),
+            FunctionCallExpression("MAX", listOf(ColumnLiteral("v4"))),
+            FunctionCallExpression("COUNT_IF", listOf(ColumnLiteral("v3")))
+        )
+        val analyzedExpressions = expressions.map { ASTAnalysis.analyzeExpression(it, inputSchema.columns) }
+        val outputSchema = TableSchema(analyzedExpressions.mapIndexed { i, expression ->
+            val isKey = ASTUtils.findColumnLiterals(expression).all {
+                it.columnPath in groupByColumns || inputSchema.columns[it.columnIndex].isKey
+            }
+            Column("c$i", expression.type, isKey)
+        })
+        val decomposition = AggregateFunctionDecomposition.decompose(analyzedExpressions, inputSchema.columns)
+        val projections = decomposition.rewrittenExpressions.map(Expression::toPhysicalExpression)
+
+        val hashAggregate = HashAggregateOperator(
+            createInputOperator(),
+            outputSchema,
+            groupByColumnIndices,
+            decomposition.aggregateFunctions,
+            decomposition.aggregateFunctionTypes,
+            decomposition.aggregateFunctionArguments,
+            decomposition.aggregateColumns,
+            projections,
+            aggregationSettings
+        )
+        val sortedInputSchema = TableSchema(inputSchema.columns.map { column ->
+            if (column.identifier in groupByColumns) column.copy(isKey = true) else column
+        })
+        val sortedInput = SortOperator(
+            createInputOperator(),
+            sortedInputSchema,
+            emptyList(),
+            groupByColumnIndices.map { IndexedSortColumn(it, true) }
+        )
+        val sortedAggregate = SortedAggregateOperator(
+            sortedInput,
+            outputSchema,
+            groupByColumnIndices,
+            decomposition.aggregateFunctions,
+            decomposition.aggregateFunctionTypes,
+            decomposition.aggregateFunctionArguments.map { it.map(Expression::toPhysicalExpression) },
+            decomposition.aggregateFunctionArguments.map { it.map(Expression::type) },
+            decomposition.aggregateColumns,
+            projections
+        )
+
+        val expectedOutput = sortedAggregate.execute().toConcreteRows()
+        val producedOutput = hashAggregate.execute().toConcreteRows()
+        assertEquals(expectedOutput.size, producedOutput.size, "Hash aggregation produced a different number of groups")
+        assertTrue(producedOutput.all { it.size == 1 }, "Hash aggregation must produce one row per group")
+        assertEquals(
+            expectedOutput.flatten().groupingBy { it }.eachCount(),
+            producedOutput.flatten().groupingBy { it }.eachCount()
+        )
+    }
+
+    private fun createInputOperator(): QueryOperator {
+        val table = object : Table {
+            override val schema: TableSchema
+                get() = DataGenerator.schema
+
+            override fun timeSeriesIterator() = inputData.toTimeSeriesIterator()
+        }
+        return LinearTableScanOperator(table)
+    }
+
+}
@@ -0,0 +1,134 @@
+package science.atlarge.grademl.query.execution.operators
+
+import org.junit.jupiter.api.BeforeAll
+import science.atlarge.grademl.query.execution.ConcreteTable
+import science.atlarge.grademl.query.execution.IndexedSortColumn
+import science.atlarge.grademl.query.execution.TemporalJoinIndex
+import science.atlarge.grademl.query.execution.util.ConcreteRow
+import science.atlarge.grademl.query.execution.util.ConcreteRowBuilder
+import science.atlarge.grademl.query.execution.util.toConcreteRows
+import science.atlarge.grademl.query.execution.util.toTimeSeriesIterator
+import science.atlarge.grademl.query.model.Columns
+import science.atlarge.grademl.query.model.Table
+import science.atlarge.grademl.query.model.TableSchema
+import kotlin.test.Test
+import kotlin.test.assertEquals
+import kotlin.test.assertSame
+import kotlin.test.assertTrue
+
+class IndexedTemporalJoinOperatorTests {
+
+    companion object {
+        private var smallInput1: Pair<TableSchema, List<List<ConcreteRow>>>? = null
+        private var smallInput2: Pair<TableSchema, List<List<ConcreteRow>>>? = null
+
+        @JvmStatic
+        @BeforeAll
+        fun generateInputData() {
+            smallInput1 = ConcreteRowBuilder.build {
+                timeSeries(0, 0, 0, 0, 0, 1, 1, 1, 1)
+                numericValueColumn("_start_time", 0.0, 1.0, 2.0, 3.0, 4.0, 0.0, 1.5, 3.0, 4.5)
+                numericValueColumn("_end_time", 1.0, 2.0, 3.0, 4.0, 5.0, 1.5, 3.0, 4.5, 6.0)
+                stringKeyColumn("key1", "a", "a", "a", "a", "a", "b", "b", "b", "b")
+                stringKeyColumn("key2", "c", "c", "c", "c", "c", "d", "d", "d", "d")
+                booleanValueColumn("value1", true, true, false, false, true, true, false, false, true)
+                stringValueColumn("value2", "1/1", "1/2", "1/3", "1/4", "1/5", "2/1", "2/2", "2/3", "2/4")
+            }
+            smallInput2 = ConcreteRowBuilder.build {
+                timeSeries(0, 0, 0, 0, 1, 2, 2, 2, 2)
+                numericValueColumn("_start_time", 0.0, 1.0, 3.0, 5.0, 0.0, 0.0, 1.0, 4.5, 5.0)
+                numericValueColumn("_end_time", 1.0, 3.0, 5.0, 6.0, 10.0, 1.0, 2.5, 5.0, 5.5)
+                booleanValueColumn("v1", true, true, false, false, true, true, false, false, true)
+                stringValueColumn("v2", "1/1", "1/2", "1/3", "1/4", "2/1", "3/1", "3/2", "3/3", "3/4")
+                stringKeyColumn("k1", "a", "a", "a", "a", "a", "b", "b", "b", "b")
+                stringKeyColumn("k2", "c", "c", "c", "c", "d", "d", "d", "d", "d")
+            }
+        }
+    }
+
+    @Test
+    fun testSmallCrossJoin() {
+        assertSameResultAsSortedJoin(emptyList(), emptyList())
+    }
+
+    @Test
+    fun testSmallFirstKeyJoin() {
+        assertSameResultAsSortedJoin(listOf(2), listOf(4))
+    }
+
+    @Test
+    fun testSmallSecondKeyJoin() {
+        assertSameResultAsSortedJoin(listOf(3), listOf(5))
+    }
+
+    @Test
+    fun testSmallMultiKeyJoin() {
+        assertSameResultAsSortedJoin(listOf(2, 3), listOf(4, 5))
+    }
+
+    @Test
+    fun testIndexesOfTableShareItsRows() {
+        val table = ConcreteTable.from(smallInput2!!.second.toTimeSeriesIterator(smallInput2!!.first))
+        assertSame(table.temporalJoinIndex(listOf(4)).cache, table.temporalJoinIndex(listOf(4, 5)).cache)
+    }
+
+    // The order of joined time series is unspecified and the indexed join skips pairs of time series without
+    // overlapping rows, so the non-empty time series of both joins are compared regardless of their order. Rows within
+    // a joined time series are ordered by time, so each time series must contain the same rows in the same order.
+    private fun assertSameResultAsSortedJoin(leftJoinColumns: List<Int>, rightJoinColumns: List<Int>) {
+        val leftInputData = object : Table {
+            override val schema = smallInput1!!.first
+            override fun timeSeriesIterator() = smallInput1!!.second.toTimeSeriesIterator(smallInput1!!.first)
+        }
+        val rightInputData = object : Table {
+            override val schema = smallInput2!!.first
+            override fun timeSeriesIterator() = smallInput2!!.second.toTimeSeriesIterator(smallInput2!!.first)
+        }
+        val newSchema = TableSchema(
+            Columns.RESERVED_COLUMNS + leftInputData.schema.columns.filter { !it.isReserved } +
+                    rightInputData.schema.columns.filter { !it.isReserved }
+        )
+        val leftOutputColumns = leftInputData.schema.columns.filter { !it.isReserved }
+        val rightOutputColumns = rightInputData.schema.columns.filter { !it.isReserved }
+
+        val sortedJoin = SortedTemporalJoinOperator(
+            LinearTableScanOperator(leftInputData),
+            LinearTableScanOperator(rightInputData),
+            newSchema,
+            leftJoinColumns.map { IndexedSortColumn(it, true) },
+            rightJoinColumns.map { IndexedSortColumn(it, true) },
+            leftOutputColumns,
+            rightOutputColumns
+        )
+        // Index the right input as it is read, and through a materialized table of the right input
+        val rightTable = ConcreteTable.from(rightInputData.timeSeriesIterator())
+        val indexes = listOf(
+            {
+                TemporalJoinIndex.build(
+                    LinearTableScanOperator(rightInputData).execute(),
+                    rightJoinColumns.toIntArray()
+                )
+            },
+            { rightTable.temporalJoinIndex(rightJoinColumns) }
+        )
+
+        val expectedTimeSeries = sortedJoin.execute().toConcreteRows().filter { it.isNotEmpty() }
+        assertTrue(expectedTimeSeries.isNotEmpty())
+        for (index in indexes) {
+            val indexedJoin = IndexedTemporalJoinOperator(
+                LinearTableScanOperator(leftInputData),
+                index,
+                newSchema,
+                leftJoinColumns,
+                leftOutputColumns,
+                rightOutputColumns.map { rightInputData.schema.indexOfColumn(it)!! }
+            )
+            val indexedTimeSeries = indexedJoin.execute().toConcreteRows().filter { it.isNotEmpty() }
+            assertEquals(
+                expectedTimeSeries.groupingBy { it }.eachCount(),
+                indexedTimeSeries.groupingBy { it }.eachCount()
+            )
+        }
+    }
+
+}
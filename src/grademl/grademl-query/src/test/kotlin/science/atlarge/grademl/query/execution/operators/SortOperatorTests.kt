@@ -8,9 +8,12 @@ import science.atlarge.grademl.query.execution.DataUtils.toGeneratedRows
 import science.atlarge.grademl.query.execution.DataUtils.toTimeSeriesIterator
 import science.atlarge.grademl.query.execution.GeneratedRow
 import science.atlarge.grademl.query.execution.IndexedSortColumn
+import science.atlarge.grademl.query.execution.SortSettings
 import science.atlarge.grademl.query.model.Table
 import science.atlarge.grademl.query.model.TableSchema
+import java.nio.file.Files
 import kotlin.test.Test
+import kotlin.test.assertTrue
 
 class SortOperatorTests {
 
@@ -84,10 +87,57 @@ class SortOperatorTests {
         testSort(listOf("-v3", "k2", "v1"), listOf("k1"))
     }
 
-    private fun testSort(sortColumns: List<String>, preSortColumns: List<String> = emptyList()) {
-        val shuffledInput = preSortInput(preSortColumns)
+    @Test
+    fun testSortInParallel() {
+        val settings = SortSettings(parallelSortThreshold = 2)
+        testSort(listOf("k2", "-v1"), sortSettings = settings)
+        testSort(listOf("-v2", "v3"), listOf("k1"), sortSettings = settings)
+    }
+
+    @Test
+    fun testSortSpilledRuns() {
+        // Sort large inputs with a minimal memory budget, so rows are sorted in runs that are merged in multiple passes
+        val spillDirectory = Files.createTempDirectory("sort-operator-test")
+        try {
+            val settings = SortSettings(memoryBudgetBytes = 1, spillDirectory = spillDirectory)
+            val largeInput = DataGenerator.generate(0.3, 40, 50)
+            testSort(listOf("v1", "-k2"), sortSettings = settings, input = largeInput)
+            testSort(listOf("-v3", "v2"), listOf("-k1"), sortSettings = settings, input = largeInput)
+            testSort(listOf("k1"), sortSettings = settings)
+            assertTrue(Files.list(spillDirectory).use { it.count() } == 0L, "Spilled runs were not deleted")
+        } finally {
+            spillDirectory.toFile().deleteRecursively()
+        }
+    }
+
+    @Test
+    fun testClosingSortDeletesSpilledRuns() {
+        // Read only the first sorted time series, as a query with a LIMIT does, and close the sort early
+        val spillDirectory = Files.createTempDirectory("sort-operator-test")
+        try {
+            val settings = SortSettings(memoryBudgetBytes = 1, spillDirectory = spillDirectory)
+            val input = preSortInput(DataGenerator.generate(0.3, 40, 50), emptyList())
+            val sortOperator = createSortOperator(input, emptyList(), listOf(sortColumn("v1")), settings)
+            sortOperator.execute().use { iterator ->
+                assertTrue(iterator.loadNext())
+                assertTrue(Files.list(spillDirectory).use { it.count() } > 0L, "No runs were spilled")
+            }
+            assertTrue(Files.list(spillDirectory).use { it.count() } == 0L, "Spilled runs were not deleted")
+        } finally {
+            spillDirectory.toFile().deleteRecursively()
+        }
+    }
+
+    private fun testSort(
+        sortColumns: List<String>,
+        preSortColumns: List<String> = emptyList(),
+        sortSettings: SortSettings = SortSettings.DEFAULT,
+        input: List<GeneratedRow> = inputData
+    ) {
+        val shuffledInput = preSortInput(input, preSortColumns)
         val sortOperator = createSortOperator(
-            shuffledInput, preSortColumns.map { sortColumn(it).columnIndex }, sortColumns.map { sortColumn(it) }
+            shuffledInput, preSortColumns.map { sortColumn(it).columnIndex }, sortColumns.map { sortColumn(it) },
+            sortSettings
         )
         val expectedOutput = sortGeneratedRows(shuffledInput, preSortColumns + sortColumns)
         val producedOutput = sortOperator.execute()
@@ -102,9 +152,9 @@ class SortOperatorTests {
         )
     }
 
-    private fun preSortInput(columnsToSort: List<String>): List<List<GeneratedRow>> {
+    private fun preSortInput(input: List<GeneratedRow>, columnsToSort: List<String>): List<List<GeneratedRow>> {
         // Group rows into time series and shuffle before sorting
-        val sortedTimeSeries = inputData.groupBy(GeneratedRow::originalTimeSeriesId)
+        val sortedTimeSeries = input.groupBy(GeneratedRow::originalTimeSeriesId)
             .map { it.value }
             .shuffled()
             .toMutableList()
@@ -122,7 +172,8 @@ class SortOperatorTests {
     private fun createSortOperator(
         inputData: List<List<GeneratedRow>>,
         preSortedColumns: List<Int>,
-        columnsToSort: List<IndexedSortColumn>
+        columnsToSort: List<IndexedSortColumn>,
+        sortSettings: SortSettings
     ): QueryOperator {
         val table = object : Table {
             override val schema: TableSchema
@@ -137,7 +188,7 @@ class SortOperatorTests {
                 else column
             }
         )
-        return SortOperator(tableScan, newSchema, preSortedColumns, columnsToSort)
+        return SortOperator(tableScan, newSchema, preSortedColumns, columnsToSort, sortSettings)
     }
 
 }
\ No newline at end of file
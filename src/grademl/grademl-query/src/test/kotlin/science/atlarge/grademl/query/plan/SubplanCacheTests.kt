@@ -0,0 +1,128 @@
+package science.atlarge.grademl.query.plan
+
+import science.atlarge.grademl.query.execution.ConcreteTable
+import science.atlarge.grademl.query.execution.DataGenerator
+import science.atlarge.grademl.query.execution.DataUtils
+import science.atlarge.grademl.query.execution.DataUtils.toGeneratedRows
+import science.atlarge.grademl.query.execution.DataUtils.toTimeSeriesIterator
+import science.atlarge.grademl.query.execution.GeneratedRow
+import science.atlarge.grademl.query.execution.SortColumn
+import science.atlarge.grademl.query.language.ColumnLiteral
+import science.atlarge.grademl.query.model.Table
+import science.atlarge.grademl.query.model.TableSchema
+import science.atlarge.grademl.query.plan.physical.LinearTableScanPlan
+import science.atlarge.grademl.query.plan.physical.PhysicalQueryPlan
+import science.atlarge.grademl.query.plan.physical.PhysicalQueryPlanBuilder
+import kotlin.test.Test
+import kotlin.test.assertIs
+import kotlin.test.assertSame
+
+class SubplanCacheTests {
+
+    private val inputData = DataGenerator.generate(1.0, 10, 10)
+        .groupBy(GeneratedRow::originalTimeSeriesId)
+        .map { it.value }
+
+    @Test
+    fun testMaterializeRepeatedSubplan() {
+        val cache = SubplanCache()
+        val table = createTable()
+
+        // The first use of a subplan is executed as-is
+        val firstPlan = createSortPlan(table)
+        assertSame(firstPlan, cache.rewrite(firstPlan))
+
+        // The second use of the same subplan is materialized and replaced by a scan of its result
+        val secondPlan = cache.rewrite(createSortPlan(table))
+        val cachedResult = assertIs<LinearTableScanPlan>(secondPlan).table
+        assertIs<ConcreteTable>(cachedResult)
+        DataUtils.compareOrderedOutput(
+            createSortPlan(table).toQueryOperator().execute().toGeneratedRows(),
+            secondPlan.toQueryOperator().execute().toGeneratedRows()
+        )
+
+        // Later uses scan the same result
+        val thirdPlan = cache.rewrite(createSortPlan(table))
+        assertSame(cachedResult, assertIs<LinearTableScanPlan>(thirdPlan).table)
+    }
+
+    @Test
+    fun testDistinguishTablesWithSameName() {
+        val cache = SubplanCache()
+        val table = createTable()
+        cache.rewrite(createSortPlan(table))
+        assertIs<LinearTableScanPlan>(cache.rewrite(createSortPlan(table)))
+
+        // A different table with the same name must not reuse the cached result
+        val otherPlan = createSortPlan(createTable())
+        assertSame(otherPlan, cache.rewrite(otherPlan))
+    }
+
+    @Test
+    fun testInvalidateTable() {
+        val cache = SubplanCache()
+        val table = createTable()
+        cache.rewrite(createSortPlan(table))
+        assertIs<LinearTableScanPlan>(cache.rewrite(createSortPlan(table)))
+
+        // Dropping the table's results also resets the use count of its subplans
+        cache.invalidate(table)
+        val plan = createSortPlan(table)
+        assertSame(plan, cache.rewrite(plan))
+    }
+
+    @Test
+    fun testSkipResultsExceedingBudget() {
+        val cache = SubplanCache(byteBudget = 100)
+        val table = createTable()
+        cache.rewrite(createSortPlan(table))
+
+        // A result that does not fit in the budget is executed as usual, and is not materialized again
+        repeat(2) {
+            val plan = createSortPlan(table)
+            assertSame(plan, cache.rewrite(plan))
+        }
+    }
+
+    @Test
+    fun testSkipRootOfQueryWithLimit() {
+        val cache = SubplanCache()
+        val table = createTable()
+
+        // A query with a LIMIT reads only part of its result, so its root is never materialized
+        repeat(2) {
+            val plan = createSortPlan(table)
+            assertSame(plan, cache.rewrite(plan, hasLimit = true))
+        }
+
+        // But it does scan a result that was cached by other queries
+        cache.rewrite(createSortPlan(table))
+        val cachedResult = assertIs<LinearTableScanPlan>(cache.rewrite(createSortPlan(table))).table
+        assertSame(cachedResult, assertIs<LinearTableScanPlan>(cache.rewrite(createSortPlan(table), true)).table)
+    }
+
+    @Test
+    fun testIgnoreScans() {
+        val cache = SubplanCache(reuseThreshold = 1)
+        val table = createTable()
+        val plan = PhysicalQueryPlanBuilder.linearScan(table, "t")
+        repeat(3) { assertSame(plan, cache.rewrite(plan), "Scans of a table must not be cached") }
+    }
+
+    private fun createSortPlan(table: Table): PhysicalQueryPlan {
+        return PhysicalQueryPlanBuilder.sort(
+            PhysicalQueryPlanBuilder.linearScan(table, "t"),
+            listOf(SortColumn(ColumnLiteral("v1"), true))
+        )
+    }
+
+    private fun createTable(): Table {
+        return object : Table {
+            override val schema: TableSchema
+                get() = DataGenerator.schema
+
+            override fun timeSeriesIterator() = inputData.toTimeSeriesIterator()
+        }
+    }
+
+}
@@ -0,0 +1,70 @@
+package science.atlarge.grademl.query.plan.physical
+
+import science.atlarge.grademl.query.execution.DataGenerator
+import science.atlarge.grademl.query.execution.DataUtils.toTimeSeriesIterator
+import science.atlarge.grademl.query.execution.GeneratedRow
+import science.atlarge.grademl.query.execution.SortColumn
+import science.atlarge.grademl.query.language.ColumnLiteral
+import science.atlarge.grademl.query.language.FunctionCallExpression
+import science.atlarge.grademl.query.language.NamedExpression
+import science.atlarge.grademl.query.model.Table
+import science.atlarge.grademl.query.model.TableSchema
+import kotlin.test.Test
+import kotlin.test.assertEquals
+import kotlin.test.assertIs
+import kotlin.test.assertNull
+import kotlin.test.assertSame
+
+class SelectAggregateStrategyOptimizationTests {
+
+    private val scan = PhysicalQueryPlanBuilder.linearScan(
+        object : Table {
+            override val schema: TableSchema
+                get() = DataGenerator.schema
+
+            override fun timeSeriesIterator() = emptyList<List<GeneratedRow>>().toTimeSeriesIterator()
+        },
+        "t"
+    )
+
+    private fun sort(input: PhysicalQueryPlan, vararg columns: String) =
+        PhysicalQueryPlanBuilder.sort(input, columns.map { SortColumn(ColumnLiteral(it), true) })
+
+    private fun aggregate(input: PhysicalQueryPlan, vararg groupByColumns: String) =
+        PhysicalQueryPlanBuilder.sortedAggregate(
+            input,
+            groupByColumns.toList(),
+            groupByColumns.map { NamedExpression(ColumnLiteral(it), it) } +
+                NamedExpression(FunctionCallExpression("SUM", listOf(ColumnLiteral("v4"))), "total")
+        )
+
+    @Test
+    fun testAggregateOfUnsortedInputUsesHashAggregation() {
+        val plan = aggregate(sort(scan, "v1", "v2"), "v2", "v1")
+        val optimizedPlan = assertIs<HashAggregatePlan>(SelectAggregateStrategyOptimization.optimize(plan))
+        // The sort for the aggregation is dropped
+        assertSame(scan, optimizedPlan.input)
+        assertEquals(listOf("v2", "v1"), optimizedPlan.groupByColumns)
+        assertEquals(plan.schema.columns, optimizedPlan.schema.columns)
+    }
+
+    @Test
+    fun testAggregateOfSortedInputDropsSort() {
+        // The filter preserves the order of its input, which is already sorted by the group-by column
+        val filter = PhysicalQueryPlanBuilder.filter(sort(scan, "v1", "v2"), ColumnLiteral("v3"))
+        val plan = aggregate(sort(filter, "v1"), "v1")
+        val optimizedPlan = assertIs<SortedAggregatePlan>(SelectAggregateStrategyOptimization.optimize(plan))
+        assertSame(filter, optimizedPlan.input)
+        assertEquals(plan.schema.columns, optimizedPlan.schema.columns)
+    }
+
+    @Test
+    fun testOtherAggregatesAreUnchanged() {
+        // Sorts by other columns than the group-by columns were not added for the aggregation
+        assertNull(SelectAggregateStrategyOptimization.optimize(aggregate(sort(scan, "v1", "v2"), "v1")))
+        assertNull(SelectAggregateStrategyOptimization.optimize(aggregate(sort(scan, "k1"), "v1")))
+        // Aggregates over the whole input need no sort
+        assertNull(SelectAggregateStrategyOptimization.optimize(aggregate(scan)))
+    }
+
+}
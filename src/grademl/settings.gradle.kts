@@ -2,6 +2,8 @@ rootProject.name = "grademl-engine"
 
 include(":grademl-core")
 include(":grademl-input:grademl-input-airflow")
+include(":grademl-input:grademl-input-framework-trace")
+include(":grademl-input:grademl-input-phase-markers")
 include(":grademl-input:grademl-input-resource-monitor")
 include(":grademl-input:grademl-input-spark")
 include(":grademl-input:grademl-input-tensorflow")
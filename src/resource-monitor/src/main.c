@@ -15,16 +15,20 @@
 
 
 /**
- * Catch SIGINT and set a flag to stop the main monitoring loop.
+ * Catch SIGINT and SIGTERM and set a flag to stop the main monitoring loop.
  */
 volatile bool interrupted = false;
+volatile sig_atomic_t received_signal = 0;
 
 void sigint_handler(int signum) {
+	received_signal = signum;
 	interrupted = true;
 }
 
 void setup_sigint_handler() {
 	signal(SIGINT, sigint_handler);
+	// Stop gracefully when killed, so the last block and the index of block output files are written
+	signal(SIGTERM, sigint_handler);
 }
 
 /**
@@ -112,6 +116,7 @@ int main(int argc, char **argv) {
 	monitor_state_t state = init_state(&opts, argc, argv);
 	create_pid_file(&opts);
 
+	init_trace_output(opts.block_samples);
 	init_all_parsers(&opts, &state);
 
 	nanosec_t last_update_time;
@@ -120,13 +125,17 @@ int main(int argc, char **argv) {
 		DEBUG_PRINT("Monitoring at t=%llu\n", last_update_time);
 
 		for (trace_file_t *trace_file = state.trace_files; trace_file != NULL; trace_file = trace_file->next) {
+			if (trace_file->block_start_callback != NULL && trace_output_at_block_start(trace_file->output_file)) {
+				trace_file->block_start_callback(trace_file);
+			}
 			trace_file->parse_callback(trace_file);
+			end_trace_sample(trace_file->output_file);
 		}
 
 		sleep_until(last_update_time + opts.monitor_period);
 	}
 
-	printf("Received SIGINT, flushing output files and shutting down");
+	printf("Received %s, flushing output files and shutting down\n", received_signal == SIGTERM ? "SIGTERM" : "SIGINT");
 	destroy_pid_file(&opts);
 	for (trace_file_t *trace_file = state.trace_files; trace_file != NULL; trace_file = trace_file->next) {
 		trace_file->cleanup_callback(trace_file);
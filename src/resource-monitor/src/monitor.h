@@ -2,6 +2,8 @@
 #ifndef __MONITOR_H__
 #define __MONITOR_H__
 
+#include "output.h"
+
 #include <stdbool.h>
 #include <stdio.h>
 #include <time.h>
@@ -39,6 +41,8 @@ typedef struct trace_file_t trace_file_t;
 struct trace_file_t {
 	void (*parse_callback)(trace_file_t *);
 	void (*cleanup_callback)(trace_file_t *);
+	// Optional: writes records that must be repeated at the start of every block of the output file
+	void (*block_start_callback)(trace_file_t *);
 	const char *source_file_name;
 	FILE *output_file;
 	void *data;
@@ -59,6 +63,7 @@ typedef struct {
 	const char *output_directory;
 	nanosec_t monitor_period;
 	const char *pid_file;
+	unsigned int block_samples;
 	bool enable_cpu_monitoring;
 #ifdef CUDA
 	bool enable_gpu_monitoring;
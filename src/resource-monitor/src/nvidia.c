@@ -205,6 +205,14 @@ static void log_nvml(trace_file_t *trace_file) {
 /**
  * Parse module initialization and cleanup
  */
+static void repeat_device_list(trace_file_t *trace_file) {
+	// Blocks of the output file are decoded independently, so each block starts with the device list
+	nvml_data *nvd = (nvml_data *)trace_file->data;
+	if (nvd->is_initialized) {
+		write_device_list(trace_file->output_file, get_time(), nvd);
+	}
+}
+
 static void cleanup_nvml_logger(trace_file_t *trace_file) {
 	shutdown_nvml((nvml_data *)trace_file->data);
 	fclose(trace_file->output_file);
@@ -224,9 +232,10 @@ trace_file_t *init_nvml_logger(const char *output_directory, const char *hostnam
 	trace_file_t *trace_file = malloc(sizeof(trace_file_t));
 	trace_file->parse_callback = log_nvml;
 	trace_file->cleanup_callback = cleanup_nvml_logger;
+	trace_file->block_start_callback = repeat_device_list;
 	trace_file->source_file_name = NULL;
 	trace_file->data = calloc(1, sizeof(nvml_data));
-	trace_file->output_file = fopen(output_filename, "wb");
+	trace_file->output_file = open_trace_output(output_filename);
 
 	free(output_filename);
 
@@ -20,13 +20,15 @@ enum LONG_OPTIONS {
 #endif
 	OPTION_NO_MEMORY,
 	OPTION_NO_NETWORK,
-	OPTION_NO_DISK
+	OPTION_NO_DISK,
+	OPTION_BLOCK_SAMPLES
 };
 
 static struct argp_option options[] = {
 	{ "output-dir",       'o',               "DIR",  0, "Output directory to store resource traces in [default: " DEFAULT_OUTPUT_DIRECTORY "]" },
 	{ "monitor-interval", 'i',               "MS",   0, "Interval between consecutive measurements, in milliseconds [default: " STR2(DEFAULT_MONITOR_INTERVAL) "]" },
 	{ "pid-file",         'p',               "FILE", 0, "File to write monitoring daemon's PID to [default: " DEFAULT_PID_FILE "]" },
+	{ "block-samples",    OPTION_BLOCK_SAMPLES, "N", 0, "Write compressed blocks of N samples with a time index instead of an unbounded stream (e.g., 600) [default: 0, disabled]" },
 	{ "no-cpu",           OPTION_NO_CPU,     0,      0, "Disable monitoring of CPU resources" },
 #ifdef CUDA
 	{ "no-gpu",           OPTION_NO_GPU,     0,      0, "Disable monitoring of GPU resources" },
@@ -58,6 +60,14 @@ static error_t option_parser(int key, char *arg, struct argp_state *state) {
 		case 'p': // --pid-file
 			opts->pid_file = arg;
 			break;
+		case OPTION_BLOCK_SAMPLES: // --block-samples
+			arg_as_int = atoi(arg);
+			if (arg_as_int < 0) {
+				fprintf(stderr, "Number of samples per block must be a non-negative integer\n");
+				return EINVAL;
+			}
+			opts->block_samples = arg_as_int;
+			break;
 		case OPTION_NO_CPU: // --no-cpu
 			opts->enable_cpu_monitoring = false;
 			break;
@@ -91,6 +101,7 @@ monitor_options_t parse_command_line(int argc, char **argv) {
 		.output_directory = DEFAULT_OUTPUT_DIRECTORY,
 		.monitor_period = DEFAULT_MONITOR_INTERVAL * MILLISECONDS,
 		.pid_file = DEFAULT_PID_FILE,
+		.block_samples = 0,
 		.enable_cpu_monitoring = true,
 #ifdef CUDA
 		.enable_gpu_monitoring = true,
@@ -106,6 +117,7 @@ monitor_options_t parse_command_line(int argc, char **argv) {
 	DEBUG_PRINT("  output_directory = %s\n", opts.output_directory);
 	DEBUG_PRINT("  monitor_period = %llu ns\n", opts.monitor_period);
 	DEBUG_PRINT("  pid_file = %s\n", opts.pid_file);
+	DEBUG_PRINT("  block_samples = %u\n", opts.block_samples);
 	DEBUG_PRINT("  enable_cpu_monitoring = %d\n", opts.enable_cpu_monitoring);
 #ifdef CUDA
 	DEBUG_PRINT("  enable_gpu_monitoring = %d\n", opts.enable_gpu_monitoring);
@@ -0,0 +1,247 @@
+#define _GNU_SOURCE
+#include "output.h"
+#include "monitor.h"
+
+#include <stdint.h>
+#include <stdlib.h>
+#include <string.h>
+#include <sys/types.h>
+#include <zlib.h>
+
+/**
+ * Data structures of the block output format (little-endian, see doc/file-formats.md)
+ */
+#define BLOCK_FILE_MAGIC "GMLRMB01"
+#define BLOCK_MAGIC      "GMLB"
+#define INDEX_MAGIC      "GMLRMIDX"
+
+typedef struct {
+	char magic[8];
+	uint32_t block_samples;
+	uint32_t reserved;
+} block_file_header_t;
+
+typedef struct {
+	char magic[4];
+	uint32_t sample_count;
+	uint64_t first_timestamp;
+	uint64_t last_timestamp;
+	uint64_t previous_timestamp;
+	uint32_t uncompressed_size;
+	uint32_t compressed_size;
+	uint32_t crc32;
+	uint32_t reserved;
+} block_header_t;
+
+typedef struct {
+	uint64_t offset;
+	uint64_t first_timestamp;
+	uint64_t last_timestamp;
+} index_entry_t;
+
+typedef struct {
+	uint64_t index_offset;
+	uint32_t block_count;
+	uint32_t reserved;
+	char magic[8];
+} index_trailer_t;
+
+
+/**
+ * State of an output file in block mode
+ */
+typedef struct block_output_t block_output_t;
+struct block_output_t {
+	FILE *stream;
+	FILE *output_file;
+	uint64_t output_offset;
+
+	// Uncompressed records of the current block, and the offset of the current sample's first record
+	char *buffer;
+	size_t buffer_size;
+	size_t buffer_capacity;
+	size_t sample_offset;
+
+	// Samples and time range of the current block, and the last timestamp of the previous block
+	unsigned int sample_count;
+	uint64_t first_timestamp;
+	uint64_t last_timestamp;
+	uint64_t previous_timestamp;
+
+	// Reusable buffer for compressed blocks
+	unsigned char *compressed_buffer;
+	uLong compressed_capacity;
+
+	// Index of all blocks written so far
+	index_entry_t *index;
+	uint32_t index_size;
+	uint32_t index_capacity;
+
+	block_output_t *next;
+};
+
+static unsigned int block_samples = 0;
+static block_output_t *block_outputs = NULL;
+
+static block_output_t *find_block_output(FILE *stream) {
+	for (block_output_t *output = block_outputs; output != NULL; output = output->next) {
+		if (output->stream == stream) return output;
+	}
+	return NULL;
+}
+
+
+/**
+ * Block writing logic
+ */
+static void write_block(block_output_t *output) {
+	// Compress the block's records
+	uLong compressed_size = compressBound(output->buffer_size);
+	if (compressed_size > output->compressed_capacity) {
+		output->compressed_buffer = realloc(output->compressed_buffer, compressed_size);
+		output->compressed_capacity = compressed_size;
+	}
+	compress2(output->compressed_buffer, &compressed_size, (const Bytef *)output->buffer, output->buffer_size,
+			Z_DEFAULT_COMPRESSION);
+
+	// Write the block header and the compressed records, and flush them so the block is complete on disk even if
+	// the monitor is killed before the next block
+	block_header_t header = {
+		.sample_count = output->sample_count,
+		.first_timestamp = output->first_timestamp,
+		.last_timestamp = output->last_timestamp,
+		.previous_timestamp = output->previous_timestamp,
+		.uncompressed_size = (uint32_t)output->buffer_size,
+		.compressed_size = (uint32_t)compressed_size,
+		.crc32 = (uint32_t)crc32(0L, (const Bytef *)output->buffer, output->buffer_size),
+		.reserved = 0
+	};
+	memcpy(header.magic, BLOCK_MAGIC, sizeof(header.magic));
+	fwrite(&header, sizeof(header), 1, output->output_file);
+	fwrite(output->compressed_buffer, compressed_size, 1, output->output_file);
+	fflush(output->output_file);
+	DEBUG_PRINT("output: Wrote block of %u samples (%zu bytes, %lu compressed)\n",
+			output->sample_count, output->buffer_size, compressed_size);
+
+	// Add the block to the index
+	if (output->index_size == output->index_capacity) {
+		output->index_capacity = output->index_capacity == 0 ? 64 : output->index_capacity * 2;
+		output->index = realloc(output->index, sizeof(index_entry_t) * output->index_capacity);
+	}
+	index_entry_t *entry = &output->index[output->index_size++];
+	entry->offset = output->output_offset;
+	entry->first_timestamp = output->first_timestamp;
+	entry->last_timestamp = output->last_timestamp;
+	output->output_offset += sizeof(header) + compressed_size;
+
+	// Start a new block
+	output->previous_timestamp = output->last_timestamp;
+	output->buffer_size = 0;
+	output->sample_offset = 0;
+	output->sample_count = 0;
+}
+
+static void end_block_sample(block_output_t *output) {
+	// Skip samples without records
+	if (output->buffer_size == output->sample_offset) return;
+	// Every record starts with its timestamp, so the first 8 bytes of a sample are its timestamp
+	uint64_t timestamp;
+	memcpy(&timestamp, output->buffer + output->sample_offset, sizeof(timestamp));
+	if (output->sample_count == 0) output->first_timestamp = timestamp;
+	output->last_timestamp = timestamp;
+	output->sample_count++;
+	output->sample_offset = output->buffer_size;
+
+	if (output->sample_count >= block_samples) write_block(output);
+}
+
+static void write_index(block_output_t *output) {
+	index_trailer_t trailer = {
+		.index_offset = output->output_offset,
+		.block_count = output->index_size,
+		.reserved = 0
+	};
+	memcpy(trailer.magic, INDEX_MAGIC, sizeof(trailer.magic));
+	fwrite(output->index, sizeof(index_entry_t), output->index_size, output->output_file);
+	fwrite(&trailer, sizeof(trailer), 1, output->output_file);
+}
+
+
+/**
+ * Stream functions for modules writing to an output file in block mode
+ */
+static ssize_t block_output_write(void *cookie, const char *data, size_t size) {
+	block_output_t *output = cookie;
+	if (output->buffer_size + size > output->buffer_capacity) {
+		while (output->buffer_size + size > output->buffer_capacity) output->buffer_capacity *= 2;
+		output->buffer = realloc(output->buffer, output->buffer_capacity);
+	}
+	memcpy(output->buffer + output->buffer_size, data, size);
+	output->buffer_size += size;
+	return size;
+}
+
+static int block_output_close(void *cookie) {
+	block_output_t *output = cookie;
+	// Write the last, partial block followed by the index
+	end_block_sample(output);
+	if (output->sample_count > 0) write_block(output);
+	write_index(output);
+	int result = fclose(output->output_file);
+
+	// Remove the output from the list of block outputs
+	for (block_output_t **ptr = &block_outputs; *ptr != NULL; ptr = &(*ptr)->next) {
+		if (*ptr == output) {
+			*ptr = output->next;
+			break;
+		}
+	}
+	free(output->buffer);
+	free(output->compressed_buffer);
+	free(output->index);
+	free(output);
+	return result;
+}
+
+
+/**
+ * Public interface
+ */
+void init_trace_output(unsigned int samples_per_block) {
+	block_samples = samples_per_block;
+}
+
+FILE *open_trace_output(const char *filename) {
+	FILE *output_file = fopen(filename, "wb");
+	if (block_samples == 0 || output_file == NULL) return output_file;
+
+	block_file_header_t header = { .block_samples = block_samples, .reserved = 0 };
+	memcpy(header.magic, BLOCK_FILE_MAGIC, sizeof(header.magic));
+	fwrite(&header, sizeof(header), 1, output_file);
+
+	block_output_t *output = calloc(1, sizeof(block_output_t));
+	output->output_file = output_file;
+	output->output_offset = sizeof(header);
+	output->buffer_capacity = 64 * 1024;
+	output->buffer = malloc(output->buffer_capacity);
+
+	// Modules write to a stream that appends to the current block; it is unbuffered, because the block is a buffer
+	cookie_io_functions_t functions = { .read = NULL, .write = block_output_write, .seek = NULL,
+			.close = block_output_close };
+	output->stream = fopencookie(output, "w", functions);
+	setvbuf(output->stream, NULL, _IONBF, 0);
+
+	output->next = block_outputs;
+	block_outputs = output;
+	return output->stream;
+}
+
+bool trace_output_at_block_start(FILE *output_file) {
+	block_output_t *output = find_block_output(output_file);
+	return output != NULL && output->buffer_size == 0;
+}
+
+void end_trace_sample(FILE *output_file) {
+	block_output_t *output = find_block_output(output_file);
+	if (output != NULL) end_block_sample(output);
+}
@@ -0,0 +1,33 @@
+#ifndef __OUTPUT_H__
+#define __OUTPUT_H__
+
+#include <stdbool.h>
+#include <stdio.h>
+
+/**
+ * Output files of monitoring modules
+ *
+ * By default, each module writes an unbounded stream of records to its output file. With block output enabled, the
+ * records of every block_samples consecutive samples are compressed into a block, and an index of the blocks' time
+ * ranges is written when the output file is closed. See doc/file-formats.md for details.
+ */
+void init_trace_output(unsigned int block_samples);
+
+/**
+ * Opens an output file for a monitoring module. Modules write records to the returned stream with fwrite and close
+ * it with fclose, regardless of the output format.
+ */
+FILE *open_trace_output(const char *filename);
+
+/**
+ * Returns true if the next record written to the given output file is the first record of a block. Modules must write
+ * any records that later records depend on (e.g., lists of devices) at the start of every block.
+ */
+bool trace_output_at_block_start(FILE *output_file);
+
+/**
+ * Marks the end of a sample, i.e., all records written by one call of a module's parse callback.
+ */
+void end_trace_sample(FILE *output_file);
+
+#endif
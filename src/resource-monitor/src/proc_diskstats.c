@@ -252,6 +252,11 @@ static void parse_proc_diskstats(trace_file_t *trace_file) {
  */
 static const char proc_diskstats_filename[] = "/proc/diskstats";
 
+static void repeat_disk_list(trace_file_t *trace_file) {
+	// Blocks of the output file are decoded independently, so each block starts with the disk list
+	write_disk_list(trace_file->output_file, get_time(), (proc_diskstats_data *)trace_file->data);
+}
+
 static void cleanup_proc_diskstats(trace_file_t *trace_file) {
 	fclose(trace_file->output_file);
 	cleanup_data_buffers((proc_diskstats_data *)trace_file->data);
@@ -269,9 +274,10 @@ trace_file_t *init_proc_diskstats_parser(const char *output_directory, const cha
 	trace_file_t *trace_file = malloc(sizeof(trace_file_t));
 	trace_file->parse_callback = parse_proc_diskstats;
 	trace_file->cleanup_callback = cleanup_proc_diskstats;
+	trace_file->block_start_callback = repeat_disk_list;
 	trace_file->source_file_name = proc_diskstats_filename;
 	trace_file->data = calloc(1, sizeof(proc_diskstats_data));
-	trace_file->output_file = fopen(output_filename, "wb");
+	trace_file->output_file = open_trace_output(output_filename);
 
 	free(output_filename);
 
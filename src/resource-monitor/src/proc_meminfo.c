@@ -176,6 +176,13 @@ static void parse_proc_meminfo(trace_file_t *trace_file) {
  */
 static const char proc_meminfo_filename[] = "/proc/meminfo";
 
+static void repeat_totals(trace_file_t *trace_file) {
+	// Blocks of the output file are decoded independently, so force the next sample to start with the totals
+	proc_meminfo_data *data = (proc_meminfo_data *)trace_file->data;
+	data->mem_total = 0;
+	data->swap_total = 0;
+}
+
 static void cleanup_proc_meminfo(trace_file_t *trace_file) {
 	fclose(trace_file->output_file);
 	free(trace_file->data);
@@ -192,9 +199,10 @@ trace_file_t *init_proc_meminfo_parser(const char *output_directory, const char
 	trace_file_t *trace_file = malloc(sizeof(trace_file_t));
 	trace_file->parse_callback = parse_proc_meminfo;
 	trace_file->cleanup_callback = cleanup_proc_meminfo;
+	trace_file->block_start_callback = repeat_totals;
 	trace_file->source_file_name = proc_meminfo_filename;
 	trace_file->data = calloc(1, sizeof(proc_meminfo_data) + 2 * sizeof(proc_meminfo_metrics));
-	trace_file->output_file = fopen(output_filename, "wb");
+	trace_file->output_file = open_trace_output(output_filename);
 
 	free(output_filename);
 
@@ -247,6 +247,11 @@ static void parse_proc_net_dev(trace_file_t *trace_file) {
  */
 static const char proc_net_dev_filename[] = "/proc/net/dev";
 
+static void repeat_iface_list(trace_file_t *trace_file) {
+	// Blocks of the output file are decoded independently, so each block starts with the interface list
+	write_iface_list(trace_file->output_file, get_time(), (proc_net_dev_data *)trace_file->data);
+}
+
 static void cleanup_proc_net_dev(trace_file_t *trace_file) {
 	fclose(trace_file->output_file);
 	cleanup_data_buffers((proc_net_dev_data *)trace_file->data);
@@ -264,9 +269,10 @@ trace_file_t *init_proc_net_dev_parser(const char *output_directory, const char
 	trace_file_t *trace_file = malloc(sizeof(trace_file_t));
 	trace_file->parse_callback = parse_proc_net_dev;
 	trace_file->cleanup_callback = cleanup_proc_net_dev;
+	trace_file->block_start_callback = repeat_iface_list;
 	trace_file->source_file_name = proc_net_dev_filename;
 	trace_file->data = calloc(1, sizeof(proc_net_dev_data));
-	trace_file->output_file = fopen(output_filename, "wb");
+	trace_file->output_file = open_trace_output(output_filename);
 
 	free(output_filename);
 
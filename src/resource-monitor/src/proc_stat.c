@@ -158,9 +158,10 @@ trace_file_t *init_proc_stat_parser(const char *output_directory, const char *ho
 	trace_file_t *trace_file = malloc(sizeof(trace_file_t));
 	trace_file->parse_callback = parse_proc_stat;
 	trace_file->cleanup_callback = cleanup_proc_stat;
+	trace_file->block_start_callback = NULL;
 	trace_file->source_file_name = proc_stat_filename;
 	trace_file->data = alloc_proc_stat_data(num_cpus);
-	trace_file->output_file = fopen(output_filename, "wb");
+	trace_file->output_file = open_trace_output(output_filename);
 
 	free(output_filename);
 
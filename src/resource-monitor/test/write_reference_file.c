@@ -0,0 +1,51 @@
+/**
+ * Writes the block-indexed reference file used by the tests of grademl-input-resource-monitor: ten samples of two
+ * CPUs in the /proc/stat output format, in blocks of four samples, so the last block is partial.
+ *
+ * Usage: write-reference-file <output file>
+ */
+#include "../src/output.h"
+#include "../src/varint.h"
+
+#include <stdint.h>
+#include <stdio.h>
+#include <string.h>
+
+#define NUM_SAMPLES   10
+#define NUM_CPUS      2
+#define BLOCK_SAMPLES 4
+
+int main(int argc, char **argv) {
+	if (argc != 2) {
+		fprintf(stderr, "Usage: %s <output file>\n", argv[0]);
+		return 1;
+	}
+
+	init_trace_output(BLOCK_SAMPLES);
+	FILE *output_file = open_trace_output(argv[1]);
+	if (output_file == NULL) {
+		perror("Failed to open output file");
+		return 1;
+	}
+
+	// Sample i is taken at 1 s + i * 100 ms; CPU c spends (7 * i + 30 * c) % 100 out of 100 jiffies busy (user)
+	for (unsigned int sample = 0; sample < NUM_SAMPLES; sample++) {
+		char record[256];
+		char *record_ptr = record;
+		uint64_t timestamp = 1000000000ULL + sample * 100000000ULL;
+		memcpy(record_ptr, &timestamp, sizeof(timestamp));
+		record_ptr += sizeof(timestamp);
+		write_var_uint32_t(NUM_CPUS, &record_ptr);
+		for (unsigned int cpu_id = 0; cpu_id < NUM_CPUS; cpu_id++) {
+			uint64_t busy = (7 * sample + 30 * cpu_id) % 100;
+			uint64_t fields[10] = { busy, 0, 0, 100 - busy, 0, 0, 0, 0, 0, 0 };
+			for (unsigned int field = 0; field < 10; field++) {
+				write_var_uint64_t(fields[field], &record_ptr);
+			}
+		}
+		fwrite(record, (size_t)(record_ptr - record), 1, output_file);
+		end_trace_sample(output_file);
+	}
+
+	return fclose(output_file) == 0 ? 0 : 1;
+}